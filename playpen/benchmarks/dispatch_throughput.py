@@ -0,0 +1,141 @@
+#!/usr/bin/env python2
+"""
+Benchmark the rate at which the resource manager dispatches reserved tasks.
+
+Each task reserves one of --resources resource IDs.  Half of the tasks are
+released as they are dispatched, so the remaining ones contend for workers
+that hold reservations.  Database queries are counted and delayed by --latency
+seconds to approximate a round trip to MongoDB.
+"""
+import optparse
+import time
+import uuid
+
+import mock
+
+from pulp.server.async import reservations, tasks
+
+
+class FakeDB(object):
+    """
+    In-memory replacement for the ReservedResource and Worker collections.
+    """
+
+    def __init__(self, workers, latency):
+        self.latency = latency
+        self.queries = 0
+        self.workers = [mock.MagicMock(name=n) for n in workers]
+        for worker, name in zip(self.workers, workers):
+            worker.__getitem__.side_effect = {'name': name}.__getitem__
+            worker.name = name
+        self.reservations = {}
+
+    def query(self):
+        self.queries += 1
+        time.sleep(self.latency)
+
+    def reserved_resource(self, task_id, worker_name, resource_id):
+        document = mock.Mock()
+        document.save.side_effect = lambda: self._save(task_id, worker_name, resource_id)
+        return document
+
+    def _save(self, task_id, worker_name, resource_id):
+        self.query()
+        self.reservations[task_id] = {
+            'task_id': task_id, 'worker_name': worker_name, 'resource_id': resource_id}
+
+    def release(self, task_id):
+        self.query()
+        self.reservations.pop(task_id, None)
+
+    def find(self, resource_id=None, resource_id__in=None, **kwargs):
+        self.query()
+        result = self.reservations.values()
+        if resource_id is not None:
+            result = [r for r in result if r['resource_id'] == resource_id]
+        if resource_id__in is not None:
+            result = [r for r in result if r['resource_id'] in resource_id__in]
+        query_set = mock.Mock()
+        query_set.first.return_value = result[0] if result else None
+        query_set.__iter__ = lambda s: iter(result)
+        return query_set
+
+    def all(self):
+        self.query()
+        return self.reservations.values()
+
+    def count(self):
+        self.query()
+        return len(self.reservations)
+
+    def only(self, *fields):
+        return self.all()
+
+    def get_online(self):
+        self.query()
+        return list(self.workers)
+
+    def worker(self, name=None):
+        self.query()
+        query_set = mock.Mock()
+        query_set.first.return_value = next((w for w in self.workers if w.name == name), None)
+        return query_set
+
+
+def run(options):
+    db = FakeDB(['reserved_resource_worker-%d@host' % n for n in range(options.workers)],
+                options.latency)
+    reserved_resource = mock.Mock(side_effect=db.reserved_resource)
+    reserved_resource.objects.side_effect = db.find
+    reserved_resource.objects.all.side_effect = db.all
+    reserved_resource.objects.count.side_effect = db.count
+    reserved_resource.objects.only.side_effect = db.only
+    worker = mock.Mock()
+    worker.objects.side_effect = db.worker
+    worker.objects.get_online.side_effect = db.get_online
+
+    reservations.view.invalidate()
+    patches = [
+        mock.patch('pulp.server.async.tasks.ReservedResource', reserved_resource),
+        mock.patch('pulp.server.async.tasks.Worker', worker),
+        mock.patch('pulp.server.async.reservations.ReservedResource', reserved_resource),
+        mock.patch('pulp.server.async.reservations.Worker', worker),
+        mock.patch('pulp.server.async.tasks.celery'),
+        mock.patch('pulp.server.async.tasks._release_resource'),
+    ]
+    for patch in patches:
+        patch.start()
+    try:
+        started = time.time()
+        for n in range(options.tasks):
+            task_id = str(uuid.uuid4())
+            resource_id = 'resource-%d' % (n % options.resources)
+            tasks._queue_reserved_task('task', task_id, resource_id, [], {})
+            if n % 2:
+                db.release(task_id)
+                reservations.view.released(task_id)
+        elapsed = time.time() - started
+    finally:
+        for patch in patches:
+            patch.stop()
+
+    print 'Dispatched %d tasks in %.2f seconds (%.1f tasks/s)' % (
+        options.tasks, elapsed, options.tasks / elapsed)
+    print 'Database queries: %d (%.2f per task)' % (
+        db.queries, db.queries / float(options.tasks))
+    print 'Reservation view: %s' % reservations.view.stats
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--tasks', type='int', default=2000, help='number of tasks to dispatch')
+    parser.add_option('--workers', type='int', default=8, help='number of workers')
+    parser.add_option('--resources', type='int', default=4, help='number of resources')
+    parser.add_option('--latency', type='float', default=0.001,
+                      help='seconds added to each database query')
+    options, _ = parser.parse_args()
+    run(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python2
+"""
+Benchmark the rate of password authenticated REST API calls
+(pulp.server.webservices.views.decorators.password_authentication) with and
+without the verified credential cache (pulp.server.auth.credentials).
+
+The user is read from an in-memory fake of the users collection, and each read
+is delayed by --latency seconds to approximate a round trip to MongoDB.  The
+same credentials are used by every call, as they are by automation driving the
+API, so all calls after the first are served by the cache when it is enabled.
+"""
+import optparse
+import time
+
+import mock
+
+from pulp.server.auth import credentials
+from pulp.server.db import model
+from pulp.server.managers.auth.authentication import AuthenticationManager
+from pulp.server.webservices.views import decorators
+
+
+LOGIN = 'admin'
+PASSWORD = 'admin'
+
+
+def run(options, name, cache):
+    user = model.User(login=LOGIN, roles=['super-users'])
+    user.set_password(PASSWORD)
+
+    def first():
+        time.sleep(options.latency)
+        return user
+
+    objects = mock.Mock()
+    objects.return_value.first.side_effect = first
+    patches = [
+        mock.patch.object(model.User, 'objects', objects),
+        mock.patch.object(decorators.http, 'username_password', return_value=(LOGIN, PASSWORD)),
+        mock.patch.object(decorators.factory, 'authentication_manager',
+                          return_value=AuthenticationManager()),
+        mock.patch.object(credentials, 'verified_credentials', return_value=cache),
+    ]
+    for patch in patches:
+        patch.start()
+    try:
+        started = time.time()
+        for n in xrange(options.requests):
+            assert decorators.password_authentication() == LOGIN
+        elapsed = time.time() - started
+    finally:
+        for patch in patches:
+            patch.stop()
+
+    print '%-18s %6d requests  %7.2fs  %8.1f requests/sec  %7.3f ms/request' % (
+        name, options.requests, elapsed, options.requests / elapsed,
+        elapsed * 1000 / options.requests)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--requests', type='int', default=500,
+                      help='number of authenticated requests')
+    parser.add_option('--ttl', type='int', default=300,
+                      help='seconds verified credentials are cached')
+    parser.add_option('--latency', type='float', default=0.0005,
+                      help='seconds added to each database query')
+    options, args = parser.parse_args()
+    run(options, 'cache disabled', credentials.VerifiedCredentialCache(0, 1000))
+    run(options, 'cache enabled', credentials.VerifiedCredentialCache(options.ttl, 1000))
+
+
+if __name__ == '__main__':
+    main()
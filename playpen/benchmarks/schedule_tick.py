@@ -0,0 +1,64 @@
+#!/usr/bin/env python2
+"""
+Benchmark the cost of a celerybeat tick (pulp.server.db.model.dispatch.ScheduleEntry.is_due
+for every schedule) as the number of schedules grows, with the run times cached
+on each scheduled call and with the cache discarded before every check.
+
+Half of the schedules are monthly (P1M) schedules that started --age years ago,
+whose runs are found by stepping one month at a time from the first run, and
+half are hourly (PT1H) schedules whose runs are calculated directly. No
+database is used.
+"""
+from datetime import datetime
+import optparse
+import time
+
+import isodate
+
+from pulp.server.db.model.dispatch import ScheduledCall
+
+
+def make_entries(count, age):
+    first_run = datetime.utcnow().replace(tzinfo=isodate.UTC, year=datetime.utcnow().year - age)
+    entries = []
+    for n in xrange(count):
+        interval = 'P1M' if n % 2 else 'PT1H'
+        call = ScheduledCall('%s/%s' % (isodate.datetime_isoformat(first_run), interval),
+                             'pulp.server.tasks.repository.sync_with_auto_publish',
+                             principal={'login': 'admin'}, total_run_count=1,
+                             last_run_at=isodate.datetime_isoformat(first_run))
+        entries.append(call.as_schedule_entry())
+    return entries
+
+
+def run(options, count, cached):
+    entries = make_entries(count, options.age)
+    started = time.time()
+    for tick in xrange(options.ticks):
+        for entry in entries:
+            if not cached:
+                entry._scheduled_call._run_times = None
+            entry.is_due()
+    elapsed = time.time() - started
+
+    print '%-9s %6d schedules  %8.2f ms/tick  %7.1f us/schedule' % (
+        'cached' if cached else 'uncached', count, elapsed * 1000 / options.ticks,
+        elapsed * 1000000 / options.ticks / count)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--schedules', default='100,1000,5000',
+                      help='comma separated numbers of schedules')
+    parser.add_option('--ticks', type='int', default=10,
+                      help='number of ticks timed for each number of schedules')
+    parser.add_option('--age', type='int', default=5,
+                      help='years since the first run of each schedule')
+    options, args = parser.parse_args()
+    for count in [int(c) for c in options.schedules.split(',')]:
+        run(options, count, False)
+        run(options, count, True)
+
+
+if __name__ == '__main__':
+    main()
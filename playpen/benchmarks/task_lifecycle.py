@@ -0,0 +1,120 @@
+#!/usr/bin/env python2
+"""
+Benchmark the rate at which Pulp tasks (pulp.server.async.tasks.Task) are
+dispatched and run, including the TaskStatus updates made by apply_async,
+__call__ and on_success.
+
+The tasks are published to Celery's in-process memory:// broker, consumed from
+it and run by the same tracer a worker uses, so only the TaskStatus collection
+is faked.  Each operation on the collection is counted and delayed by --latency
+seconds to approximate a round trip to MongoDB.
+"""
+import optparse
+import time
+
+from celery.app.trace import build_tracer
+import mock
+
+from pulp.common import constants
+from pulp.server.async import tasks
+from pulp.server.async.celery_instance import celery
+from pulp.server.db.model import TaskStatus
+
+
+class FakeCollection(object):
+    """
+    In-memory replacement for the task_status collection.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.operations = {}
+        self.documents = {}
+
+    def operation(self, name):
+        self.operations[name] = self.operations.get(name, 0) + 1
+        time.sleep(self.latency)
+
+    def _match(self, query):
+        document = self.documents.get(query['task_id'])
+        if document is not None and 'state' in query and \
+                document.get('state') in query['state']['$nin']:
+            return None
+        return document
+
+    def _upsert(self, query, update, upsert):
+        document = self._match(query)
+        if document is None:
+            if not upsert or query['task_id'] in self.documents:
+                return None
+            document = self.documents[query['task_id']] = {'task_id': query['task_id']}
+            document.update(update.get('$setOnInsert', {}))
+        document.update(update['$set'])
+        return document
+
+    def update(self, query, update, upsert=False):
+        self.operation('update')
+        self._upsert(query, update, upsert)
+
+    def find_one_and_update(self, query, update, projection=None, upsert=False, **kwargs):
+        self.operation('find_one_and_update')
+        document = self._upsert(query, update, upsert)
+        if document is not None and projection is not None:
+            return {'_id': document['task_id']}
+        return document
+
+
+@celery.task(base=tasks.Task, ignore_result=True, name='benchmark.noop')
+def noop(n):
+    return n
+
+
+def run(options):
+    celery.conf.update(BROKER_URL='memory://')
+    collection = FakeCollection(options.latency)
+    tracer = build_tracer(noop.name, noop, hostname='worker@benchmark', app=celery)
+    patches = [
+        mock.patch.object(TaskStatus, '_get_collection', return_value=collection),
+        mock.patch('pulp.server.async.tasks.common_utils'),
+    ]
+    for patch in patches:
+        patch.start()
+    try:
+        with celery.connection() as connection:
+            queue = connection.SimpleQueue(celery.conf.CELERY_DEFAULT_QUEUE)
+            started = time.time()
+            for n in xrange(options.tasks):
+                noop.apply_async(args=[n], queue=queue.queue.name)
+                message = queue.get(timeout=1)
+                body = message.payload
+                tracer(body['id'], body['args'], body['kwargs'],
+                       request={'id': body['id'], 'hostname': 'worker@benchmark',
+                                'delivery_info': message.delivery_info})
+                message.ack()
+            elapsed = time.time() - started
+            queue.close()
+    finally:
+        for patch in patches:
+            patch.stop()
+
+    finished = sum(1 for d in collection.documents.values()
+                   if d['state'] == constants.CALL_FINISHED_STATE)
+    print 'Ran %d tasks (%d finished) in %.2f seconds (%.1f tasks/s)' % (
+        options.tasks, finished, elapsed, options.tasks / elapsed)
+    print 'TaskStatus operations: %d (%.2f per task) %s' % (
+        sum(collection.operations.values()),
+        sum(collection.operations.values()) / float(options.tasks),
+        collection.operations)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--tasks', type='int', default=2000, help='number of tasks to run')
+    parser.add_option('--latency', type='float', default=0.001,
+                      help='seconds added to each database operation')
+    options, args = parser.parse_args()
+    run(options)
+
+
+if __name__ == '__main__':
+    main()
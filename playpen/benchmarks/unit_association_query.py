@@ -0,0 +1,204 @@
+#!/usr/bin/env python2
+"""
+Benchmark the memory and latency of querying the units associated with a large
+repository (pulp.server.managers.repo.unit_association_query).
+
+A repository with --units units is written to a scratch database on a real
+MongoDB server, with the indices pulp-manage-db creates, so the sorts and
+their limits are those of the server.  Each query runs in its own process and
+reports the time to the first unit, the total time and the growth of the peak
+RSS.  The plan MongoDB chooses for the associations query of each criteria is
+also reported, since a SORT stage means the server sorts every association of
+the repository in memory.
+
+The "unit sort" query sorts by unit fields, which still requires loading all
+of the associations, and approximates the behavior of every query before the
+streaming execution paths were added.
+"""
+import optparse
+import os
+import resource
+import time
+
+import mock
+import pymongo
+
+from pulp.server.db import connection
+from pulp.server.db.model.criteria import UnitAssociationCriteria
+from pulp.server.managers.repo import unit_association_query
+
+
+REPO_ID = 'benchmark-repo'
+TYPE_ID = 'benchmark_rpm'
+INSERT_BATCH_SIZE = 10000
+
+
+def _indices(model):
+    """
+    :return: the unique and search indices of an old style model as pymongo key lists
+    :rtype:  list of (list, bool)
+    """
+    indices = []
+    for unique, fields in ((True, model.unique_indices), (False, model.search_indices)):
+        for index in fields:
+            if isinstance(index, basestring):
+                index = (index,)
+            indices.append(([(f, pymongo.ASCENDING) for f in index], unique))
+    return indices
+
+
+def populate(options):
+    """
+    Write the associations and units of the repository, unless they exist.
+    """
+    client = pymongo.MongoClient(options.seeds)
+    try:
+        db = client[options.database]
+        associations = db[unit_association_query.RepoContentUnit.collection_name]
+        units = db['units_%s' % TYPE_ID]
+        if associations.find({'repo_id': REPO_ID}).count() == options.units:
+            return
+        associations.delete_many({'repo_id': REPO_ID})
+        units.drop()
+        for keys, unique in _indices(unit_association_query.RepoContentUnit):
+            associations.create_index(keys, unique=unique)
+
+        for start in xrange(0, options.units, INSERT_BATCH_SIZE):
+            indices = xrange(start, min(start + INSERT_BATCH_SIZE, options.units))
+            units.insert_many([{
+                '_id': 'unit-%08d' % i,
+                '_content_type_id': TYPE_ID,
+                'name': 'package-%08d' % i,
+                'version': '1.0',
+                'release': '1',
+                'checksum': '%064d' % i,
+            } for i in indices])
+            associations.insert_many([{
+                'repo_id': REPO_ID,
+                'unit_type_id': TYPE_ID,
+                # Inserted out of unit_id order, as a repository that was
+                # synchronized many times would be.
+                'unit_id': 'unit-%08d' % ((i * 7919) % options.units),
+                'created': '2016-01-01T00:00:00Z-%08d' % i,
+                'updated': '2016-01-01T00:00:00Z-%08d' % i,
+                'owner_type': 'importer',
+                'owner_id': 'yum_importer',
+            } for i in indices])
+    finally:
+        client.close()
+
+
+def drop(options):
+    client = pymongo.MongoClient(options.seeds)
+    try:
+        db = client[options.database]
+        db[unit_association_query.RepoContentUnit.collection_name].delete_many(
+            {'repo_id': REPO_ID})
+        db['units_%s' % TYPE_ID].drop()
+    finally:
+        client.close()
+
+
+def peak_rss():
+    """
+    :return: peak RSS of this process in KiB
+    :rtype:  int
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def sort_stage(manager, criteria):
+    """
+    :return: whether MongoDB sorts the associations query of the criteria in memory
+    :rtype:  bool
+    """
+    cursors = []
+    original = manager._unit_associations_cursor
+
+    def record(*args, **kwargs):
+        cursor = original(*args, **kwargs)
+        cursors.append(cursor)
+        return cursor
+
+    with mock.patch.object(manager, '_unit_associations_cursor', side_effect=record):
+        units = manager.get_units(REPO_ID, criteria, as_generator=True)
+        next(units, None)
+    if not cursors:
+        return False
+    return "'SORT'" in repr(cursors[0].clone().explain()['queryPlanner']['winningPlan'])
+
+
+def query(options, name, criteria):
+    connection.initialize(name=options.database, seeds=options.seeds)
+    with mock.patch.object(unit_association_query.units, 'get_model_serializer_for_type',
+                           return_value=None):
+        manager = unit_association_query.RepoUnitAssociationQueryManager()
+        rss = peak_rss()
+        started = time.time()
+        first = None
+        count = 0
+        try:
+            for unit in manager.get_units(REPO_ID, criteria(), as_generator=True):
+                if first is None:
+                    first = time.time() - started
+                count += 1
+        except pymongo.errors.OperationFailure as e:
+            print '%-22s failed: %s' % (name, e)
+            return
+        elapsed = time.time() - started
+        rss = peak_rss() - rss
+        in_memory = sort_stage(manager, criteria())
+
+    print '%-22s %8d units  first unit %7.3fs  total %7.2fs  peak RSS +%d KiB%s' % (
+        name, count, first or 0, elapsed, rss, '  (in-memory sort)' if in_memory else '')
+
+
+def run(options):
+    queries = [
+        ('no sort', lambda: UnitAssociationCriteria()),
+        ('no sort, limit %d' % options.limit,
+         lambda: UnitAssociationCriteria(limit=options.limit)),
+        ('association sort', lambda: UnitAssociationCriteria(
+            association_sort=[('created', unit_association_query.SORT_ASCENDING)])),
+        ('unit sort', lambda: UnitAssociationCriteria(
+            unit_sort=[('_id', unit_association_query.SORT_ASCENDING)])),
+        ('unit sort, limit %d' % options.limit, lambda: UnitAssociationCriteria(
+            unit_sort=[('_id', unit_association_query.SORT_ASCENDING)], limit=options.limit)),
+    ]
+    populate(options)
+    print 'Repository with %d units, window of %d associations' % (
+        options.units, unit_association_query.UNITS_BATCH_SIZE)
+    try:
+        for name, criteria in queries:
+            # Run each query in its own process so the peak RSS is not shared. The
+            # database connection is made after the fork.
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    query(options, name, criteria)
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+    finally:
+        if not options.keep:
+            drop(options)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--units', type='int', default=300000,
+                      help='number of units in the repository')
+    parser.add_option('--limit', type='int', default=100, help='limit of the limited queries')
+    parser.add_option('--seeds', default='localhost:27017', help='MongoDB server')
+    parser.add_option('--database', default='pulp_benchmark',
+                      help='scratch database, which must not be the Pulp database')
+    parser.add_option('--keep', action='store_true', default=False,
+                      help='keep the repository to benchmark it again')
+    options, args = parser.parse_args()
+    if options.database == 'pulp':
+        parser.error('the benchmark must not use the Pulp database')
+    run(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,8 @@ doesn't care at all about repo authentication.
 
 from ConfigParser import SafeConfigParser
 
+from pulp.repoauth.file_cache import FileCache
+
 # This needs to be accessible on both Pulp and the CDS instances, so a
 # separate config file for repo auth purposes is used.
 CONFIG_FILENAME = '/etc/pulp/repo_auth.conf'
@@ -30,6 +32,21 @@ def authenticate(environ):
 
 
 def _config():
+    return _config_cache.get()
+
+
+def _read_config(path):
     config = SafeConfigParser()
-    config.read(CONFIG_FILENAME)
+    config.read(path)
     return config
+
+
+# The parsed config is cached and only read again when the file's mtime changes.
+_config_cache = FileCache(CONFIG_FILENAME, _read_config)
+
+
+def reset_cache():
+    '''
+    Discard the cached config so it is read again on the next request.
+    '''
+    _config_cache.reset()
@@ -0,0 +1,53 @@
+'''
+Per process cache of values loaded from a file, such as the parsed repo auth
+configuration. The value is loaded again only when the file's mtime changes.
+'''
+
+import os
+from threading import Lock
+
+
+class FileCache(object):
+    '''
+    A value loaded from a file that is reloaded when the file's mtime changes.
+    '''
+
+    def __init__(self, path, load):
+        '''
+        @param path: absolute path to the file
+        @type  path: str
+
+        @param load: called with the path to load the value; it is called when the
+                     file does not exist as well
+        @type  load: callable
+        '''
+        self.path = path
+        self.load = load
+        self._lock = Lock()
+        self._loaded = False
+        self._mtime = None
+        self._value = None
+
+    def get(self):
+        '''
+        Returns the value, loading it on first use or when the file has changed.
+        '''
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        with self._lock:
+            if not self._loaded or self._mtime != mtime:
+                self._value = self.load(self.path)
+                self._mtime = mtime
+                self._loaded = True
+            return self._value
+
+    def reset(self):
+        '''
+        Discards the value so it is loaded again by the next get().
+        '''
+        with self._lock:
+            self._loaded = False
+            self._mtime = None
+            self._value = None
@@ -7,10 +7,14 @@ The is_valid method is the logic driver. It performs the following functions:
   - DOES NOT validate the client certificate against the CA certificate
     configured for Pulp
   - Ensures the CN of the certificate matches the identity string
+
+Results are cached by certificate fingerprint (see verification_cache).
 '''
 
 from rhsm import certificate
 
+from pulp.repoauth import verification_cache
+
 
 IDENTITY_CN = 'pulp-identity'
 
@@ -36,7 +40,14 @@ def _is_valid(cert_pem):
     :type  cert_pem: string
     '''
 
+    key = verification_cache.CACHE.key(verification_cache.IDENTITY, cert_pem)
+    result = verification_cache.CACHE.get(key)
+    if result is not None:
+        return result
+
     cert = certificate.create_from_pem(cert_pem)
     cn = cert.subject()['CN']
 
-    return cn == IDENTITY_CN
+    result = cn == IDENTITY_CN
+    verification_cache.CACHE.put(key, result)
+    return result
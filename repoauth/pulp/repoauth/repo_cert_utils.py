@@ -38,6 +38,7 @@ import os
 
 from M2Crypto import X509, BIO
 from pulp.common.util import encode_unicode
+from pulp.repoauth import verification_cache
 from pulp.repoauth.openssl import Certificate
 
 
@@ -280,14 +281,22 @@ class RepoCertUtils:
         @param log_func: a function to log debug messages
         @param log_func: a function accepting a single string
 
+        Results are cached by certificate and CA fingerprint (see verification_cache).
+
         @return: true if the certificate was signed by the given CA; false otherwise
         @rtype:  boolean
         '''
         if not log_func:
             log_func = LOG.info
+        key = verification_cache.CACHE.key(verification_cache.CA, cert_pem, ca_pem)
+        result = verification_cache.CACHE.get(key)
+        if result is not None:
+            return result
         cert = X509.load_cert_string(cert_pem)
         ca_chain = self.get_certs_from_string(ca_pem, log_func)
-        return self.x509_verify_cert(cert, ca_chain, log_func=log_func)
+        result = self.x509_verify_cert(cert, ca_chain, log_func=log_func)
+        verification_cache.CACHE.put(key, result)
+        return result
 
     def x509_verify_cert(self, cert, ca_certs, log_func=None):
         """
@@ -495,6 +504,8 @@ class RepoCertUtils:
             return cert_files
 
         finally:
+            # The bundles have changed so cached verification results are discarded.
+            verification_cache.CACHE.invalidate()
             WRITE_LOCK.release()
 
     def _repo_cert_directory(self, repo_id):
@@ -0,0 +1,131 @@
+'''
+Bounded, time limited cache of client certificate verification results.
+
+Consumers typically download many files using the same client certificate so
+the results of parsing and verifying the certificate against a CA bundle are
+cached, keyed by the kind of verification, the certificate fingerprint and the
+version of the CA bundle.
+The CA bundle version is the digest of its content combined with a generation
+that is incremented each time cert bundles are written by this process.
+'''
+
+import hashlib
+import time
+from collections import OrderedDict
+from threading import RLock
+
+
+# Default maximum number of cached results.
+MAX_ENTRIES = 10000
+
+# Default number of seconds a cached result is valid.
+TTL = 300
+
+# Kinds of verification; the results of each are cached separately.
+IDENTITY = 'identity'
+CA = 'ca'
+
+
+def fingerprint(pem):
+    '''
+    Returns the fingerprint used to identify a PEM encoded certificate or bundle.
+
+    @param pem: PEM encoded certificate(s); may be None
+    @type  pem: str
+
+    @return: hex digest, or None when pem is None
+    @rtype:  str
+    '''
+    if pem is None:
+        return None
+    return hashlib.sha256(pem).hexdigest()
+
+
+class VerificationCache(object):
+    '''
+    LRU cache of verification results whose entries expire after the TTL.
+    '''
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL):
+        '''
+        @param max_entries: maximum number of cached results
+        @type  max_entries: int
+
+        @param ttl: number of seconds a cached result is valid
+        @type  ttl: int
+        '''
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._lock = RLock()
+        self._results = OrderedDict()
+
+    def key(self, kind, cert_pem, ca_pem=None):
+        '''
+        Returns the cache key for verifying a certificate.
+
+        @param kind: kind of verification; IDENTITY or CA
+        @type  kind: str
+
+        @param cert_pem: PEM encoded client certificate
+        @type  cert_pem: str
+
+        @param ca_pem: PEM encoded CA certificate(s) of a CA verification
+        @type  ca_pem: str
+
+        @return: cache key
+        @rtype:  tuple
+        '''
+        if kind == IDENTITY:
+            return kind, fingerprint(cert_pem), self.generation
+        return kind, fingerprint(cert_pem), fingerprint(ca_pem), self.generation
+
+    def get(self, key):
+        '''
+        Returns the cached result or None when not cached or expired.
+
+        @param key: cache key returned by key()
+        @type  key: tuple
+        '''
+        with self._lock:
+            try:
+                expiration, result = self._results.pop(key)
+            except KeyError:
+                return None
+            if expiration < time.time():
+                return None
+            self._results[key] = (expiration, result)
+            return result
+
+    def put(self, key, result):
+        '''
+        Caches a verification result.
+
+        @param key: cache key returned by key()
+        @type  key: tuple
+
+        @param result: verification result; None is not cached
+        '''
+        if result is None:
+            return
+        with self._lock:
+            self._results.pop(key, None)
+            self._results[key] = (time.time() + self.ttl, result)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def invalidate(self):
+        '''
+        Discards all cached results. Results that are being computed while this is
+        called are keyed using the previous generation and will never be returned.
+        '''
+        with self._lock:
+            self.generation += 1
+            self._results.clear()
+
+    def __len__(self):
+        return len(self._results)
+
+
+# Process wide cache shared by the repo auth validators.
+CACHE = VerificationCache()
@@ -1,11 +1,22 @@
+import logging
+import threading
+import time
+
 from ConfigParser import SafeConfigParser
 from pkg_resources import iter_entry_points
 
 from pulp.repoauth import auth_enabled_validation
+from pulp.repoauth.file_cache import FileCache
 
 AUTH_ENTRY_POINT = 'pulp_content_authenticators'
 CONFIG_FILENAME = '/etc/pulp/repo_auth.conf'
 
+_logger = logging.getLogger(__name__)
+
+# Authenticators are loaded once per process.
+_lock = threading.Lock()
+_authenticators = None
+
 
 def allow_access(environ, host):
     """
@@ -22,16 +33,42 @@ def allow_access(environ, host):
     :return: True if the request is authorized or validation is disabled, otherwise False.
     :rtype:  Boolean
     """
+    start = time.time()
+    try:
+        return _allow_access(environ)
+    finally:
+        elapsed = time.time() - start
+        _logger.debug('Authentication completed in {ms:.3f} ms.'.format(ms=elapsed * 1000))
+
+
+def reset_cache():
+    """
+    Discard the loaded authenticators and configuration so they are loaded
+    again on the next request.
+    """
+    global _authenticators
+    with _lock:
+        _authenticators = None
+    _disabled_authenticators_cache.reset()
 
+
+def _allow_access(environ):
+    """
+    Run the enabled authenticators.
+
+    :param environ: environ passed in from mod_wsgi
+    :type  environ: dict of env vars
+
+    :return: True if the request is authorized or validation is disabled, otherwise False.
+    :rtype:  Boolean
+    """
     # If auth is disabled, then let the request continue. Note that this returns
     # True if auth is disabled.
     if auth_enabled_validation.authenticate(environ):
         return True
 
     # find all of the authenticator methods we need to try
-    authenticators = {}
-    for ep in iter_entry_points(group=AUTH_ENTRY_POINT):
-        authenticators.update({ep.name: ep.load()})
+    authenticators = _get_authenticators()
 
     # load our list of disabled authenticators
     disabled_authenticators = _get_disabled_authenticators()
@@ -47,12 +84,44 @@ def allow_access(environ, host):
     return True
 
 
+def _get_authenticators():
+    """
+    Get the authenticators, loading them from the entry points on first use.
+
+    :return: dict of authenticator functions keyed by entry point name
+    :rtype:  dict
+    """
+    global _authenticators
+    with _lock:
+        if _authenticators is None:
+            authenticators = {}
+            for ep in iter_entry_points(group=AUTH_ENTRY_POINT):
+                authenticators.update({ep.name: ep.load()})
+            _authenticators = authenticators
+        return _authenticators
+
+
 def _get_disabled_authenticators():
+    """
+    Get the names of the disabled authenticators. The config file is only
+    parsed again when its mtime has changed.
+
+    :return: list of disabled authenticator names
+    :rtype:  list
+    """
+    return _disabled_authenticators_cache.get()
+
+
+def _read_disabled_authenticators(path):
     disabled_authenticators = []
     config = SafeConfigParser()
-    config.read(CONFIG_FILENAME)
+    config.read(path)
 
     if config.has_option('main', 'disabled_authenticators'):
         disabled_authenticators = config.get('main', 'disabled_authenticators').split(',')
 
     return disabled_authenticators
+
+
+# The disabled authenticators are only read again when the config file's mtime changes.
+_disabled_authenticators_cache = FileCache(CONFIG_FILENAME, _read_disabled_authenticators)
@@ -6,6 +6,12 @@ import pulp.repoauth.auth_enabled_validation as auth_enabled_validation
 
 class TestAuthEnabledValiation(unittest.TestCase):
 
+    def setUp(self):
+        auth_enabled_validation.reset_cache()
+
+    def tearDown(self):
+        auth_enabled_validation.reset_cache()
+
     @mock.patch("pulp.repoauth.auth_enabled_validation.SafeConfigParser")
     def test_config_read(self, mock_parser):
         mock_parser_instance = mock.Mock()
@@ -15,6 +21,28 @@ class TestAuthEnabledValiation(unittest.TestCase):
 
         mock_parser_instance.read.assert_called_once_with('/etc/pulp/repo_auth.conf')
 
+    @mock.patch("pulp.repoauth.file_cache.os.stat")
+    @mock.patch("pulp.repoauth.auth_enabled_validation.SafeConfigParser")
+    def test_config_cached_until_modified(self, mock_parser, mock_stat):
+        mock_stat.return_value.st_mtime = 1
+
+        config = auth_enabled_validation._config()
+        self.assertTrue(auth_enabled_validation._config() is config)
+        self.assertEquals(mock_parser.call_count, 1)
+
+        mock_stat.return_value.st_mtime = 2
+        auth_enabled_validation._config()
+        self.assertEquals(mock_parser.call_count, 2)
+
+    @mock.patch("pulp.repoauth.file_cache.os.stat")
+    @mock.patch("pulp.repoauth.auth_enabled_validation.SafeConfigParser")
+    def test_config_missing(self, mock_parser, mock_stat):
+        mock_stat.side_effect = OSError()
+
+        auth_enabled_validation._config()
+        auth_enabled_validation._config()
+        self.assertEquals(mock_parser.call_count, 1)
+
     @mock.patch("pulp.repoauth.auth_enabled_validation._config")
     def test_authenticate_enabled(self, mock_config):
         mock_config_instance = mock.Mock()
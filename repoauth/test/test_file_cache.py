@@ -0,0 +1,37 @@
+import unittest
+
+import mock
+
+from pulp.repoauth.file_cache import FileCache
+
+
+@mock.patch('pulp.repoauth.file_cache.os.stat')
+class TestFileCache(unittest.TestCase):
+
+    def test_get_cached_until_modified(self, mock_stat):
+        load = mock.Mock(side_effect=['a', 'b'])
+        cache = FileCache('/etc/pulp/repo_auth.conf', load)
+        mock_stat.return_value.st_mtime = 1
+        self.assertEqual(cache.get(), 'a')
+        self.assertEqual(cache.get(), 'a')
+        load.assert_called_once_with('/etc/pulp/repo_auth.conf')
+
+        mock_stat.return_value.st_mtime = 2
+        self.assertEqual(cache.get(), 'b')
+        self.assertEqual(load.call_count, 2)
+
+    def test_get_missing(self, mock_stat):
+        mock_stat.side_effect = OSError()
+        load = mock.Mock(return_value=None)
+        cache = FileCache('/etc/pulp/repo_auth.conf', load)
+        self.assertTrue(cache.get() is None)
+        self.assertTrue(cache.get() is None)
+        self.assertEqual(load.call_count, 1)
+
+    def test_reset(self, mock_stat):
+        mock_stat.return_value.st_mtime = 1
+        load = mock.Mock(side_effect=['a', 'b'])
+        cache = FileCache('/etc/pulp/repo_auth.conf', load)
+        cache.get()
+        cache.reset()
+        self.assertEqual(cache.get(), 'b')
@@ -3,9 +3,10 @@ import shutil
 import os
 import unittest
 
+import mock
 from M2Crypto import X509
 
-from pulp.repoauth import repo_cert_utils
+from pulp.repoauth import repo_cert_utils, verification_cache
 
 
 # -- constants -----------------------------------------------------------------------
@@ -98,6 +99,19 @@ class TestCertStorage(unittest.TestCase):
     def tearDown(self):
         self.clean()
 
+    def test_write_invalidates_verification_cache(self):
+        """
+        Tests that writing a cert bundle discards cached verification results.
+        """
+        key = verification_cache.CACHE.key(verification_cache.CA, 'cert', 'ca')
+        verification_cache.CACHE.put(key, True)
+
+        self.utils.write_consumer_cert_bundle('repo1', None)
+
+        self.assertEqual(verification_cache.CACHE.get(key), None)
+        self.assertNotEqual(verification_cache.CACHE.key(verification_cache.CA, 'cert', 'ca'),
+                            key)
+
     def test_write_feed_certs(self):
         """
         Tests writing repo feed certificates to disk.
@@ -467,3 +481,14 @@ class TestCertVerify(unittest.TestCase):
         ca_chain_pems = open(ca_chain_path).read()
         test_cert_pem = open(test_cert_path).read()
         self.assertTrue(self.utils.validate_certificate_pem(test_cert_pem, ca_chain_pems))
+
+    @mock.patch('pulp.repoauth.repo_cert_utils.RepoCertUtils.x509_verify_cert')
+    def test_validate_certificate_pem_cached(self, mock_verify):
+        verification_cache.CACHE.invalidate()
+        mock_verify.return_value = 1
+        ca_chain_pems = open(os.path.join(CA_CHAIN_TEST_DATA, "certs/ca_chain")).read()
+        test_cert_pem = open(os.path.join(CA_CHAIN_TEST_DATA, "certs/test_cert.pem")).read()
+
+        self.assertTrue(self.utils.validate_certificate_pem(test_cert_pem, ca_chain_pems))
+        self.assertTrue(self.utils.validate_certificate_pem(test_cert_pem, ca_chain_pems))
+        self.assertEqual(mock_verify.call_count, 1)
@@ -0,0 +1,83 @@
+import unittest
+
+import mock
+
+from pulp.repoauth import verification_cache
+from pulp.repoauth.verification_cache import CA, IDENTITY, VerificationCache
+
+
+class TestVerificationCache(unittest.TestCase):
+
+    def test_key(self):
+        cache = VerificationCache()
+        key = cache.key(CA, 'cert', 'ca')
+        self.assertEqual(key, cache.key(CA, 'cert', 'ca'))
+        self.assertNotEqual(key, cache.key(CA, 'cert', 'other-ca'))
+        self.assertNotEqual(key, cache.key(CA, 'other-cert', 'ca'))
+        self.assertEqual(cache.key(IDENTITY, 'cert'), cache.key(IDENTITY, 'cert'))
+
+    def test_key_collision(self):
+        cache = VerificationCache()
+        keys = [cache.key(IDENTITY, 'cert'), cache.key(CA, 'cert', None),
+                cache.key(CA, 'cert', ''), cache.key(IDENTITY, '')]
+        self.assertEqual(len(set(keys)), len(keys))
+        cache.put(cache.key(IDENTITY, 'cert'), True)
+        self.assertEqual(cache.get(cache.key(CA, 'cert', None)), None)
+        self.assertEqual(cache.get(cache.key(CA, 'cert', '')), None)
+
+    def test_fingerprint(self):
+        self.assertEqual(verification_cache.fingerprint(None), None)
+        self.assertNotEqual(verification_cache.fingerprint(''), None)
+
+    def test_get_put(self):
+        cache = VerificationCache()
+        key = cache.key(CA, 'cert', 'ca')
+        self.assertEqual(cache.get(key), None)
+        cache.put(key, False)
+        self.assertEqual(cache.get(key), False)
+        cache.put(key, 1)
+        self.assertEqual(cache.get(key), 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_put_none(self):
+        cache = VerificationCache()
+        cache.put(cache.key(IDENTITY, 'cert'), None)
+        self.assertEqual(len(cache), 0)
+
+    @mock.patch('pulp.repoauth.verification_cache.time.time')
+    def test_expired(self, mock_time):
+        mock_time.return_value = 100
+        cache = VerificationCache(ttl=10)
+        key = cache.key(IDENTITY, 'cert')
+        cache.put(key, True)
+        mock_time.return_value = 110
+        self.assertEqual(cache.get(key), True)
+        mock_time.return_value = 111
+        self.assertEqual(cache.get(key), None)
+        self.assertEqual(len(cache), 0)
+
+    def test_bounded(self):
+        cache = VerificationCache(max_entries=2)
+        keys = [cache.key(IDENTITY, cert) for cert in ('a', 'b', 'c')]
+        cache.put(keys[0], True)
+        cache.put(keys[1], True)
+        cache.get(keys[0])
+        cache.put(keys[2], True)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(keys[0]), True)
+        self.assertEqual(cache.get(keys[1]), None)
+        self.assertEqual(cache.get(keys[2]), True)
+
+    def test_invalidate(self):
+        cache = VerificationCache()
+        key = cache.key(CA, 'cert', 'ca')
+        cache.put(key, True)
+        cache.invalidate()
+        self.assertEqual(cache.get(key), None)
+        self.assertNotEqual(cache.key(CA, 'cert', 'ca'), key)
+        # results computed before the invalidation are never returned
+        cache.put(key, True)
+        self.assertEqual(cache.get(cache.key(CA, 'cert', 'ca')), None)
+
+    def test_process_cache(self):
+        self.assertTrue(isinstance(verification_cache.CACHE, VerificationCache))
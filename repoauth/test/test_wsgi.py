@@ -1,6 +1,7 @@
 import unittest
 import mock
 
+from pulp.repoauth import wsgi
 from pulp.repoauth.wsgi import allow_access, _get_disabled_authenticators
 
 
@@ -22,6 +23,10 @@ class TestWsgi(unittest.TestCase):
         entrypoint_two.load.return_value = self.auth_two
 
         self.entrypoint_list = [entrypoint_one, entrypoint_two]
+        wsgi.reset_cache()
+
+    def tearDown(self):
+        wsgi.reset_cache()
 
     @mock.patch('pulp.repoauth.auth_enabled_validation.authenticate')
     def test_auth_disabled(self, auth_enabled):
@@ -133,3 +138,40 @@ class TestWsgi(unittest.TestCase):
 
         mock_parser_instance.read.assert_called_once_with('/etc/pulp/repo_auth.conf')
         mock_parser_instance.has_option.assert_called_once_with('main', 'disabled_authenticators')
+
+    @mock.patch('pulp.repoauth.auth_enabled_validation.authenticate')
+    @mock.patch('pulp.repoauth.wsgi.iter_entry_points')
+    def test_entry_points_loaded_once(self, iter_ep, auth_enabled):
+        """
+        Test that entry points are only loaded by the first request
+        """
+        auth_enabled.return_value = False
+        environ = mock.Mock()
+        iter_ep.return_value = self.entrypoint_list
+
+        self.assertTrue(allow_access(environ, 'fake.host.name'))
+        self.assertTrue(allow_access(environ, 'fake.host.name'))
+
+        iter_ep.assert_called_once_with(group=wsgi.AUTH_ENTRY_POINT)
+        for entry_point in self.entrypoint_list:
+            entry_point.load.assert_called_once_with()
+        self.assertEqual(self.auth_one.call_count, 2)
+
+    @mock.patch('pulp.repoauth.file_cache.os.stat')
+    @mock.patch('pulp.repoauth.wsgi.SafeConfigParser')
+    def test_config_cached_until_modified(self, mock_parser, mock_stat):
+        """
+        Test that the config file is only read again when its mtime changes
+        """
+        mock_parser.return_value.get.return_value = 'foo'
+        mock_stat.return_value.st_mtime = 1
+
+        self.assertEquals(_get_disabled_authenticators(), ['foo'])
+        self.assertEquals(_get_disabled_authenticators(), ['foo'])
+        self.assertEquals(mock_parser.call_count, 1)
+
+        mock_parser.return_value.get.return_value = 'foo,bar'
+        mock_stat.return_value.st_mtime = 2
+
+        self.assertEquals(_get_disabled_authenticators(), ['foo', 'bar'])
+        self.assertEquals(mock_parser.call_count, 2)
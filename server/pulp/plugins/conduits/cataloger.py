@@ -1,23 +1,39 @@
+from uuid import uuid4
+
 from pulp.server.managers import factory as managers
 
 
+# The number of entries written to the catalog at once during a refresh.
+BATCH_SIZE = 1000
+
+
 class CatalogerConduit(object):
     """
     Provides access to pulp platform API.
+    When created to refresh a content source URL, entries are written to the
+    catalog in batches and only the entries that have changed are inserted.
+    Entries previously contributed by the URL that are not added during the
+    refresh are expired by finish().
     """
 
-    def __init__(self, source_id, expires):
+    def __init__(self, source_id, expires, url=None):
         """
         :param source_id: The content source ID.
         :type source_id: str
         :param expires: The content expiration in seconds.
         :type expires: int
+        :param url: The content source URL being refreshed.
+            When not specified, each entry is added immediately.
+        :type url: str
         :return:
         """
         self.source_id = source_id
         self.expires = expires
+        self.url = url
         self.added_count = 0
         self.deleted_count = 0
+        self.refresh_id = uuid4().hex
+        self._pending = []
 
     def add_entry(self, type_id, unit_key, url):
         """
@@ -29,9 +45,14 @@ class CatalogerConduit(object):
         :param url: The URL used to download content associated with the unit.
         :type url: str
         """
-        manager = managers.content_catalog_manager()
-        manager.add_entry(self.source_id, self.expires, type_id, unit_key, url)
-        self.added_count += 1
+        if self.url is None:
+            manager = managers.content_catalog_manager()
+            manager.add_entry(self.source_id, self.expires, type_id, unit_key, url)
+            self.added_count += 1
+            return
+        self._pending.append((type_id, unit_key, url))
+        if len(self._pending) >= BATCH_SIZE:
+            self.flush()
 
     def delete_entry(self, type_id, unit_key):
         """
@@ -41,13 +62,38 @@ class CatalogerConduit(object):
         :param unit_key: The content unit key.
         :type unit_key: dict
         """
+        self.flush()
         manager = managers.content_catalog_manager()
         manager.delete_entry(self.source_id, type_id, unit_key)
         self.deleted_count += 1
 
+    def flush(self):
+        """
+        Write pending entries to the content catalog.
+        """
+        if not self._pending:
+            return
+        manager = managers.content_catalog_manager()
+        self.added_count += manager.update_entries(
+            self.source_id, self.expires, self.url, self.refresh_id, self._pending)
+        self._pending = []
+
+    def finish(self):
+        """
+        Complete a successful refresh.  Pending entries are written and the
+        entries contributed by the URL that were not added are expired.
+        """
+        self.flush()
+        if self.url is None:
+            return
+        manager = managers.content_catalog_manager()
+        self.deleted_count += manager.expire_stale(self.source_id, self.url, self.refresh_id)
+
     def reset(self):
         """
-        Reset statistics.
+        Reset statistics and discard pending entries.
         """
         self.added_count = 0
         self.deleted_count = 0
+        self.refresh_id = uuid4().hex
+        self._pending = []
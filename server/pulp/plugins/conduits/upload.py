@@ -5,7 +5,20 @@ from pulp.plugins.conduits.mixins import (
 
 class UploadConduit(AddUnitMixin, SingleRepoUnitsMixin, SearchUnitsMixin):
 
-    def __init__(self, repo_id, importer_id):
+    def __init__(self, repo_id, importer_id, checksums=None):
         AddUnitMixin.__init__(self, repo_id, importer_id)
         SingleRepoUnitsMixin.__init__(self, repo_id, ImporterConduitException)
         SearchUnitsMixin.__init__(self, ImporterConduitException)
+        self.checksums = checksums or {}
+
+    def get_checksums(self):
+        """
+        Returns the checksums of the uploaded file that were calculated by the
+        server as the file was uploaded. Importers should use them instead of
+        reading the file again to calculate the same checksums.
+
+        :return: checksums keyed by checksum type (see the TYPE_* constants in
+                 pulp.server.util); empty if they could not be calculated
+        :rtype:  dict
+        """
+        return dict(self.checksums)
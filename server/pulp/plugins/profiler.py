@@ -241,3 +241,36 @@ class Profiler(object):
         :rtype:               list of str
         """
         raise NotImplementedError()
+
+    def calculate_applicable_units_delta(self, unit_profile, bound_repo_id, applicability,
+                                         added, removed, config, conduit):
+        """
+        Update applicability previously calculated by calculate_applicable_units() to
+        reflect content units added to and removed from the bound repository since.
+        Profilers that implement this method are only called with the units that changed,
+        so the cost of regenerating applicability after a sync is proportional to the
+        number of units added and removed rather than to the size of the repository.
+
+        Units are reported as added when they are associated to the repository again,
+        for instance when a sync updates them.
+
+        :param unit_profile:  a consumer unit profile
+        :type  unit_profile:  object
+        :param bound_repo_id: repo id of a repository to be used to calculate applicability
+                              against the given consumer profile
+        :type  bound_repo_id: str
+        :param applicability: the applicability previously calculated for the unit profile
+                              and bound repository
+        :type  applicability: dict
+        :param added:         IDs of the content units added, keyed by content type ID
+        :type  added:         dict
+        :param removed:       IDs of the content units removed, keyed by content type ID
+        :type  removed:       dict
+        :param config:        plugin configuration
+        :type  config:        pulp.server.plugins.config.PluginCallConfiguration
+        :param conduit:       provides access to relevant Pulp functionality
+        :type  conduit:       pulp.plugins.conduits.profile.ProfilerConduit
+        :return:              the updated applicability
+        :rtype:               dict
+        """
+        raise NotImplementedError()
@@ -341,7 +341,7 @@ class Step(object):
             self.parent.report_progress(force)
         else:
             if force:
-                self.get_status_conduit().set_progress(self.get_progress_report())
+                self.get_status_conduit().set_progress(self.get_progress_report(), force=True)
             else:
                 current_time = time.time()
                 if current_time != self.last_report_time:
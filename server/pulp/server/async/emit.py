@@ -19,16 +19,30 @@ def send(document, routing_key=None):
     :param routing_key: The routing key for the message
     :type  routing_key: str
     """
+    send_all([(document, routing_key)])
+
+
+def send_all(messages):
+    """
+    Attempt to send messages to the AMQP broker over a single connection.
+
+    :param messages: (document, routing_key) tuples of the taskstatus Documents
+                     we want to send and the routing key for each message
+    :type  messages: list
+    """
 
     # if the user has not enabled notifications, just bail
     event_notifications_enabled = config.getboolean('messaging', 'event_notifications_enabled')
     if not event_notifications_enabled:
         return
 
-    try:
-        payload = document.to_json()
-    except TypeError:
-        _logger.warn("unable to convert document to JSON; event message not sent")
+    payloads = []
+    for document, routing_key in messages:
+        try:
+            payloads.append((document.to_json(), routing_key))
+        except TypeError:
+            _logger.warn("unable to convert document to JSON; event message not sent")
+    if not payloads:
         return
 
     broker_url = config.get('messaging', 'event_notification_url')
@@ -38,4 +52,5 @@ def send(document, routing_key=None):
     with Connection(broker_url) as connection:
         producer = Producer(connection)
         producer.maybe_declare(notification_topic)
-        producer.publish(payload, exchange=notification_topic, routing_key=routing_key)
+        for payload, routing_key in payloads:
+            producer.publish(payload, exchange=notification_topic, routing_key=routing_key)
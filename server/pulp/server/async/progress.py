@@ -0,0 +1,220 @@
+"""
+Aggregates the progress reports of the tasks run by this process.
+
+Plugins report progress as often as each unit is processed, and each report
+used to rewrite the whole progress_report of the TaskStatus and send a task
+status message. The aggregator keeps the latest report of each task and writes
+the reports at most once every [tasks] progress_interval seconds, setting only
+the fields that changed since the last write. The reports of all tasks are
+written by a single bulk write, and the task status messages are sent over a
+single connection.
+
+Forced reports, such as when a step changes state, are written immediately, and
+the report of a task is written before the final state of the task is saved, so
+a completed task never has a stale progress report.
+"""
+import copy
+import logging
+import os
+import threading
+import time
+
+from pymongo import UpdateOne
+
+from pulp.server.async import emit
+from pulp.server.config import config
+from pulp.server.db.model import TaskStatus
+
+
+_logger = logging.getLogger(__name__)
+
+FIELD = 'progress_report'
+
+
+def _key_is_safe(key):
+    """
+    :param key: A key of a report dictionary.
+    :return: True when the key can be used in a dotted field path.
+    :rtype:  bool
+    """
+    return isinstance(key, basestring) and key and '.' not in key and not key.startswith('$')
+
+
+def changes(path, old, new, fields):
+    """
+    Find the fields of a report that changed.
+
+    Dictionaries and lists of the same length are compared item by item, so a
+    changed count in one step of a large report sets only that count. Anything
+    else that changed, including dictionaries with removed keys, is replaced.
+
+    :param path: The dotted path of the values.
+    :type  path: basestring
+    :param old: The value that was last written.
+    :param new: The current value, which differs from the old value.
+    :param fields: Changed values are added to this dictionary keyed by path.
+    :type  fields: dict
+    """
+    if isinstance(old, dict) and isinstance(new, dict) and old and \
+            all(k in new for k in old) and all(_key_is_safe(k) for k in new):
+        for key, value in new.iteritems():
+            if key not in old:
+                fields['%s.%s' % (path, key)] = value
+            elif old[key] != value:
+                changes('%s.%s' % (path, key), old[key], value, fields)
+    elif isinstance(old, list) and isinstance(new, list) and old and len(old) == len(new):
+        for index, (old_value, value) in enumerate(zip(old, new)):
+            if old_value != value:
+                changes('%s.%d' % (path, index), old_value, value, fields)
+    else:
+        fields[path] = new
+
+
+class ProgressAggregator(object):
+    """
+    Buffers the progress reports of tasks and writes them periodically.
+
+    :ivar interval: The number of seconds between writes of buffered reports.
+                    0 writes each report immediately.
+    :type interval: float
+    """
+
+    def __init__(self, interval):
+        """
+        :param interval: The number of seconds between writes of buffered reports.
+        :type  interval: float
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+        # Held while writing so reports of a task are written in order.
+        self._write_lock = threading.Lock()
+        # task_id: the latest report that has not been written
+        self._pending = {}
+        # task_id: the report last written
+        self._written = {}
+        self._flusher = None
+        self._pid = None
+
+    def update(self, task_id, report, force=False):
+        """
+        Set the progress report of a task.
+
+        :param task_id: The ID of the task.
+        :type  task_id: basestring
+        :param report: The complete progress report of the task.
+        :type  report: dict
+        :param force: Write the report (and any other buffered reports) now.
+        :type  force: bool
+        """
+        # The report is copied since callers keep updating it in place.
+        report = copy.deepcopy(report)
+        with self._lock:
+            self._pending[task_id] = report
+        if force or self.interval <= 0:
+            self.flush()
+        else:
+            self._start_flusher()
+
+    def flush(self):
+        """
+        Write the buffered reports of all tasks and send the task status messages.
+        """
+        with self._write_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+            if not pending:
+                return
+            task_ids = []
+            requests = []
+            for task_id, report in pending.iteritems():
+                written = self._written.get(task_id)
+                if written is None:
+                    fields = {FIELD: report}
+                elif written != report:
+                    fields = {}
+                    changes(FIELD, written, report, fields)
+                else:
+                    continue
+                task_ids.append(task_id)
+                requests.append(UpdateOne({'task_id': task_id}, {'$set': fields}))
+            if not requests:
+                return
+            try:
+                TaskStatus._get_collection().bulk_write(requests, ordered=False)
+            except Exception:
+                # Which reports were written is unknown, so the complete reports
+                # are written next time.
+                for task_id in pending:
+                    self._written.pop(task_id, None)
+                raise
+            self._written.update(pending)
+        self._send(task_ids)
+
+    def finish(self, task_id):
+        """
+        Write the buffered report of a task that has finished running and stop
+        tracking it. Errors are logged rather than raised so the final state of
+        the task is still saved.
+
+        :param task_id: The ID of the task.
+        :type  task_id: basestring
+        """
+        try:
+            self.flush()
+        except Exception:
+            _logger.exception('Unable to save the progress report of task [%s]' % task_id)
+        with self._write_lock:
+            self._written.pop(task_id, None)
+
+    def _send(self, task_ids):
+        """
+        Send a task status message for each task, over a single connection.
+
+        :param task_ids: The IDs of the tasks.
+        :type  task_ids: list
+        """
+        if not config.getboolean('messaging', 'event_notifications_enabled'):
+            return
+        messages = [(task_status, 'tasks.%s' % task_status['task_id'])
+                    for task_status in TaskStatus.objects(task_id__in=task_ids)]
+        emit.send_all(messages)
+
+    def _start_flusher(self):
+        """
+        Start the thread that writes the buffered reports, unless it is running
+        in this process.
+        """
+        with self._lock:
+            pid = os.getpid()
+            if self._flusher is not None and self._pid == pid:
+                return
+            self._flusher = threading.Thread(target=self._run, name='progress-flusher')
+            self._flusher.daemon = True
+            self._pid = pid
+            self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                _logger.exception('Unable to save task progress reports')
+
+
+_aggregator = None
+
+
+def aggregator():
+    """
+    Get the progress aggregator used by this process, as configured by the
+    [tasks] progress_interval setting.
+
+    :return: The progress aggregator.
+    :rtype:  ProgressAggregator
+    """
+    global _aggregator
+    if _aggregator is None:
+        _aggregator = ProgressAggregator(config.getfloat('tasks', 'progress_interval'))
+    return _aggregator
@@ -0,0 +1,178 @@
+"""
+An in-memory view of the resource reservations used by the resource manager to
+select a worker for each reserved task.
+
+The resource manager is the only process that creates ReservedResource documents,
+so the view is updated directly as reservations are made. Reservations are
+released by the workers (and removed when workers are deleted), so the view is
+considered stale when the number of ReservedResource documents no longer matches
+the view, in which case it is reloaded. Since releases happen in other
+processes, the resource manager polls the cheap staleness check with an
+increasing delay while it waits for a reservation to be released.
+"""
+import logging
+import threading
+import time
+
+from pulp.server.db.model import ReservedResource, Worker
+
+
+_logger = logging.getLogger(__name__)
+
+
+# The initial and maximum number of seconds to sleep between polls for a released reservation.
+MIN_POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.25
+
+# The number of seconds the list of online workers is cached.
+WORKER_TTL = 5
+
+
+class ReservationView(object):
+    """
+    In-memory view of the ReservedResource documents and online workers.
+
+    :ivar worker_ttl: The number of seconds the list of online workers is cached.
+    :type worker_ttl: int
+    """
+
+    def __init__(self, worker_ttl=WORKER_TTL):
+        """
+        :param worker_ttl: The number of seconds the list of online workers is cached.
+        :type  worker_ttl: int
+        """
+        self.worker_ttl = worker_ttl
+        self._lock = threading.Lock()
+        # task_id: (worker_name, resource_id); None when not loaded
+        self._reservations = None
+        # worker name: Worker; None when not loaded
+        self._workers = None
+        self._workers_expiration = 0
+
+    def refresh(self):
+        """
+        Reload the reservations when the view is stale.
+        """
+        count = ReservedResource.objects.count()
+        with self._lock:
+            if self._reservations is None or count != len(self._reservations):
+                self._load()
+
+    def invalidate(self):
+        """
+        Discard the view so that it is reloaded by the next refresh.
+        """
+        with self._lock:
+            self._reservations = None
+            self._workers = None
+
+    def workers_for(self, resource_ids):
+        """
+        Get the names of the workers holding reservations on any of the specified resources.
+
+        :param resource_ids: A list of resource IDs.
+        :type  resource_ids: list
+        :return: The set of worker names.
+        :rtype:  set
+        """
+        resource_ids = set(resource_ids)
+        with self._lock:
+            return set(worker_name for worker_name, resource_id in self._view().itervalues()
+                       if resource_id in resource_ids)
+
+    def get_worker(self, name):
+        """
+        Get a Worker by name.
+
+        :param name: The worker name.
+        :type  name: basestring
+        :return: The worker or None when not found.
+        :rtype:  pulp.server.db.model.Worker
+        """
+        with self._lock:
+            worker = self._online_workers().get(name)
+        if worker is None:
+            worker = Worker.objects(name=name).first()
+        return worker
+
+    def online_workers(self):
+        """
+        Get the online workers.
+
+        :return: Worker keyed by name.
+        :rtype:  dict
+        """
+        with self._lock:
+            return dict(self._online_workers())
+
+    def reserved_worker_names(self):
+        """
+        Get the names of the workers holding reservations.
+
+        :return: The set of worker names.
+        :rtype:  set
+        """
+        with self._lock:
+            return set(worker_name for worker_name, _ in self._view().itervalues())
+
+    def reserved(self, task_id, worker_name, resource_id):
+        """
+        A reservation has been saved by this process.
+
+        :param task_id: The reserving task ID.
+        :type  task_id: basestring
+        :param worker_name: The name of the worker the task is dispatched to.
+        :type  worker_name: basestring
+        :param resource_id: The reserved resource ID.
+        :type  resource_id: basestring
+        """
+        with self._lock:
+            if self._reservations is not None:
+                self._reservations[task_id] = (worker_name, resource_id)
+
+    def released(self, task_id):
+        """
+        A reservation has been released by this process.
+
+        :param task_id: The reserving task ID.
+        :type  task_id: basestring
+        """
+        with self._lock:
+            if self._reservations is not None:
+                self._reservations.pop(task_id, None)
+
+    def _view(self):
+        if self._reservations is None:
+            self._load()
+        return self._reservations
+
+    def _load(self):
+        query_set = ReservedResource.objects.only('task_id', 'worker_name', 'resource_id')
+        self._reservations = dict(
+            (r['task_id'], (r['worker_name'], r['resource_id'])) for r in query_set)
+        self._workers = None
+        _logger.debug('Loaded %d reservations.' % len(self._reservations))
+
+    def _online_workers(self):
+        now = time.time()
+        if self._workers is None or now >= self._workers_expiration:
+            self._workers = dict((w['name'], w) for w in Worker.objects.get_online())
+            self._workers_expiration = now + self.worker_ttl
+        return self._workers
+
+
+# The view used by the resource manager.
+view = ReservationView()
+
+
+def poll_intervals():
+    """
+    Generate the number of seconds to sleep between attempts to find a worker,
+    doubling from MIN_POLL_INTERVAL up to MAX_POLL_INTERVAL.
+
+    :return: generator of float
+    """
+    interval = MIN_POLL_INTERVAL
+    while True:
+        yield interval
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
 from gettext import gettext as _
+import copy
+import heapq
 import itertools
 import logging
 import platform
@@ -17,7 +19,7 @@ from pulp.server.async.tasks import _delete_worker
 from pulp.server.constants import PULP_PROCESS_HEARTBEAT_INTERVAL, PULP_PROCESS_TIMEOUT_INTERVAL
 from pulp.server.db import connection as db_connection
 from pulp.server.db.connection import UnsafeRetry
-from pulp.server.db.model.dispatch import ScheduledCall, ScheduleEntry
+from pulp.server.db.model.dispatch import ScheduledCall, ScheduleEntry, ScheduleVersion
 from pulp.server.db.model import Worker, CeleryBeatLock
 from pulp.server.managers.schedule import utils
 
@@ -32,6 +34,11 @@ _logger = logging.getLogger(__name__)
 # setting the celerybeat name
 CELERYBEAT_NAME = constants.SCHEDULER_WORKER_NAME + "@" + platform.node()
 
+# Number of seconds before the most recent update already loaded from which updated schedules
+# are read again, so that updates saved late by other processes are not missed. Schedules
+# whose update has already been loaded are skipped.
+SCHEDULE_UPDATE_OVERLAP = 60
+
 
 class CeleryProcessTimeoutMonitor(threading.Thread):
     """
@@ -153,6 +160,11 @@ class Scheduler(beat.Scheduler):
         self._schedule = None
         self._loaded_from_db_count = 0
         self._most_recent_timestamp = None
+        self._schedule_version = None
+        # the last_updated value of each loaded schedule, keyed by schedule ID
+        self._last_updated = {}
+        # IDs of the enabled schedules that are not loaded because they have no remaining runs
+        self._ignored_ids = set()
         self._first_lock_acq_check = True
 
         # Force the use of the Pulp celery_instance when this custom Scheduler is used.
@@ -208,11 +220,13 @@ class Scheduler(beat.Scheduler):
         """
         worker_watcher.handle_worker_heartbeat(CELERYBEAT_NAME)
 
-        if celery_version.startswith('4') and self.schedule_changed:
-            # Setting _heap = None is a workaround for this bug in Celery4
+        if celery_version.startswith('4') and self._schedule is not None \
+                and self.schedule_changed:
+            # Celery 4 keeps the entries in a heap, which is updated along with the
+            # schedule. The changes are applied before the superclass compares the
+            # schedule with its copy, so the heap is not rebuilt.
             # https://github.com/celery/celery/pull/3958
-            # Once 3958 is released and updated in Fedora this can be removed
-            self._heap = None
+            self.update_schedule()
 
         now = ensure_tz(datetime.utcnow())
         old_timestamp = now - timedelta(seconds=PULP_PROCESS_TIMEOUT_INTERVAL)
@@ -277,48 +291,124 @@ class Scheduler(beat.Scheduler):
         for key, value in items:
             self._schedule[key] = beat.ScheduleEntry(**dict(value, name=key))
 
+        # The version is read before the schedules, so changes saved while
+        # loading are applied by the next update.
+        self._schedule_version = ScheduleVersion.current()
         # include a "0" as the default in case there are no schedules to load
-        update_timestamps = [0]
+        self._most_recent_timestamp = 0
+        self._last_updated = {}
+        self._ignored_ids = set()
 
         _logger.debug(_('loading schedules from DB'))
-        ignored_db_count = 0
-        self._loaded_from_db_count = 0
         for call in itertools.imap(ScheduledCall.from_db, utils.get_enabled()):
-            if call.remaining_runs == 0:
-                _logger.debug(
-                    _('ignoring schedule with 0 remaining runs: %(id)s') % {'id': call.id})
-                ignored_db_count += 1
-            else:
-                self._schedule[call.id] = call.as_schedule_entry()
-                update_timestamps.append(call.last_updated)
-                self._loaded_from_db_count += 1
+            self._load_call(call)
 
+        self._loaded_from_db_count = len(self._last_updated)
         _logger.debug(_('loaded %(count)d schedules') % {'count': self._loaded_from_db_count})
 
-        self._most_recent_timestamp = max(update_timestamps)
+    def update_schedule(self):
+        """
+        Applies the schedules that have been inserted, updated, disabled or deleted
+        in the database since they were loaded to the "_schedule" dictionary, and
+        to the heap of entries used by Celery 4. Unchanged entries are kept.
+        """
+        self._schedule_version = ScheduleVersion.current()
+        changed = {}
+
+        # inserted, updated and disabled schedules
+        since = self._most_recent_timestamp - SCHEDULE_UPDATE_OVERLAP
+        for call in itertools.imap(ScheduledCall.from_db, utils.get_changed_since(since)):
+            if call.id in self._last_updated and \
+                    self._last_updated[call.id] == call.last_updated:
+                continue
+            self._unload_call(call.id)
+            changed[call.id] = self._load_call(call) if call.enabled else None
+
+        # Deleted schedules. The IDs are only read when the number of enabled
+        # schedules shows that some have been deleted, or missed.
+        if utils.get_enabled().count() != len(self._last_updated) + len(self._ignored_ids):
+            enabled_ids = utils.get_enabled_ids()
+            known_ids = set(self._last_updated) | self._ignored_ids
+            for schedule_id in known_ids - enabled_ids:
+                self._unload_call(schedule_id)
+                changed[schedule_id] = None
+            for call in utils.get(list(enabled_ids - known_ids)):
+                if call.enabled:
+                    changed[call.id] = self._load_call(call)
+
+        self._loaded_from_db_count = len(self._last_updated)
+        _logger.debug(_('updated %(changed)d schedules, %(count)d loaded') % {
+            'changed': len(changed), 'count': self._loaded_from_db_count})
+        self._update_heap(set(changed), [entry for entry in changed.values() if entry])
+
+    def _load_call(self, call):
+        """
+        Adds an enabled scheduled call to the "_schedule" dictionary, unless it
+        has no remaining runs.
+
+        :param call:    an enabled scheduled call
+        :type  call:    pulp.server.db.model.dispatch.ScheduledCall
+        :return:        the entry added, or None
+        :rtype:         pulp.server.db.model.dispatch.ScheduleEntry
+        """
+        self._most_recent_timestamp = max(self._most_recent_timestamp, call.last_updated)
+        if call.remaining_runs == 0:
+            _logger.debug(
+                _('ignoring schedule with 0 remaining runs: %(id)s') % {'id': call.id})
+            self._ignored_ids.add(call.id)
+            return None
+        entry = self._schedule[call.id] = call.as_schedule_entry()
+        self._last_updated[call.id] = call.last_updated
+        return entry
+
+    def _unload_call(self, schedule_id):
+        """
+        Removes a scheduled call from the "_schedule" dictionary.
+
+        :param schedule_id: ID of the scheduled call
+        :type  schedule_id: basestring
+        """
+        self._schedule.pop(schedule_id, None)
+        self._last_updated.pop(schedule_id, None)
+        self._ignored_ids.discard(schedule_id)
+
+    def _update_heap(self, names, entries):
+        """
+        Celery 4 keeps the entries in a heap ordered by when they are due. This
+        replaces the events of the changed entries, rather than letting the
+        heap be rebuilt from all of the entries.
+
+        :param names:   names of the entries that have been changed or removed
+        :type  names:   set
+        :param entries: the entries that have been changed or added
+        :type  entries: list
+        """
+        heap = getattr(self, '_heap', None)
+        if heap is None:
+            # the superclass builds the heap from the schedule when it is needed
+            return
+        heap = [event for event in heap if event[2].name not in names]
+        for entry in entries:
+            heap.append(beat.event_t(self._when(entry, entry.is_due()[1]) or 0, 5, entry))
+        heapq.heapify(heap)
+        self._heap = heap
+        # the superclass rebuilds the heap when the schedule differs from this copy
+        self.old_schedulers = copy.copy(self._schedule)
 
     @property
     @UnsafeRetry.retry_decorator()
     def schedule_changed(self):
         """
-        Looks at the update timestamps in the database to determine if there
-        are new or modified schedules.
-
-        Indexing should make this very fast.
+        Compares the version of the schedules in the database with the version
+        loaded, which requires reading a single small document.
 
-        :return:    True iff the set of enabled scheduled calls has changed
-                    in the database.
+        :return:    True iff scheduled calls have been inserted, updated, disabled
+                    or deleted in the database.
         :rtype:     bool
         """
-        if utils.get_enabled().count() != self._loaded_from_db_count:
-            logging.debug(_('number of enabled schedules has changed'))
+        if ScheduleVersion.current() != self._schedule_version:
+            logging.debug(_('one or more schedules has changed'))
             return True
-
-        if self._most_recent_timestamp is not None:
-            if utils.get_updated_since(self._most_recent_timestamp).count() > 0:
-                logging.debug(_('one or more enabled schedules has been updated'))
-                return True
-
         return False
 
     @property
@@ -333,7 +423,7 @@ class Scheduler(beat.Scheduler):
             return self.get_schedule()
 
         if self.schedule_changed:
-            self.setup_schedule()
+            self.update_schedule()
 
         return self._schedule
 
@@ -16,12 +16,12 @@ from celery import task, Task as CeleryTask, current_task, __version__ as celery
 from celery.app import control, defaults
 from celery.result import AsyncResult
 from mongoengine.queryset import DoesNotExist
-from mongoengine.errors import NotUniqueError
 
 from pulp.common.constants import RESOURCE_MANAGER_WORKER_NAME, SCHEDULER_WORKER_NAME
 from pulp.common import constants, dateutils, tags
 from pulp.plugins.util import misc
 
+from pulp.server.async import progress, reservations
 from pulp.server.async.celery_instance import celery, RESOURCE_MANAGER_QUEUE, \
     DEDICATED_QUEUE_EXCHANGE
 from pulp.server.exceptions import PulpException, MissingResource, \
@@ -137,6 +137,7 @@ def _queue_reserved_task_list(name, task_id, resource_id_list, inner_args, inner
     for rid in resource_id_list:
         _logger.debug('...saving RR for RID %s' % rid)
         ReservedResource(task_id=task_id, worker_name=worker['name'], resource_id=rid).save()
+        reservations.view.reserved(task_id, worker['name'], rid)
 
     # Dispatch the Worker
     inner_kwargs['routing_key'] = worker.name
@@ -176,7 +177,7 @@ def _queue_reserved_task(name, task_id, resource_id, inner_args, inner_kwargs):
 
     :return: None
     """
-    while True:
+    for interval in reservations.poll_intervals():
         try:
             worker = get_worker_for_reservation(resource_id)
         except NoWorkers:
@@ -191,10 +192,11 @@ def _queue_reserved_task(name, task_id, resource_id, inner_args, inner_kwargs):
         else:
             break
 
-        # No worker is ready for this work, so we need to wait
-        time.sleep(0.25)
+        # No worker is ready for this work, so we need to wait for a release
+        time.sleep(interval)
 
     ReservedResource(task_id=task_id, worker_name=worker['name'], resource_id=resource_id).save()
+    reservations.view.reserved(task_id, worker['name'], resource_id)
 
     inner_kwargs['routing_key'] = worker.name
     inner_kwargs['exchange'] = DEDICATED_QUEUE_EXCHANGE
@@ -234,9 +236,10 @@ def get_worker_for_reservation(resource_id):
                            `resource_id` associated with it.
     :rtype:                pulp.server.db.model.resources.Worker
     """
-    reservation = ReservedResource.objects(resource_id=resource_id).first()
-    if reservation:
-        return Worker.objects(name=reservation['worker_name']).first()
+    reservations.view.refresh()
+    worker_names = reservations.view.workers_for([resource_id])
+    if worker_names:
+        return reservations.view.get_worker(worker_names.pop())
     else:
         raise NoWorkers()
 
@@ -258,14 +261,13 @@ def get_worker_for_reservation_list(resources):
 
     _logger.debug('get_worker_for_reservation_list [%s]' % resources)
     # We leave this loop once we find a Worker to return - otherwise, sleep and try again
-    while True:
-        reservation_workers = set(
-            [reservation['worker_name'] for reservation in
-                ReservedResource.objects(resource_id__in=resources)])
+    for interval in reservations.poll_intervals():
+        reservations.view.refresh()
+        reservation_workers = reservations.view.workers_for(resources)
         _logger.debug('...num-RR is %d' % len(reservation_workers))
         if len(reservation_workers) == 1:  # Exactly one worker holds any of the desired resources
             _logger.debug('...one-holds')
-            return Worker.objects(name=list(reservation_workers)[0]).first()
+            return reservations.view.get_worker(list(reservation_workers)[0])
         elif len(reservation_workers) == 0:  # No worker holds any of the desired resources
             _logger.debug('...zero-holds')
             try:
@@ -277,7 +279,7 @@ def get_worker_for_reservation_list(resources):
         else:
             _logger.debug('...multiple-holds - WAIT')
 
-        time.sleep(0.25)
+        time.sleep(interval)
 
 
 def _get_unreserved_worker():
@@ -294,9 +296,9 @@ def _get_unreserved_worker():
     """
 
     # Build a mapping of queue names to Worker objects
-    workers_dict = dict((worker['name'], worker) for worker in Worker.objects.get_online())
+    workers_dict = reservations.view.online_workers()
     worker_names = workers_dict.keys()
-    reserved_names = [r['worker_name'] for r in ReservedResource.objects.all()]
+    reserved_names = reservations.view.reserved_worker_names()
 
     # Find an unreserved worker using set differences of the names, and filter
     # out workers that should not be assigned work.
@@ -340,6 +342,7 @@ def _delete_worker(name, normal_shutdown=False):
 
     # Delete all reserved_resource documents for the worker
     ReservedResource.objects(worker_name=name).delete()
+    reservations.view.invalidate()
 
     # If the worker is a resource manager, we also need to delete the associated lock
     if name.startswith(RESOURCE_MANAGER_WORKER_NAME):
@@ -377,6 +380,7 @@ def _release_resource(task_id):
 
         new_task.on_failure(exception, task_id, (), {}, MyEinfo)
     ReservedResource.objects(task_id=task_id).delete()
+    reservations.view.released(task_id)
 
 
 class TaskResult(object):
@@ -637,8 +641,8 @@ class Task(PulpTask, ReservedTaskMixin):
         # have completed by now. To avoid overwriting TaskStatus updates from those callbacks,
         # we'll do an upsert and only touch the fields listed below if we've inserted the object.
         task_status.save_with_set_on_insert(fields_to_set_on_insert=[
-            'state', 'start_time', 'finish_time', 'result', 'error',
-            'spawned_tasks', 'traceback'])
+            'state', 'worker_name', 'start_time', 'finish_time', 'result', 'error',
+            'spawned_tasks', 'progress_report', 'traceback'])
         return async_result
 
     def __call__(self, *args, **kwargs):
@@ -646,16 +650,6 @@ class Task(PulpTask, ReservedTaskMixin):
         This overrides PulpTask's __call__() method. We use this method
         for task state tracking of Pulp tasks.
         """
-        # Check task status and skip running the task if task state is in one of complete states.
-        try:
-            task_status = TaskStatus.objects.get(task_id=self.request.id)
-        except DoesNotExist:
-            task_status = None
-        if task_status and task_status['state'] in constants.CALL_COMPLETE_STATES:
-            _logger.debug(
-                "Task is in the %s state, task-id : [%s]" % (task_status['state'], self.request.id)
-            )
-            return
         # Update start_time and set the task state to 'running' for asynchronous tasks.
         # Also update the worker_name to cover cases where apply_async was called without
         # providing the worker name up-front. Skip updating status for eagerly executed tasks,
@@ -665,20 +659,17 @@ class Task(PulpTask, ReservedTaskMixin):
             start_time = dateutils.format_iso8601_datetime(now)
             worker_name = self.request.hostname
             # Using 'upsert' to avoid a possible race condition described in the apply_async method
-            # above.
-            try:
-                TaskStatus.objects(task_id=self.request.id).update_one(
-                    set__state=constants.CALL_RUNNING_STATE,
-                    set__start_time=start_time,
-                    set__worker_name=worker_name,
-                    upsert=True)
-            except NotUniqueError:
-                # manually retry the upsert. see https://jira.mongodb.org/browse/SERVER-14322
-                TaskStatus.objects(task_id=self.request.id).update_one(
-                    set__state=constants.CALL_RUNNING_STATE,
-                    set__start_time=start_time,
-                    set__worker_name=worker_name,
-                    upsert=True)
+            # above. The task is skipped if it is in one of the complete states, which happens
+            # when the message is delivered again.
+            started = TaskStatus.update_fields(
+                self.request.id,
+                {'state': constants.CALL_RUNNING_STATE,
+                 'start_time': start_time,
+                 'worker_name': worker_name},
+                unless_complete=True, upsert=True)
+            if not started:
+                _logger.debug("Task is in a complete state, task-id : [%s]" % self.request.id)
+                return
 
         # Run the actual task
         _logger.debug("Running task : [%s]" % self.request.id)
@@ -708,21 +699,16 @@ class Task(PulpTask, ReservedTaskMixin):
                              % {'id': kwargs['scheduled_call_id']})
                 utils.reset_failure_count(kwargs['scheduled_call_id'])
         if not self.request.called_directly:
+            # Save the progress report before the final state.
+            progress.aggregator().finish(task_id)
             now = datetime.now(dateutils.utc_tz())
             finish_time = dateutils.format_iso8601_datetime(now)
-            task_status = TaskStatus.objects.get(task_id=task_id)
-            task_status['finish_time'] = finish_time
-            task_status['result'] = retval
+            fields = {'finish_time': finish_time, 'result': retval}
 
-            # Only set the state to finished if it's not already in a complete state. This is
-            # important for when the task has been canceled, so we don't move the task from canceled
-            # to finished.
-            if task_status['state'] not in constants.CALL_COMPLETE_STATES:
-                task_status['state'] = constants.CALL_FINISHED_STATE
             if isinstance(retval, TaskResult):
-                task_status['result'] = retval.return_value
+                fields['result'] = retval.return_value
                 if retval.error:
-                    task_status['error'] = retval.error.to_dict()
+                    fields['error'] = retval.error.to_dict()
                 if retval.spawned_tasks:
                     task_list = []
                     for spawned_task in retval.spawned_tasks:
@@ -730,26 +716,32 @@ class Task(PulpTask, ReservedTaskMixin):
                             task_list.append(spawned_task.task_id)
                         elif isinstance(spawned_task, dict):
                             task_list.append(spawned_task['task_id'])
-                    task_status['spawned_tasks'] = task_list
+                    fields['spawned_tasks'] = task_list
             if isinstance(retval, AsyncResult):
-                task_status['spawned_tasks'] = [retval.task_id, ]
-                task_status['result'] = None
+                fields['spawned_tasks'] = [retval.task_id, ]
+                fields['result'] = None
 
-            task_status.save()
+            # Only set the state to finished if it's not already in a complete state. This is
+            # important for when the task has been canceled, so we don't move the task from canceled
+            # to finished.
+            finished = dict(fields, state=constants.CALL_FINISHED_STATE)
+            if not TaskStatus.update_fields(task_id, finished, unless_complete=True):
+                TaskStatus.update_fields(task_id, fields)
             self._handle_cProfile(task_id)
             common_utils.delete_working_directory()
 
     def _handle_on_failure_cleanup(self, task_id, exc, einfo):
+        # Save the progress report before the final state.
+        progress.aggregator().finish(task_id)
         now = datetime.now(dateutils.utc_tz())
         finish_time = dateutils.format_iso8601_datetime(now)
-        task_status = TaskStatus.objects.get(task_id=task_id)
-        task_status['state'] = constants.CALL_ERROR_STATE
-        task_status['finish_time'] = finish_time
-        task_status['traceback'] = einfo.traceback
         if not isinstance(exc, PulpException):
             exc = PulpException(str(exc))
-        task_status['error'] = exc.to_dict()
-        task_status.save()
+        TaskStatus.update_fields(task_id, {
+            'state': constants.CALL_ERROR_STATE,
+            'finish_time': finish_time,
+            'traceback': einfo.traceback,
+            'error': exc.to_dict()})
         self._handle_cProfile(task_id)
         common_utils.delete_working_directory()
 
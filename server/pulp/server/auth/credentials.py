@@ -0,0 +1,140 @@
+"""
+A bounded, in-memory cache of verified username and password credentials.
+
+Verifying a password requires thousands of HMAC iterations, which makes each
+password authenticated REST call expensive. Once a password has been verified,
+a digest of the credentials is cached for a short time so that subsequent
+requests using the same credentials skip the password hashing.
+
+The digest is an HMAC, keyed by a secret generated by each process, of the login,
+the password, the user's stored password hash and the user's roles. The user
+is still read from the database on each request, so changing the user's password
+or roles (in any process) invalidates the cached credentials. Plain passwords
+are never stored.
+
+The cache is disabled unless [authentication] credential_cache_ttl is set.
+"""
+from collections import OrderedDict
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from pulp.server.config import config
+
+
+class VerifiedCredentialCache(object):
+    """
+    Cache of verified credentials keyed by login.
+
+    :ivar ttl: The number of seconds verified credentials are cached.  0 disables the cache.
+    :type ttl: int
+    :ivar max_size: The maximum number of logins with cached credentials.
+    :type max_size: int
+    """
+
+    def __init__(self, ttl, max_size):
+        """
+        :param ttl: The number of seconds verified credentials are cached.  0 disables the cache.
+        :type  ttl: int
+        :param max_size: The maximum number of logins with cached credentials.
+        :type  max_size: int
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._secret = os.urandom(32)
+        self._lock = threading.Lock()
+        # login: (digest, expiration), least recently added first
+        self._entries = OrderedDict()
+
+    @property
+    def enabled(self):
+        """
+        :return: True when credentials are cached.
+        :rtype:  bool
+        """
+        return self.ttl > 0 and self.max_size > 0
+
+    def verified(self, user, password):
+        """
+        Get whether the password has recently been verified for the user.
+
+        :param user: The user read from the database.
+        :type  user: pulp.server.db.model.User
+        :param password: The plain password.
+        :type  password: basestring
+        :return: True when the credentials are cached.
+        :rtype:  bool
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            entry = self._entries.get(user.login)
+        if entry is None:
+            return False
+        digest, expiration = entry
+        if time.time() >= expiration:
+            self.invalidate(user.login)
+            return False
+        return hmac.compare_digest(digest, self._digest(user, password))
+
+    def add(self, user, password):
+        """
+        Cache credentials that have been verified. The least recently added
+        credentials are discarded when the cache is full.
+
+        :param user: The user read from the database.
+        :type  user: pulp.server.db.model.User
+        :param password: The verified plain password.
+        :type  password: basestring
+        """
+        if not self.enabled:
+            return
+        entry = (self._digest(user, password), time.time() + self.ttl)
+        with self._lock:
+            self._entries.pop(user.login, None)
+            self._entries[user.login] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, login=None):
+        """
+        Discard cached credentials.
+
+        :param login: The login of the user.  None discards the credentials of all users.
+        :type  login: basestring
+        """
+        with self._lock:
+            if login is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(login, None)
+
+    def _digest(self, user, password):
+        """
+        :return: The HMAC of the credentials and the stored user password and roles.
+        :rtype:  str
+        """
+        parts = [user.login, password, user.password or ''] + sorted(user.roles or [])
+        message = '\0'.join(p.encode('utf-8') if isinstance(p, unicode) else p for p in parts)
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+
+_cache = None
+
+
+def verified_credentials():
+    """
+    Get the cache of verified credentials used by this process, as configured
+    by the [authentication] credential_cache_ttl and credential_cache_size settings.
+
+    :return: The verified credential cache.
+    :rtype:  VerifiedCredentialCache
+    """
+    global _cache
+    if _cache is None:
+        _cache = VerifiedCredentialCache(
+            config.getint('authentication', 'credential_cache_ttl'),
+            config.getint('authentication', 'credential_cache_size'))
+    return _cache
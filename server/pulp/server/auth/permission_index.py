@@ -0,0 +1,129 @@
+"""
+An in-memory index of the user permissions used to authorize REST API calls.
+
+The Permission documents are loaded into a trie of resource path components so
+that a user's permissions on a resource and all of its base resources are found
+without querying the database. The permission and role managers increment the
+PermissionVersion counter after each change, and the index is reloaded when it
+no longer matches the counter, so authorizing a call requires reading a single
+small document.
+"""
+import logging
+import threading
+
+from pulp.server.db.model.auth import Permission, PermissionVersion
+
+
+_logger = logging.getLogger(__name__)
+
+
+class _Node(object):
+    """
+    A resource in the trie.
+
+    :ivar children: Child nodes keyed by resource path component.
+    :type children: dict
+    :ivar users: Set of granted operations keyed by user login.
+    :type users: dict
+    """
+
+    __slots__ = ('children', 'users')
+
+    def __init__(self):
+        self.children = {}
+        self.users = {}
+
+
+def _path(resource):
+    """
+    :param resource: A resource path, such as /v2/repositories/
+    :type  resource: basestring
+    :return: The path components.
+    :rtype:  list
+    """
+    return [p for p in resource.split('/') if p]
+
+
+class PermissionIndex(object):
+    """
+    In-memory index of the Permission documents.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root = None
+        self._version = None
+
+    def is_authorized(self, resource, login, operation):
+        """
+        Check whether a user has been granted an operation on a resource or any
+        of its base resources.
+
+        :param resource: pulp resource url
+        :type  resource: basestring
+        :param login: login of the user
+        :type  login: basestring
+        :param operation: operation to be performed on the resource
+        :type  operation: int
+        :return: True if the user is authorized.
+        :rtype:  bool
+        """
+        node = self._refresh()
+        if operation in node.users.get(login, ()):
+            return True
+        for part in _path(resource):
+            node = node.children.get(part)
+            if node is None:
+                return False
+            if operation in node.users.get(login, ()):
+                return True
+        return False
+
+    def invalidate(self):
+        """
+        Discard the index so that it is reloaded by the next check.
+        """
+        with self._lock:
+            self._root = None
+
+    def _refresh(self):
+        """
+        Reload the index when it does not match the current version.
+
+        :return: The root of the trie.
+        :rtype:  _Node
+        """
+        version = PermissionVersion.current()
+        with self._lock:
+            if self._root is None or version != self._version:
+                # The version is read before the permissions, so changes saved
+                # while loading cause another reload by the next check.
+                self._root = self._load()
+                self._version = version
+            return self._root
+
+    def _load(self):
+        root = _Node()
+        count = 0
+        for permission in Permission.get_collection().find(projection=['resource', 'users']):
+            node = root
+            for part in _path(permission['resource']):
+                node = node.children.setdefault(part, _Node())
+            for user in permission['users']:
+                node.users.setdefault(user['username'], set()).update(user['permissions'])
+            count += 1
+        _logger.debug('Loaded %d permissions.' % count)
+        return root
+
+
+# The index used by this process.
+index = PermissionIndex()
+
+
+def changed():
+    """
+    Permissions, roles or role memberships have been changed. Increments the
+    version so the index is reloaded by every process.
+    """
+    PermissionVersion.increment()
+    index.invalidate()
@@ -51,10 +51,15 @@ _default_values = {
     'authentication': {
         'rsa_key': '/etc/pki/pulp/rsa.key',
         'rsa_pub': '/etc/pki/pulp/rsa_pub.key',
+        'credential_cache_ttl': '0',
+        'credential_cache_size': '1000',
     },
     'consumer_history': {
         'lifetime': '180',  # in days
     },
+    'content_sources': {
+        'refresh_concurrency': '4',
+    },
     'data_reaping': {
         'reaper_interval': '0.25',
         'consumer_history': '60',
@@ -63,6 +68,8 @@ _default_values = {
         'repo_group_publish_history': '60',
         'task_status_history': '7',
         'task_result_history': '3',
+        'batch_size': '1000',
+        'batch_pause': '0.1',
     },
     'database': {
         'name': 'pulp_database',
@@ -122,7 +129,8 @@ _default_values = {
         'log_type': 'syslog',
         'key_url': '/pulp/gpg',
         'ks_url': '/pulp/ks',
-        'working_directory': '/var/cache/pulp'
+        'working_directory': '/var/cache/pulp',
+        'zero_copy_import': 'false'
     },
     'tasks': {
         'broker_url': 'qpid://localhost/',
@@ -132,6 +140,7 @@ _default_values = {
         'certfile': '/etc/pki/pulp/qpid/client.crt',
         'login_method': '',
         'worker_timeout': '30',
+        'progress_interval': '2',
     },
     'lazy': {
         'redirect_host': '',
@@ -139,7 +148,8 @@ _default_values = {
         'redirect_path': '/streamer/',
         'https_retrieval': 'true',
         'download_interval': '30',
-        'download_concurrency': '5'
+        'download_concurrency': '5',
+        'direct_download': 'false'
     },
     'profiling': {
         'enabled': 'false',
@@ -1,5 +1,6 @@
 from collections import namedtuple
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
 from threading import Thread, RLock
 from Queue import Queue, Empty, Full
 
@@ -7,6 +8,8 @@ from nectar.listener import DownloadEventListener
 from nectar.report import DownloadReport as NectarDownloadReport, DOWNLOAD_SUCCEEDED
 from nectar.request import DownloadRequest
 
+from pulp.plugins.util.misc import paginate
+from pulp.server.config import config as pulp_conf
 from pulp.server.content.sources.event import Started, Succeeded, Failed
 from pulp.server.content.sources.model import ContentSource, PrimarySource, \
     DownloadReport, DownloadDetails, RefreshReport
@@ -16,6 +19,10 @@ from pulp.server.managers import factory as managers
 log = getLogger(__name__)
 
 
+# The number of requests for which content sources are resolved using a single query.
+RESOLVE_BATCH_SIZE = 1000
+
+
 class DownloadFailed(Exception):
     """
     A serial download has failed.
@@ -74,30 +81,58 @@ class ContentContainer(object):
         report = batch()
         return report
 
-    def refresh(self, force=False):
+    def refresh(self, force=False, concurrency=None):
         """
         Refresh the content catalog using available content sources.
+        The URLs of all content sources are refreshed concurrently.
 
         :param force: Force refresh of content sources with unexpired catalog entries.
         :type force: bool
+        :param concurrency: The number of URLs refreshed concurrently.
+            Defaults to the "refresh_concurrency" server setting.
+        :type concurrency: int
         :return: A list of refresh reports.
         :rtype: list of: pulp.server.content.sources.model.RefreshReport
         """
-        reports = []
         catalog = managers.content_catalog_manager()
+        targets = []
         for source_id, source in self.sources.items():
             if force or not catalog.has_entries(source_id):
-                try:
-                    report = source.refresh()
-                    reports.extend(report)
-                except Exception, e:
-                    log.error('refresh %s, failed: %s', source_id, e)
-                    report = RefreshReport(source_id, '')
-                    report.errors.append(str(e))
-                    reports.append(report)
+                targets.extend((source, url) for url in source.urls)
+        if concurrency is None:
+            concurrency = pulp_conf.getint('content_sources', 'refresh_concurrency')
+        concurrency = max(1, min(concurrency, len(targets)))
+        if concurrency > 1:
+            pool = ThreadPool(concurrency)
+            try:
+                reports = pool.map(ContentContainer._refresh_url, targets, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            reports = map(ContentContainer._refresh_url, targets)
         catalog.purge_expired()
         return reports
 
+    @staticmethod
+    def _refresh_url(target):
+        """
+        Refresh one of the URLs of a content source.
+
+        :param target: A tuple of: (source, url).
+        :type target: tuple
+        :return: The refresh report.
+        :rtype: pulp.server.content.sources.model.RefreshReport
+        """
+        source, url = target
+        try:
+            return source.refresh_url(url)
+        except Exception, e:
+            log.error('refresh %s, failed: %s', source.id, e)
+            report = RefreshReport(source.id, url)
+            report.errors.append(str(e))
+            return report
+
     def purge_orphans(self):
         """
         Purge the catalog of orphaned entries.
@@ -213,6 +248,27 @@ class Batch(object):
         """
         return self.container.sources
 
+    def resolved(self):
+        """
+        Find the content sources for each request.
+        The catalog entries for each batch of RESOLVE_BATCH_SIZE requests are
+        found using a single query.  The catalog is not queried when there are
+        no alternate content sources.
+
+        :return: An iterable of: pulp.server.content.sources.model.Request
+            with the content sources resolved.
+        :rtype: iterable
+        """
+        catalog = managers.content_catalog_manager()
+        for requests in paginate(self.requests, RESOLVE_BATCH_SIZE):
+            if self.sources:
+                entries = catalog.find_by_locators(set(r.locator for r in requests))
+            else:
+                entries = {}
+            for request in requests:
+                request.find_sources(self.primary, self.sources, entries.get(request.locator, []))
+                yield request
+
     def __call__(self):
         """
         Begin processing the batch of requests.
@@ -248,10 +304,9 @@ class Serial(Batch):
         """
         report = DownloadReport()
         report.total_sources = len(self.sources)
-        for request in self.requests:
+        for request in self.resolved():
             event = Started(request)
             event(self.listener)
-            request.find_sources(self.primary, self.sources)
             for source, url in request.sources:
                 details = report.downloads.setdefault(source.id, DownloadDetails())
                 try:
@@ -425,8 +480,7 @@ class Threaded(Batch):
         report.total_sources = len(self.sources)
 
         try:
-            for request in self.requests:
-                request.find_sources(self.primary, self.sources)
+            for request in self.resolved():
                 self.dispatch(request)
                 count += 1
         finally:
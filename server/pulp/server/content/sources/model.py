@@ -23,6 +23,7 @@ from pulp.plugins.conduits.cataloger import CatalogerConduit
 from pulp.plugins.loader import api as plugins
 from pulp.server.content.sources import constants
 from pulp.server.content.sources.descriptor import is_valid, to_seconds, DEFAULT
+from pulp.server.db.model.content import ContentCatalog
 from pulp.server.managers import factory as managers
 
 
@@ -81,7 +82,16 @@ class Request(object):
         self.errors = []
         self.data = None
 
-    def find_sources(self, primary, alternates):
+    @property
+    def locator(self):
+        """
+        The content catalog locator for the requested content unit.
+        :return: The locator.
+        :rtype: str
+        """
+        return ContentCatalog.get_locator(self.type_id, self.unit_key)
+
+    def find_sources(self, primary, alternates, entries=None):
         """
         Find and set the list of content sources in the order they are to
         be used to satisfy the request.  The alternate sources are
@@ -90,10 +100,15 @@ class Request(object):
         :type primary: ContentSource
         :param alternates: A list of alternative sources.
         :type alternates: dict
+        :param entries: The content catalog entries matching the request.
+            When not specified, the entries are found in the catalog.
+        :type entries: list
         """
         resolved = [(primary, self.url)]
-        catalog = managers.content_catalog_manager()
-        for entry in catalog.find(self.type_id, self.unit_key):
+        if entries is None:
+            catalog = managers.content_catalog_manager()
+            entries = catalog.find(self.type_id, self.unit_key)
+        for entry in entries:
             source_id = entry[constants.SOURCE_ID]
             source = alternates.get(source_id)
             if source is None:
@@ -258,13 +273,15 @@ class ContentSource(object):
             url_list.append(url)
         return url_list
 
-    def get_conduit(self):
+    def get_conduit(self, url=None):
         """
         Get a plugin conduit.
+        :param url: The URL being refreshed.
+        :type url: str
         :return: A plugin conduit.
         :rtype CatalogerConduit
         """
-        return CatalogerConduit(self.id, self.expires)
+        return CatalogerConduit(self.id, self.expires, url)
 
     def get_cataloger(self):
         """
@@ -300,25 +317,33 @@ class ContentSource(object):
         :return: The list of refresh reports.
         :rtype: list of: RefreshReport
         """
-        reports = []
-        conduit = self.get_conduit()
-        plugin = self.get_cataloger()
-        for url in self.urls:
-            conduit.reset()
-            report = RefreshReport(self.id, url)
-            log.info(REFRESHING, self.id, url)
-            try:
-                plugin.refresh(conduit, self.descriptor, url)
-                log.info(REFRESH_SUCCEEDED, self.id, conduit.added_count, conduit.deleted_count)
-                report.succeeded = True
-                report.added_count = conduit.added_count
-                report.deleted_count = conduit.deleted_count
-            except Exception, e:
-                log.error(REFRESH_FAILED, self.id, url, e)
-                report.errors.append(str(e))
-            finally:
-                reports.append(report)
-        return reports
+        return [self.refresh_url(url) for url in self.urls]
+
+    def refresh_url(self, url):
+        """
+        Refresh the content catalog entries contributed by one of the URLs
+        using the cataloger plugin.  Each URL is refreshed using its own conduit
+        so that URLs may be refreshed concurrently.
+        :param url: The URL to refresh.
+        :type url: str
+        :return: The refresh report.
+        :rtype: RefreshReport
+        """
+        report = RefreshReport(self.id, url)
+        log.info(REFRESHING, self.id, url)
+        try:
+            conduit = self.get_conduit(url)
+            plugin = self.get_cataloger()
+            plugin.refresh(conduit, self.descriptor, url)
+            conduit.finish()
+            log.info(REFRESH_SUCCEEDED, self.id, conduit.added_count, conduit.deleted_count)
+            report.succeeded = True
+            report.added_count = conduit.added_count
+            report.deleted_count = conduit.deleted_count
+        except Exception, e:
+            log.error(REFRESH_FAILED, self.id, url, e)
+            report.errors.append(str(e))
+        return report
 
     def dict(self):
         """
@@ -400,7 +425,7 @@ class PrimarySource(ContentSource):
         """
         Does not support refresh.
         """
-        pass
+        return []
 
 
 class DownloadDetails(object):
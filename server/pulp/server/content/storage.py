@@ -1,14 +1,30 @@
 import os
 import errno
+import fcntl
+import logging
 import shutil
 import tempfile
 
+from gettext import gettext as _
 from hashlib import sha256
 
 from pulp.server.config import config
 from pulp.plugins.util import misc
 
 
+_logger = logging.getLogger(__name__)
+
+
+# The methods used by FileStorage.put() to transfer a file into storage.
+TRANSFER_RENAME = 'rename'
+TRANSFER_REFLINK = 'reflink'
+TRANSFER_LINK = 'link'
+TRANSFER_COPY = 'copy'
+
+# The ioctl request that clones a file on filesystems that support reflinks (linux/fs.h).
+FICLONE = 0x40049409
+
+
 class ContentStorage(object):
     """
     Base class for content storage.
@@ -90,14 +106,21 @@ class FileStorage(ContentStorage):
             digest[0:2],
             digest[2:])
 
-    def put(self, unit, path, location=None):
+    def put(self, unit, path, location=None, disposable=False):
         """
         Put the content defined by the content unit into storage.
         The file at the specified *path* is transferred into storage:
-         - Copy file to the temporary file at its final directory.
+         - Transfer file to the temporary file at its final directory.
          - If possible, verify size of the file to make sure that file is not corrupted.
          - Do atomic rename.
 
+        The file is copied unless [server] zero_copy_import is enabled, in which case
+        the first of these methods that succeeds is used:
+         - Rename the file, when it is disposable.
+         - Clone the file (reflink), when the filesystem supports it.
+         - Hard link the file.
+         - Copy the file.
+
         :param unit: The content unit to be stored.
         :type unit: pulp.sever.db.model.ContentUnit
         :param path: The absolute path to the file (or directory) to be stored.
@@ -105,6 +128,11 @@ class FileStorage(ContentStorage):
         :param location: The (optional) location within the path
             where the content is to be stored.
         :type location: str
+        :param disposable: The file at *path* is not used after it is stored,
+            so it may be moved into storage.
+        :type disposable: bool
+        :return: The method used to transfer the file. One of the TRANSFER_* constants.
+        :rtype: str
         """
         destination = unit.storage_path
         if location:
@@ -116,7 +144,7 @@ class FileStorage(ContentStorage):
         # going to use.
         os.close(fd)
 
-        shutil.copy(path, temp_destination)
+        method = self.transfer(path, temp_destination, disposable)
 
         try:
             unit.verify_size(temp_destination)
@@ -128,6 +156,37 @@ class FileStorage(ContentStorage):
             raise
 
         os.rename(temp_destination, destination)
+        _logger.debug(_('Stored {path} at {destination} by {method}.').format(
+            path=path, destination=destination, method=method))
+        return method
+
+    @staticmethod
+    def transfer(path, destination, disposable=False):
+        """
+        Transfer a file to a temporary file in storage. The zero copy methods are
+        tried only when [server] zero_copy_import is enabled.
+
+        Hard linked files share their content with the source file, so the source
+        must not be modified in place once it has been stored.
+
+        :param path: The absolute path to the file to be transferred.
+        :type path: str
+        :param destination: The absolute path to the temporary file in storage.
+        :type destination: str
+        :param disposable: The file at *path* is not used after it is transferred.
+        :type disposable: bool
+        :return: The method used to transfer the file. One of the TRANSFER_* constants.
+        :rtype: str
+        """
+        if config.getboolean('server', 'zero_copy_import'):
+            if disposable and _rename(path, destination):
+                return TRANSFER_RENAME
+            if _reflink(path, destination):
+                return TRANSFER_REFLINK
+            if _link(path, destination):
+                return TRANSFER_LINK
+        shutil.copy(path, destination)
+        return TRANSFER_COPY
 
     def get(self, unit):
         """
@@ -258,3 +317,71 @@ class SharedStorage(ContentStorage):
             else:
                 raise
         return link
+
+
+def _rename(path, destination):
+    """
+    Rename a file over the destination. Fails when the files are on different
+    filesystems.
+
+    :param path: The absolute path to the file.
+    :type path: str
+    :param destination: The absolute path to the destination file.
+    :type destination: str
+    :return: True if renamed.
+    :rtype: bool
+    """
+    try:
+        os.rename(path, destination)
+    except OSError, e:
+        _logger.debug(_('Unable to rename {path}: {reason}').format(path=path, reason=e))
+        return False
+    return True
+
+
+def _reflink(path, destination):
+    """
+    Clone a file over the destination. The clone shares the data blocks of the
+    file until either is modified. Fails unless the files are on the same
+    filesystem and it supports reflinks (such as btrfs or XFS).
+
+    :param path: The absolute path to the file.
+    :type path: str
+    :param destination: The absolute path to the destination file.
+    :type destination: str
+    :return: True if cloned.
+    :rtype: bool
+    """
+    try:
+        with open(path, 'rb') as source:
+            with open(destination, 'wb') as target:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        shutil.copymode(path, destination)
+    except (IOError, OSError), e:
+        _logger.debug(_('Unable to clone {path}: {reason}').format(path=path, reason=e))
+        return False
+    return True
+
+
+def _link(path, destination):
+    """
+    Hard link a file over the destination. Fails when the files are on different
+    filesystems.
+
+    :param path: The absolute path to the file.
+    :type path: str
+    :param destination: The absolute path to the destination file.
+    :type destination: str
+    :return: True if linked.
+    :rtype: bool
+    """
+    # The link is created beside the destination and renamed over it because
+    # links cannot replace existing files.
+    link_path = destination + '.link'
+    try:
+        os.link(path, link_path)
+    except OSError, e:
+        _logger.debug(_('Unable to link {path}: {reason}').format(path=path, reason=e))
+        return False
+    os.rename(link_path, destination)
+    return True
@@ -6,12 +6,14 @@ import os
 import socket
 import sys
 import time
-from urlparse import urlunsplit
+from urlparse import urlparse, urlunsplit
 import uuid
 
 from bson.objectid import ObjectId, InvalidId
 import celery
 from mongoengine import NotUniqueError, OperationError, ValidationError, DoesNotExist
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from nectar.config import DownloaderConfig
 from nectar.request import DownloadRequest
 from nectar.downloaders.threaded import HTTPThreadedDownloader
@@ -30,6 +32,7 @@ from pulp.plugins.model import SyncReport
 from pulp.plugins.util.misc import paginate, mkdir
 from pulp.plugins.util.verification import VerificationException, verify_checksum
 from pulp.server import exceptions as pulp_exceptions
+from pulp.server.async import progress
 from pulp.server.async.tasks import (PulpTask, register_sigterm_handler, Task, TaskResult,
                                      get_current_task_id)
 from pulp.server.config import config as pulp_conf
@@ -39,13 +42,14 @@ from pulp.server.controllers import consumer as consumer_controller
 from pulp.server.controllers import distributor as dist_controller
 from pulp.server.controllers import importer as importer_controller
 from pulp.server.db import connection, model
+from pulp.server.db.model.consumer import Bind
 from pulp.server.db.model.repository import (
-    RepoContentUnit, RepoSyncResult, RepoPublishResult)
+    RepoContentDelta, RepoContentDeltaStatus, RepoContentUnit, RepoSyncResult, RepoPublishResult)
 from pulp.server.exceptions import PulpCodedTaskException
 from pulp.server.lazy import URL, Key
 from pulp.server.managers import factory as manager_factory
 from pulp.server.managers.repo import _common as common_utils
-from pulp.server.util import InvalidChecksumType
+from pulp.server.util import DigestingFile, InvalidChecksumType
 
 
 _logger = logging.getLogger(__name__)
@@ -57,6 +61,13 @@ TYPE_ID = 'type_id'
 UNIT_FILES = 'unit_files'
 REQUEST = 'request'
 
+# The number of content units for which lazy download requests are created at a time.
+DOWNLOAD_PAGE_SIZE = 1000
+
+# The maximum number of content changes recorded for a repository between regenerations of
+# its applicability. Applicability is regenerated from scratch beyond that.
+MAX_DELTA_UNITS = 5000
+
 
 def get_associated_unit_ids(repo_id, unit_type, repo_content_unit_q=None):
     """
@@ -348,6 +359,7 @@ def associate_single_unit(repository, unit):
         set_on_insert__created=formatted_datetime,
         set__updated=formatted_datetime,
         upsert=True)
+    record_content_delta(repository.repo_id, unit._content_type_id, [unit.id], True)
 
 
 def disassociate_units(repository, unit_iterable):
@@ -368,11 +380,62 @@ def disassociate_units(repository, unit_iterable):
             repo_id=repository.repo_id, unit_id__in=unit_id_list)
         # queryset delete returns the number of records deleted
         units_removed += qs.delete()
+        unit_map = {}
+        for unit in unit_group:
+            unit_map.setdefault(unit._content_type_id, []).append(unit.id)
+        for unit_type_id, unit_ids in unit_map.items():
+            record_content_delta(repository.repo_id, unit_type_id, unit_ids, False)
 
     if units_removed:
         update_last_unit_removed(repository.repo_id)
 
 
+def record_content_delta(repo_id, unit_type_id, unit_ids, added):
+    """
+    Record that units have been added to or removed from a repository so that applicability
+    can be regenerated incrementally. See RepoContentDelta.
+
+    Once more than MAX_DELTA_UNITS changes have been recorded for the repository, or when no
+    consumer is bound to it, the changes recorded so far are removed and the repository is
+    marked for a full regeneration instead. A status created by the first change recorded
+    for a repository is marked the same way, since earlier changes are not known. See
+    RepoContentDeltaStatus.
+
+    :param repo_id: identifies the repository
+    :type  repo_id: basestring
+    :param unit_type_id: identifies the type of the units
+    :type  unit_type_id: basestring
+    :param unit_ids: the IDs of the units added or removed
+    :type  unit_ids: list
+    :param added: True if the units were added, False if they were removed
+    :type  added: bool
+    """
+    if not unit_ids:
+        return
+    status_collection = RepoContentDeltaStatus.get_collection()
+    update = {'$inc': {'units': len(unit_ids), 'version': 1}, '$setOnInsert': {'full': True}}
+    try:
+        status = status_collection.find_one_and_update(
+            {'repo_id': repo_id}, update, upsert=True, return_document=ReturnDocument.AFTER)
+    except DuplicateKeyError:
+        # The status was inserted concurrently.
+        status = status_collection.find_one_and_update(
+            {'repo_id': repo_id}, update, return_document=ReturnDocument.AFTER)
+    if status.get('full'):
+        return
+    if status['units'] > MAX_DELTA_UNITS or \
+            Bind.get_collection().find_one({'repo_id': repo_id}, projection=['_id']) is None:
+        status_collection.update({'_id': status['_id']}, {'$set': {'full': True}})
+        RepoContentDelta.get_collection().remove({'repo_id': repo_id})
+        return
+    operations = [
+        UpdateOne({'repo_id': repo_id, 'unit_type_id': unit_type_id, 'unit_id': unit_id},
+                  {'$set': {'added': added}, '$inc': {'version': 1}},
+                  upsert=True)
+        for unit_id in unit_ids]
+    connection.bulk_upsert(RepoContentDelta.get_collection(), operations)
+
+
 def create_repo(repo_id, display_name=None, description=None, notes=None, importer_type_id=None,
                 importer_repo_plugin_config=None, distributor_list=None):
     """
@@ -558,6 +621,8 @@ def delete(repo_id):
         RepoSyncResult.get_collection().remove({'repo_id': repo_id})
         RepoPublishResult.get_collection().remove({'repo_id': repo_id})
         RepoContentUnit.get_collection().remove({'repo_id': repo_id})
+        RepoContentDelta.get_collection().remove({'repo_id': repo_id})
+        RepoContentDeltaStatus.get_collection().remove({'repo_id': repo_id})
     except Exception, e:
         msg = _('Error updating one or more database collections while removing repo [%(r)s]')
         msg = msg % {'r': repo_id}
@@ -1442,12 +1507,16 @@ def download_deferred():
     Downloads all the units with entries in the DeferredDownload collection.
     """
     task_description = _('Download Cached On-Demand Content')
+    direct = _direct_download()
+    total_units = model.DeferredDownload.objects.count()
     deferred_content_units = _get_deferred_content_units()
-    download_requests = _create_download_requests(deferred_content_units)
+    download_requests = _create_download_requests(deferred_content_units, direct=direct)
     download_step = LazyUnitDownloadStep(
         _('on_demand_download'),
         task_description,
-        download_requests
+        download_requests,
+        direct=direct,
+        total_units=total_units
     )
     download_step.start()
 
@@ -1469,20 +1538,42 @@ def download_repo(repo_id, verify_all_units=False):
     """
     task_description = _('Download Repository Content')
     if verify_all_units:
-        repo_unit_querysets = get_mongoengine_unit_querysets(repo_id)
+        repo_unit_querysets = list(get_mongoengine_unit_querysets(repo_id))
+        total_units = sum(query_set.count() for query_set in repo_unit_querysets)
         missing_content_units = chain(*repo_unit_querysets)
     else:
+        total_units = missing_unit_count(repo_id)
         missing_content_units = find_units_not_downloaded(repo_id)
 
-    download_requests = _create_download_requests(missing_content_units)
+    direct = _direct_download()
+    download_requests = _create_download_requests(missing_content_units, direct=direct)
     download_step = LazyUnitDownloadStep(
         _('background_download'),
         task_description,
-        download_requests
+        download_requests,
+        direct=direct,
+        total_units=total_units
     )
     download_step.start()
 
 
+def _direct_download():
+    """
+    Get whether background downloads fetch content directly from the upstream
+    URLs in the lazy catalog rather than through the Pulp streamer.
+
+    :return: The value of the [lazy] direct_download setting.
+    :rtype:  bool
+
+    :raises PulpCodedTaskException: if the setting is not a boolean.
+    """
+    try:
+        return parse_bool(pulp_conf.get('lazy', 'direct_download'))
+    except Unparsable:
+        raise PulpCodedTaskException(error_codes.PLP1014, section='lazy', key='direct_download',
+                                     reason=_('The value is not boolean'))
+
+
 def _get_deferred_content_units():
     """
     Retrieve a list of units that have been added to the DeferredDownload collection.
@@ -1506,63 +1597,130 @@ def _get_deferred_content_units():
                 type=deferred_download.unit_type_id, id=deferred_download.unit_id))
 
 
-def _create_download_requests(content_units):
+def _create_download_requests(content_units, direct=False):
     """
-    Make a list of Nectar DownloadRequests for the given content units using
-    the lazy catalog.
+    Generate Nectar DownloadRequests for the given content units using the lazy
+    catalog. The catalog entries are fetched for a page of units at a time, and
+    all the requests for a unit are generated together.
 
-    :param content_units: The content units to build a list of DownloadRequests for.
-    :type  content_units: list of pulp.server.db.model.FileContentUnit
+    :param content_units: The content units to generate DownloadRequests for.
+    :type  content_units: iterable of pulp.server.db.model.FileContentUnit
+    :param direct:        When True, the requests use the upstream URL in the catalog
+                          entry rather than a signed URL of the Pulp streamer.
+    :type  direct:        bool
 
-    :return: A list of DownloadRequests; each request includes a ``data``
+    :return: A generator of DownloadRequests; each request includes a ``data``
              instance variable which is a dict containing the FileContentUnit,
              the list of files in the unit, and the downloaded file's storage
              path.
+    :rtype:  generator of nectar.request.DownloadRequest
+    """
+    working_dir = common_utils.get_working_directory()
+    signing_key = None
+    if not direct:
+        signing_key = Key.load(pulp_conf.get('authentication', 'rsa_key'))
+
+    for page in paginate(content_units, DOWNLOAD_PAGE_SIZE):
+        catalog = _get_catalog_entries(page)
+        for content_unit in page:
+            for request in _create_unit_download_requests(
+                    content_unit, catalog, working_dir, signing_key, direct):
+                yield request
+
+
+def _get_catalog_entries(content_units):
+    """
+    Get the catalog entries for the files of the given content units with a single
+    query. When a file has entries with several revisions, the lowest is used.
+
+    :param content_units: The content units to get the catalog entries for.
+    :type  content_units: iterable of pulp.server.db.model.FileContentUnit
+
+    :return: Catalog entries keyed by (unit_id, unit_type_id, path).
+    :rtype:  dict
+    """
+    unit_ids = [content_unit.id for content_unit in content_units]
+    entries = {}
+    for catalog_entry in model.LazyCatalogEntry.objects.filter(unit_id__in=unit_ids):
+        key = (catalog_entry.unit_id, catalog_entry.unit_type_id, catalog_entry.path)
+        found = entries.get(key)
+        if found is None or catalog_entry.revision < found.revision:
+            entries[key] = catalog_entry
+    return entries
+
+
+def _create_unit_download_requests(content_unit, catalog, working_dir, signing_key, direct):
+    """
+    Make the list of Nectar DownloadRequests for the files of a content unit that
+    have catalog entries.
+
+    :param content_unit: The content unit to build the DownloadRequests for.
+    :type  content_unit: pulp.server.db.model.FileContentUnit
+    :param catalog:      Catalog entries keyed by (unit_id, unit_type_id, path).
+    :type  catalog:      dict
+    :param working_dir:  The working directory of the task.
+    :type  working_dir:  str
+    :param signing_key:  The server private RSA key used to sign streamer URLs.
+    :type  signing_key:  M2Crypto.RSA.RSA
+    :param direct:       When True, the requests use the upstream URL in the catalog
+                         entry rather than a signed URL of the Pulp streamer.
+    :type  direct:       bool
+
+    :return: The download requests for the unit.
     :rtype:  list of nectar.request.DownloadRequest
     """
     requests = []
-    working_dir = common_utils.get_working_directory()
-    signing_key = Key.load(pulp_conf.get('authentication', 'rsa_key'))
-
-    for content_unit in content_units:
-        # All files in the unit; every request for a unit has a reference to this dict.
-        unit_files = {}
-        unit_working_dir = os.path.join(working_dir, content_unit.id)
-        for file_path in content_unit.list_files():
-            qs = model.LazyCatalogEntry.objects.filter(
-                unit_id=content_unit.id,
-                unit_type_id=content_unit.type_id,
-                path=file_path
-            )
-            catalog_entry = qs.order_by('revision').first()
-            if catalog_entry is None:
-                continue
-            signed_url = _get_streamer_url(catalog_entry, signing_key)
+    # All files in the unit; every request for a unit has a reference to this dict.
+    unit_files = {}
+    unit_working_dir = os.path.join(working_dir, content_unit.id)
+    for file_path in content_unit.list_files():
+        catalog_entry = catalog.get((content_unit.id, content_unit.type_id, file_path))
+        if catalog_entry is None:
+            continue
+        if direct:
+            url = catalog_entry.url
+        else:
+            url = _get_streamer_url(catalog_entry, signing_key)
 
-            temporary_destination = os.path.join(
-                unit_working_dir,
-                os.path.basename(catalog_entry.path)
-            )
-            mkdir(unit_working_dir)
-            unit_files[temporary_destination] = {
-                CATALOG_ENTRY: catalog_entry,
-                PATH_DOWNLOADED: None,
-            }
-
-            request = DownloadRequest(signed_url, temporary_destination)
-            # For memory reasons, only hold onto the id and type_id so we can reload the unit
-            # once it's successfully downloaded.
-            request.data = {
-                TYPE_ID: content_unit.type_id,
-                UNIT_ID: content_unit.id,
-                UNIT_FILES: unit_files,
-                REQUEST: request
-            }
-            requests.append(request)
+        temporary_destination = os.path.join(
+            unit_working_dir,
+            os.path.basename(catalog_entry.path)
+        )
+        mkdir(unit_working_dir)
+        unit_files[temporary_destination] = {
+            CATALOG_ENTRY: catalog_entry,
+            PATH_DOWNLOADED: None,
+        }
+
+        # The checksum is calculated as the file is written.
+        destination = DigestingFile(temporary_destination, catalog_entry.checksum_algorithm)
+        request = DownloadRequest(url, destination)
+        # For memory reasons, only hold onto the id and type_id so we can reload the unit
+        # once it's successfully downloaded.
+        request.data = {
+            TYPE_ID: content_unit.type_id,
+            UNIT_ID: content_unit.id,
+            UNIT_FILES: unit_files,
+            REQUEST: request
+        }
+        requests.append(request)
 
     return requests
 
 
+def _destination_path(destination):
+    """
+    Get the path of a download destination.
+
+    :param destination: The destination of a download request.
+    :type  destination: pulp.server.util.DigestingFile or str
+
+    :return: The absolute path to the downloaded file.
+    :rtype:  str
+    """
+    return getattr(destination, 'path', destination)
+
+
 def _get_streamer_url(catalog_entry, signing_key):
     """
     Build a URL that can be used to retrieve the file in the catalog entry from
@@ -1595,35 +1753,52 @@ def _get_streamer_url(catalog_entry, signing_key):
 class LazyUnitDownloadStep(DownloadEventListener):
     """
     A Step that downloads all the given requests. The downloader is configured
-    to download from the Pulp Streamer components.
+    to download from the Pulp Streamer components unless the step downloads
+    directly from the upstream URLs in the lazy catalog, in which case each
+    request is downloaded by the downloader of the importer that created the
+    catalog entry.
 
     :ivar download_requests: The download requests the step will process.
     :type download_requests: list of nectar.request.DownloadRequest
+    :ivar direct:            True when the requests are downloaded directly from
+                             the upstream URLs.
+    :type direct:            bool
     :ivar download_config:   The keyword args used to initialize the Nectar
                              downloader configuration.
     :type download_config:   dict
-    :ivar downloader:        The Nectar downloader used to fetch the requests.
+    :ivar downloader:        The Nectar downloader used to fetch the requests
+                             from the streamer. None when downloading directly.
     :type downloader:        nectar.downloaders.threaded.HTTPThreadedDownloader
     """
 
-    def __init__(self, step_type, step_description, download_requests):
+    def __init__(self, step_type, step_description, download_requests, direct=False,
+                 total_units=None):
         """
         Initializes a Step that downloads all the download requests provided.
 
-        :param download_requests:   List of download requests to process.
-        :type  download_requests:   list of nectar.request.DownloadRequest
+        :param download_requests:   The download requests to process.
+        :type  download_requests:   iterable of nectar.request.DownloadRequest
+        :param direct:              Download directly from the upstream URLs.
+        :type  direct:              bool
+        :param total_units:         The number of items reported as the progress total.
+                                    Defaults to the number of download requests, which
+                                    must then be a list.
+        :type  total_units:         int
         """
         self.description = step_description
         self.download_requests = download_requests
+        self.direct = direct
         self.download_config = {
             MAX_CONCURRENT: int(pulp_conf.get('lazy', 'download_concurrency')),
             HEADERS: {PULP_STREAM_REQUEST_HEADER: 'true'},
             SSL_VALIDATION: True
         }
-        self.downloader = HTTPThreadedDownloader(
-            DownloaderConfig(**self.download_config),
-            self
-        )
+        self.downloader = None
+        if not direct:
+            self.downloader = HTTPThreadedDownloader(
+                DownloaderConfig(**self.download_config),
+                self
+            )
 
         self.uuid = str(uuid.uuid4())
         self.description = step_description
@@ -1633,7 +1808,10 @@ class LazyUnitDownloadStep(DownloadEventListener):
         self.progress_successes = 0
         self.progress_failures = 0
         self.error_details = []
-        self.total_units = len(download_requests)
+        if total_units is None:
+            total_units = len(download_requests)
+        self.total_units = total_units
+        self.finished = False
         self.last_report_time = 0
         self.last_reported_state = self.state
         self.timestamp = str(time.time())
@@ -1645,7 +1823,95 @@ class LazyUnitDownloadStep(DownloadEventListener):
         """
         self.state = reporting_constants.STATE_RUNNING
         self.report()
-        self.downloader.download(self.download_requests)
+        if self.direct:
+            self._download_direct()
+        else:
+            self.downloader.download(self.download_requests)
+        self.finished = True
+        self.report()
+
+    def _download_direct(self):
+        """
+        Download the requests from the upstream URLs using the downloaders of the
+        importers referenced by their catalog entries. The requests are downloaded
+        a page at a time, grouped so that one downloader is configured for each
+        importer and URL scheme. When the importer cannot be loaded, its requests
+        are failed.
+        """
+        # (importer_id, scheme): downloader, or None when the importer cannot be loaded
+        downloaders = {}
+        try:
+            for page in paginate(self.download_requests, DOWNLOAD_PAGE_SIZE):
+                grouped = {}
+                for request in page:
+                    path_entry = request.data[UNIT_FILES][_destination_path(request.destination)]
+                    catalog_entry = path_entry[CATALOG_ENTRY]
+                    key = (catalog_entry.importer_id, urlparse(request.url).scheme)
+                    grouped.setdefault(key, []).append(request)
+
+                for key, requests in grouped.items():
+                    if key not in downloaders:
+                        downloaders[key] = self._get_importer_downloader(key[0], requests[0].url)
+                    downloader = downloaders[key]
+                    if downloader is None:
+                        for request in requests:
+                            self._file_resolved(request.data[UNIT_FILES],
+                                                _destination_path(request.destination), False)
+                        self.report()
+                        continue
+                    downloader.download(requests)
+        finally:
+            for downloader in filter(None, downloaders.values()):
+                downloader.config.finalize()
+
+    def _get_importer_downloader(self, importer_id, url):
+        """
+        Get the downloader the importer uses to fetch content from the URL. This step
+        is its event listener.
+
+        :param importer_id: The document ID of the repository-importer association.
+        :type  importer_id: str
+        :param url:         A URL the downloader is used to fetch.
+        :type  url:         str
+
+        :return: The configured downloader, or None if the importer cannot be loaded
+                 or the URL scheme is not supported.
+        :rtype:  nectar.downloaders.base.Downloader
+        """
+        try:
+            importer, config, importer_model = get_importer_by_id(importer_id)
+            importer_model.config = config.flatten()
+            downloader = importer.get_downloader_for_db_importer(
+                importer_model, url, working_dir=common_utils.get_working_directory(),
+                stream=True)
+        except (plugin_exceptions.PluginNotFound, ValueError), e:
+            msg = _('Unable to download content using importer {id}: {reason}')
+            _logger.error(msg.format(id=importer_id, reason=str(e)))
+            return None
+        downloader.event_listener = self
+        return downloader
+
+    def _file_resolved(self, unit_files, destination, downloaded):
+        """
+        Record whether a file of a unit was downloaded. The progress is counted per
+        unit, once all of its files are resolved; the unit fails if any file failed.
+
+        :param unit_files:  All files in the unit, keyed by destination path.
+        :type  unit_files:  dict
+        :param destination: The destination path of the resolved file.
+        :type  destination: str
+        :param downloaded:  True if the file was downloaded.
+        :type  downloaded:  bool
+        """
+        counted = all(entry[PATH_DOWNLOADED] is not None for entry in unit_files.values())
+        unit_files[destination][PATH_DOWNLOADED] = downloaded
+        download_flags = [entry[PATH_DOWNLOADED] for entry in unit_files.values()]
+        if counted or None in download_flags:
+            return
+        if all(download_flags):
+            self.progress_successes += 1
+        else:
+            self.progress_failures += 1
 
     def report(self):
         """
@@ -1654,13 +1920,13 @@ class LazyUnitDownloadStep(DownloadEventListener):
         progress reporting system when that has been implemented.
         """
         total_processed = self.progress_successes + self.progress_failures
-        if self.total_units == total_processed:
+        if self.finished:
             self.state = reporting_constants.STATE_COMPLETE
 
         if self.progress_failures > 0:
             self.state = reporting_constants.STATE_FAILED
 
-        progress = {
+        step_report = {
             reporting_constants.PROGRESS_STEP_UUID: self.uuid,
             reporting_constants.PROGRESS_STEP_TYPE_KEY: self.step_id,
             reporting_constants.PROGRESS_NUM_SUCCESSES_KEY: self.progress_successes,
@@ -1672,13 +1938,13 @@ class LazyUnitDownloadStep(DownloadEventListener):
             reporting_constants.PROGRESS_DESCRIPTION_KEY: self.description,
             reporting_constants.PROGRESS_DETAILS_KEY: self.progress_details
         }
-        report = {self.step_id: [progress]}
+        report = {self.step_id: [step_report]}
 
-        # Update at most once a second, unless the state changed
-        if self.state != self.last_reported_state or int(time.time()) != self.last_report_time:
+        # Update at most once a second, and save immediately if the state changed
+        state_changed = self.state != self.last_reported_state
+        if state_changed or int(time.time()) != self.last_report_time:
             if self.task_id is not None:
-                qs = model.TaskStatus.objects.filter(task_id=self.task_id)
-                qs.update_one(set__progress_report=report)
+                progress.aggregator().update(self.task_id, report, force=state_changed)
         self.last_report_time = int(time.time())
         self.last_reported_state = self.state
 
@@ -1707,15 +1973,15 @@ class LazyUnitDownloadStep(DownloadEventListener):
 
         try:
             # If the file exists and the checksum is valid, don't download it
-            path_entry = report.data[UNIT_FILES][report.destination]
+            destination = _destination_path(report.destination)
+            path_entry = report.data[UNIT_FILES][destination]
             catalog_entry = path_entry[CATALOG_ENTRY]
-            self.validate_file(
+            self.validate_stored_file(
                 catalog_entry.path,
                 catalog_entry.checksum_algorithm,
                 catalog_entry.checksum
             )
-            path_entry[PATH_DOWNLOADED] = True
-            self.progress_successes += 1
+            self._file_resolved(report.data[UNIT_FILES], destination, True)
             self.report()
             msg = _('{path} has already been downloaded.').format(
                 path=path_entry[CATALOG_ENTRY].path)
@@ -1756,32 +2022,42 @@ class LazyUnitDownloadStep(DownloadEventListener):
             'id', '_last_updated',
             '_storage_path',
         ).get()
-        path_entry = report.data[UNIT_FILES][report.destination]
+        destination = _destination_path(report.destination)
+        path_entry = report.data[UNIT_FILES][destination]
 
         # Validate the file and update the progress.
         catalog_entry = path_entry[CATALOG_ENTRY]
         try:
-            self.validate_file(
+            self.validate_download(
                 report.destination,
                 catalog_entry.checksum_algorithm,
                 catalog_entry.checksum
             )
 
+            # The downloaded file is in the task working directory, so it can be
+            # moved into storage.
             if len(report.data[UNIT_FILES]) == 1:
-                content_unit.import_content(report.destination)
+                method = content_unit.import_content(destination, disposable=True)
             else:
                 relative_path = os.path.relpath(
                     catalog_entry.path,
                     content_unit.storage_path,
                 )
-                content_unit.import_content(report.destination, location=relative_path)
-            self.progress_successes += 1
-            path_entry[PATH_DOWNLOADED] = True
+                method = content_unit.import_content(
+                    destination, location=relative_path, disposable=True)
+            _logger.debug(_('Imported {path} for content unit {type}:{id} by {method}.').format(
+                path=catalog_entry.path, type=content_unit.type_id, id=content_unit.id,
+                method=method))
+            self.cache_checksum(
+                catalog_entry.path,
+                catalog_entry.checksum_algorithm,
+                catalog_entry.checksum
+            )
+            self._file_resolved(report.data[UNIT_FILES], destination, True)
         except (InvalidChecksumType, VerificationException, IOError), e:
             _logger.info(_('Download of {path} failed: {reason}.').format(
                 path=catalog_entry.path, reason=str(e)))
-            path_entry[PATH_DOWNLOADED] = False
-            self.progress_failures += 1
+            self._file_resolved(report.data[UNIT_FILES], destination, False)
         self.report()
 
         # Mark the entire unit as downloaded, if necessary.
@@ -1802,12 +2078,14 @@ class LazyUnitDownloadStep(DownloadEventListener):
         :type  report: nectar.report.DownloadReport
         """
         super(LazyUnitDownloadStep, self).download_failed(report)
+        if isinstance(report.destination, DigestingFile):
+            report.destination.close()
         if not report.data[REQUEST].canceled:
-            path_entry = report.data[UNIT_FILES][report.destination]
+            destination = _destination_path(report.destination)
+            path_entry = report.data[UNIT_FILES][destination]
             _logger.info('Download of {path} failed: {reason}.'.format(
                 path=path_entry[CATALOG_ENTRY].path, reason=report.error_msg))
-            path_entry[PATH_DOWNLOADED] = False
-            self.progress_failures += 1
+            self._file_resolved(report.data[UNIT_FILES], destination, False)
             self.report()
 
     @staticmethod
@@ -1836,3 +2114,85 @@ class LazyUnitDownloadStep(DownloadEventListener):
         else:
             if not os.path.isfile(file_path):
                 raise IOError(_("The path '{path}' does not exist").format(path=file_path))
+
+    def validate_download(self, destination, checksum_algorithm, checksum):
+        """
+        Validate a downloaded file. When the checksum was calculated as the file was
+        written, it is used instead of reading the file again.
+
+        :param destination:        The destination of the download request.
+        :type  destination:        pulp.server.util.DigestingFile or str
+        :param checksum_algorithm: Algorithm used to generate the provided checksum.
+        :type  checksum_algorithm: str
+        :param checksum:           The expected checksum to verify against.
+        :type  checksum:           str
+
+        :raises IOError:               If the file does not exist.
+        :raises InvalidChecksumType:   If the checksum algorithm is not supported by
+                                       pulp.plugins.utils.verification.
+        :raises VerificationException: If the calculated checksum does not match the
+                                       one provided.
+        """
+        if isinstance(destination, DigestingFile):
+            destination.close()
+            digest = destination.hexdigest()
+            if checksum and digest is not None and \
+                    destination.checksum_type == checksum_algorithm:
+                if digest != checksum:
+                    raise VerificationException(digest)
+                return
+        self.validate_file(_destination_path(destination), checksum_algorithm, checksum)
+
+    def validate_stored_file(self, file_path, checksum_algorithm, checksum):
+        """
+        Validate a file in storage. The checksum is read from the checksum cache
+        unless the file has changed since it was cached, in which case the file is
+        read and the checksum is cached.
+
+        :param file_path:          Absolute path to the file to validate.
+        :type  file_path:          str
+        :param checksum_algorithm: Algorithm used to generate the provided checksum.
+        :type  checksum_algorithm: str
+        :param checksum:           The expected checksum to verify against.
+        :type  checksum:           str
+
+        :raises IOError:               If the file does not exist.
+        :raises InvalidChecksumType:   If the checksum algorithm is not supported by
+                                       pulp.plugins.utils.verification.
+        :raises VerificationException: If the checksum does not match the one provided.
+        """
+        if not (checksum_algorithm and checksum):
+            self.validate_file(file_path, checksum_algorithm, checksum)
+            return
+        try:
+            file_stat = os.stat(file_path)
+        except OSError, e:
+            raise IOError(str(e))
+        cached = model.FileChecksum.get_checksum(file_path, checksum_algorithm, file_stat)
+        if cached is not None:
+            if cached != checksum:
+                raise VerificationException(cached)
+            return
+        self.validate_file(file_path, checksum_algorithm, checksum)
+        model.FileChecksum.set_checksum(file_path, checksum_algorithm, file_stat, checksum)
+
+    @staticmethod
+    def cache_checksum(file_path, checksum_algorithm, checksum):
+        """
+        Cache the verified checksum of a file that has been imported into storage
+        so that it is not read again when the unit is verified.
+
+        :param file_path:          Absolute path to the file in storage.
+        :type  file_path:          str
+        :param checksum_algorithm: Algorithm used to generate the checksum.
+        :type  checksum_algorithm: str
+        :param checksum:           The verified checksum.
+        :type  checksum:           str
+        """
+        if not (checksum_algorithm and checksum):
+            return
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return
+        model.FileChecksum.set_checksum(file_path, checksum_algorithm, file_stat, checksum)
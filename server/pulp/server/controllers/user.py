@@ -3,9 +3,10 @@ from gettext import gettext as _
 from mongoengine import NotUniqueError, ValidationError
 
 from pulp.server import exceptions as pulp_exceptions
+from pulp.server.auth import credentials, permission_index
 from pulp.server.constants import SUPER_USER_ROLE
 from pulp.server.db import model
-from pulp.server.db.model.auth import Permission, Role
+from pulp.server.db.model.auth import Role
 from pulp.server.managers import factory as manager_factory
 
 
@@ -85,6 +86,7 @@ def update_user(login, delta):
     except ValidationError, e:
         raise pulp_exceptions.InvalidValue(e.to_dict().keys())
 
+    credentials.verified_credentials().invalidate(login)
     return user
 
 
@@ -107,6 +109,7 @@ def delete_user(login):
     permission_manager = manager_factory.permission_manager()
     permission_manager.revoke_all_permissions_from_user(login)
     user.delete()
+    credentials.verified_credentials().invalidate(login)
 
 
 def is_last_super_user(login):
@@ -135,39 +138,31 @@ def is_last_super_user(login):
     return True
 
 
-def is_authorized(resource, login, operation):
+def is_authorized(resource, login, operation, user=None):
     """
     Check to see if a user is authorized to perform an operation on a resource.
 
+    The permissions are found using the in-memory permission index.
+
     :param resource: pulp resource url
     :type  resource: str
     :param login: login of user to check permissions for
     :type  login: str
     :param operation: operation to be performed on resource
     :type  operation: int
+    :param user: the user with the login, when it has already been fetched
+    :type  user: pulp.server.db.model.User
 
     :return: True if the user is authorized for the operation on the resource, False otherwise
     :rtype: bool
     """
-    user = model.User.objects.get_or_404(login=login)
+    if user is None:
+        user = model.User.objects.get_or_404(login=login)
     if user.is_superuser():
         return True
 
-    permission_query_manager = manager_factory.permission_query_manager()
-
     # User is authorized if they have access to the resource or any of the its base resources.
-    parts = [p for p in resource.split('/') if p]
-    while parts:
-        current_resource = '/%s/' % '/'.join(parts)
-        permission = permission_query_manager.find_by_resource(current_resource)
-        if permission is not None:
-            if operation in permission_query_manager.find_user_permission(permission, login):
-                return True
-        parts = parts[:-1]
-
-    permission = Permission.get_collection().find_one({'resource': '/'})
-    return (permission is not None and
-            operation in permission_query_manager.find_user_permission(permission, login))
+    return permission_index.index.is_authorized(resource, login, operation)
 
 
 def find_users_belonging_to_role(role_id):
@@ -17,7 +17,7 @@ except ImportError:
     from mongoengine.connection import ConnectionError as MongoEngineConnectionError
 
 from pymongo.collection import Collection
-from pymongo.errors import AutoReconnect, OperationFailure
+from pymongo.errors import AutoReconnect, BulkWriteError, OperationFailure
 from pymongo.son_manipulator import NamespaceInjector
 
 from pulp.common import error_codes
@@ -37,6 +37,9 @@ _DEFAULT_MAX_POOL_SIZE = 10
 MONGO_MINIMUM_VERSION = semantic_version.Version("2.4.0")
 MONGO_WRITE_CONCERN_VERSION = semantic_version.Version("2.6.0")
 
+# The error code reported by MongoDB when a unique index is violated.
+DUPLICATE_KEY_ERROR = 11000
+
 _logger = logging.getLogger(__name__)
 
 
@@ -332,6 +335,29 @@ def get_collection(name, create=False):
     return PulpCollection(_DATABASE, name, create=create)
 
 
+def bulk_upsert(collection, operations):
+    """
+    Execute unordered bulk upserts.
+
+    Concurrent upserts of the same document may both attempt the insert, in which case
+    one of them violates the unique index. Those upserts are retried once, as updates.
+
+    :param collection: The collection to write to.
+    :type  collection: pymongo.collection.Collection
+    :param operations: The upserts to execute.
+    :type  operations: list of pymongo.UpdateOne
+    """
+    if not operations:
+        return
+    try:
+        collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details['writeErrors']
+        if any(error['code'] != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        collection.bulk_write([operations[error['index']] for error in errors], ordered=False)
+
+
 def get_database():
     """
     :return: reference to the mongo database being used by the server
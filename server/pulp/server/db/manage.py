@@ -211,6 +211,7 @@ def ensure_database_indexes():
     model.ResourceManagerLock.ensure_indexes()
     model.LazyCatalogEntry.ensure_indexes()
     model.DeferredDownload.ensure_indexes()
+    model.FileChecksum.ensure_indexes()
     model.Distributor.ensure_indexes()
     model.User.ensure_indexes()
 
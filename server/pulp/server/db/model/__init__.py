@@ -10,9 +10,11 @@ from gettext import gettext as _
 from hashlib import sha256
 from hmac import HMAC
 
-from mongoengine import (BooleanField, DictField, Document, DynamicField, IntField,
-                         ListField, StringField, UUIDField, ValidationError, QuerySetNoCache)
+from mongoengine import (BooleanField, DictField, Document, DynamicField, FloatField, IntField,
+                         ListField, NotUniqueError, StringField, UUIDField, ValidationError,
+                         QuerySetNoCache)
 from mongoengine import signals
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 
 from pulp.common import constants, dateutils, error_codes
@@ -23,6 +25,7 @@ from pulp.server import exceptions
 from pulp.server.constants import LOCAL_STORAGE, SUPER_USER_ROLE
 from pulp.server.content.storage import FileStorage, SharedStorage
 from pulp.server.async.emit import send as send_taskstatus_message
+from pulp.server.config import config
 from pulp.server.db.connection import UnsafeRetry
 from pulp.server.compat import digestmod
 from pulp.server.db.fields import ISO8601StringField, UTCDateTimeField
@@ -571,6 +574,49 @@ class TaskStatus(AutoRetryDocument, ReaperMixin):
             # manually retry the upsert. see https://jira.mongodb.org/browse/SERVER-14322
             TaskStatus._get_collection().update({'task_id': task_id}, update, upsert=True)
 
+    @classmethod
+    def update_fields(cls, task_id, fields, unless_complete=False, upsert=False):
+        """
+        Set fields of a TaskStatus with a single update, without reading it first, and send a
+        taskstatus message.
+
+        :param task_id: identity of the task
+        :type  task_id: basestring
+        :param fields: values keyed by field name
+        :type  fields: dict
+        :param unless_complete: only update the TaskStatus if the task is not in a complete state
+        :type  unless_complete: bool
+        :param upsert: insert the TaskStatus if it does not exist
+        :type  upsert: bool
+        :return: True if a TaskStatus was updated or inserted
+        :rtype:  bool
+        """
+        query = {'task_id': task_id}
+        if unless_complete:
+            query['state'] = {'$nin': constants.CALL_COMPLETE_STATES}
+        update = {'$set': dict((name, cls._fields[name].to_mongo(value))
+                               for name, value in fields.iteritems())}
+        # The whole document is only returned when it is needed for the message.
+        if config.getboolean('messaging', 'event_notifications_enabled'):
+            projection = None
+        else:
+            projection = {'_id': True}
+        collection = cls._get_collection()
+        try:
+            son = collection.find_one_and_update(query, update, projection=projection,
+                                                 upsert=upsert,
+                                                 return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            # Either the task is complete, or the TaskStatus was inserted by a concurrent upsert.
+            # see https://jira.mongodb.org/browse/SERVER-14322
+            son = collection.find_one_and_update(query, update, projection=projection,
+                                                 return_document=ReturnDocument.AFTER)
+        if son is None:
+            return False
+        if projection is None:
+            cls.post_save(cls, cls._from_son(son))
+        return True
+
     @classmethod
     def post_save(cls, sender, document, **kwargs):
         """
@@ -897,7 +943,7 @@ class FileContentUnit(ContentUnit):
                 raise ValueError(_('must be relative path'))
         self._storage_path = path
 
-    def import_content(self, path, location=None):
+    def import_content(self, path, location=None, disposable=False):
         """
         Import a content file into platform storage.
         The (optional) *location* may be used to specify a path within the unit
@@ -911,6 +957,12 @@ class FileContentUnit(ContentUnit):
         :param location: The (optional) location within the unit storage path
             where the content is to be stored.
         :type location: str
+        :param disposable: The file at *path* is not used after it is imported,
+            so it may be moved into storage.
+        :type disposable: bool
+        :return: The method used to transfer the file into storage.
+            One of the pulp.server.content.storage.TRANSFER_* constants.
+        :rtype: str
 
         :raises ImportError: if the unit has not been saved.
         :raises PulpCodedException: PLP0037 if *path* is not an existing file.
@@ -921,7 +973,7 @@ class FileContentUnit(ContentUnit):
         if not os.path.isfile(path):
             raise exceptions.PulpCodedException(error_code=error_codes.PLP0037, path=path)
         with FileStorage() as storage:
-            storage.put(self, path, location)
+            return storage.put(self, path, location, disposable=disposable)
 
     def save_and_import_content(self, path, location=None):
         """
@@ -1172,6 +1224,110 @@ class DeferredDownload(AutoRetryDocument):
     _ns = StringField(default='deferred_download')
 
 
+class FileChecksum(AutoRetryDocument):
+    """
+    A cached checksum of a file in storage. The checksum is used only while the
+    size, modification time and inode of the file are unchanged, so files can be
+    verified again without being read.
+
+    :ivar path:      The absolute path to the file.
+    :type path:      str
+    :ivar algorithm: The checksum algorithm.
+    :type algorithm: str
+    :ivar checksum:  The checksum of the file.
+    :type checksum:  str
+    :ivar size:      The size of the file in bytes when the checksum was calculated.
+    :type size:      int
+    :ivar mtime:     The modification time of the file when the checksum was calculated.
+    :type mtime:     float
+    :ivar inode:     The inode of the file when the checksum was calculated.
+    :type inode:     int
+    """
+    meta = {
+        'collection': 'file_checksums',
+        'allow_inheritance': False,
+        'indexes': [
+            {
+                'fields': ['path', 'algorithm'],
+                'unique': True
+            }
+        ]
+    }
+
+    path = StringField(required=True)
+    algorithm = StringField(required=True)
+    checksum = StringField(required=True)
+    size = IntField(required=True)
+    mtime = FloatField(required=True)
+    inode = IntField(required=True)
+
+    @classmethod
+    def get_checksum(cls, path, algorithm, file_stat):
+        """
+        Get the cached checksum of a file.
+
+        :param path:      The absolute path to the file.
+        :type  path:      str
+        :param algorithm: The checksum algorithm.
+        :type  algorithm: str
+        :param file_stat: The current status of the file.
+        :type  file_stat: posix.stat_result
+
+        :return: The checksum, or None when not cached or the file has changed.
+        :rtype:  str
+        """
+        cached = cls.objects(path=path, algorithm=algorithm).first()
+        if cached is None:
+            return None
+        if (cached.size, cached.mtime, cached.inode) != \
+                (file_stat.st_size, file_stat.st_mtime, file_stat.st_ino):
+            return None
+        return cached.checksum
+
+    @classmethod
+    def set_checksum(cls, path, algorithm, file_stat, checksum):
+        """
+        Cache the checksum of a file.
+
+        :param path:      The absolute path to the file.
+        :type  path:      str
+        :param algorithm: The checksum algorithm.
+        :type  algorithm: str
+        :param file_stat: The status of the file read before the checksum was calculated.
+        :type  file_stat: posix.stat_result
+        :param checksum:  The checksum of the file.
+        :type  checksum:  str
+        """
+        try:
+            cls.objects(path=path, algorithm=algorithm).update_one(
+                upsert=True,
+                set__checksum=checksum,
+                set__size=file_stat.st_size,
+                set__mtime=file_stat.st_mtime,
+                set__inode=file_stat.st_ino)
+        except NotUniqueError:
+            # Cached concurrently by another process.
+            pass
+
+    @classmethod
+    def delete_checksums(cls, paths):
+        """
+        Delete the cached checksums of files that are being removed from storage. The
+        checksums of all files in a directory are deleted with the directory.
+
+        :param paths: The absolute paths to the files or directories.
+        :type  paths: iterable of str
+        """
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                cls.objects(path__startswith=os.path.join(path, '')).delete()
+            else:
+                files.append(path)
+        if files:
+            cls.objects(path__in=files).delete()
+
+
 class User(AutoRetryDocument):
     """
     :ivar login: user's login name, must be unique for each user
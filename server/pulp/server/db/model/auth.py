@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from pulp.server.db.model.base import Model
+from pulp.server.db.model.base import Model, VersionCounter
 
 
 class Role(Model):
@@ -53,3 +53,15 @@ class Permission(Model):
 
         self.resource = resource
         self.users = users or []
+
+
+class PermissionVersion(VersionCounter):
+    """
+    A counter incremented each time permissions, roles or role memberships are
+    changed. Server processes compare it with the version of their in-memory
+    permission index to know when the index must be reloaded.
+    """
+
+    collection_name = 'permission_version'
+
+    DOCUMENT_ID = 'permissions'
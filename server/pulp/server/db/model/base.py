@@ -115,3 +115,39 @@ class Model(dict):
         if not cls._collection:
             cls._collection = cls._get_collection_from_db()
         return cls._collection
+
+
+class VersionCounter(Model):
+    """
+    Base class of counters stored as a single document, incremented each time
+    the data they track is changed. Processes that keep the data in memory
+    compare the counter with the version they loaded to know when to reload it.
+
+    Derived classes define the collection_name and the DOCUMENT_ID.
+
+    @ivar version: incremented by each change
+    @type version: int
+    """
+
+    unique_indices = ()
+
+    DOCUMENT_ID = None
+
+    @classmethod
+    def current(cls):
+        """
+        @return: the current version
+        @rtype:  int
+        """
+        document = cls.get_collection().find_one({'_id': cls.DOCUMENT_ID})
+        if document is None:
+            return 0
+        return document['version']
+
+    @classmethod
+    def increment(cls):
+        """
+        Increment the version after a change has been saved.
+        """
+        cls.get_collection().update_one(
+            {'_id': cls.DOCUMENT_ID}, {'$inc': {'version': 1}}, upsert=True)
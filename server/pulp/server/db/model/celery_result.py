@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 
 from pulp.server.db.model.base import Model
-from pulp.server.db.model.reaper_base import ReaperMixin
+from pulp.server.db.model.reaper_base import ReaperMixin, remove_in_batches
 
 
 class CeleryResult(Model, ReaperMixin):
@@ -13,7 +13,8 @@ class CeleryResult(Model, ReaperMixin):
     unique_indices = tuple()
 
     @classmethod
-    def reap_old_documents(cls, config_days):
+    def reap_old_documents(cls, config_days, batch_size=0, batch_pause=0, stop=None,
+                           progress=None):
         """
         Delete old Celery task results from the celery_taskmeta collection.
 
@@ -23,8 +24,23 @@ class CeleryResult(Model, ReaperMixin):
 
         :param config_days: Remove all records older than the number of days set by config_days.
         :type config_days: float
+        :param batch_size: Remove at most this many documents at a time. 0 removes all of the
+                           documents at once.
+        :type batch_size: int
+        :param batch_pause: The number of seconds to wait between batches.
+        :type batch_pause: float
+        :param stop: Stop removing documents between batches once this is set.
+        :type stop: threading.Event
+        :param progress: Called with the number of documents removed after each batch.
+        :type progress: callable
         """
         # Remove all objects older than the epoch time encoded in last_valid_date_done
         last_valid_date_done = datetime.utcnow() - timedelta(days=config_days)
         collection = cls.get_collection()
-        collection.remove({'date_done': {'$lt': last_valid_date_done}})
+        query = {'date_done': {'$lt': last_valid_date_done}}
+        if batch_size:
+            # The _ids are task IDs, which are not ordered by age.
+            remove_in_batches(collection, query, batch_size, batch_pause, stop, progress,
+                              id_ranges=False)
+        else:
+            collection.remove(query)
@@ -172,7 +172,8 @@ class RepoProfileApplicability(Model):
     all_profiles_hash, each individual profile is identified by profile_hash and can be found in
     the consumer_unit_profiles collection.
     The applicability data is a dictionary structure that represents the applicable units for
-    the given set of profiles and repository.
+    the given set of profiles and repository. The revision field is set to a new value each time
+    the applicability is regenerated in batches, so that concurrent regenerations are detected.
 
     The RepoProfileApplicabilityManager can be accessed through the classlevel "objects" attribute.
     """
@@ -92,10 +92,14 @@ class ContentCatalog(Model):
     :type locator: str
     :ivar url: The URL used to download the file associated with the unit.
     :type url: str
+    :ivar source_url: The content source URL that contributed the entry during a refresh.
+    :type source_url: str
+    :ivar refresh_id: Identifies the refresh that last contributed the entry.
+    :type refresh_id: str
     """
 
     collection_name = 'content_catalog'
-    search_indices = ('source_id', 'locator')
+    search_indices = ('source_id', 'locator', ('source_id', 'source_url'))
     unique_indices = ()
 
     @staticmethod
@@ -128,7 +132,8 @@ class ContentCatalog(Model):
         dt = now + timedelta(seconds=duration)
         return dateutils.datetime_to_utc_timestamp(dt)
 
-    def __init__(self, source_id, expiration, type_id, unit_key, url):
+    def __init__(self, source_id, expiration, type_id, unit_key, url, source_url=None,
+                 refresh_id=None):
         """
         :param source_id: The ID of the contributing content source.
         :type source_id: str
@@ -140,6 +145,10 @@ class ContentCatalog(Model):
         :type unit_key: dict
         :param url: The URL used to download the file associated with the unit.
         :type url: str
+        :param source_url: The content source URL that contributed the entry during a refresh.
+        :type source_url: str
+        :param refresh_id: Identifies the refresh that contributed the entry.
+        :type refresh_id: str
         """
         Model.__init__(self)
         self.source_id = source_id
@@ -148,3 +157,5 @@ class ContentCatalog(Model):
         self.unit_key = unit_key
         self.locator = self.get_locator(type_id, unit_key)
         self.url = url
+        self.source_url = source_url
+        self.refresh_id = refresh_id
@@ -11,7 +11,7 @@ from celery.schedules import schedule as CelerySchedule
 
 from pulp.common import dateutils
 from pulp.server.async.celery_instance import celery as app
-from pulp.server.db.model.base import Model
+from pulp.server.db.model.base import Model, VersionCounter
 from pulp.server.managers import factory
 
 
@@ -29,6 +29,104 @@ def timedelta_total_seconds(timedelta):
         (timedelta.seconds + timedelta.days * 24 * 3600) * 10 ** 6) / 10 ** 6
 
 
+class _RunTimes(object):
+    """
+    Values derived from a schedule and its first run, which are needed every time
+    the scheduler checks whether the schedule is due. They are only valid while
+    the schedule and first run are unchanged (see the key attribute).
+
+    The runs of a calendar interval (an isodate.Duration, such as P1M) cannot be
+    calculated directly, because the length of each interval depends on the date
+    it starts. They are found by stepping one interval at a time from the first
+    run, so the most recent run found is kept and later calls continue from it.
+
+    :ivar key: the pickled schedule and the first run the values were derived from
+    :type key: tuple
+    :ivar interval: interval between runs
+    :type interval: isodate.Duration or datetime.timedelta
+    :ivar first_run_dt: time of the first run
+    :type first_run_dt: datetime.datetime
+    :ivar first_run_s: time of the first run as seconds since the epoch
+    :type first_run_s: int
+    """
+
+    def __init__(self, schedule, first_run):
+        """
+        :param schedule:    pickled instance of celery.schedules.schedule
+        :type  schedule:    basestring
+        :param first_run:   ISO8601 string representing the first run
+        :type  first_run:   basestring
+        """
+        self.key = (schedule, first_run)
+        #  the schedule is cast to a string because python 2.6 sometimes fails to
+        #  deserialize json from unicode.
+        self.interval = pickle.loads(str(schedule)).run_every
+        self.first_run_dt = dateutils.to_utc_datetime(dateutils.parse_iso8601_datetime(first_run))
+        self.first_run_s = calendar.timegm(self.first_run_dt.utctimetuple())
+        if isinstance(self.interval, isodate.Duration):
+            self._first_interval_s = timedelta_total_seconds(
+                self.interval.totimedelta(start=self.first_run_dt))
+        else:
+            self._first_interval_s = timedelta_total_seconds(self.interval)
+        self._last_run = (None, self._first_interval_s)
+        self._start_walk()
+
+    def _start_walk(self):
+        self._current_run = self.first_run_dt
+        self._current_run_s = self.first_run_s
+        self._expected_runs = 0
+        self._last_scheduled_run_s = self.first_run_s
+
+    def run_every(self, last_run_at):
+        """
+        :param last_run_at: ISO8601 string representing when the schedule last ran, or None
+        :type  last_run_at: basestring
+        :return:            how many seconds should elapse between the last run and the next
+        :rtype:             float
+        """
+        if last_run_at is None or not isinstance(self.interval, isodate.Duration):
+            return self._first_interval_s
+        if self._last_run[0] != last_run_at:
+            # a duration can be a month or a year, so this depends on when it last ran
+            last_run_dt = dateutils.to_utc_datetime(
+                dateutils.parse_iso8601_datetime(str(last_run_at)))
+            self._last_run = (last_run_at,
+                              timedelta_total_seconds(self.interval.totimedelta(start=last_run_dt)))
+        return self._last_run[1]
+
+    def scheduled_runs(self, now_s):
+        """
+        :param now_s:   current time as seconds since the epoch
+        :type  now_s:   float
+        :return:        tuple of the number of runs that should have happened after the first
+                        run, and the most recent time at which the schedule should have run
+                        as seconds since the epoch
+        :rtype:         tuple
+        """
+        if not isinstance(self.interval, isodate.Duration):
+            # don't want this to be negative
+            expected_runs = max(int((now_s - self.first_run_s) / self._first_interval_s), 0)
+            return expected_runs, self.first_run_s + expected_runs * self._first_interval_s
+
+        if self._expected_runs and self._current_run_s >= now_s:
+            # the clock has gone back since the last call
+            self._start_walk()
+        while True:
+            # The interval is determined by the date of the previous run
+            current_interval = self.interval.totimedelta(start=self._current_run)
+            next_run = self._current_run + current_interval
+
+            # If time of this run is less than the current time, keep going
+            next_run_s = calendar.timegm(next_run.utctimetuple())
+            if next_run_s >= now_s:
+                break
+            self._current_run = next_run
+            self._current_run_s = next_run_s
+            self._expected_runs += 1
+            self._last_scheduled_run_s += timedelta_total_seconds(current_interval)
+        return self._expected_runs, self._last_scheduled_run_s
+
+
 class ScheduledCall(Model):
     """
     Serialized scheduled call request
@@ -165,6 +263,8 @@ class ScheduledCall(Model):
         else:
             self.remaining_runs = remaining_runs
 
+        # cache used by _calculate_times(), which is not saved (see as_dict())
+        self._run_times = None
         self.next_run = self.calculate_next_run()
 
     @classmethod
@@ -269,6 +369,7 @@ class ScheduledCall(Model):
             as_dict['_id'] = ObjectId(as_dict['_id'])
             self.get_collection().insert(as_dict)
             self._new = False
+            ScheduleVersion.increment()
         else:
             as_dict = self.as_dict()
             del as_dict['_id']
@@ -296,44 +397,14 @@ class ScheduledCall(Model):
 
         """
         now_s = time.time()
-        first_run_dt = dateutils.to_utc_datetime(dateutils.parse_iso8601_datetime(self.first_run))
-        first_run_s = calendar.timegm(first_run_dt.utctimetuple())
-        since_first_s = now_s - first_run_s
+        run_times = self._run_times
+        if run_times is None or run_times.key != (self.schedule, self.first_run):
+            run_times = self._run_times = _RunTimes(self.schedule, self.first_run)
 
-        # An interval could be an isodate.Duration or a datetime.timedelta
-        interval = self.as_schedule_entry().schedule.run_every
-        if isinstance(interval, isodate.Duration):
-            # Determine how long (in seconds) to wait between the last run and the next one. This
-            # changes depending on the current time because a duration can be a month or a year.
-            if self.last_run_at is not None:
-                last_run_dt = dateutils.to_utc_datetime(
-                    dateutils.parse_iso8601_datetime(str(self.last_run_at)))
-                run_every_s = timedelta_total_seconds(interval.totimedelta(start=last_run_dt))
-            else:
-                run_every_s = timedelta_total_seconds(interval.totimedelta(start=first_run_dt))
-
-            # This discovers how many runs should have occurred based on the schedule
-            expected_runs = 0
-            current_run = first_run_dt
-            last_scheduled_run_s = first_run_s
-            duration = self.as_schedule_entry().schedule.run_every
-            while True:
-                # The interval is determined by the date of the previous run
-                current_interval = duration.totimedelta(start=current_run)
-                current_run += current_interval
-
-                # If time of this run is less than the current time, keep going
-                current_run_s = calendar.timegm(current_run.utctimetuple())
-                if current_run_s < now_s:
-                    expected_runs += 1
-                    last_scheduled_run_s += timedelta_total_seconds(current_interval)
-                else:
-                    break
-        else:
-            run_every_s = timedelta_total_seconds(interval)
-            # don't want this to be negative
-            expected_runs = max(int(since_first_s / run_every_s), 0)
-            last_scheduled_run_s = first_run_s + expected_runs * run_every_s
+        first_run_s = run_times.first_run_s
+        since_first_s = now_s - first_run_s
+        run_every_s = run_times.run_every(self.last_run_at)
+        expected_runs, last_scheduled_run_s = run_times.scheduled_runs(now_s)
 
         return now_s, first_run_s, since_first_s, run_every_s, last_scheduled_run_s, expected_runs
 
@@ -365,6 +436,18 @@ class ScheduledCall(Model):
         return dateutils.format_iso8601_utc_timestamp(next_run_s)
 
 
+class ScheduleVersion(VersionCounter):
+    """
+    A counter incremented each time scheduled calls are inserted, updated, disabled
+    or deleted. The scheduler compares it with the version of its in-memory
+    schedule to know when the schedule must be updated.
+    """
+
+    collection_name = 'schedule_version'
+
+    DOCUMENT_ID = 'schedules'
+
+
 class ScheduleEntry(beat.ScheduleEntry):
     def __init__(self, *args, **kwargs):
         """
@@ -382,8 +465,10 @@ class ScheduleEntry(beat.ScheduleEntry):
     def _next_instance(self, last_run_at=None):
         """
         Returns an instance of this class with the appropriate fields incremented
-        and updated to reflect that its task has been queued. The parent
-        ScheduledCall gets saved to the database with these updated values.
+        and updated to reflect that its task has been queued. The updated fields
+        of the parent ScheduledCall are saved to the database. Only those fields
+        are set, since the rest of the ScheduledCall, such as its consecutive
+        failures, may have been changed since it was loaded.
 
         :param last_run_at: not used here, but it is part of the superclass
                             function signature
@@ -396,10 +481,19 @@ class ScheduleEntry(beat.ScheduleEntry):
         self._scheduled_call.total_run_count += 1
         if self._scheduled_call.remaining_runs:
             self._scheduled_call.remaining_runs -= 1
-        if self._scheduled_call.remaining_runs == 0:
+        disabled = self._scheduled_call.remaining_runs == 0
+        if disabled:
             _logger.info('disabling schedule with 0 remaining runs: %s' % self._scheduled_call.id)
             self._scheduled_call.enabled = False
-        self._scheduled_call.save()
+            self._scheduled_call.last_updated = time.time()
+        fields = dict((name, getattr(self._scheduled_call, name)) for name in
+                      ('last_run_at', 'total_run_count', 'remaining_runs', 'enabled'))
+        if disabled:
+            fields['last_updated'] = self._scheduled_call.last_updated
+        self._scheduled_call.get_collection().update(
+            {'_id': ObjectId(self._scheduled_call.id)}, {'$set': fields})
+        if disabled:
+            ScheduleVersion.increment()
         return self._scheduled_call.as_schedule_entry()
 
     __next__ = next = _next_instance
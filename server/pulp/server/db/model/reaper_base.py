@@ -1,4 +1,7 @@
 from datetime import timedelta, datetime
+import time
+
+from pymongo import ASCENDING
 
 from pulp.common import dateutils
 from pulp.server.compat import ObjectId
@@ -13,12 +16,22 @@ class ReaperMixin(object):
     """
 
     @classmethod
-    def reap_old_documents(cls, config_days):
+    def reap_old_documents(cls, config_days, batch_size=0, batch_pause=0, stop=None,
+                           progress=None):
         """
         Remove documents from that are older than config_days.
 
         :param config_days: Remove all records older than the number of days set by config_days.
         :type config_days: float
+        :param batch_size: Remove at most this many documents at a time. 0 removes all of the
+                           documents at once.
+        :type batch_size: int
+        :param batch_pause: The number of seconds to wait between batches.
+        :type batch_pause: float
+        :param stop: Stop removing documents between batches once this is set.
+        :type stop: threading.Event
+        :param progress: Called with the number of documents removed after each batch.
+        :type progress: callable
         """
         age = timedelta(days=config_days)
         # Generate an ObjectId that we can use to know which objects to remove
@@ -32,7 +45,62 @@ class ReaperMixin(object):
             # and just use mongoengine queryset to delete old documents.
             collection = cls._get_collection()
 
-        collection.remove({'_id': {'$lte': expired_object_id}})
+        query = {'_id': {'$lte': expired_object_id}}
+        if batch_size:
+            remove_in_batches(collection, query, batch_size, batch_pause, stop, progress)
+        else:
+            collection.remove(query)
+
+
+def remove_in_batches(collection, query, batch_size, batch_pause=0, stop=None, progress=None,
+                      id_ranges=True):
+    """
+    Remove the documents that match a query a batch at a time, so that removing a large number
+    of documents does not monopolize the database.
+
+    By default, the documents are found in _id order and each batch is removed by the range of
+    their _ids, which requires that every document in the range matches the query, as
+    documents older than an _id do.
+
+    :param collection: The collection to remove documents from.
+    :type  collection: pymongo.collection.Collection
+    :param query: The query that matches the documents to remove.
+    :type  query: dict
+    :param batch_size: The maximum number of documents to remove at a time.
+    :type  batch_size: int
+    :param batch_pause: The number of seconds to wait between batches.
+    :type  batch_pause: float
+    :param stop: Stop removing documents between batches once this is set.
+    :type  stop: threading.Event
+    :param progress: Called with the number of documents removed after each batch.
+    :type  progress: callable
+    :param id_ranges: Remove each batch by its range of _ids, rather than by a list of _ids.
+    :type  id_ranges: bool
+    :return: The number of documents removed.
+    :rtype:  int
+    """
+    sort = [('_id', ASCENDING)] if id_ranges else None
+    removed = 0
+    while stop is None or not stop.is_set():
+        ids = [d['_id'] for d in
+               collection.find(query, projection={'_id': True}, sort=sort, limit=batch_size)]
+        if not ids:
+            break
+        if id_ranges:
+            collection.remove({'_id': {'$gte': ids[0], '$lte': ids[-1]}})
+        else:
+            collection.remove({'_id': {'$in': ids}})
+        removed += len(ids)
+        if progress is not None:
+            progress(removed)
+        if len(ids) < batch_size:
+            break
+        if batch_pause > 0:
+            if stop is None:
+                time.sleep(batch_pause)
+            else:
+                stop.wait(batch_pause)
+    return removed
 
 
 def _create_expired_object_id(age):
@@ -48,6 +48,8 @@ class RepoContentUnit(Model):
     search_indices = (('repo_id', 'unit_type_id'),
                       # default sort order on get_units query, do not remove
                       ('unit_type_id', 'created'),
+                      # referenced unit ids of a type, read by the orphan manager
+                      ('unit_type_id', 'unit_id'),
                       'unit_id')
 
     OWNER_TYPE_IMPORTER = 'importer'
@@ -67,6 +69,77 @@ class RepoContentUnit(Model):
         self.updated = self.created
 
 
+class RepoContentDelta(Model):
+    """
+    Each instance records that a content unit has been added to or removed from a
+    repo since applicability was last regenerated for the repo. There is at most
+    one instance for each unit in a repo, reflecting the last change made.
+
+    @ivar repo_id: identifies the repo
+    @type repo_id: str
+
+    @ivar unit_id: ID (_id) of the content unit in its type collection
+    @type unit_id: str
+
+    @ivar unit_type_id: identifies the type of content unit
+    @type unit_type_id: str
+
+    @ivar added: True if the unit was added (or re-associated), False if it was removed
+    @type added: bool
+
+    @ivar version: incremented each time the change is recorded, so a change recorded
+                   while applicability is being regenerated is not discarded
+    @type version: int
+    """
+
+    collection_name = 'repo_content_deltas'
+
+    unique_indices = (('repo_id', 'unit_type_id', 'unit_id'),)
+
+    def __init__(self, repo_id, unit_id, unit_type_id, added, version=1):
+        super(RepoContentDelta, self).__init__()
+
+        self.repo_id = repo_id
+        self.unit_id = unit_id
+        self.unit_type_id = unit_type_id
+        self.added = added
+        self.version = version
+
+
+class RepoContentDeltaStatus(Model):
+    """
+    Each instance tracks the content changes recorded for a repo since applicability was
+    last regenerated for the repo. Changes are no longer recorded as RepoContentDelta
+    instances once there are too many of them or while no consumer is bound to the repo,
+    in which case the applicability of the repo must be regenerated from scratch.
+
+    @ivar repo_id: identifies the repo
+    @type repo_id: str
+
+    @ivar units: number of unit changes recorded, including changes to the same unit
+    @type units: int
+
+    @ivar full: True if changes are no longer recorded
+    @type full: bool
+
+    @ivar version: incremented each time changes are recorded, so changes recorded
+                   while applicability is being regenerated are not discarded
+    @type version: int
+    """
+
+    collection_name = 'repo_content_delta_status'
+
+    unique_indices = ('repo_id',)
+
+    def __init__(self, repo_id, units=0, full=False, version=1):
+        super(RepoContentDeltaStatus, self).__init__()
+
+        self.repo_id = repo_id
+        self.units = units
+        self.full = full
+        self.version = version
+
+
 class RepoSyncResult(Model, ReaperMixin):
     """
     Stores the results of a repo sync.
@@ -1,12 +1,14 @@
 from gettext import gettext as _
 import logging
+import threading
 
 from celery import task
 
 from pulp.common.tags import action_tag
 from pulp.server import config as pulp_config
 from pulp.server.db import model
-from pulp.server.async.tasks import PulpTask, Task
+from pulp.server.async import progress
+from pulp.server.async.tasks import PulpTask, Task, get_current_task_id, register_sigterm_handler
 from pulp.server.db.model import celery_result, consumer, repo_group, repository
 
 
@@ -42,11 +44,44 @@ def reap_expired_documents():
     For each collection in _COLLECTION_TIMEDELTAS, call the class method reap_old_documents().
 
     This method gets the number of days from the pulp_config, and calls reap_old_documents with the
-    number of days as the argument.
+    number of days as the argument. Documents are removed in batches of [data_reaping] batch_size,
+    and the reaper stops between batches when the worker is shut down.
     """
     _logger.info(_('The reaper task is cleaning out old documents from the database.'))
+    stop = threading.Event()
+    reap = register_sigterm_handler(_reap_expired_documents, stop.set)
+    reap(stop)
+    if stop.is_set():
+        _logger.info(_('The reaper task was stopped before it completed.'))
+    else:
+        _logger.info(_('The reaper task has completed.'))
+
+
+def _reap_expired_documents(stop):
+    """
+    Reap each collection in _COLLECTION_TIMEDELTAS until stop is set, and report the number of
+    documents removed from each collection as the progress of the task.
+
+    :param stop: Stop reaping between batches once this is set.
+    :type  stop: threading.Event
+    """
+    batch_size = pulp_config.config.getint('data_reaping', 'batch_size')
+    batch_pause = pulp_config.config.getfloat('data_reaping', 'batch_pause')
+    task_id = get_current_task_id()
+    report = {}
+
+    def reaped(config_name, removed):
+        report[config_name] = removed
+        _logger.debug(_('The reaper task has removed %(count)d documents of %(name)s.') %
+                      {'count': removed, 'name': config_name})
+        if task_id is not None:
+            progress.aggregator().update(task_id, {'reaper': report})
+
     for model_class, config_name in _COLLECTION_TIMEDELTAS.items():
+        if stop.is_set():
+            break
         # Get the config for how old documents should be before they are reaped.
         config_days = pulp_config.config.getfloat('data_reaping', config_name)
-        model_class.reap_old_documents(config_days)
-    _logger.info(_('The reaper task has completed.'))
+        model_class.reap_old_documents(
+            config_days, batch_size=batch_size, batch_pause=batch_pause, stop=stop,
+            progress=lambda removed, name=config_name: reaped(name, removed))
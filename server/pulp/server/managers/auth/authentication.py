@@ -3,7 +3,7 @@ import logging
 
 import oauth2
 
-from pulp.server.auth import ldap_connection
+from pulp.server.auth import credentials, ldap_connection
 from pulp.server.config import config
 from pulp.server.db import model
 from pulp.server.db.model.consumer import Consumer
@@ -43,9 +43,12 @@ class AuthenticationManager(object):
             return None
 
         if password is not None:
-            if not user.check_password(password):
-                _logger.debug('Password for user [%s] was incorrect' % username)
-                return None
+            cache = credentials.verified_credentials()
+            if not cache.verified(user, password):
+                if not user.check_password(password):
+                    _logger.debug('Password for user [%s] was incorrect' % username)
+                    return None
+                cache.add(user, password)
 
         return user
 
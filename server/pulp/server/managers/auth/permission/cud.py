@@ -8,7 +8,7 @@ from gettext import gettext as _
 from celery import task
 
 from pulp.server.async.tasks import Task
-from pulp.server.auth import authorization
+from pulp.server.auth import authorization, permission_index
 from pulp.server.db import model
 from pulp.server.db.model.auth import Permission
 from pulp.server.exceptions import (
@@ -76,6 +76,7 @@ class PermissionManager(object):
             raise PulpDataException(_("Update Keyword [%s] is not supported" % key))
 
         Permission.get_collection().save(found)
+        permission_index.changed()
 
     @staticmethod
     def delete_permission(resource_uri):
@@ -98,6 +99,7 @@ class PermissionManager(object):
             raise MissingResource(resource_uri)
 
         Permission.get_collection().remove({'resource': resource_uri})
+        permission_index.changed()
 
     @staticmethod
     def grant(resource, login, operations):
@@ -139,6 +141,7 @@ class PermissionManager(object):
             current_ops.append(o)
 
         Permission.get_collection().save(permission)
+        permission_index.changed()
 
     @staticmethod
     def revoke(resource, login, operations):
@@ -186,6 +189,7 @@ class PermissionManager(object):
             return
 
         Permission.get_collection().save(permission)
+        permission_index.changed()
 
     def grant_automatic_permissions_for_resource(self, resource):
         """
@@ -245,6 +249,7 @@ class PermissionManager(object):
         :type login: str
         """
         permission_query_manager = factory.permission_query_manager()
+        revoked = False
         for permission in permission_query_manager.find_all():
             if permission_query_manager.get_user_permission(permission, login) is None:
                 continue
@@ -254,6 +259,9 @@ class PermissionManager(object):
             else:
                 # Delete entire permission if there are no more users
                 Permission.get_collection().remove({'resource': permission['resource']})
+            revoked = True
+        if revoked:
+            permission_index.changed()
 
     def operation_name_to_value(self, name):
         """
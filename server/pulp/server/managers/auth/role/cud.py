@@ -9,6 +9,7 @@ from celery import task
 
 from pulp.server.constants import SUPER_USER_ROLE
 from pulp.server.async.tasks import Task
+from pulp.server.auth import permission_index
 from pulp.server.auth.authorization import CREATE, READ, UPDATE, DELETE, EXECUTE, \
     _operations_not_granted_by_roles
 from pulp.server.controllers import user as user_controller
@@ -141,6 +142,7 @@ class RoleManager(object):
             user.save()
 
         Role.get_collection().remove({'id': role_id})
+        permission_index.changed()
 
     @staticmethod
     def add_permissions_to_role(role_id, resource, operations):
@@ -186,6 +188,7 @@ class RoleManager(object):
             factory.permission_manager().grant(resource, user.login, operations)
 
         Role.get_collection().save(role)
+        permission_index.changed()
 
     @staticmethod
     def remove_permissions_from_role(role_id, resource, operations):
@@ -235,6 +238,7 @@ class RoleManager(object):
             role['permissions'].remove(resource_permission)
 
         Role.get_collection().save(role)
+        permission_index.changed()
 
     @staticmethod
     def add_user_to_role(role_id, login):
@@ -265,6 +269,7 @@ class RoleManager(object):
         for item in role['permissions']:
             factory.permission_manager().grant(item['resource'], login,
                                                item.get('permission', []))
+        permission_index.changed()
 
     @staticmethod
     def remove_user_from_role(role_id, login):
@@ -302,6 +307,7 @@ class RoleManager(object):
                                                         item['permission'],
                                                         other_roles)
             factory.permission_manager().revoke(item['resource'], login, user_ops)
+        permission_index.changed()
 
     def ensure_super_user_role(self):
         """
@@ -4,6 +4,7 @@ Contains content applicability management classes
 import hashlib
 import itertools
 import json
+import math
 
 from gettext import gettext as _
 from logging import getLogger
@@ -11,15 +12,17 @@ from uuid import uuid4
 
 from celery import task
 from mongoengine import errors as mongo_errors
-from pymongo.errors import DuplicateKeyError
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from pulp.plugins.conduits.profiler import ProfilerConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptions
 from pulp.plugins.profiler import Profiler
-from pulp.server.async.tasks import Task
+from pulp.server.async.tasks import Task, _is_worker
 from pulp.server.db import model, connection
 from pulp.server.db.model.consumer import Bind, RepoProfileApplicability, UnitProfile
+from pulp.server.db.model.repository import RepoContentDelta, RepoContentDeltaStatus
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.managers import factory as managers
 from pulp.server.managers.consumer.query import ConsumerQueryManager
@@ -27,6 +30,14 @@ from pulp.server.managers.consumer.query import ConsumerQueryManager
 
 _logger = getLogger(__name__)
 
+# The bounds of the number of (repo_id, all_profiles_hash) pairs processed by each
+# batch_regenerate_applicability_task.
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 500
+
+# The number of batches queued for each available worker.
+BATCHES_PER_WORKER = 4
+
 
 class ApplicabilityRegenerationManager(object):
     @staticmethod
@@ -81,100 +92,306 @@ class ApplicabilityRegenerationManager(object):
                                                                               profiles, repo_id)
 
     @staticmethod
-    def regenerate_applicability_for_repos(repo_criteria):
+    def regenerate_applicability_for_repos(repo_criteria, full=False):
         """
         Regenerate and save applicability data affected by given updated repositories.
 
         :param repo_criteria: The repo selection criteria
         :type repo_criteria: dict
+        :param full: recalculate all the applicability from scratch, even where only the
+                     content changes since the last regeneration would be needed
+        :type full: bool
         """
         repo_criteria = Criteria.from_dict(repo_criteria)
         # Process repo criteria
         repo_criteria.fields = ['id']
         repo_ids = [r.repo_id for r in model.Repository.objects.find_by_criteria(repo_criteria)]
 
-        repo_consumer_map = ApplicabilityRegenerationManager._get_repo_consumer_map(
-            repo_ids=repo_ids)
+        # The content changes are loaded before the profiles so that changes made while
+        # applicability is regenerated are kept for the next regeneration.
+        repo_deltas, recorded_deltas = \
+            ApplicabilityRegenerationManager._get_repo_content_deltas(repo_ids)
+        if full:
+            repo_deltas = {}
 
-        consumer_ids = itertools.chain(*repo_consumer_map.values())
-        consumer_profile_map = ApplicabilityRegenerationManager._get_consumer_profile_map(
-            consumer_ids)
+        profiles_to_process = ApplicabilityRegenerationManager._get_profiles_to_process(repo_ids)
 
-        for repo_id in repo_consumer_map:
-            seen_hashes = set()
-            for consumer_id in repo_consumer_map[repo_id]:
-                if consumer_id in consumer_profile_map:
-                    all_profiles_hash = consumer_profile_map[consumer_id]['all_profiles_hash']
-                    if all_profiles_hash in seen_hashes:
-                        continue
-                    seen_hashes.add(all_profiles_hash)
-                    profiles = consumer_profile_map[consumer_id]['profiles']
+        for i in range(0, len(profiles_to_process), MAX_BATCH_SIZE):
+            ApplicabilityRegenerationManager.batch_regenerate_applicability(
+                profiles_to_process[i:i + MAX_BATCH_SIZE], repo_deltas)
 
-                    # Regenerate applicability data for a given all_profiles_hash and repo id
-                    ApplicabilityRegenerationManager.regenerate_applicability(
-                        all_profiles_hash, profiles, repo_id)
+        ApplicabilityRegenerationManager._clear_repo_content_deltas(recorded_deltas)
 
     @staticmethod
-    def queue_regenerate_applicability_for_repos(repo_criteria):
+    def queue_regenerate_applicability_for_repos(repo_criteria, full=False):
         """
         Queue a group of tasks to generate and save applicability data affected by given updated
         repositories.
 
+        The content changes recorded for the repositories are passed to the tasks and are
+        cleared once the tasks have been queued.
+
         :param repo_criteria: The repo selection criteria
         :type repo_criteria: dict
+        :param full: recalculate all the applicability from scratch, even where only the
+                     content changes since the last regeneration would be needed
+        :type full: bool
         """
         repo_criteria = Criteria.from_dict(repo_criteria)
         # Process repo criteria
         repo_criteria.fields = ['id']
         repo_ids = [r.repo_id for r in model.Repository.objects.find_by_criteria(repo_criteria)]
 
-        repo_consumer_map = ApplicabilityRegenerationManager._get_repo_consumer_map(
-            repo_ids=repo_ids)
+        repo_deltas, recorded_deltas = \
+            ApplicabilityRegenerationManager._get_repo_content_deltas(repo_ids)
+        if full:
+            repo_deltas = {}
 
-        consumer_ids = itertools.chain(*repo_consumer_map.values())
-        consumer_profile_map = ApplicabilityRegenerationManager._get_consumer_profile_map(
-            consumer_ids)
+        profiles_to_process = ApplicabilityRegenerationManager._get_profiles_to_process(repo_ids)
 
         task_group_id = uuid4()
-        batch_size = 10
-
-        # list of tuples (repo_id, all_profiles_hash, profiles)
-        profiles_to_process = []
-        for repo_id in repo_consumer_map:
-            seen_hashes = set()
-            for consumer_id in repo_consumer_map[repo_id]:
-                if consumer_id in consumer_profile_map:
-                    all_profiles_hash = consumer_profile_map[consumer_id]['all_profiles_hash']
-                    if all_profiles_hash in seen_hashes:
-                        continue
-                    seen_hashes.add(all_profiles_hash)
-                    profiles = consumer_profile_map[consumer_id]['profiles']
-                    profiles_to_process.append((repo_id, all_profiles_hash, profiles))
-                    if len(profiles_to_process) >= batch_size:
-                        batch_regenerate_applicability_task.apply_async(
-                            (profiles_to_process,), **{'group_id': task_group_id})
-                        profiles_to_process = []
 
-        # last few non-processed profiles which didn't make a whole batch
-        if profiles_to_process:
+        batch_size = ApplicabilityRegenerationManager._batch_size(len(profiles_to_process))
+        for i in range(0, len(profiles_to_process), batch_size):
+            batch = profiles_to_process[i:i + batch_size]
+            batch_repo_deltas = dict((repo_id, repo_deltas[repo_id]) for repo_id, _, _ in batch
+                                     if repo_id in repo_deltas)
             batch_regenerate_applicability_task.apply_async(
-                (profiles_to_process,), **{'group_id': task_group_id})
+                (batch, batch_repo_deltas), **{'group_id': task_group_id})
+
+        ApplicabilityRegenerationManager._clear_repo_content_deltas(recorded_deltas)
         return task_group_id
 
     @staticmethod
-    def batch_regenerate_applicability(profiles_to_process):
+    def batch_regenerate_applicability(profiles_to_process, repo_deltas=None):
         """
         Regenerate and save applicability data for a batch of applicabilities
 
+        The content types of all the repositories and the unit profiles of the whole batch
+        are each loaded with a single query and the results are saved using unordered
+        bulk upserts.
+
+        When the content changes of a repository are known and the profiler implements
+        calculate_applicable_units_delta(), existing applicability is updated using only the
+        units added and removed, and is left untouched when nothing changed.
+
+        Each write of applicability sets a new revision, and applicability updated from the
+        content changes is only written if its revision is still the one that was read.
+        Applicability written by another regeneration in the meantime is calculated again from
+        scratch, so that the changes known to either regeneration are not lost.
+
         :param profiles_to_process: profile data necessary for applicability calculation,
                                     [(repo_id, all_profiles_hash, profiles), ...]
         :type  profiles_to_process: list of tuples
+        :param repo_deltas:         content changes keyed by repo_id, as returned by
+                                    _get_repo_content_deltas(); None when not known
+        :type  repo_deltas:         dict
         """
+        profiler_conduit = ProfilerConduit()
+        repo_deltas = repo_deltas or {}
+        revision = uuid4().hex
+
+        profilers = {}
+        for profile_data in profiles_to_process:
+            # The same profiler is used for all the content types of a consumer,
+            # see regenerate_applicability().
+            content_type = profile_data[2][0][1]
+            if content_type not in profilers:
+                profilers[content_type] = ApplicabilityRegenerationManager._profiler(content_type)
+
+        existing_applicability = ApplicabilityRegenerationManager._get_existing_applicability_map(
+            [(repo_id, all_profiles_hash) for repo_id, all_profiles_hash, _ in profiles_to_process
+             if repo_id in repo_deltas])
+
+        # Applicability of repositories that have not changed is up to date.
+        unchanged = set(repo_id for repo_id, delta in repo_deltas.items()
+                        if not (delta['added'] or delta['removed']))
+        profiles_to_process = [
+            (repo_id, all_profiles_hash, profiles)
+            for repo_id, all_profiles_hash, profiles in profiles_to_process
+            if not (repo_id in unchanged and
+                    existing_applicability.get((all_profiles_hash, repo_id)) is not None and
+                    ApplicabilityRegenerationManager._supports_delta(
+                        profilers[profiles[0][1]][0]))]
+
+        repo_ids = set(repo_id for repo_id, _, _ in profiles_to_process)
+        repo_content_types = ApplicabilityRegenerationManager._get_repo_content_types_map(
+            repo_ids)
+
+        profile_ids = set(itertools.chain.from_iterable(
+            [p_id for _, _, p_id in profiles] for _, _, profiles in profiles_to_process))
+        unit_profiles = UnitProfile.get_collection().find({'id': {'$in': list(profile_ids)}},
+                                                          projection=['id',
+                                                                      'profile',
+                                                                      'content_type',
+                                                                      'profile_hash'])
+        unit_profiles = dict((p['id'], p) for p in unit_profiles)
+
+        operations = []
+        # The arguments needed to calculate the applicability updated from the content changes
+        # from scratch, keyed by (repo_id, all_profiles_hash).
+        patched = {}
+        patch_operations = []
         for repo_id, all_profiles_hash, profiles in profiles_to_process:
+            content_type = profiles[0][1]
+            profiler, profiler_cfg = profilers[content_type]
 
-            # Regenerate applicability data for given profiles and repo id
-            ApplicabilityRegenerationManager.regenerate_applicability(all_profiles_hash,
-                                                                      profiles, repo_id)
+            if profiler.calculate_applicable_units == Profiler.calculate_applicable_units:
+                continue
+            if not (set(repo_content_types.get(repo_id, [])) & set(profiler.metadata()['types'])):
+                continue
+
+            try:
+                profiles = [(unit_profiles[p_id]['profile_hash'],
+                             unit_profiles[p_id]['content_type'],
+                             unit_profiles[p_id]['profile']) for _, _, p_id in profiles]
+            except KeyError:
+                # The consumer has been removed during applicability regeneration.
+                continue
+
+            call_config = PluginCallConfiguration(plugin_config=profiler_cfg,
+                                                  repo_plugin_config=None)
+
+            previous = existing_applicability.get((all_profiles_hash, repo_id))
+            if previous is not None:
+                delta = repo_deltas[repo_id]
+                try:
+                    applicability = profiler.calculate_applicable_units_delta(
+                        profiles, repo_id, previous['applicability'], delta['added'],
+                        delta['removed'], call_config, profiler_conduit)
+                except NotImplementedError:
+                    pass
+                else:
+                    # Unchanged applicability is not written, but its revision is still
+                    # set so that a concurrent update is detected.
+                    if applicability == previous['applicability']:
+                        applicability = None
+                    patched[(repo_id, all_profiles_hash)] = (profiler, profiles, call_config)
+                    patch_operations.extend(
+                        ApplicabilityRegenerationManager._applicability_updates(
+                            repo_id, all_profiles_hash, profiles, applicability, revision,
+                            conditional=True, previous_revision=previous['revision']))
+                    continue
+
+            applicability = ApplicabilityRegenerationManager._calculate_applicability(
+                profiler, profiles, repo_id, call_config, profiler_conduit)
+            if applicability is not None:
+                operations.extend(ApplicabilityRegenerationManager._applicability_updates(
+                    repo_id, all_profiles_hash, profiles, applicability, revision))
+
+        if patch_operations:
+            collection = RepoProfileApplicability.get_collection()
+            result = collection.bulk_write(patch_operations, ordered=False)
+            if result.matched_count < len(patch_operations):
+                conflicts = ApplicabilityRegenerationManager._get_conflicting_applicability(
+                    patched, revision)
+                for repo_id, all_profiles_hash in conflicts:
+                    profiler, profiles, call_config = patched[(repo_id, all_profiles_hash)]
+                    applicability = ApplicabilityRegenerationManager._calculate_applicability(
+                        profiler, profiles, repo_id, call_config, profiler_conduit)
+                    if applicability is not None:
+                        operations.extend(ApplicabilityRegenerationManager._applicability_updates(
+                            repo_id, all_profiles_hash, profiles, applicability, revision))
+
+        connection.bulk_upsert(RepoProfileApplicability.get_collection(), operations)
+
+    @staticmethod
+    def _calculate_applicability(profiler, profiles, repo_id, call_config, profiler_conduit):
+        """
+        Calculate applicability from scratch.
+
+        :param profiler:         the profiler of the content type of the profiles
+        :type  profiler:         pulp.plugins.profiler.Profiler
+        :param profiles:         the consumer profiles: (profile_hash, content_type, profile)
+        :type  profiles:         list of tuples
+        :param repo_id:          the bound repository
+        :type  repo_id:          basestring
+        :param call_config:      the plugin configuration
+        :type  call_config:      pulp.plugins.config.PluginCallConfiguration
+        :param profiler_conduit: the conduit passed to the profiler
+        :type  profiler_conduit: pulp.plugins.conduits.profiler.ProfilerConduit
+        :return:                 the applicability, or None if the profiler does not support it
+        :rtype:                  dict
+        """
+        try:
+            return profiler.calculate_applicable_units(profiles, repo_id, call_config,
+                                                       profiler_conduit)
+        except NotImplementedError:
+            msg = "Profiler for content type [%s] does not support applicability" % \
+                profiles[0][1]
+            _logger.debug(msg)
+            return None
+
+    @staticmethod
+    def _applicability_updates(repo_id, all_profiles_hash, profiles, applicability, revision,
+                               conditional=False, previous_revision=None):
+        """
+        Build the writes of the applicability of each of the profiles.
+
+        :param repo_id:           the bound repository
+        :type  repo_id:           basestring
+        :param all_profiles_hash: the hash of the consumer profiles
+        :type  all_profiles_hash: basestring
+        :param profiles:          the consumer profiles: (profile_hash, content_type, profile)
+        :type  profiles:          list of tuples
+        :param applicability:     the applicability; None to only set the revision
+        :type  applicability:     dict
+        :param revision:          the new revision of the applicability
+        :type  revision:          basestring
+        :param conditional:       only update existing applicability that has the previous
+                                  revision; otherwise the applicability is created or updated
+        :type  conditional:       bool
+        :param previous_revision: the revision the applicability must have to be updated, which
+                                  is None for applicability written without a revision
+        :type  previous_revision: basestring
+        :return:                  the writes
+        :rtype:                   list of pymongo.UpdateOne
+        """
+        operations = []
+        for profile in profiles:
+            query = {'repo_id': repo_id,
+                     'all_profiles_hash': all_profiles_hash,
+                     'profile_hash': profile[0]}
+            update = {'$set': {'revision': revision}}
+            if applicability is not None:
+                update['$set']['applicability'] = applicability
+            if conditional:
+                query['revision'] = previous_revision
+                operations.append(UpdateOne(query, update))
+            else:
+                update['$setOnInsert'] = {'profile': []}
+                operations.append(UpdateOne(query, update, upsert=True))
+        return operations
+
+    @staticmethod
+    def _get_conflicting_applicability(patched, revision):
+        """
+        Find the applicability that was not updated from the revision that was read, because
+        another regeneration wrote it in the meantime.
+
+        :param patched:  keyed by (repo_id, all_profiles_hash) of the applicability updated
+                         from the revision that was read
+        :type  patched:  dict
+        :param revision: the revision set by the updates
+        :type  revision: basestring
+        :return:         (repo_id, all_profiles_hash) of the conflicting applicability
+        :rtype:          set
+        """
+        query = {'repo_id': {'$in': list(set(repo_id for repo_id, _ in patched))},
+                 'all_profiles_hash': {'$in': list(set(p_hash for _, p_hash in patched))}}
+        written = RepoProfileApplicability.get_collection().find(
+            query, projection=['repo_id', 'all_profiles_hash', 'revision'])
+        found = set()
+        conflicts = set()
+        for applicability in written:
+            pair = (applicability['repo_id'], applicability['all_profiles_hash'])
+            if pair not in patched:
+                continue
+            found.add(pair)
+            if applicability.get('revision') != revision:
+                conflicts.add(pair)
+        # Applicability that has been removed in the meantime is also written again.
+        return conflicts | (set(patched) - found)
 
     @staticmethod
     def regenerate_applicability(all_profiles_hash, profiles, bound_repo_id):
@@ -288,6 +505,188 @@ class ApplicabilityRegenerationManager(object):
                 repo_content_types_with_non_zero_unit_count.append(content_type)
         return repo_content_types_with_non_zero_unit_count
 
+    @staticmethod
+    def _get_repo_content_types_map(repo_ids):
+        """
+        For the given repo_ids, return a map of repo_id to a list of content_type_ids that have
+        content units counts greater than 0. Repositories that do not exist are omitted.
+
+        :param repo_ids: The repo_ids for the repositories that we wish to know the unit types
+                         contained therein
+        :type  repo_ids: iterable
+        :return:         A map of repo_id to a list of content type ids that have unit counts
+                         greater than 0
+        :rtype:          dict
+        """
+        repos = model.Repository.objects(repo_id__in=list(repo_ids)).only('repo_id',
+                                                                          'content_unit_counts')
+        return dict((repo.repo_id, [content_type for content_type, count in
+                                    repo.content_unit_counts.items() if count > 0])
+                    for repo in repos)
+
+    @staticmethod
+    def _get_profiles_to_process(repo_ids):
+        """
+        Get the profile data of the consumers bound to the given repositories, with one entry
+        for each unique all_profiles_hash bound to each repository.
+
+        :param repo_ids: repositories which should be included
+        :type  repo_ids: list
+        :return:         [(repo_id, all_profiles_hash, profiles), ...]
+        :rtype:          list of tuples
+        """
+        repo_consumer_map = ApplicabilityRegenerationManager._get_repo_consumer_map(
+            repo_ids=repo_ids)
+
+        consumer_ids = itertools.chain(*repo_consumer_map.values())
+        consumer_profile_map = ApplicabilityRegenerationManager._get_consumer_profile_map(
+            consumer_ids)
+
+        profiles_to_process = []
+        for repo_id in repo_consumer_map:
+            seen_hashes = set()
+            for consumer_id in repo_consumer_map[repo_id]:
+                if consumer_id in consumer_profile_map:
+                    all_profiles_hash = consumer_profile_map[consumer_id]['all_profiles_hash']
+                    if all_profiles_hash in seen_hashes:
+                        continue
+                    seen_hashes.add(all_profiles_hash)
+                    profiles = consumer_profile_map[consumer_id]['profiles']
+                    profiles_to_process.append((repo_id, all_profiles_hash, profiles))
+        return profiles_to_process
+
+    @staticmethod
+    def _get_repo_content_deltas(repo_ids):
+        """
+        Load the content changes recorded for the given repositories since applicability was
+        last regenerated. Repositories whose changes are no longer recorded, or have never been
+        recorded, are omitted so that their applicability is calculated from scratch.
+
+        :param repo_ids: The repo_ids of the repositories
+        :type  repo_ids: list
+        :return:         (deltas, recorded) where deltas maps repo_id to a dict with keys 'added'
+                         and 'removed', each mapping content type IDs to lists of unit IDs, and
+                         recorded lists the (model, operation) writes that reset the
+                         RepoContentDeltaStatus and delete the RepoContentDelta documents that
+                         were loaded, to be passed to _clear_repo_content_deltas()
+        :rtype:          tuple
+        """
+        deltas = {}
+        recorded = []
+        statuses = RepoContentDeltaStatus.get_collection().find(
+            {'repo_id': {'$in': list(repo_ids)}}, projection=['repo_id', 'full', 'version'])
+        status_repo_ids = set()
+        for status in statuses:
+            status_repo_ids.add(status['repo_id'])
+            # Changes recorded since the status was loaded are kept.
+            recorded.append((RepoContentDeltaStatus, UpdateOne(
+                {'_id': status['_id'], 'version': status['version']},
+                {'$set': {'units': 0, 'full': False}})))
+            if not status.get('full'):
+                deltas[status['repo_id']] = {'added': {}, 'removed': {}}
+        for repo_id in [r for r in repo_ids if r not in status_repo_ids]:
+            # Changes are recorded from now on, unless a change was recorded concurrently.
+            recorded.append((RepoContentDeltaStatus, UpdateOne(
+                {'repo_id': repo_id},
+                {'$setOnInsert': {'units': 0, 'full': False, 'version': 0}},
+                upsert=True)))
+        if not deltas:
+            return deltas, recorded
+        changes = RepoContentDelta.get_collection().find(
+            {'repo_id': {'$in': deltas.keys()}},
+            projection=['repo_id', 'unit_type_id', 'unit_id', 'added', 'version'])
+        for change in changes:
+            recorded.append((RepoContentDelta, DeleteOne(
+                {'_id': change['_id'], 'version': change['version']})))
+            repo_id = change['repo_id']
+            if repo_id not in deltas:
+                # Changes are no longer recorded since the status was loaded.
+                continue
+            key = 'added' if change['added'] else 'removed'
+            deltas[repo_id][key].setdefault(change['unit_type_id'], []).append(change['unit_id'])
+        return deltas, recorded
+
+    @staticmethod
+    def _clear_repo_content_deltas(recorded):
+        """
+        Delete content changes loaded by _get_repo_content_deltas() once applicability has been
+        regenerated, and reset the status of the repositories so that changes are recorded
+        from now on. Changes recorded again since they were loaded are kept.
+
+        :param recorded: list of (model, operation) writes of RepoContentDeltaStatus and
+                         RepoContentDelta documents
+        :type  recorded: list
+        """
+        operations = {}
+        for model_class, operation in recorded:
+            operations.setdefault(model_class, []).append(operation)
+        for model_class, model_operations in operations.items():
+            try:
+                model_class.get_collection().bulk_write(model_operations, ordered=False)
+            except BulkWriteError, e:
+                # A status inserted concurrently by record_content_delta() is kept.
+                if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                    raise
+
+    @staticmethod
+    def _get_existing_applicability_map(pairs):
+        """
+        Get the applicability already calculated for the given pairs.
+
+        :param pairs: list of (repo_id, all_profiles_hash)
+        :type  pairs: list
+        :return:      dicts with keys 'applicability' and 'revision' keyed by
+                      (all_profiles_hash, repo_id); None when the applicability of the profiles
+                      differs, such as while another regeneration is writing it
+        :rtype:       dict
+        """
+        if not pairs:
+            return {}
+        pairs = set(pairs)
+        query = {'repo_id': {'$in': list(set(repo_id for repo_id, _ in pairs))},
+                 'all_profiles_hash': {'$in': list(set(p_hash for _, p_hash in pairs))}}
+        applicabilities = RepoProfileApplicability.get_collection().find(
+            query, projection=['repo_id', 'all_profiles_hash', 'applicability', 'revision'])
+        existing = {}
+        for a in applicabilities:
+            if (a['repo_id'], a['all_profiles_hash']) not in pairs:
+                continue
+            key = (a['all_profiles_hash'], a['repo_id'])
+            value = {'applicability': a['applicability'], 'revision': a.get('revision')}
+            if existing.setdefault(key, value) != value:
+                existing[key] = None
+        return existing
+
+    @staticmethod
+    def _supports_delta(profiler):
+        """
+        Determine whether a profiler implements calculate_applicable_units_delta().
+
+        :param profiler: A profiler instance
+        :type  profiler: pulp.plugins.profiler.Profiler
+        :return:         True if supported
+        :rtype:          bool
+        """
+        method = getattr(type(profiler), 'calculate_applicable_units_delta', None)
+        return method is not None and \
+            method.__func__ is not Profiler.calculate_applicable_units_delta.__func__
+
+    @staticmethod
+    def _batch_size(count):
+        """
+        Calculate the number of (repo_id, all_profiles_hash) pairs processed by each
+        batch_regenerate_applicability_task so that the work is spread evenly among the
+        available workers while keeping the number of tasks low.
+
+        :param count: The total number of pairs to process.
+        :type  count: int
+        :return:      The batch size.
+        :rtype:       int
+        """
+        workers = len([w for w in model.Worker.objects.get_online() if _is_worker(w.name)])
+        batch_size = int(math.ceil(float(count) / (max(workers, 1) * BATCHES_PER_WORKER)))
+        return max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, batch_size))
+
     @staticmethod
     def _is_existing_applicability(repo_id, all_profiles_hash):
         """
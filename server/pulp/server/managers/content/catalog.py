@@ -11,7 +11,7 @@
 
 from logging import getLogger
 
-from pymongo import ASCENDING
+from pymongo import ASCENDING, InsertOne, UpdateMany
 
 from pulp.server.db.model.content import ContentCatalog
 
@@ -60,6 +60,85 @@ class ContentCatalogManager(object):
         entry = ContentCatalog(source_id, expires, type_id, unit_key, url)
         collection.insert(entry)
 
+    def update_entries(self, source_id, expires, source_url, refresh_id, entries):
+        """
+        Add a batch of entries contributed by a content source URL during a refresh.
+        The batch is compared with the existing unexpired entries for the source
+        using a single query.  Existing entries with the same locator and URL
+        are kept and their expiration extended.  The other entries are inserted.
+        All writes are performed by a single unordered bulk operation.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param expires: The entry expiration in seconds.
+        :type expires: int
+        :param source_url: The content source URL being refreshed.
+        :type source_url: str
+        :param refresh_id: Identifies the refresh.
+        :type refresh_id: str
+        :param entries: A list of: (type_id, unit_key, url).
+        :type entries: list
+        :return: The number of entries inserted.
+        :rtype: int
+        """
+        collection = ContentCatalog.get_collection()
+        added = {}
+        for type_id, unit_key, url in entries:
+            locator = ContentCatalog.get_locator(type_id, unit_key)
+            added[locator] = (type_id, unit_key, url)
+        query = {
+            'source_id': source_id,
+            'locator': {'$in': added.keys()},
+            'expiration': {'$gte': ContentCatalog.get_expiration(0)}
+        }
+        unchanged = []
+        for entry in collection.find(query, projection=['locator', 'url']):
+            matched = added.get(entry['locator'])
+            if matched is not None and matched[2] == entry['url']:
+                unchanged.append(entry['_id'])
+                del added[entry['locator']]
+        operations = []
+        if unchanged:
+            update = {
+                '$set': {
+                    'expiration': ContentCatalog.get_expiration(expires),
+                    'source_url': source_url,
+                    'refresh_id': refresh_id
+                }
+            }
+            operations.append(UpdateMany({'_id': {'$in': unchanged}}, update))
+        for type_id, unit_key, url in added.values():
+            entry = ContentCatalog(source_id, expires, type_id, unit_key, url,
+                                   source_url=source_url, refresh_id=refresh_id)
+            operations.append(InsertOne(entry))
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        return len(added)
+
+    def expire_stale(self, source_id, source_url, refresh_id):
+        """
+        Expire the entries contributed by a content source URL that were not
+        added by the specified refresh.  Expired entries are ignored and
+        eventually purged.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param source_url: The refreshed content source URL.
+        :type source_url: str
+        :param refresh_id: Identifies the refresh.
+        :type refresh_id: str
+        :return: The number of entries expired.
+        :rtype: int
+        """
+        collection = ContentCatalog.get_collection()
+        now = ContentCatalog.get_expiration(0)
+        query = {
+            'source_id': source_id,
+            'source_url': source_url,
+            'refresh_id': {'$ne': refresh_id},
+            'expiration': {'$gte': now}
+        }
+        result = collection.update_many(query, {'$set': {'expiration': now - 1}})
+        return result.modified_count
+
     def delete_entry(self, source_id, type_id, unit_key):
         """
         Delete an entry from the content catalog.
@@ -148,6 +227,33 @@ class ContentCatalogManager(object):
             newest_by_source[entry['source_id']] = entry
         return newest_by_source.values()
 
+    def find_by_locators(self, locators):
+        """
+        Find entries in the content catalog matching any of the specified
+        locators using a single query.  As with find(), only the newest entry
+        for each source is included for each locator.
+        :param locators: A list of locators.
+        :type locators: list
+        :return: A dictionary of: list of matching entries keyed by locator.
+            Locators without matching entries are not included.
+        :rtype: dict
+        """
+        collection = ContentCatalog.get_collection()
+        query = {
+            'locator': {'$in': list(locators)},
+            'expiration': {'$gte': ContentCatalog.get_expiration(0)}
+        }
+        newest_by_locator = {}
+        for entry in collection.find(query):
+            newest_by_source = newest_by_locator.setdefault(entry['locator'], {})
+            newest = newest_by_source.get(entry['source_id'])
+            # The ObjectId increases with the insertion time.
+            if newest is None or newest['_id'] < entry['_id']:
+                newest_by_source[entry['source_id']] = entry
+        return dict(
+            (locator, newest_by_source.values())
+            for locator, newest_by_source in newest_by_locator.items())
+
     def has_entries(self, source_id):
         """
         Get whether the specified content source has entries in the catalog.
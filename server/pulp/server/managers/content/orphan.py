@@ -1,9 +1,11 @@
 from gettext import gettext as _
+import heapq
 import itertools
 import logging
 import os
 import re
 import shutil
+import time
 
 from celery import task
 
@@ -11,7 +13,7 @@ from pulp.plugins.types import database as content_types_db
 from pulp.plugins.loader import api as plugin_api
 from pulp.plugins.util import misc as plugin_misc
 from pulp.server import config as pulp_config, exceptions as pulp_exceptions
-from pulp.server.async.tasks import Task
+from pulp.server.async.tasks import Task, get_current_task_id
 from pulp.server.controllers import units as units_controller
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.db import model
@@ -20,6 +22,62 @@ from pulp.server.exceptions import MissingResource
 
 _logger = logging.getLogger(__name__)
 
+# The number of units read per batch and deleted per chunk when finding and deleting orphans.
+ORPHAN_CHUNK_SIZE = 1000
+
+# The minimum number of seconds between updates of the task progress report while deleting.
+PROGRESS_INTERVAL = 1
+
+# Marks the end of the referenced unit id stream.
+_END = object()
+
+
+class OrphanDeleteProgress(object):
+    """
+    Tracks the number of orphans deleted by content type. Progress is logged and,
+    when running in a task, recorded in the task's progress report.
+
+    :ivar deleted: The number of orphans deleted keyed by content type id.
+    :type deleted: dict
+    """
+
+    def __init__(self, interval=PROGRESS_INTERVAL):
+        """
+        :param interval: The minimum number of seconds between progress report updates.
+        :type  interval: int
+        """
+        self.deleted = {}
+        self.interval = interval
+        self.task_id = get_current_task_id()
+        self._last_report = 0
+
+    def update(self, content_type_id, count):
+        """
+        Record that orphans of a content type have been deleted.
+
+        :param content_type_id: id of the content type
+        :type  content_type_id: basestring
+        :param count: The number of orphans deleted.
+        :type  count: int
+        """
+        if not count:
+            return
+        self.deleted[content_type_id] = self.deleted.get(content_type_id, 0) + count
+        _logger.info(_('Deleted %(n)d orphaned units of type %(t)s') % {
+            'n': self.deleted[content_type_id], 't': content_type_id})
+        if time.time() - self._last_report >= self.interval:
+            self.report()
+
+    def report(self):
+        """
+        Record the progress in the task's progress report.
+        """
+        self._last_report = time.time()
+        if self.task_id is None:
+            return
+        report = {'orphans': {'deleted': dict(self.deleted)}}
+        model.TaskStatus.objects(task_id=self.task_id).update_one(set__progress_report=report)
+
 
 class OrphanManager(object):
 
@@ -31,12 +89,9 @@ class OrphanManager(object):
         :return: summary of orphaned units
         :rtype: dict
         """
-        summary = {}
-        for content_type_id in content_types_db.all_type_ids():
-            summary[content_type_id] = self.orphans_count_by_type(content_type_id)
-        for content_type_id in plugin_api.list_unit_models():
-            summary[content_type_id] = self.orphans_count_by_type(content_type_id)
-        return summary
+        content_type_ids = set(content_types_db.all_type_ids())
+        content_type_ids.update(plugin_api.list_unit_models())
+        return OrphanManager.count_orphans(content_type_ids)
 
     def orphans_count_by_type(self, content_type_id):
         """
@@ -47,10 +102,22 @@ class OrphanManager(object):
         :return: count of orphaned units of the given type
         :rtype: int
         """
-        count = 0
-        for unit in OrphanManager.generate_orphans_by_type(content_type_id):
-            count += 1
-        return count
+        return OrphanManager.count_orphans([content_type_id])[content_type_id]
+
+    @staticmethod
+    def count_orphans(content_type_ids):
+        """
+        Count the orphans of the given content types in a single pass.
+
+        :param content_type_ids: ids of the content types to count orphans of
+        :type  content_type_ids: iterable
+        :return: count of orphaned units keyed by content type id
+        :rtype: dict
+        """
+        counts = dict((content_type_id, 0) for content_type_id in content_type_ids)
+        for content_type_id, content_unit in OrphanManager.find_orphans(counts.keys()):
+            counts[content_type_id] += 1
+        return counts
 
     def generate_all_orphans(self, fields=None):
         """
@@ -64,9 +131,9 @@ class OrphanManager(object):
         :rtype: generator
         """
 
-        for content_type_id in content_types_db.all_type_ids():
-            for content_unit in OrphanManager.generate_orphans_by_type(content_type_id, fields):
-                yield content_unit
+        content_type_ids = content_types_db.all_type_ids()
+        for content_type_id, content_unit in OrphanManager.find_orphans(content_type_ids, fields):
+            yield content_unit
 
     def generate_all_orphans_with_unit_keys(self):
         """
@@ -99,19 +166,46 @@ class OrphanManager(object):
         :rtype: generator
         """
 
-        fields = fields if fields is not None else ['_id']
-        content_units_collection = content_types_db.type_units_collection(content_type_id)
-        repo_content_units_collection = RepoContentUnit.get_collection()
+        for content_type_id, content_unit in OrphanManager.find_orphans([content_type_id], fields):
+            yield content_unit
 
-        for content_unit in content_units_collection.find({}, projection=fields).batch_size(100):
+    @staticmethod
+    def find_orphans(content_type_ids, fields=None):
+        """
+        Return a generator of all orphaned content units of the given content types.
 
-            repo_content_units_cursor = repo_content_units_collection.find(
-                {'unit_id': content_unit['_id']})
+        The units of each type are read in _id order and merged with the unit ids
+        referenced by repository associations, read in the same order from the
+        unit_id index, so orphans are found in a single pass with bounded memory.
 
-            if repo_content_units_cursor.count() > 0:
-                continue
+        If fields is not specified, only the `_id` field will be present.
 
-            yield content_unit
+        :param content_type_ids: ids of the content types
+        :type  content_type_ids: iterable
+        :param fields: list of fields to include in each content unit
+        :type  fields: list or None
+        :return: generator of (content type id, orphaned content unit) tuples
+        :rtype: generator
+        """
+        fields = list(fields) if fields is not None else ['_id']
+        if '_id' not in fields:
+            fields.append('_id')
+        content_type_ids = list(content_type_ids)
+
+        streams = []
+        for content_type_id in content_type_ids:
+            collection = content_types_db.type_units_collection(content_type_id)
+            cursor = collection.find({}, projection=fields).sort('_id', 1)
+            streams.append(_tag_units(content_type_id, cursor.batch_size(ORPHAN_CHUNK_SIZE)))
+
+        referenced = _referenced_unit_ids(content_type_ids)
+        referenced_id = next(referenced, _END)
+        for unit_id, content_type_id, content_unit in heapq.merge(*streams):
+            while referenced_id is not _END and referenced_id < unit_id:
+                referenced_id = next(referenced, _END)
+            if referenced_id == unit_id:
+                continue
+            yield content_type_id, content_unit
 
     @staticmethod
     def generate_orphans_by_type_with_unit_keys(content_type_id):
@@ -150,11 +244,9 @@ class OrphanManager(object):
                                  given content type and unit id
         """
 
-        for content_unit in OrphanManager.generate_orphans_by_type(content_type_id):
-
-            if content_unit['_id'] != content_unit_id:
-                continue
-
+        collection = content_types_db.type_units_collection(content_type_id)
+        content_unit = collection.find_one({'_id': content_unit_id}, projection=['_id'])
+        if content_unit is not None and not _associated_unit_ids([content_unit_id]):
             return content_unit
 
         raise pulp_exceptions.MissingResource(content_type=content_type_id,
@@ -169,15 +261,18 @@ class OrphanManager(object):
         :rtype: dict
         """
         ret = {}
+        progress = OrphanDeleteProgress()
         for content_type_id in content_types_db.all_type_ids():
-            count = OrphanManager.delete_orphans_by_type(content_type_id)
+            count = OrphanManager.delete_orphans_by_type(content_type_id, progress=progress)
             if count > 0:
                 ret[content_type_id] = count
 
         for content_type_id in plugin_api.list_unit_models():
-            count = OrphanManager.delete_orphan_content_units_by_type(content_type_id)
+            count = OrphanManager.delete_orphan_content_units_by_type(
+                content_type_id, progress=progress)
             if count > 0:
                 ret[content_type_id] = count
+        progress.report()
         return ret
 
     @staticmethod
@@ -206,19 +301,24 @@ class OrphanManager(object):
             OrphanManager.delete_orphans_by_type(content_type_id, content_unit_id_list)
 
     @staticmethod
-    def delete_orphans_by_type(content_type_id, content_unit_ids=None):
+    def delete_orphans_by_type(content_type_id, content_unit_ids=None, progress=None):
         """
         Delete the orphaned content units for the given content type.
 
         If the content_unit_ids parameter is not None, is acts as a filter of
         the specific orphaned content units that may be deleted.
 
+        Orphans are deleted in chunks of ORPHAN_CHUNK_SIZE. Each chunk is checked
+        again for associations that were created after it was found.
+
         NOTE: this method deletes the content unit's bits from disk, if applicable.
 
         :param content_type_id: id of the content type
         :type content_type_id: basestring
         :param content_unit_ids: list of content unit ids to delete; None means delete them all
         :type content_unit_ids: iterable or None
+        :param progress: used to report the number of deleted units
+        :type progress: OrphanDeleteProgress or None
         :return: count of units deleted
         :rtype: int
         """
@@ -232,29 +332,49 @@ class OrphanManager(object):
             raise MissingResource(content_type_id=content_type_id)
 
         fields = ('_id', '_storage_path') + unit_key_fields
-        count = 0
-        for content_unit in OrphanManager.generate_orphans_by_type(content_type_id, fields=fields):
+        if content_unit_ids is not None:
+            content_units = (
+                content_unit
+                for page in plugin_misc.paginate(content_unit_ids, ORPHAN_CHUNK_SIZE)
+                for content_unit in content_units_collection.find(
+                    {'_id': {'$in': list(page)}}, projection=fields))
+        else:
+            content_units = OrphanManager.generate_orphans_by_type(content_type_id, fields=fields)
 
-            if content_unit_ids is not None and content_unit['_id'] not in content_unit_ids:
+        progress = progress or OrphanDeleteProgress()
+        count = 0
+        for units_group in plugin_misc.paginate(content_units, ORPHAN_CHUNK_SIZE):
+            unit_dict = dict((content_unit['_id'], content_unit) for content_unit in units_group)
+            for non_orphan_id in _associated_unit_ids(unit_dict.keys()):
+                unit_dict.pop(non_orphan_id, None)
+            if not unit_dict:
                 continue
 
+            id_list = unit_dict.keys()
             model.LazyCatalogEntry.objects(
-                unit_id=content_unit['_id'],
+                unit_id__in=id_list,
                 unit_type_id=content_type_id
             ).delete()
-            content_units_collection.remove(content_unit['_id'])
+            content_units_collection.remove({'_id': {'$in': id_list}})
 
-            if hasattr(content_model, 'do_post_delete_actions'):
-                content_model.do_post_delete_actions(content_unit)
+            storage_paths = [content_unit['_storage_path'] for content_unit in
+                             unit_dict.itervalues() if content_unit.get('_storage_path')]
+            model.FileChecksum.delete_checksums(storage_paths)
 
-            storage_path = content_unit.get('_storage_path', None)
-            if storage_path is not None:
-                OrphanManager.delete_orphaned_file(storage_path)
-            count += 1
+            for content_unit in unit_dict.itervalues():
+                if hasattr(content_model, 'do_post_delete_actions'):
+                    content_model.do_post_delete_actions(content_unit)
+
+                storage_path = content_unit.get('_storage_path', None)
+                if storage_path is not None:
+                    OrphanManager.delete_orphaned_file(storage_path)
+
+            count += len(unit_dict)
+            progress.update(content_type_id, len(unit_dict))
         return count
 
     @staticmethod
-    def delete_orphan_content_units_by_type(type_id, content_unit_ids=None):
+    def delete_orphan_content_units_by_type(type_id, content_unit_ids=None, progress=None):
         """
         Delete the orphaned content units for the given content type.
         This method only applies to new style content units that are loaded via entry points
@@ -265,6 +385,8 @@ class OrphanManager(object):
         :type type_id: basestring
         :param content_unit_ids: list of content unit ids to delete; None means delete them all
         :type content_unit_ids: iterable or None
+        :param progress: used to report the number of deleted units
+        :type progress: OrphanDeleteProgress or None
         :return: count of units deleted
         :rtype: int
         """
@@ -283,12 +405,13 @@ class OrphanManager(object):
                 query_sets.append(qs)
             content_units = itertools.chain(*query_sets)
         else:
-            content_units = content_model.objects.only(*fields)
+            content_units = content_model.objects.only(*fields).batch_size(ORPHAN_CHUNK_SIZE)
 
+        progress = progress or OrphanDeleteProgress()
         count = 0
 
         # Paginate the content units
-        for units_group in plugin_misc.paginate(content_units):
+        for units_group in plugin_misc.paginate(content_units, ORPHAN_CHUNK_SIZE):
             # Build the list of ids to search for an easier way to access units in the group by id
             unit_dict = dict()
             for unit in units_group:
@@ -300,22 +423,29 @@ class OrphanManager(object):
             non_orphan = model.RepositoryContentUnit.objects(unit_id__in=id_list)\
                 .distinct('unit_id')
             for non_orphan_id in non_orphan:
-                unit_dict.pop(non_orphan_id)
+                unit_dict.pop(non_orphan_id, None)
+            if not unit_dict:
+                continue
 
-            # Remove the unit, lazy catalog entries, and any content in storage.
-            for unit_to_delete in unit_dict.itervalues():
-                model.LazyCatalogEntry.objects(
-                    unit_id=str(unit_to_delete.id),
-                    unit_type_id=str(type_id)
-                ).delete()
-                unit_to_delete.delete()
+            # Remove the units, lazy catalog entries, and any content in storage.
+            id_list = [str(unit_id) for unit_id in unit_dict.iterkeys()]
+            model.LazyCatalogEntry.objects(
+                unit_id__in=id_list,
+                unit_type_id=str(type_id)
+            ).delete()
+            content_model.objects(id__in=id_list).delete()
+            model.FileChecksum.delete_checksums(
+                [unit._storage_path for unit in unit_dict.itervalues() if unit._storage_path])
 
+            for unit_to_delete in unit_dict.itervalues():
                 if hasattr(content_model, 'do_post_delete_actions'):
                     content_model.do_post_delete_actions(unit_to_delete)
 
                 if unit_to_delete._storage_path:
                     OrphanManager.delete_orphaned_file(unit_to_delete._storage_path)
-                count += 1
+
+            count += len(unit_dict)
+            progress.update(type_id, len(unit_dict))
 
         return count
 
@@ -420,6 +550,56 @@ class OrphanManager(object):
             _logger.error(_('Delete path: %(p)s failed: %(m)s'), {'p': path, 'm': str(e)})
 
 
+def _tag_units(content_type_id, content_units):
+    """
+    Tag each content unit with its id and content type for merging.
+
+    :param content_type_id: id of the content type
+    :type  content_type_id: basestring
+    :param content_units: content units sorted by _id
+    :type  content_units: iterable
+    :return: generator of (unit id, content type id, content unit) tuples
+    :rtype: generator
+    """
+    for content_unit in content_units:
+        yield content_unit['_id'], content_type_id, content_unit
+
+
+def _referenced_unit_ids(content_type_ids):
+    """
+    Return the ids of the units associated with a repository in sorted order.
+    An id is repeated for each repository the unit is associated with. When a
+    single content type is given, only the units of that type are read and the
+    query is covered by the (unit_type_id, unit_id) index; otherwise the ids of
+    all units are read using the unit_id index.
+
+    :param content_type_ids: ids of the content types of the units
+    :type  content_type_ids: list
+    :return: generator of unit ids
+    :rtype: generator
+    """
+    spec = {}
+    if len(content_type_ids) == 1:
+        spec['unit_type_id'] = content_type_ids[0]
+    collection = RepoContentUnit.get_collection()
+    cursor = collection.find(spec, projection={'unit_id': 1, '_id': 0}).sort('unit_id', 1)
+    for association in cursor.batch_size(ORPHAN_CHUNK_SIZE):
+        yield association['unit_id']
+
+
+def _associated_unit_ids(unit_ids):
+    """
+    Return the ids of the given units that are associated with a repository.
+
+    :param unit_ids: list of unit ids
+    :type  unit_ids: list
+    :return: list of associated unit ids
+    :rtype: list
+    """
+    collection = RepoContentUnit.get_collection()
+    return collection.distinct('unit_id', {'unit_id': {'$in': list(unit_ids)}})
+
+
 delete_all_orphans = task(OrphanManager.delete_all_orphans, base=Task)
 delete_orphans_by_id = task(OrphanManager.delete_orphans_by_id, base=Task, ignore_result=True)
 delete_orphans_by_type = task(OrphanManager.delete_orphans_by_type, base=Task, ignore_result=True)
@@ -1,8 +1,12 @@
+from collections import OrderedDict
 from errno import ENOENT
 from gettext import gettext as _
+import fcntl
+import json
 import logging
 import os
 import sys
+import threading
 from uuid import uuid4
 
 from celery import task
@@ -13,7 +17,7 @@ from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptions
 from pulp.plugins.util import misc
 
-from pulp.server import config as pulp_config
+from pulp.server import config as pulp_config, util
 from pulp.server.async.tasks import Task
 from pulp.server.db import model
 from pulp.server.exceptions import (PulpDataException, MissingResource, PulpExecutionException,
@@ -23,6 +27,22 @@ from pulp.server.controllers import repository as repo_controller
 
 logger = logging.getLogger(__name__)
 
+# Number of bytes of the request body read into RAM at a time when saving uploaded data
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Checksums calculated while the data is uploaded and passed to the importer
+UPLOAD_CHECKSUM_TYPES = (util.TYPE_SHA256,)
+
+# Suffix of the file, next to the uploaded file, holding the running checksums of an upload
+DIGEST_SUFFIX = '.digest'
+
+# Maximum number of uploads whose running checksums are kept in memory by this process
+MAX_CACHED_DIGESTS = 100
+
+# upload_id: (size, digests) of the uploads last written by this process, least recent first
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+
 
 class ContentUploadManager(object):
     def initialize_upload(self):
@@ -60,14 +80,22 @@ class ContentUploadManager(object):
         to retrieve the upload_id value and perform any steps necessary before
         bits can be saved.
 
+        The data is written UPLOAD_CHUNK_SIZE bytes at a time. While the upload
+        is written in order, the data is added to running checksums, so that the
+        importer does not need to read the file again. The checksums are kept in
+        memory, and the size and checksums written so far are saved with the
+        upload; a process that does not have them in memory calculates them
+        again from the data already written.
+
         @param upload_id: upload request ID
         @type  upload_id: str
 
         @param offset: area in the uploaded file to start writing at
         @type  offset: int
 
-        @param data: content to write to the file
-        @type  data: str
+        @param data: content to write to the file, or a file-like object the
+                     content is read from
+        @type  data: str or file
         """
 
         file_path = ContentUploadManager._upload_file_path(upload_id)
@@ -76,10 +104,32 @@ class ContentUploadManager(object):
         if not os.path.exists(file_path):
             raise MissingResource(upload_request=upload_id)
 
-        f = open(file_path, 'r+')
-        f.seek(offset)
-        f.write(data)
-        f.close()
+        digest_path = ContentUploadManager._upload_digest_path(upload_id)
+
+        with open(file_path, 'r+') as f:
+            # The running checksums must be updated in the order the data is written
+            fcntl.flock(f, fcntl.LOCK_EX)
+            digests = ContentUploadManager._resume_digests(upload_id, f, offset)
+            f.seek(offset)
+            for chunk in _read_chunks(data):
+                f.write(chunk)
+                offset += len(chunk)
+                for digest in digests:
+                    digest.update(chunk)
+            if digests:
+                state = {
+                    'size': offset,
+                    'checksums': _hexdigests(digests),
+                }
+                # The state is replaced atomically so it is never read partially written.
+                tmp_path = ContentUploadManager._upload_digest_tmp_path(upload_id)
+                with open(tmp_path, 'w') as fp:
+                    json.dump(state, fp)
+                os.rename(tmp_path, digest_path)
+                with _digests_lock:
+                    _digests[upload_id] = (offset, digests)
+                    while len(_digests) > MAX_CACHED_DIGESTS:
+                        _digests.popitem(last=False)
 
     def delete_upload(self, upload_id):
         """
@@ -93,12 +143,17 @@ class ContentUploadManager(object):
         @raise MissingResource: if the upload request ID does not exist
         """
 
+        with _digests_lock:
+            _digests.pop(upload_id, None)
         file_path = ContentUploadManager._upload_file_path(upload_id)
-        try:
-            os.remove(file_path)
-        except OSError as e:
-            if e.errno != ENOENT:
-                raise
+        digest_path = ContentUploadManager._upload_digest_path(upload_id)
+        tmp_path = ContentUploadManager._upload_digest_tmp_path(upload_id)
+        for path in (file_path, digest_path, tmp_path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                if e.errno != ENOENT:
+                    raise
 
     def read_upload(self, upload_id):
         """
@@ -132,7 +187,7 @@ class ContentUploadManager(object):
         @rtype:  list
         """
         upload_dir = ContentUploadManager._upload_storage_dir()
-        upload_ids = os.listdir(upload_dir)
+        upload_ids = [name for name in os.listdir(upload_dir) if not name.endswith(DIGEST_SUFFIX)]
         return upload_ids
 
     @staticmethod
@@ -205,15 +260,16 @@ class ContentUploadManager(object):
         except plugin_exceptions.PluginNotFound:
             raise MissingResource(repo_id), None, sys.exc_info()[2]
 
+        file_path = ContentUploadManager._upload_file_path(upload_id)
+
         # Assemble the data needed for the import
-        conduit = UploadConduit(repo_id, repo_importer['id'])
+        conduit = UploadConduit(repo_id, repo_importer['id'],
+                                ContentUploadManager._upload_checksums(upload_id))
 
         call_config = PluginCallConfiguration(plugin_config, repo_importer['config'],
                                               override_config)
         transfer_repo = repo_obj.to_transfer_repo()
 
-        file_path = ContentUploadManager._upload_file_path(upload_id)
-
         # Invoke the importer
         try:
             result = importer_instance.upload_unit(transfer_repo, unit_type_id, unit_key,
@@ -258,6 +314,123 @@ class ContentUploadManager(object):
         path = os.path.join(upload_storage_dir, upload_id)
         return path
 
+    @staticmethod
+    def _upload_digest_path(upload_id):
+        """
+        Returns the full path to the file holding the running checksums of the given upload.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :return:          full path on the server's filesystem
+        :rtype:           str
+        """
+        return ContentUploadManager._upload_file_path(upload_id) + DIGEST_SUFFIX
+
+    @staticmethod
+    def _upload_digest_tmp_path(upload_id):
+        """
+        Returns the full path to the file the running checksums of the given upload are
+        written to before they replace the saved checksums. Like the saved checksums, it
+        is not listed as an upload.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :return:          full path on the server's filesystem
+        :rtype:           str
+        """
+        return ContentUploadManager._upload_file_path(upload_id) + '.tmp' + DIGEST_SUFFIX
+
+    @staticmethod
+    def _read_digest_state(digest_path):
+        """
+        :param digest_path: full path to the file holding the running checksums of an upload
+        :type  digest_path: str
+        :return:            the saved state, or None if there is no valid state
+        :rtype:             dict
+        """
+        try:
+            with open(digest_path) as fp:
+                state = json.load(fp)
+        except (IOError, ValueError):
+            return None
+        if not isinstance(state, dict) or not isinstance(state.get('size'), int):
+            return None
+        return state
+
+    @staticmethod
+    def _resume_digests(upload_id, f, offset):
+        """
+        Returns the running checksums of an upload to which data is about to be
+        written at the given offset. The checksums are started at offset 0 and are
+        resumed when the data follows the data already added to them. They are
+        taken from memory when this process wrote the data last, and are calculated
+        again from the data already written otherwise. When the data does not follow
+        the data already added, the saved checksums are no longer valid and are
+        deleted.
+
+        Must be called with the upload file locked.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :param f:         the upload file, open for reading
+        :type  f:         file
+        :param offset:    area in the uploaded file the data is written at
+        :type  offset:    int
+        :return:          the checksums to which the data is added; empty if they are not
+                          calculated
+        :rtype:           list of hashlib digests
+        """
+        digest_path = ContentUploadManager._upload_digest_path(upload_id)
+        with _digests_lock:
+            cached = _digests.pop(upload_id, None)
+        if offset == 0:
+            return [util.CHECKSUM_FUNCTIONS[t]() for t in UPLOAD_CHECKSUM_TYPES]
+        state = ContentUploadManager._read_digest_state(digest_path)
+        if state is not None and state['size'] == offset:
+            # The checksums in memory are stale if another process wrote the upload since.
+            if cached is not None and cached[0] == offset and \
+                    _hexdigests(cached[1]) == state.get('checksums'):
+                return cached[1]
+            digests = [util.CHECKSUM_FUNCTIONS[t]() for t in UPLOAD_CHECKSUM_TYPES]
+            f.seek(0)
+            remaining = offset
+            while remaining:
+                chunk = f.read(min(remaining, UPLOAD_CHUNK_SIZE))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                for digest in digests:
+                    digest.update(chunk)
+            if not remaining:
+                return digests
+        try:
+            os.remove(digest_path)
+        except OSError as e:
+            if e.errno != ENOENT:
+                raise
+        return []
+
+    @staticmethod
+    def _upload_checksums(upload_id):
+        """
+        Returns the checksums calculated while the given upload was written.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :return:          checksums keyed by checksum type; empty if they were not calculated
+                          for the whole file
+        :rtype:           dict
+        """
+        file_path = ContentUploadManager._upload_file_path(upload_id)
+        state = ContentUploadManager._read_digest_state(
+            ContentUploadManager._upload_digest_path(upload_id))
+        try:
+            if state is not None and state['size'] == os.path.getsize(file_path):
+                return dict(state['checksums'])
+        except (OSError, KeyError, TypeError, ValueError):
+            pass
+        return {}
+
     @staticmethod
     def _upload_storage_dir():
         """
@@ -277,4 +450,33 @@ class ContentUploadManager(object):
         return upload_storage_dir
 
 
+def _hexdigests(digests):
+    """
+    :param digests: running checksums of an upload, in the order of UPLOAD_CHECKSUM_TYPES
+    :type  digests: list of hashlib digests
+    :return:        the checksums calculated so far keyed by checksum type
+    :rtype:         dict
+    """
+    return dict((t, d.hexdigest()) for t, d in zip(UPLOAD_CHECKSUM_TYPES, digests))
+
+
+def _read_chunks(data):
+    """
+    Yields the data to be written to an upload.
+
+    :param data: content to write, or a file-like object the content is read from
+    :type  data: str or file
+    :return:     generator of strings of at most UPLOAD_CHUNK_SIZE bytes when read from a file
+    :rtype:      generator
+    """
+    if not hasattr(data, 'read'):
+        yield data
+        return
+    while True:
+        chunk = data.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
 import_uploaded_unit = task(ContentUploadManager.import_uploaded_unit, base=Task)
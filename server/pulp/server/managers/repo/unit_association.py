@@ -95,6 +95,7 @@ class RepoUnitAssociationManager(object):
         # Create the database entry
         association = RepoContentUnit(repo_id, unit_id, unit_type_id)
         RepoContentUnit.get_collection().save(association)
+        repo_controller.record_content_delta(repo_id, unit_type_id, [unit_id], True)
 
         # update the count and times of associated units on the repo object
         if update_repo_metadata and not similar_exists:
@@ -390,6 +391,7 @@ class RepoUnitAssociationManager(object):
                 'unit_id': {'$in': unit_ids}
             }
             collection.remove(spec)
+            repo_controller.record_content_delta(repo_id, unit_type_id, unit_ids, False)
 
         repo_controller.update_last_unit_removed(repo_id)
         repo_controller.rebuild_content_unit_counts(repo)
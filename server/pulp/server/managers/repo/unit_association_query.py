@@ -6,6 +6,7 @@ import itertools
 import pymongo
 
 from pulp.plugins.types import database as types_db
+from pulp.plugins.util import misc as plugin_misc
 from pulp.server.controllers import units
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
@@ -23,7 +24,10 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
-UNITS_BATCH_SIZE = 100000
+# The number of associations read per window when streaming units. This also
+# bounds the number of unit ids in each query of the unit collections, which
+# would otherwise exceed the 16M query size limit for very large repositories.
+UNITS_BATCH_SIZE = 1000
 
 
 class RepoUnitAssociationQueryManager(object):
@@ -66,112 +70,12 @@ class RepoUnitAssociationQueryManager(object):
 
         criteria = criteria or UnitAssociationCriteria()
 
-        unit_associations_generator = self._unit_associations_cursor(repo_id, criteria)
-
-        if criteria.remove_duplicates:
-            unit_associations_generator = self._unit_associations_no_duplicates(
-                criteria, unit_associations_generator)
-
-        if criteria.association_sort and not criteria.unit_filters:
-            # If we're ordering by association fields, but not filtering the
-            # content units, then perform the skip and limit on this generator
-            # to limit the number of units we load into memory.
-            # Manually perform skip and limit so we don't have to differentiate
-            # based on whether we're removing duplicates or not.
-            unit_associations_generator = self._with_skip_and_limit(unit_associations_generator,
-                                                                    criteria.skip, criteria.limit)
-
-        # The unit ids are used for ordering the units when association field
-        # ordering is specified (i.e. created timestamps, etc.)
-        # The ids are (unit_type_id, unit_id) tuples.
-        association_ordered_unit_ids = []
-
-        # The unit association information is part of the return values, so we
-        # construct a lookup in order to retrieve that information when we are
-        # iterating over the content units.
-        #
-        # unit_type_id -> unit_id -> (ordered)[association_1, association_2, ...]
-        #
-        # We also use the unit_id keys to lookup the units from unit_type_id
-        # collections.
-        associations_lookup = {}
-
-        for association in unit_associations_generator:
-
-            unit_type_id = association['unit_type_id']
-            unit_id = association['unit_id']
-
-            # Build the ordering.
-            association_ordered_unit_ids.append((unit_type_id, unit_id))
-
-            # Build the lookup.
-            association_type_dict = associations_lookup.setdefault(unit_type_id, {})
-            association_list = association_type_dict.setdefault(unit_id, [])
-            association_list.append(association)
-
-        association_unit_types = criteria.type_ids or self.unit_type_ids_for_repo(repo_id)
-        # The unit types should always be sorted in the same order, this allows
-        # multiple calls with skip and limit to work across types.
-        association_unit_types = sorted(association_unit_types)
-
-        # Use a generator expression here to keep from going back to the types
-        # collections once we've returned our limit of results.
-        # Be sure to skip cursors that would otherwise return an empty result set.
-        #
-        # If the repo contains too many units (>345K) of same type, the number of associated
-        # units will be too large and cause that the length of corresponding query exceeds the
-        # limit (16M), so split it into batches. But the way does not help if the criteria
-        # contains sorting.
-        if criteria.unit_sort:
-            units_cursors = (self._associated_units_by_type_cursor(t, criteria,
-                                                                   associations_lookup[t].keys())
-                             for t in association_unit_types if t in associations_lookup)
-        else:
-            units_cursors_list = []
-            for t in association_unit_types:
-                if t in associations_lookup:
-                    associations_unit_keys = associations_lookup[t].keys()
-                    unit_keys_list = [associations_unit_keys[i:i + UNITS_BATCH_SIZE]
-                                      for i in xrange(0, len(associations_unit_keys),
-                                                      UNITS_BATCH_SIZE)]
-                    for sub_unit_keys in unit_keys_list:
-                        units_cursors_list.append(
-                            self._associated_units_by_type_cursor(
-                                t, criteria, sub_unit_keys))
-            units_cursors = (units_cursor for units_cursor in units_cursors_list)
-
-        if not criteria.association_sort:
-            # If we're not sorting based on association fields, then set the
-            # skip and limit individually across the cursors to get consistent
-            # behavior across multiple calls across multiple unit types.
-            # The order that the generators are applied here is extremely
-            # important. DO NOT CHANGE!
-            units_cursors = self._associated_units_cursors_with_skip(units_cursors, criteria.skip)
-            units_cursors = self._associated_units_cursors_with_limit(units_cursors, criteria.limit)
-
-        units_generator = itertools.chain(*units_cursors)
-
         if criteria.association_sort:
-            # Use the ordered associations we created to properly order the results.
-            units_generator = self._association_ordered_units(association_ordered_unit_ids,
-                                                              units_generator)
-
-            if criteria.unit_filters:
-                # If we're ordering by association fields and filtering the
-                # content units, then skip and limit must be performed manually
-                # and last (skip and limit must always come after sorting).
-                units_generator = self._with_skip_and_limit(units_generator, criteria.skip,
-                                                            criteria.limit)
-
-            # The association ordering will generate the same unit for every
-            # association it has with the repository, hence "duplicate units".
-            units_generator = self._merged_units_duplicate_units(associations_lookup,
-                                                                 units_generator)
-
+            units_generator = self._units_in_association_order(repo_id, criteria)
+        elif criteria.unit_sort:
+            units_generator = self._units_in_unit_order(repo_id, criteria)
         else:
-            # Unit ordering or no ordering only produce unique units, hence
-            # "unique units".
-            units_generator = self._merged_units_unique_units(associations_lookup, units_generator)
+            units_generator = self._units_in_id_order(repo_id, criteria)
 
         if as_generator:
             return units_generator
@@ -265,23 +169,245 @@ class RepoUnitAssociationQueryManager(object):
 
         return [t for t in cursor.distinct('unit_type_id')]
 
+    # -- execution paths -------------------------------------------------------
+
+    def _units_in_association_order(self, repo_id, criteria):
+        """
+        Stream the units ordered by association fields.
+
+        The sorted associations are read in windows of UNITS_BATCH_SIZE and the
+        units for each window are fetched and merged in the window's order, so
+        only one window is held in memory at a time.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :rtype: generator
+        """
+        associations = self._unit_associations_cursor(repo_id, criteria)
+
+        # Without unit filters every association yields a unit, so skip and
+        # limit apply to the associations.
+        push_down = not criteria.unit_filters
+
+        if criteria.remove_duplicates:
+            associations = self._unit_associations_no_duplicates(criteria, associations)
+            if push_down:
+                associations = self._with_skip_and_limit(associations, criteria.skip,
+                                                         criteria.limit)
+        elif push_down:
+            if criteria.skip:
+                associations.skip(criteria.skip)
+            if criteria.limit:
+                associations.limit(criteria.limit)
+
+        units_generator = itertools.chain.from_iterable(
+            self._association_ordered_window(criteria, window)
+            for window in plugin_misc.paginate(associations, UNITS_BATCH_SIZE))
+
+        if not push_down:
+            # Skip and limit must always come after filtering and sorting.
+            units_generator = self._with_skip_and_limit(units_generator, criteria.skip,
+                                                        criteria.limit)
+
+        return units_generator
+
+    def _association_ordered_window(self, criteria, associations):
+        """
+        Fetch the units for a window of sorted associations and merge them in
+        the order of the associations.
+
+        :type criteria: UnitAssociationCriteria
+        :type associations: list
+        :rtype: generator
+        """
+        # The ids are (unit_type_id, unit_id) tuples.
+        association_ordered_unit_ids = []
+
+        # unit_type_id -> unit_id -> (ordered)[association_1, association_2, ...]
+        associations_lookup = {}
+
+        for association in associations:
+            unit_type_id = association['unit_type_id']
+            unit_id = association['unit_id']
+            association_ordered_unit_ids.append((unit_type_id, unit_id))
+            association_type_dict = associations_lookup.setdefault(unit_type_id, {})
+            association_type_dict.setdefault(unit_id, []).append(association)
+
+        units_cursors = [self._associated_units_by_type_cursor(t, criteria, ids.keys())
+                         for t, ids in sorted(associations_lookup.items())]
+
+        units_generator = self._association_ordered_units(association_ordered_unit_ids,
+                                                          itertools.chain(*units_cursors))
+
+        # The association ordering will generate the same unit for every
+        # association it has with the repository, hence "duplicate units".
+        return self._merged_units_duplicate_units(associations_lookup, units_generator)
+
+    def _units_in_id_order(self, repo_id, criteria):
+        """
+        Stream the units when no sort is specified, ordered by type and then by id.
+
+        The associations of each type are read in unit_id order in windows of
+        UNITS_BATCH_SIZE and the units of each window are fetched in _id order,
+        so the units are generated in the same order as a single query would
+        return them while only one window is held in memory at a time. When
+        possible, skip and limit are performed by the associations query.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :rtype: generator
+        """
+        unit_type_ids = sorted(criteria.type_ids or self.unit_type_ids_for_repo(repo_id))
+
+        # Without unit filters every association yields exactly one unit, so skip
+        # and limit apply to the associations.
+        push_down = not criteria.unit_filters and not criteria.remove_duplicates
+        # Skip and limit values of None and 0 are semantically equivalent.
+        to_skip = (criteria.skip or None) if push_down else None
+        to_generate = (criteria.limit or None) if push_down else None
+
+        units_generator = self._id_ordered_units(repo_id, criteria, unit_type_ids, to_skip,
+                                                 to_generate)
+
+        if not push_down:
+            units_generator = self._with_skip_and_limit(units_generator, criteria.skip,
+                                                        criteria.limit)
+
+        return units_generator
+
+    def _id_ordered_units(self, repo_id, criteria, unit_type_ids, skip, limit):
+        """
+        Generate the units of each type in id order one window at a time.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :type unit_type_ids: list
+        :param skip: number of associations to skip across all types; None for no skip
+        :type skip: int or None
+        :param limit: maximum number of associations across all types; None for no limit
+        :type limit: int or None
+        :rtype: generator
+        """
+        for unit_type_id in unit_type_ids:
+
+            if limit is not None and limit <= 0:
+                return
+
+            associations = self._unit_associations_cursor(repo_id, criteria, unit_type_id)
+            # The unique (repo_id, unit_type_id, unit_id) index provides this order
+            # without sorting in memory.
+            associations.sort([('unit_id', SORT_ASCENDING)])
+
+            if skip:
+                # Aggressively skip whole types.
+                count = associations.count()
+                if count <= skip:
+                    skip -= count
+                    continue
+                associations.skip(skip)
+                skip = 0
+
+            if limit:
+                associations.limit(limit)
+
+            if criteria.remove_duplicates:
+                associations = self._adjacent_unit_associations_no_duplicates(associations)
+
+            for window in plugin_misc.paginate(associations, UNITS_BATCH_SIZE):
+                if limit:
+                    limit -= len(window)
+
+                associations_lookup = {}
+                for association in window:
+                    associations_lookup.setdefault(association['unit_id'], []).append(
+                        association)
+
+                units_cursor = self._associated_units_by_type_cursor(
+                    unit_type_id, criteria, associations_lookup.keys())
+
+                for association in self._merged_units_unique_units(
+                        {unit_type_id: associations_lookup}, units_cursor):
+                    yield association
+
+    def _units_in_unit_order(self, repo_id, criteria):
+        """
+        Get the units ordered by unit fields.
+
+        Sorting by unit fields requires the ids of all of the associated units of
+        a type in a single query, so all of the matching associations are loaded.
+
+        :type repo_id: str
+        :type criteria: UnitAssociationCriteria
+        :rtype: generator
+        """
+        unit_associations_generator = self._unit_associations_cursor(repo_id, criteria)
+
+        if criteria.remove_duplicates:
+            unit_associations_generator = self._unit_associations_no_duplicates(
+                criteria, unit_associations_generator)
+
+        # The unit association information is part of the return values, so we
+        # construct a lookup in order to retrieve that information when we are
+        # iterating over the content units.
+        #
+        # unit_type_id -> unit_id -> (ordered)[association_1, association_2, ...]
+        #
+        # We also use the unit_id keys to lookup the units from unit_type_id
+        # collections.
+        associations_lookup = {}
+
+        for association in unit_associations_generator:
+            association_type_dict = associations_lookup.setdefault(
+                association['unit_type_id'], {})
+            association_list = association_type_dict.setdefault(association['unit_id'], [])
+            association_list.append(association)
+
+        association_unit_types = criteria.type_ids or self.unit_type_ids_for_repo(repo_id)
+        # The unit types should always be sorted in the same order, this allows
+        # multiple calls with skip and limit to work across types.
+        association_unit_types = sorted(association_unit_types)
+
+        # Use a generator expression here to keep from going back to the types
+        # collections once we've returned our limit of results.
+        # Be sure to skip cursors that would otherwise return an empty result set.
+        units_cursors = (self._associated_units_by_type_cursor(t, criteria,
+                                                               associations_lookup[t].keys())
+                         for t in association_unit_types if t in associations_lookup)
+
+        # If we're not sorting based on association fields, then set the
+        # skip and limit individually across the cursors to get consistent
+        # behavior across multiple calls across multiple unit types.
+        # The order that the generators are applied here is extremely
+        # important. DO NOT CHANGE!
+        units_cursors = self._associated_units_cursors_with_skip(units_cursors, criteria.skip)
+        units_cursors = self._associated_units_cursors_with_limit(units_cursors, criteria.limit)
+
+        units_generator = itertools.chain(*units_cursors)
+
+        # Unit ordering only produces unique units, hence "unique units".
+        return self._merged_units_unique_units(associations_lookup, units_generator)
+
     # -- unit association methods ----------------------------------------------
 
     @staticmethod
-    def _unit_associations_cursor(repo_id, criteria):
+    def _unit_associations_cursor(repo_id, criteria, unit_type_id=None):
         """
         Retrieve a pymongo cursor for unit associations for the given repository
         that match the given criteria.
 
         :type repo_id: str
         :type criteria: UnitAssociationCriteria
+        :param unit_type_id: if specified, only associations of this type are returned
+        :type unit_type_id: str
         :rtype: pymongo.cursor.Cursor
         """
 
         spec = criteria.association_filters.copy()
         spec['repo_id'] = repo_id
 
-        if criteria.type_ids:
+        if unit_type_id is not None:
+            spec['unit_type_id'] = unit_type_id
+        elif criteria.type_ids:
             spec['unit_type_id'] = {'$in': criteria.type_ids}
 
         collection = RepoContentUnit.get_collection()
@@ -325,6 +451,29 @@ class RepoUnitAssociationQueryManager(object):
 
             previously_generated_association_ids.add(association_id)
 
+    @staticmethod
+    def _adjacent_unit_associations_no_duplicates(associations):
+        """
+        Remove duplicate unit associations from an iterator of unit associations
+        of a single type sorted by unit id.
+
+        :type associations: iterable
+        :rtype: generator
+        """
+
+        # This algorithm returns the earliest association in the case of duplicates.
+
+        previous_unit_id = None
+
+        for unit_association in associations:
+
+            if unit_association['unit_id'] == previous_unit_id:
+                continue
+
+            yield unit_association
+
+            previous_unit_id = unit_association['unit_id']
+
     @staticmethod
     def _with_skip_and_limit(iterator, skip, limit):
         """
@@ -490,11 +639,8 @@ class RepoUnitAssociationQueryManager(object):
 
         # This algorithm assumes that associated_unit_ids has already been sorted.
 
-        # XXX This is unfortunate as it's the one place that loads all of the
-        # associated_units into memory.
-        # It is worth noting that the units have already been filtered by type,
-        # association filters, and unit filters. In addition, skip and limit
-        # may have also been performed, so it's potentially not as bad as it seems.
+        # This loads all of the associated_units into memory, so it is called
+        # with a single window of associations at a time.
         associated_units_by_id = dict(
             ((u['_content_type_id'], u['_id']), u) for u in associated_units)
 
@@ -14,7 +14,7 @@ import isodate
 from pulp.common import dateutils
 from pulp.server import exceptions
 from pulp.server.db.model.criteria import Criteria
-from pulp.server.db.model.dispatch import ScheduledCall
+from pulp.server.db.model.dispatch import ScheduledCall, ScheduleVersion
 
 
 SCHEDULE_OPTIONS_FIELDS = ('failure_threshold', 'last_run', 'enabled')
@@ -87,6 +87,32 @@ def get_updated_since(seconds):
     return ScheduledCall.get_collection().query(criteria)
 
 
+def get_changed_since(seconds):
+    """
+    Get schedules, whether or not they are enabled, that have been updated since
+    the timestamp represented by "seconds".
+
+    :param seconds: seconds since the epoch
+    :param seconds: float
+
+    :return:    pymongo cursor of ScheduledCall database objects
+    :rtype:     pymongo.cursor.Cursor
+    """
+    criteria = Criteria(filters={'last_updated': {'$gt': seconds}})
+    return ScheduledCall.get_collection().query(criteria)
+
+
+def get_enabled_ids():
+    """
+    Get the IDs of the schedules that are enabled.
+
+    :return:    set of schedule IDs
+    :rtype:     set
+    """
+    documents = ScheduledCall.get_collection().find({'enabled': True}, projection=['_id'])
+    return set(str(document['_id']) for document in documents)
+
+
 def delete(schedule_id):
     """
     Deletes the schedule with unique ID schedule_id
@@ -106,6 +132,7 @@ def delete(schedule_id):
         query=spec, remove=True)
     if schedule is None:
         raise exceptions.MissingResource(schedule_id=schedule_id)
+    ScheduleVersion.increment()
 
 
 def delete_by_resource(resource):
@@ -116,6 +143,7 @@ def delete_by_resource(resource):
     :type  resource:    basestring
     """
     ScheduledCall.get_collection().remove({'resource': resource})
+    ScheduleVersion.increment()
 
 
 def update(schedule_id, delta):
@@ -161,6 +189,7 @@ def update(schedule_id, delta):
         query=spec, update={'$set': delta}, new=True)
     if schedule is None:
         raise exceptions.MissingResource(schedule_id=schedule_id)
+    ScheduleVersion.increment()
     return ScheduledCall.from_db(schedule)
 
 
@@ -214,6 +243,7 @@ def increment_failure_count(schedule_id):
                 'last_updated': time.time(),
             }}
             ScheduledCall.get_collection().update(spec, delta)
+            ScheduleVersion.increment()
 
 
 def validate_keys(options, valid_keys, all_required=False):
@@ -366,3 +366,64 @@ def calculate_checksums(file_object, checksum_types):
         bits = file_object.read(CHECKSUM_CHUNK_SIZE)
 
     return dict((checksum_type, hasher.hexdigest()) for checksum_type, hasher in hashers.items())
+
+
+class DigestingFile(object):
+    """
+    A file-like object that writes to a file and calculates the checksum of the
+    data as it is written, so that the file does not need to be read again to be
+    verified. The file is opened by the first write or by close().
+
+    :ivar path: The absolute path to the file.
+    :type path: str
+    :ivar checksum_type: The type of checksum calculated, or None.
+    :type checksum_type: str
+    """
+
+    def __init__(self, path, checksum_type=None):
+        """
+        :param path: The absolute path to the file.
+        :type  path: str
+        :param checksum_type: The type of checksum to calculate. No checksum is calculated
+                              when None or not in CHECKSUM_FUNCTIONS.
+        :type  checksum_type: str
+        """
+        self.path = path
+        self.checksum_type = checksum_type
+        self._hasher = None
+        if checksum_type in CHECKSUM_FUNCTIONS:
+            self._hasher = CHECKSUM_FUNCTIONS[checksum_type]()
+        self._fp = None
+
+    def write(self, data):
+        """
+        Write data to the file and add it to the checksum.
+
+        :param data: The data to write.
+        :type  data: str
+        """
+        if self._fp is None:
+            self._fp = open(self.path, 'wb')
+        self._fp.write(data)
+        if self._hasher is not None:
+            self._hasher.update(data)
+
+    def close(self):
+        """
+        Close the file. An empty file is created if nothing has been written.
+        """
+        if self._fp is None:
+            self._fp = open(self.path, 'wb')
+        self._fp.close()
+
+    def hexdigest(self):
+        """
+        :return: The checksum of the data written, or None when it is not calculated.
+        :rtype:  str
+        """
+        if self._hasher is None:
+            return None
+        return self._hasher.hexdigest()
+
+    def __str__(self):
+        return self.path
@@ -328,6 +328,7 @@ class ConsumerProfileSearchView(search.SearchView):
     """
     response_builder = staticmethod(generate_json_response_with_pulp_encoder)
     manager = profile.ProfileManager()
+    stream_results = True
 
 
 class ConsumerRepoBindingView(View):
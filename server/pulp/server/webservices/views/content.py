@@ -5,6 +5,7 @@ from django.http import HttpResponseNotFound, HttpResponseBadRequest
 from django.views.generic import View
 
 from pulp.common import tags
+from pulp.plugins.util.misc import paginate
 from pulp.common.tags import (ACTION_REFRESH_ALL_CONTENT_SOURCES,
                               ACTION_REFRESH_CONTENT_SOURCE,
                               RESOURCE_CONTENT_SOURCE)
@@ -27,6 +28,10 @@ from pulp.server.webservices.views.util import (generate_json_response,
                                                 parse_json_body)
 
 
+# The number of units for which repository memberships are found using a single query.
+MEMBERSHIP_PAGE_SIZE = 1000
+
+
 def _process_content_unit(content_unit, content_type):
     """
     Adds an href to the content unit and hrefs for its children.
@@ -245,6 +250,7 @@ class ContentUnitSearch(search.SearchView):
     """
     optional_bool_fields = ('include_repos',)
     manager = content_query.ContentQueryManager()
+    stream_results = True
 
     @staticmethod
     def _add_repo_memberships(units, type_id):
@@ -285,17 +291,30 @@ class ContentUnitSearch(search.SearchView):
         """
         Overrides the base class so additional information can optionally be added.
         """
+        return list(cls.iter_results(query, search_method, options, *args, **kwargs))
+
+    @classmethod
+    def iter_results(cls, query, search_method, options, *args, **kwargs):
+        """
+        Overrides the base class so additional information can optionally be added. Repository
+        memberships are added to one page of units at a time.
+        """
 
         type_id = kwargs['type_id']
         serializer = units_controller.get_model_serializer_for_type(type_id)
         if serializer and query.get('filters') is not None:
             # if we have a model serializer, translate the filter for this content unit type
             query['filters'] = serializer.translate_filters(serializer.model, query['filters'])
-        units = list(search_method(type_id, query))
-        units = [_process_content_unit(unit, type_id) for unit in units]
-        if options.get('include_repos') is True:
-            cls._add_repo_memberships(units, type_id)
-        return units
+        units = (_process_content_unit(unit, type_id) for unit in search_method(type_id, query))
+        if options.get('include_repos') is not True:
+            for unit in units:
+                yield unit
+            return
+        for page in paginate(units, MEMBERSHIP_PAGE_SIZE):
+            page = list(page)
+            cls._add_repo_memberships(page, type_id)
+            for unit in page:
+                yield unit
 
 
 class ContentUnitResourceView(View):
@@ -479,7 +498,8 @@ class UploadSegmentResourceView(View):
 
         # If the upload ID doesn't exists, either because it was not initialized
         # or was deleted, the call to the manager will raise missing resource
-        upload_manager.save_data(upload_id, offset, request.body)
+        # The body is streamed to the upload rather than read into memory.
+        upload_manager.save_data(upload_id, offset, request)
         return generate_json_response(None)
 
 
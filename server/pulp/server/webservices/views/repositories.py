@@ -23,6 +23,7 @@ from pulp.server.webservices.views.serializers import content
 from pulp.server.webservices.views.util import (generate_json_response,
                                                 generate_json_response_with_pulp_encoder,
                                                 generate_redirect_response,
+                                                generate_streaming_json_response_with_pulp_encoder,
                                                 parse_json_body)
 
 
@@ -270,15 +271,16 @@ class RepoUnitSearch(search.SearchView):
         serialized HttpReponse object.
 
         This overrides the base class so we can validate repo existance and to choose the search
-        method depending on how many unit types we are dealing with.
+        method depending on how many unit types we are dealing with. The units are serialized as
+        they are read from the database and streamed to the client.
 
         :param query: The criteria that should be used to search for objects
         :type  query: dict
         :param options: additional options for including extra data
         :type  options: dict
 
-        :return:      The serialized search results in an HttpReponse
-        :rtype:       django.http.HttpResponse
+        :return:      The serialized search results in a streaming HttpReponse
+        :rtype:       django.http.StreamingHttpResponse
         """
         repo_id = kwargs.get('repo_id')
         model.Repository.objects.get_repo_or_missing_resource(repo_id)
@@ -286,12 +288,26 @@ class RepoUnitSearch(search.SearchView):
         manager = manager_factory.repo_unit_association_query_manager()
         if criteria.type_ids is not None and len(criteria.type_ids) == 1:
             type_id = criteria.type_ids[0]
-            units = manager.get_units_by_type(repo_id, type_id, criteria=criteria)
+            units = manager.get_units_by_type(repo_id, type_id, criteria=criteria,
+                                              as_generator=True)
         else:
-            units = manager.get_units(repo_id, criteria=criteria)
-        for unit in units:
-            content.serialize_unit_with_serializer(unit['metadata'])
-        return generate_json_response_with_pulp_encoder(units)
+            units = manager.get_units(repo_id, criteria=criteria, as_generator=True)
+        return generate_streaming_json_response_with_pulp_encoder(
+            cls._serialize_unit(unit) for unit in units)
+
+    @staticmethod
+    def _serialize_unit(unit):
+        """
+        Serialize the metadata of a unit returned by the unit association query manager.
+
+        :param unit: unit and association information
+        :type  unit: dict
+
+        :return: the same unit, with serialized metadata
+        :rtype:  dict
+        """
+        content.serialize_unit_with_serializer(unit['metadata'])
+        return unit
 
 
 class RepoImportersView(View):
@@ -895,6 +911,7 @@ class ContentApplicabilityRegenerationView(View):
 
         repo_criteria_body = request.body_as_json.get('repo_criteria', None)
         parallel = request.body_as_json.get('parallel', False)
+        full = request.body_as_json.get('full', False)
 
         if repo_criteria_body is None:
             raise exceptions.MissingValue('repo_criteria')
@@ -905,12 +922,15 @@ class ContentApplicabilityRegenerationView(View):
             invalid_criteria.add_child_exception(e)
             raise invalid_criteria
 
+        if type(full) is not bool:
+            raise exceptions.InvalidValue('full')
+
         if parallel:
             if type(parallel) is not bool:
                 raise exceptions.InvalidValue('parallel')
 
             async_result = ApplicabilityRegenerationManager.\
-                queue_regenerate_applicability_for_repos(repo_criteria.as_dict())
+                queue_regenerate_applicability_for_repos(repo_criteria.as_dict(), full=full)
             ret = GroupCallReport()
             ret['group_id'] = str(async_result)
             ret['_href'] = reverse('task_group', kwargs={'group_id': str(async_result)})
@@ -919,7 +939,7 @@ class ContentApplicabilityRegenerationView(View):
         regeneration_tag = tags.action_tag('content_applicability_regeneration')
         async_result = regenerate_applicability_for_repos.apply_async_with_reservation(
             tags.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE, tags.RESOURCE_ANY_ID,
-            (repo_criteria.as_dict(),), tags=[regeneration_tag])
+            (repo_criteria.as_dict(),), {'full': full}, tags=[regeneration_tag])
         raise exceptions.OperationPostponed(async_result)
 
 
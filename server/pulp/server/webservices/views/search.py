@@ -46,9 +46,20 @@ class SearchView(generic.View):
                                model instance, sane serializers are used by default, and this
                                method should not be defined.
     :vartype serializer:       staticmethod
+    :cvar    stream_results:   When True, results are serialized one document at a time by
+                               iter_results() while the response is sent, and the response is
+                               built using stream_response_builder.  Use this for views that
+                               can return very large numbers of results.
+    :vartype stream_results:   bool
+    :cvar    stream_response_builder: The function used to turn an iterable of serialized search
+                               results into a streaming Django Response object.
+    :vartype stream_response_builder: staticmethod
     """
 
     response_builder = staticmethod(util.generate_json_response_with_pulp_encoder)
+    stream_response_builder = staticmethod(
+        util.generate_streaming_json_response_with_pulp_encoder)
+    stream_results = False
     optional_string_fields = tuple()
     optional_bool_fields = tuple()
 
@@ -191,6 +202,9 @@ class SearchView(generic.View):
         # We do not validate all aspects of the criteria object, so if pymongo has a problem we
         # raise an InvalidValue.
         try:
+            if cls.stream_results:
+                return cls.stream_response_builder(cls.iter_results(query, search_method, options,
+                                                                    *args, **kwargs))
             return cls.response_builder(cls.get_results(query, search_method, options,
                                                         *args, **kwargs))
         except OperationFailure, e:
@@ -218,15 +232,63 @@ class SearchView(generic.View):
         results = list(search_method(query))
         return cls._serialize_results(results, only=only)
 
+    @classmethod
+    def iter_results(cls, query, search_method, options, *args, **kwargs):
+        """
+        Search using the class's search method and serialize the results one at a time, as they
+        are read from the database. This is used instead of get_results() by views that stream
+        their results and should be overridden by those that also override get_results().
 
-def _trim_results(model, results, only):
+        :param query: The criteria that should be used to search for objects
+        :type  query: dict
+        :param search_method: function that should be used to search
+        :type  search_method: func
+        :param options: additional options for including extra data
+        :type  options: dict
+
+        :return: serialized search results
+        :rtype:  generator
+        """
+        only = query.get('fields')
+        if hasattr(cls, 'serializer'):
+            for result in search_method(query):
+                yield cls.serializer(result)
+        elif hasattr(cls, 'model') and hasattr(cls.model, 'SERIALIZER'):
+            return_fields = None
+            if only is not None:
+                return_fields = _return_fields(cls.model, only)
+            for result in search_method(query):
+                result = cls.model.SERIALIZER(result).data
+                if return_fields is not None:
+                    _trim_result(result, return_fields)
+                yield result
+        else:
+            for result in search_method(query):
+                yield result
+
+
+def _return_fields(model, only):
     """
-    Remove key/value pairs from results that are not required or specified by `fields`.
+    Get the fields that are required or specified by `fields`.
     """
     min_fields = set(['_id', 'id', '_href'])
     required_fields = set([field for field, val in model._fields.items() if val.required])
-    return_fields = set(only) | min_fields | required_fields
+    return set(only) | min_fields | required_fields
+
+
+def _trim_result(result, return_fields):
+    """
+    Remove key/value pairs from a result that are not in `return_fields`.
+    """
+    for k in result.keys():
+        if k not in return_fields:
+            result.pop(k)
+
+
+def _trim_results(model, results, only):
+    """
+    Remove key/value pairs from results that are not required or specified by `fields`.
+    """
+    return_fields = _return_fields(model, only)
     for result in results:
-        for k, v in result.items():
-            if k not in return_fields:
-                result.pop(k)
+        _trim_result(result, return_fields)
@@ -48,6 +48,7 @@ class TaskSearchView(search.SearchView):
     response_builder = staticmethod(generate_json_response_with_pulp_encoder)
     model = TaskStatus
     serializer = staticmethod(task_serializer)
+    stream_results = True
 
 
 class TaskCollectionView(View):
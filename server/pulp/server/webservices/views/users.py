@@ -5,7 +5,7 @@ from django.views.generic import View
 from django.core.urlresolvers import reverse
 
 from pulp.server import exceptions as pulp_exceptions
-from pulp.server.auth import authorization
+from pulp.server.auth import authorization, permission_index
 from pulp.server.controllers import user as user_controller
 from pulp.server.db import model
 from pulp.server.db.model.auth import Permission
@@ -128,6 +128,7 @@ class UserResourceView(View):
         link = reverse('user_resource', kwargs={'login': login})
         if Permission.get_collection().find_one({'resource': link}):
             Permission.get_collection().remove({'resource': link})
+            permission_index.changed()
         return generate_json_response()
 
     @auth_required(authorization.UPDATE)
@@ -3,10 +3,11 @@ from functools import wraps
 
 import functools
 import httplib
+import itertools
 import json
 import sys
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.encoding import iri_to_uri
 
 from pulp.common import dateutils, error_codes
@@ -15,6 +16,10 @@ from pulp.server.compat import json_util
 from pulp.server.exceptions import PulpCodedValidationException, InputEncodingError
 
 
+# The number of items encoded into each chunk of a streamed JSON response.
+STREAM_CHUNK_SIZE = 100
+
+
 def pulp_json_encoder(obj):
     """
     Specialized json encoding.
@@ -65,6 +70,76 @@ generate_json_response_with_pulp_encoder = functools.partial(
 )
 
 
+def generate_streaming_json_response(content, default=None,
+                                     content_type='application/json; charset=utf-8',
+                                     chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Serialize an iterable as a JSON list and return a django streaming response. Items are
+    consumed and encoded in chunks while the response is sent, so the entire list is never held
+    in memory. The body is identical to the one produced by generate_json_response().
+
+    The first item is fetched before the response is returned so that errors raised by the
+    iterable when it starts (such as an invalid database query) are raised by this function.
+
+    :param content        : items to be serialized
+    :type  content        : iterable of objects serializable by json.dumps
+    :param default        : function used by json.dumps to serialize content (also called default)
+    :type  default        : function or None
+    :param content_type   : type of returned content
+    :type  content_type   : str
+    :param chunk_size     : number of items encoded into each chunk of the response
+    :type  chunk_size     : int
+
+    :return               : response streaming the serialized content
+    :rtype                : django.http.StreamingHttpResponse
+    """
+    content = iter(content)
+    try:
+        first = next(content)
+    except StopIteration:
+        content = iter([])
+    else:
+        content = itertools.chain([first], content)
+    chunks = _json_list_chunks(content, default, chunk_size)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+def _json_list_chunks(content, default, chunk_size):
+    """
+    Encode an iterable as a JSON list, in chunks of `chunk_size` items.
+
+    :param content: items to be serialized
+    :type  content: iterator
+    :param default: function used by json.dumps to serialize content
+    :type  default: function or None
+    :param chunk_size: number of items encoded into each chunk
+    :type  chunk_size: int
+
+    :return: generator of str
+    """
+    separator = '['
+    while True:
+        chunk = [json.dumps(item, default=default)
+                 for item in itertools.islice(content, chunk_size)]
+        if not chunk:
+            break
+        yield separator + ', '.join(chunk)
+        separator = ', '
+    yield ']' if separator == ', ' else '[]'
+
+
+"""
+Shortcut function to generate a streaming json response using the in house json_encoder.
+
+This function is equivalent to:
+generate_streaming_json_response(content, default=pulp_json_encoder)
+"""
+generate_streaming_json_response_with_pulp_encoder = functools.partial(
+    generate_streaming_json_response,
+    default=pulp_json_encoder,
+)
+
+
 def generate_redirect_response(response, href):
     response['Location'] = iri_to_uri(href)
     response.status_code = httplib.CREATED
@@ -1,6 +1,10 @@
+from unittest import TestCase
 from uuid import uuid4
 
+from mock import patch
+
 from ... import base
+from pulp.plugins.conduits import cataloger
 from pulp.plugins.conduits.cataloger import CatalogerConduit
 from pulp.server.db.model.content import ContentCatalog
 
@@ -78,3 +82,77 @@ class TestCatalogerConduit(base.PulpServerTests):
         conduit.reset()
         self.assertEqual(conduit.added_count, 0)
         self.assertEqual(conduit.deleted_count, 0)
+
+
+@patch('pulp.plugins.conduits.cataloger.managers.content_catalog_manager')
+class TestCatalogerConduitRefresh(TestCase):
+
+    URL = 'http://redhat.com/repository/'
+
+    def test_add_buffered(self, fake_manager):
+        manager = fake_manager.return_value
+        manager.update_entries.return_value = 2
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, self.URL)
+        conduit.add_entry(TYPE_ID, {'name': 'A'}, 'http://redhat.com/A')
+        conduit.add_entry(TYPE_ID, {'name': 'B'}, 'http://redhat.com/B')
+        self.assertFalse(manager.add_entry.called)
+        self.assertFalse(manager.update_entries.called)
+        conduit.flush()
+        manager.update_entries.assert_called_once_with(
+            SOURCE_ID, EXPIRES, self.URL, conduit.refresh_id,
+            [(TYPE_ID, {'name': 'A'}, 'http://redhat.com/A'),
+             (TYPE_ID, {'name': 'B'}, 'http://redhat.com/B')])
+        self.assertEqual(conduit.added_count, 2)
+        conduit.flush()
+        self.assertEqual(manager.update_entries.call_count, 1)
+
+    @patch.object(cataloger, 'BATCH_SIZE', 2)
+    def test_add_batch_full(self, fake_manager):
+        manager = fake_manager.return_value
+        manager.update_entries.return_value = 1
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, self.URL)
+        for n in range(5):
+            conduit.add_entry(TYPE_ID, {'name': str(n)}, 'http://redhat.com/%d' % n)
+        self.assertEqual(manager.update_entries.call_count, 2)
+        self.assertEqual(len(conduit._pending), 1)
+
+    def test_delete_flushes(self, fake_manager):
+        manager = fake_manager.return_value
+        manager.update_entries.return_value = 1
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, self.URL)
+        conduit.add_entry(TYPE_ID, {'name': 'A'}, 'http://redhat.com/A')
+        conduit.delete_entry(TYPE_ID, {'name': 'A'})
+        self.assertEqual(manager.update_entries.call_count, 1)
+        manager.delete_entry.assert_called_once_with(SOURCE_ID, TYPE_ID, {'name': 'A'})
+        self.assertEqual(conduit.added_count, 1)
+        self.assertEqual(conduit.deleted_count, 1)
+
+    def test_finish(self, fake_manager):
+        manager = fake_manager.return_value
+        manager.update_entries.return_value = 1
+        manager.expire_stale.return_value = 3
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, self.URL)
+        conduit.add_entry(TYPE_ID, {'name': 'A'}, 'http://redhat.com/A')
+        conduit.finish()
+        self.assertEqual(manager.update_entries.call_count, 1)
+        manager.expire_stale.assert_called_once_with(SOURCE_ID, self.URL, conduit.refresh_id)
+        self.assertEqual(conduit.added_count, 1)
+        self.assertEqual(conduit.deleted_count, 3)
+
+    def test_finish_no_url(self, fake_manager):
+        manager = fake_manager.return_value
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
+        conduit.add_entry(TYPE_ID, {'name': 'A'}, 'http://redhat.com/A')
+        conduit.finish()
+        manager.add_entry.assert_called_once_with(
+            SOURCE_ID, EXPIRES, TYPE_ID, {'name': 'A'}, 'http://redhat.com/A')
+        self.assertFalse(manager.update_entries.called)
+        self.assertFalse(manager.expire_stale.called)
+
+    def test_reset(self, fake_manager):
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES, self.URL)
+        refresh_id = conduit.refresh_id
+        conduit.add_entry(TYPE_ID, {'name': 'A'}, 'http://redhat.com/A')
+        conduit.reset()
+        self.assertEqual(conduit._pending, [])
+        self.assertNotEqual(conduit.refresh_id, refresh_id)
@@ -678,15 +678,13 @@ class StatusMixinTests(unittest.TestCase):
     def setUp(self):
         manager_factory.initialize()
 
-    @mock.patch('pulp.server.db.model.TaskStatus.objects')
+    @mock.patch('pulp.plugins.conduits.mixins.progress')
     @mock.patch('pulp.plugins.conduits.mixins.get_current_task_id')
-    def test_set_progress(self, mock_get_task_id, mock_task_status_objects):
+    def test_set_progress(self, mock_get_task_id, mock_progress):
         # Setup
         self.report_id = 'test-report'
         task_id = 'test-id'
         mock_get_task_id.return_value = task_id
-        test_task_documents = mock.Mock()
-        mock_task_status_objects.return_value = test_task_documents
         self.mixin = mixins.StatusMixin(self.report_id, mixins.ImporterConduitException)
 
         # Test
@@ -694,14 +692,26 @@ class StatusMixinTests(unittest.TestCase):
         self.mixin.set_progress(status)
 
         # Verify
-        mock_task_status_objects.assert_called_with(task_id=task_id)
-        self.assertEqual(1, test_task_documents.update_one.call_count)
-        test_task_documents.update_one.assert_called_with(
-            set__progress_report={'test-report': 'status'})
+        mock_progress.aggregator.return_value.update.assert_called_once_with(
+            task_id, {'test-report': 'status'}, force=False)
 
-    @mock.patch('pulp.server.db.model.TaskStatus.objects')
+    @mock.patch('pulp.plugins.conduits.mixins.progress')
     @mock.patch('pulp.plugins.conduits.mixins.get_current_task_id')
-    def test_set_progress_no_task(self, mock_get_task_id, mock_task_status_objects):
+    def test_set_progress_force(self, mock_get_task_id, mock_progress):
+        # Setup
+        mock_get_task_id.return_value = 'test-id'
+        self.mixin = mixins.StatusMixin('test-report', mixins.ImporterConduitException)
+
+        # Test
+        self.mixin.set_progress('status', force=True)
+
+        # Verify
+        mock_progress.aggregator.return_value.update.assert_called_once_with(
+            'test-id', {'test-report': 'status'}, force=True)
+
+    @mock.patch('pulp.plugins.conduits.mixins.progress')
+    @mock.patch('pulp.plugins.conduits.mixins.get_current_task_id')
+    def test_set_progress_no_task(self, mock_get_task_id, mock_progress):
         # Setup
         mock_get_task_id.return_value = None
         self.mixin = mixins.StatusMixin('', mixins.ImporterConduitException)
@@ -711,15 +721,15 @@ class StatusMixinTests(unittest.TestCase):
         self.mixin.set_progress(status)
 
         # Verify
-        self.assertFalse(mock_task_status_objects.called)
+        self.assertFalse(mock_progress.aggregator.called)
 
-    @mock.patch('pulp.server.db.model.TaskStatus.objects')
-    def test_set_progress_with_exception(self, mock_call):
+    @mock.patch('pulp.plugins.conduits.mixins.progress')
+    def test_set_progress_with_exception(self, mock_progress):
         # Setup
         self.report_id = 'test-report'
         self.mixin = mixins.StatusMixin(self.report_id, mixins.ImporterConduitException)
         self.mixin.task_id = 'test_id'
-        mock_call.side_effect = Exception()
+        mock_progress.aggregator.return_value.update.side_effect = Exception()
 
         # Test
         self.assertRaises(mixins.ImporterConduitException, self.mixin.set_progress, 'foo')
@@ -4,7 +4,7 @@ This module contains tests for the pulp.server.async.emit module.
 import unittest
 
 import mock
-from pulp.server.async.emit import send
+from pulp.server.async.emit import send, send_all
 
 
 class TestEmit(unittest.TestCase):
@@ -77,3 +77,30 @@ class TestEmit(unittest.TestCase):
         mock_producer_instance.maybe_declare.assert_called_once_with(mock_exchange_instance)
         mock_producer_instance.publish.assert_called_once_with('{"a": "B"}', routing_key=None,
                                                                exchange=mock_exchange_instance)
+
+    @mock.patch('pulp.server.async.emit.config')
+    @mock.patch('pulp.server.async.emit.Producer')
+    @mock.patch('pulp.server.async.emit.Connection')
+    @mock.patch('pulp.server.async.emit.Exchange')
+    def test_send_all(self, mock_exchange, mock_conn, mock_producer, mock_config):
+        """
+        Test that messages are sent over a single connection
+        """
+        docs = [mock.Mock(), mock.Mock()]
+        docs[0].to_json.return_value = '{"a": "B"}'
+        docs[1].to_json.return_value = '{"c": "D"}'
+        mock_config.getboolean.return_value = True
+        mock_config.get.return_value = "amqp://some.amqp.url/"
+
+        mock_producer_instance = mock.Mock()
+        mock_producer.return_value = mock_producer_instance
+
+        send_all([(docs[0], 'tasks.a'), (docs[1], 'tasks.c')])
+
+        mock_conn.assert_called_once_with("amqp://some.amqp.url/")
+        self.assertEqual(mock_producer_instance.publish.call_args_list, [
+            mock.call('{"a": "B"}', routing_key='tasks.a',
+                      exchange=mock_exchange.return_value),
+            mock.call('{"c": "D"}', routing_key='tasks.c',
+                      exchange=mock_exchange.return_value),
+        ])
@@ -0,0 +1,199 @@
+"""
+This module contains tests for the pulp.server.async.progress module.
+"""
+import unittest
+
+import mock
+
+from pulp.server.async import progress
+
+
+MODULE = 'pulp.server.async.progress.'
+
+
+def step(num_success, state='IN_PROGRESS'):
+    return {'num_success': num_success, 'state': state, 'items_total': 10}
+
+
+class TestChanges(unittest.TestCase):
+
+    def changes(self, old, new):
+        fields = {}
+        progress.changes('progress_report', old, new, fields)
+        return fields
+
+    def test_nested_value(self):
+        """
+        Ensure only the changed values of nested dictionaries and lists are set.
+        """
+        old = {'importer': {'content': [step(1), step(0)], 'metadata': step(10, 'FINISHED')}}
+        new = {'importer': {'content': [step(1), step(2)], 'metadata': step(10, 'FINISHED')}}
+        self.assertEqual(self.changes(old, new),
+                         {'progress_report.importer.content.1.num_success': 2})
+
+    def test_added_key(self):
+        """
+        Ensure added keys are set.
+        """
+        old = {'importer': {'content': step(1)}}
+        new = {'importer': {'content': step(1)}, 'distributor': {'publish': step(0)}}
+        self.assertEqual(self.changes(old, new),
+                         {'progress_report.distributor': {'publish': step(0)}})
+
+    def test_removed_key(self):
+        """
+        Ensure a dictionary with removed keys is replaced.
+        """
+        old = {'importer': {'content': step(1)}}
+        new = {'distributor': {'publish': step(0)}}
+        self.assertEqual(self.changes(old, new), {'progress_report': new})
+
+    def test_list_length_changed(self):
+        """
+        Ensure a list with a different length is replaced.
+        """
+        old = {'importer': {'errors': ['a']}}
+        new = {'importer': {'errors': ['a', 'b']}}
+        self.assertEqual(self.changes(old, new),
+                         {'progress_report.importer.errors': ['a', 'b']})
+
+    def test_unsafe_key(self):
+        """
+        Ensure a dictionary with keys that cannot be used in a path is replaced.
+        """
+        old = {'importer': {'a.b': 1}}
+        new = {'importer': {'a.b': 2}}
+        self.assertEqual(self.changes(old, new), {'progress_report.importer': new['importer']})
+
+
+@mock.patch(MODULE + 'config')
+@mock.patch(MODULE + 'TaskStatus')
+class TestProgressAggregator(unittest.TestCase):
+
+    def setUp(self):
+        self.aggregator = progress.ProgressAggregator(10)
+        self.aggregator._start_flusher = mock.Mock()
+
+    def written(self, mock_task_status):
+        collection = mock_task_status._get_collection.return_value
+        return [dict((r._filter['task_id'], r._doc['$set']) for r in c[0][0])
+                for c in collection.bulk_write.call_args_list]
+
+    def test_buffered(self, mock_task_status, mock_config):
+        """
+        Ensure reports are buffered until they are flushed, and only the latest
+        report of each task is written.
+        """
+        mock_config.getboolean.return_value = False
+        report = {'importer': step(1)}
+        self.aggregator.update('task-1', report)
+        report['importer'] = step(2)
+        self.aggregator.update('task-1', report)
+        self.aggregator.update('task-2', {'importer': step(5)})
+        self.assertEqual(self.written(mock_task_status), [])
+        self.aggregator._start_flusher.assert_called_with()
+
+        self.aggregator.flush()
+        self.assertEqual(self.written(mock_task_status), [{
+            'task-1': {'progress_report': {'importer': step(2)}},
+            'task-2': {'progress_report': {'importer': step(5)}},
+        }])
+
+    def test_changed_fields(self, mock_task_status, mock_config):
+        """
+        Ensure only changed fields are written after the first write, and
+        unchanged reports are not written.
+        """
+        mock_config.getboolean.return_value = False
+        self.aggregator.update('task-1', {'importer': step(1)}, force=True)
+        self.aggregator.update('task-1', {'importer': step(2)}, force=True)
+        self.aggregator.update('task-1', {'importer': step(2)}, force=True)
+        self.assertEqual(self.written(mock_task_status), [
+            {'task-1': {'progress_report': {'importer': step(1)}}},
+            {'task-1': {'progress_report.importer.num_success': 2}},
+        ])
+        self.assertFalse(self.aggregator._start_flusher.called)
+
+    def test_interval_disabled(self, mock_task_status, mock_config):
+        """
+        Ensure each report is written immediately when the interval is 0.
+        """
+        mock_config.getboolean.return_value = False
+        self.aggregator.interval = 0
+        self.aggregator.update('task-1', {'importer': step(1)})
+        self.assertEqual(len(self.written(mock_task_status)), 1)
+
+    def test_write_failed(self, mock_task_status, mock_config):
+        """
+        Ensure the complete report is written after a failed write.
+        """
+        mock_config.getboolean.return_value = False
+        collection = mock_task_status._get_collection.return_value
+        self.aggregator.update('task-1', {'importer': step(1)}, force=True)
+        collection.bulk_write.side_effect = Exception()
+        self.assertRaises(Exception, self.aggregator.update, 'task-1', {'importer': step(2)},
+                          force=True)
+        collection.bulk_write.side_effect = None
+        self.aggregator.update('task-1', {'importer': step(3)}, force=True)
+        self.assertEqual(self.written(mock_task_status)[-1],
+                         {'task-1': {'progress_report': {'importer': step(3)}}})
+
+    @mock.patch(MODULE + '_logger')
+    def test_finish(self, mock_logger, mock_task_status, mock_config):
+        """
+        Ensure finishing a task writes its buffered report, and the report is
+        written completely if the task ID is reused.
+        """
+        mock_config.getboolean.return_value = False
+        self.aggregator.update('task-1', {'importer': step(1)}, force=True)
+        self.aggregator.update('task-1', {'importer': step(2)})
+        self.aggregator.finish('task-1')
+        self.assertEqual(self.written(mock_task_status)[-1],
+                         {'task-1': {'progress_report.importer.num_success': 2}})
+        self.aggregator.update('task-1', {'importer': step(2)}, force=True)
+        self.assertEqual(self.written(mock_task_status)[-1],
+                         {'task-1': {'progress_report': {'importer': step(2)}}})
+        self.assertFalse(mock_logger.exception.called)
+
+    @mock.patch(MODULE + '_logger')
+    def test_finish_write_failed(self, mock_logger, mock_task_status, mock_config):
+        """
+        Ensure a failure to write the report of a finished task is logged.
+        """
+        mock_config.getboolean.return_value = False
+        collection = mock_task_status._get_collection.return_value
+        collection.bulk_write.side_effect = Exception()
+        self.aggregator.update('task-1', {'importer': step(1)})
+        self.aggregator.finish('task-1')
+        self.assertEqual(mock_logger.exception.call_count, 1)
+
+    @mock.patch(MODULE + 'emit')
+    def test_messages(self, mock_emit, mock_task_status, mock_config):
+        """
+        Ensure one message is sent for each written task, in a single batch.
+        """
+        mock_config.getboolean.return_value = True
+        documents = [{'task_id': 'task-1'}, {'task_id': 'task-2'}]
+        mock_task_status.objects.return_value = documents
+        self.aggregator.update('task-1', {'importer': step(1)})
+        self.aggregator.update('task-2', {'importer': step(1)})
+        self.aggregator.flush()
+        self.assertEqual(
+            sorted(mock_task_status.objects.call_args[1]['task_id__in']), ['task-1', 'task-2'])
+        mock_emit.send_all.assert_called_once_with(
+            [(documents[0], 'tasks.task-1'), (documents[1], 'tasks.task-2')])
+
+
+class TestAggregator(unittest.TestCase):
+
+    @mock.patch(MODULE + '_aggregator', None)
+    @mock.patch(MODULE + 'config')
+    def test_aggregator(self, mock_config):
+        """
+        Ensure the process aggregator is created once, as configured.
+        """
+        mock_config.getfloat.return_value = 5.0
+        aggregator = progress.aggregator()
+        self.assertTrue(aggregator is progress.aggregator())
+        self.assertEqual(aggregator.interval, 5.0)
+        mock_config.getfloat.assert_called_once_with('tasks', 'progress_interval')
@@ -0,0 +1,108 @@
+import unittest
+
+import mock
+
+from pulp.server.async import reservations
+
+
+RESERVATIONS = [
+    {'task_id': 'task1', 'worker_name': 'worker1', 'resource_id': 'resource1'},
+    {'task_id': 'task2', 'worker_name': 'worker2', 'resource_id': 'resource2'},
+]
+
+
+@mock.patch('pulp.server.async.reservations.Worker')
+@mock.patch('pulp.server.async.reservations.ReservedResource')
+class TestReservationView(unittest.TestCase):
+
+    def test_refresh_loads(self, mock_reserved_resource, mock_worker):
+        """
+        Ensure the reservations are loaded on the first refresh.
+        """
+        mock_reserved_resource.objects.only.return_value = RESERVATIONS
+        mock_reserved_resource.objects.count.return_value = 2
+        view = reservations.ReservationView()
+        view.refresh()
+        view.refresh()
+        mock_reserved_resource.objects.only.assert_called_once_with(
+            'task_id', 'worker_name', 'resource_id')
+        self.assertEqual(view.workers_for(['resource1', 'resource3']), set(['worker1']))
+        self.assertEqual(view.reserved_worker_names(), set(['worker1', 'worker2']))
+
+    def test_refresh_stale(self, mock_reserved_resource, mock_worker):
+        """
+        Ensure the reservations are reloaded when the number of documents changes.
+        """
+        mock_reserved_resource.objects.only.side_effect = [RESERVATIONS, RESERVATIONS[1:]]
+        mock_reserved_resource.objects.count.side_effect = [2, 1]
+        view = reservations.ReservationView()
+        view.refresh()
+        view.refresh()
+        self.assertEqual(mock_reserved_resource.objects.only.call_count, 2)
+        self.assertEqual(view.reserved_worker_names(), set(['worker2']))
+
+    def test_reserved_released(self, mock_reserved_resource, mock_worker):
+        """
+        Ensure reservations made and released in this process update the view.
+        """
+        mock_reserved_resource.objects.only.return_value = []
+        view = reservations.ReservationView()
+        self.assertEqual(view.workers_for(['resource1']), set())
+        view.reserved('task1', 'worker1', 'resource1')
+        self.assertEqual(view.workers_for(['resource1']), set(['worker1']))
+        view.released('task1')
+        self.assertEqual(view.workers_for(['resource1']), set())
+        self.assertEqual(mock_reserved_resource.objects.only.call_count, 1)
+
+    def test_reserved_not_loaded(self, mock_reserved_resource, mock_worker):
+        """
+        Ensure reservations made before the view is loaded are ignored.
+        """
+        mock_reserved_resource.objects.only.return_value = RESERVATIONS
+        view = reservations.ReservationView()
+        view.reserved('task3', 'worker3', 'resource3')
+        self.assertEqual(view.workers_for(['resource3']), set())
+
+    def test_invalidate(self, mock_reserved_resource, mock_worker):
+        """
+        Ensure the reservations are reloaded after being invalidated.
+        """
+        mock_reserved_resource.objects.only.return_value = RESERVATIONS
+        view = reservations.ReservationView()
+        view.workers_for(['resource1'])
+        view.invalidate()
+        view.workers_for(['resource1'])
+        self.assertEqual(mock_reserved_resource.objects.only.call_count, 2)
+
+    def test_online_workers_cached(self, mock_reserved_resource, mock_worker):
+        """
+        Ensure the online workers are cached for the TTL.
+        """
+        worker = {'name': 'worker1'}
+        mock_worker.objects.get_online.return_value = [worker]
+        view = reservations.ReservationView(worker_ttl=60)
+        self.assertEqual(view.online_workers(), {'worker1': worker})
+        self.assertTrue(view.get_worker('worker1') is worker)
+        mock_worker.objects.get_online.assert_called_once_with()
+
+    def test_get_worker_not_online(self, mock_reserved_resource, mock_worker):
+        """
+        Ensure workers that are not online are fetched from the database.
+        """
+        mock_worker.objects.get_online.return_value = []
+        view = reservations.ReservationView()
+        worker = view.get_worker('worker1')
+        mock_worker.objects.assert_called_once_with(name='worker1')
+        self.assertEqual(worker, mock_worker.objects.return_value.first.return_value)
+
+
+class TestPollIntervals(unittest.TestCase):
+
+    def test_intervals(self):
+        """
+        Ensure the intervals double up to the maximum.
+        """
+        intervals = reservations.poll_intervals()
+        self.assertEqual(
+            [next(intervals) for n in range(7)],
+            [0.01, 0.02, 0.04, 0.08, 0.16, 0.25, 0.25])
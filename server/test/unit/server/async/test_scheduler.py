@@ -155,6 +155,7 @@ class TestSchedulerTick(unittest.TestCase):
         self.assertFalse(mock_tick.called)
 
 
+@mock.patch('pulp.server.async.scheduler.ScheduleVersion', new=mock.MagicMock())
 class TestSchedulerSetupSchedule(unittest.TestCase):
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
@@ -215,56 +216,130 @@ class TestSchedulerSetupSchedule(unittest.TestCase):
         self.assertTrue('529f4bd93de3a31d0ec77340' not in sched_instance._schedule)
 
 
+@mock.patch('threading.Thread', new=mock.MagicMock())
+@mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
+@mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+@mock.patch('pulp.server.async.scheduler.ScheduleVersion')
 class TestSchedulerScheduleChanged(unittest.TestCase):
 
-    @mock.patch('threading.Thread', new=mock.MagicMock())
-    @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
-    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_count_changed(self, mock_updated_since, mock_get_enabled):
+    def test_version_changed(self, mock_version, mock_get_enabled):
         """
-        This test ensures that if the number of enabled schedules changes, the schedule_changed
+        This test ensures that if the schedule version changes, the schedule_changed
         property returns True.
         """
-        mock_updated_since.return_value.count.return_value = 0
         mock_get_enabled.return_value = SCHEDULES
+        mock_version.current.return_value = 3
         sched_instance = scheduler.Scheduler()
 
-        mock_get_enabled.return_value = mock.MagicMock()
-        mock_get_enabled.return_value.count.return_value = sched_instance._loaded_from_db_count + 1
+        mock_version.current.return_value = 4
 
         self.assertTrue(sched_instance.schedule_changed is True)
 
-    @mock.patch('threading.Thread', new=mock.MagicMock())
-    @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
-    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_new_updated(self, mock_updated_since, mock_get_enabled):
+    def test_no_changes(self, mock_version, mock_get_enabled):
         mock_get_enabled.return_value = SCHEDULES
+        mock_version.current.return_value = 3
         sched_instance = scheduler.Scheduler()
 
-        mock_get_enabled.return_value = mock.MagicMock()
-        mock_get_enabled.return_value.count.return_value = sched_instance._loaded_from_db_count
-        mock_updated_since.return_value.count.return_value = 1
+        self.assertTrue(sched_instance.schedule_changed is False)
+        self.assertEqual(mock_version.current.call_count, 2)
 
-        self.assertTrue(sched_instance.schedule_changed is True)
 
-    @mock.patch('threading.Thread', new=mock.MagicMock())
-    @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
-    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_no_changes(self, mock_updated_since, mock_get_enabled):
-        mock_updated_since.return_value.count.return_value = 0
-        mock_get_enabled.return_value = SCHEDULES
-        sched_instance = scheduler.Scheduler()
+@mock.patch('threading.Thread', new=mock.MagicMock())
+@mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
+@mock.patch('pulp.server.async.scheduler.ScheduleVersion', new=mock.MagicMock())
+@mock.patch('pulp.server.managers.schedule.utils.get')
+@mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+@mock.patch('pulp.server.managers.schedule.utils.get_changed_since')
+@mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+class TestSchedulerUpdateSchedule(unittest.TestCase):
 
+    def load_scheduler(self, mock_get_enabled):
+        mock_get_enabled.return_value = [dict(s) for s in SCHEDULES]
+        sched_instance = scheduler.Scheduler()
+        # the enabled count, including the schedule with 0 remaining runs
         mock_get_enabled.return_value = mock.MagicMock()
-        # -1 because there is an ignored schedule that has 0 remaining runs
+        mock_get_enabled.return_value.count.return_value = len(SCHEDULES)
+        return sched_instance
+
+    def test_unchanged_entries_kept(self, mock_get_enabled, mock_changed_since,
+                                    mock_enabled_ids, mock_get):
+        sched_instance = self.load_scheduler(mock_get_enabled)
+        entries = dict(sched_instance._schedule)
+        mock_changed_since.return_value = [dict(s) for s in SCHEDULES]
+
+        sched_instance.update_schedule()
+
+        mock_changed_since.assert_called_once_with(
+            1387218569.811224 - scheduler.SCHEDULE_UPDATE_OVERLAP)
+        for key, entry in entries.items():
+            self.assertTrue(sched_instance._schedule[key] is entry)
+        self.assertFalse(mock_enabled_ids.called)
+
+    def test_updated(self, mock_get_enabled, mock_changed_since, mock_enabled_ids, mock_get):
+        sched_instance = self.load_scheduler(mock_get_enabled)
+        entries = dict(sched_instance._schedule)
+        updated = dict(SCHEDULES[1], last_updated=1387218600.0, iso_schedule=u'PT2M')
+        mock_changed_since.return_value = [updated]
+
+        sched_instance.update_schedule()
+
+        entry = sched_instance._schedule['529f4bd93de3a31d0ec77339']
+        self.assertFalse(entry is entries['529f4bd93de3a31d0ec77339'])
+        self.assertEqual(entry._scheduled_call.iso_schedule, u'PT2M')
+        self.assertTrue(sched_instance._schedule['529f4bd93de3a31d0ec77338'] is
+                        entries['529f4bd93de3a31d0ec77338'])
+        self.assertEqual(sched_instance._most_recent_timestamp, 1387218600.0)
+
+    def test_disabled(self, mock_get_enabled, mock_changed_since, mock_enabled_ids, mock_get):
+        sched_instance = self.load_scheduler(mock_get_enabled)
         mock_get_enabled.return_value.count.return_value = len(SCHEDULES) - 1
+        disabled = dict(SCHEDULES[1], last_updated=1387218600.0, enabled=False)
+        mock_changed_since.return_value = [disabled]
 
-        self.assertTrue(sched_instance.schedule_changed is False)
+        sched_instance.update_schedule()
 
+        self.assertTrue('529f4bd93de3a31d0ec77339' not in sched_instance._schedule)
+        self.assertTrue('529f4bd93de3a31d0ec77338' in sched_instance._schedule)
+        self.assertEqual(sched_instance._loaded_from_db_count, 1)
+        self.assertFalse(mock_enabled_ids.called)
 
+    def test_deleted_and_missed(self, mock_get_enabled, mock_changed_since, mock_enabled_ids,
+                                mock_get):
+        sched_instance = self.load_scheduler(mock_get_enabled)
+        mock_changed_since.return_value = []
+        mock_get_enabled.return_value.count.return_value = len(SCHEDULES) - 1
+        mock_enabled_ids.return_value = set(['529f4bd93de3a31d0ec77338',
+                                             '529f4bd93de3a31d0ec77341'])
+        missed = dict(SCHEDULES[1], _id=u'529f4bd93de3a31d0ec77341')
+        mock_get.return_value = [dispatch.ScheduledCall.from_db(missed)]
+
+        sched_instance.update_schedule()
+
+        mock_get.assert_called_once_with(['529f4bd93de3a31d0ec77341'])
+        self.assertTrue('529f4bd93de3a31d0ec77339' not in sched_instance._schedule)
+        self.assertTrue('529f4bd93de3a31d0ec77341' in sched_instance._schedule)
+        self.assertEqual(sched_instance._ignored_ids, set())
+
+    @mock.patch.object(scheduler.beat, 'event_t', create=True,
+                       side_effect=lambda when, priority, entry: (when, priority, entry))
+    def test_heap_updated(self, mock_event_t, mock_get_enabled, mock_changed_since,
+                          mock_enabled_ids, mock_get):
+        sched_instance = self.load_scheduler(mock_get_enabled)
+        sched_instance._when = mock.Mock(return_value=10)
+        old = sched_instance._schedule['529f4bd93de3a31d0ec77339']
+        kept = sched_instance._schedule['529f4bd93de3a31d0ec77338']
+        sched_instance._heap = [(5, 5, kept), (7, 5, old)]
+        updated = dict(SCHEDULES[1], last_updated=1387218600.0)
+        mock_changed_since.return_value = [updated]
+
+        sched_instance.update_schedule()
+
+        new = sched_instance._schedule['529f4bd93de3a31d0ec77339']
+        self.assertEqual(sched_instance._heap, [(5, 5, kept), (10, 5, new)])
+        self.assertEqual(sched_instance.old_schedulers, sched_instance._schedule)
+
+
+@mock.patch('pulp.server.async.scheduler.ScheduleVersion', new=mock.MagicMock())
 class TestSchedulerSchedule(unittest.TestCase):
 
     @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
@@ -280,20 +355,25 @@ class TestSchedulerSchedule(unittest.TestCase):
         mock_get_schedule.assert_called_once_with()
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
+    @mock.patch.object(scheduler.Scheduler, 'update_schedule')
     @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
     @mock.patch.object(scheduler.Scheduler, 'schedule_changed', new=True)
-    def test_schedule_changed(self, mock_setup_schedule):
+    def test_schedule_changed(self, mock_setup_schedule, mock_update_schedule):
         sched_instance = scheduler.Scheduler()
+        sched_instance._schedule = {}
 
         sched_instance.schedule
 
-        # make sure it called the setup_schedule() method
+        # make sure the changes are applied rather than reloading the schedule
+        mock_update_schedule.assert_called_once_with()
         mock_setup_schedule.assert_called_once_with()
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch.object(scheduler.Scheduler, 'schedule_changed', return_value=False)
+    @mock.patch.object(scheduler.Scheduler, 'update_schedule')
     @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
-    def test_schedule_returns_value(self, mock_setup_schedule, mock_schedule_changed):
+    def test_schedule_returns_value(self, mock_setup_schedule, mock_update_schedule,
+                                    mock_schedule_changed):
         sched_instance = scheduler.Scheduler()
         sched_instance._schedule = mock.Mock()
 
@@ -44,8 +44,8 @@ class TestQueueReservedTask(ResourceReservationTests):
         self.patch_b = mock.patch('pulp.server.async.tasks._get_unreserved_worker')
         self.mock_get_unreserved_worker = self.patch_b.start()
 
-        self.patch_c = mock.patch('pulp.server.async.tasks.time', autospec=True)
-        self.mock_time = self.patch_c.start()
+        self.patch_c = mock.patch('pulp.server.async.tasks.reservations.view', autospec=True)
+        self.mock_view = self.patch_c.start()
 
         self.patch_d = mock.patch('pulp.server.async.tasks.ReservedResource', autospec=True)
         self.mock_reserved_resource = self.patch_d.start()
@@ -57,6 +57,9 @@ class TestQueueReservedTask(ResourceReservationTests):
         self.patch_f = mock.patch('pulp.server.async.tasks._release_resource', autospec=True)
         self.mock__release_resource = self.patch_f.start()
 
+        self.patch_g = mock.patch('pulp.server.async.tasks.time', autospec=True)
+        self.mock_time = self.patch_g.start()
+
         super(TestQueueReservedTask, self).setUp()
 
     def tearDown(self):
@@ -66,6 +69,7 @@ class TestQueueReservedTask(ResourceReservationTests):
         self.patch_d.stop()
         self.patch_e.stop()
         self.patch_f.stop()
+        self.patch_g.stop()
         super(TestQueueReservedTask, self).tearDown()
 
     def test_creates_and_saves_reserved_resource(self):
@@ -141,7 +145,7 @@ class TestQueueReservedTask(ResourceReservationTests):
         else:
             self.fail('_queue_reserved_task should have raised a BreakOutException')
 
-        self.mock_time.sleep.assert_has_calls([mock.call(0.25), mock.call(0.25)])
+        self.mock_time.sleep.assert_has_calls([mock.call(0.01), mock.call(0.02)])
 
 
 class TestDeleteWorker(ResourceReservationTests):
@@ -587,6 +591,112 @@ class TestTaskOnFailureHandler(ResourceReservationTests):
         self.assertFalse(mock_increment_failure.called)
 
 
+@mock.patch('pulp.server.async.tasks.TaskStatus')
+@mock.patch('pulp.server.async.tasks.Task.request')
+class TestTaskLifecycle(unittest.TestCase):
+    """
+    Test that the TaskStatus is updated without being read.
+    """
+
+    @mock.patch('celery.Task.__call__')
+    def test_call(self, mock_parent_call, mock_request, mock_task_status):
+        mock_request.called_directly = False
+        mock_request.id = 'task-1'
+        mock_request.hostname = 'worker-1'
+        mock_task_status.update_fields.return_value = True
+
+        tasks.Task()(1, a=2)
+
+        mock_task_status.update_fields.assert_called_once_with(
+            'task-1', {'state': 'running', 'start_time': mock.ANY, 'worker_name': 'worker-1'},
+            unless_complete=True, upsert=True)
+        mock_parent_call.assert_called_once_with(1, a=2)
+        self.assertFalse(mock_task_status.objects.called)
+
+    @mock.patch('celery.Task.__call__')
+    def test_call_complete(self, mock_parent_call, mock_request, mock_task_status):
+        """
+        Ensure a task that is already complete is not run again.
+        """
+        mock_request.called_directly = False
+        mock_task_status.update_fields.return_value = False
+
+        self.assertTrue(tasks.Task()() is None)
+
+        self.assertFalse(mock_parent_call.called)
+
+    @mock.patch('celery.Task.__call__')
+    def test_call_directly(self, mock_parent_call, mock_request, mock_task_status):
+        """
+        Ensure synchronous tasks are not tracked.
+        """
+        mock_request.called_directly = True
+
+        tasks.Task()()
+
+        self.assertFalse(mock_task_status.update_fields.called)
+        mock_parent_call.assert_called_once_with()
+
+    @mock.patch('pulp.server.async.tasks.common_utils')
+    @mock.patch('pulp.server.async.tasks.progress')
+    def test_on_success(self, mock_progress, mock_common_utils, mock_request,
+                        mock_task_status):
+        """
+        Ensure the buffered progress report is saved, then the task is finished.
+        """
+        mock_request.called_directly = False
+        mock_task_status.update_fields.side_effect = self.update_after_finish(mock_progress, True)
+
+        tasks.Task().on_success('result', 'task-1', [], {})
+
+        mock_progress.aggregator.return_value.finish.assert_called_once_with('task-1')
+        mock_task_status.update_fields.assert_called_once_with(
+            'task-1', {'state': 'finished', 'finish_time': mock.ANY, 'result': 'result'},
+            unless_complete=True)
+        self.assertFalse(mock_task_status.objects.called)
+
+    @mock.patch('pulp.server.async.tasks.common_utils')
+    @mock.patch('pulp.server.async.tasks.progress')
+    def test_on_success_canceled(self, mock_progress, mock_common_utils, mock_request,
+                                 mock_task_status):
+        """
+        Ensure the state of a task that was canceled is kept.
+        """
+        mock_request.called_directly = False
+        mock_task_status.update_fields.side_effect = [False, True]
+
+        tasks.Task().on_success(tasks.TaskResult('result', spawned_tasks=[{'task_id': 't2'}]),
+                                'task-1', [], {})
+
+        self.assertEqual(mock_task_status.update_fields.call_args_list[1], mock.call(
+            'task-1', {'finish_time': mock.ANY, 'result': 'result', 'spawned_tasks': ['t2']}))
+
+    @mock.patch('pulp.server.async.tasks.common_utils')
+    @mock.patch('pulp.server.async.tasks.progress')
+    def test_on_failure(self, mock_progress, mock_common_utils, mock_request,
+                        mock_task_status):
+        """
+        Ensure the buffered progress report is saved, then the task is failed.
+        """
+        mock_request.called_directly = False
+        mock_task_status.update_fields.side_effect = self.update_after_finish(mock_progress, True)
+
+        tasks.Task().on_failure(Exception('boom'), 'task-1', [], {}, mock.Mock(traceback='tb'))
+
+        mock_progress.aggregator.return_value.finish.assert_called_once_with('task-1')
+        fields = mock_task_status.update_fields.call_args[0][1]
+        self.assertEqual(fields['state'], 'error')
+        self.assertEqual(fields['traceback'], 'tb')
+        self.assertEqual(fields['error']['description'], 'boom')
+        self.assertFalse(mock_task_status.objects.called)
+
+    def update_after_finish(self, mock_progress, updated):
+        def update_fields(*args, **kwargs):
+            self.assertTrue(mock_progress.aggregator.return_value.finish.called)
+            return updated
+        return update_fields
+
+
 class TestTaskApplyAsync(ResourceReservationTests):
 
     @mock.patch('celery.Task.apply_async')
@@ -989,28 +1099,41 @@ class TestScheduledTasks(unittest.TestCase):
 
 class TestGetWorkerForReservation(ResourceReservationTests):
 
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_existing_reservation_correctly_found(self, mock_reserved_resource,
-                                                  mock_worker_objects):
-        get_objects = mock_reserved_resource.objects
-        tasks.get_worker_for_reservation('resource1')
-        get_objects.assert_called_once_with(resource_id='resource1')
-        get_objects.return_value.first.assert_called_once_with()
+    def setUp(self):
+        super(TestGetWorkerForReservation, self).setUp()
+        tasks.reservations.view.invalidate()
 
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
+    @mock.patch('pulp.server.async.reservations.Worker.objects')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
     def test_correct_worker_returned(self, mock_reserved_resource, mock_worker_objects):
-        find_one = mock_reserved_resource.objects.return_value.first
-        find_one.return_value = {'worker_name': 'worker1'}
-        mock_worker_objects.return_value.first.return_value = find_one.return_value
+        worker = {'name': 'worker1'}
+        mock_reserved_resource.objects.only.return_value = [
+            {'task_id': 'task1', 'worker_name': 'worker1', 'resource_id': 'resource1'},
+            {'task_id': 'task2', 'worker_name': 'worker2', 'resource_id': 'resource2'},
+        ]
+        mock_reserved_resource.objects.count.return_value = 2
+        mock_worker_objects.get_online.return_value = [worker, {'name': 'worker2'}]
         result = tasks.get_worker_for_reservation('resource1')
-        self.assertTrue(result is find_one.return_value)
+        self.assertTrue(result is worker)
+        mock_reserved_resource.objects.count.assert_called_once_with()
+
+    @mock.patch('pulp.server.async.reservations.Worker.objects')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
+    def test_reservations_loaded_once(self, mock_reserved_resource, mock_worker_objects):
+        mock_reserved_resource.objects.only.return_value = [
+            {'task_id': 'task1', 'worker_name': 'worker1', 'resource_id': 'resource1'},
+        ]
+        mock_reserved_resource.objects.count.return_value = 1
+        mock_worker_objects.get_online.return_value = [{'name': 'worker1'}]
+        tasks.get_worker_for_reservation('resource1')
+        tasks.get_worker_for_reservation('resource1')
+        self.assertEqual(mock_reserved_resource.objects.only.call_count, 1)
+        self.assertEqual(mock_worker_objects.get_online.call_count, 1)
 
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
     def test_no_workers_raised_if_no_reservations(self, mock_reserved_resource):
-        find_one = mock_reserved_resource.objects.return_value.first
-        find_one.return_value = False
+        mock_reserved_resource.objects.only.return_value = []
+        mock_reserved_resource.objects.count.return_value = 0
         try:
             tasks.get_worker_for_reservation('resource1')
         except NoWorkers:
@@ -1019,36 +1142,90 @@ class TestGetWorkerForReservation(ResourceReservationTests):
             self.fail("NoWorkers() Exception should have been raised.")
 
 
+class TestGetWorkerForReservationList(ResourceReservationTests):
+
+    def setUp(self):
+        super(TestGetWorkerForReservationList, self).setUp()
+        tasks.reservations.view.invalidate()
+
+    @mock.patch('pulp.server.async.reservations.Worker.objects')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
+    def test_one_worker_holds(self, mock_reserved_resource, mock_worker_objects):
+        worker = {'name': 'worker1'}
+        mock_reserved_resource.objects.only.return_value = [
+            {'task_id': 'task1', 'worker_name': 'worker1', 'resource_id': 'resource1'},
+        ]
+        mock_reserved_resource.objects.count.return_value = 1
+        mock_worker_objects.get_online.return_value = [worker, {'name': 'worker2'}]
+        result = tasks.get_worker_for_reservation_list(['resource1', 'resource2'])
+        self.assertTrue(result is worker)
+
+    @mock.patch('pulp.server.async.tasks.time.sleep')
+    @mock.patch('pulp.server.async.reservations.Worker.objects')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
+    def test_waits_for_release(self, mock_reserved_resource, mock_worker_objects, mock_sleep):
+        worker = {'name': 'worker2'}
+        mock_reserved_resource.objects.only.side_effect = [
+            [
+                {'task_id': 'task1', 'worker_name': 'worker1', 'resource_id': 'resource1'},
+                {'task_id': 'task2', 'worker_name': 'worker2', 'resource_id': 'resource2'},
+            ],
+            [
+                {'task_id': 'task2', 'worker_name': 'worker2', 'resource_id': 'resource2'},
+            ],
+        ]
+        mock_reserved_resource.objects.count.side_effect = [2, 1]
+        mock_worker_objects.get_online.return_value = [{'name': 'worker1'}, worker]
+        result = tasks.get_worker_for_reservation_list(['resource1', 'resource2'])
+        self.assertTrue(result is worker)
+        mock_sleep.assert_called_once_with(tasks.reservations.MIN_POLL_INTERVAL)
+
+
 class TestGetUnreservedWorker(ResourceReservationTests):
 
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_reserved_resources_queried_correctly(self, mock_reserved_resource):
-        find = mock_reserved_resource.objects.all
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
+    def setUp(self):
+        super(TestGetUnreservedWorker, self).setUp()
+        tasks.reservations.view.invalidate()
+
+    @mock.patch('pulp.server.async.reservations.Worker.objects')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
+    def test_reserved_resources_queried_correctly(self, mock_reserved_resource,
+                                                  mock_worker_objects):
+        mock_worker_objects.get_online.return_value = [{'name': 'a'}, {'name': 'b'}]
+        find = mock_reserved_resource.objects.only
+        find.return_value = [
+            {'task_id': '1', 'worker_name': 'a', 'resource_id': 'r1'},
+            {'task_id': '2', 'worker_name': 'b', 'resource_id': 'r2'},
+        ]
         try:
             tasks._get_unreserved_worker()
         except NoWorkers:
             pass
         else:
             self.fail("NoWorkers() Exception should have been raised.")
-        find.assert_called_once_with()
+        find.assert_called_once_with('task_id', 'worker_name', 'resource_id')
 
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
+    @mock.patch('pulp.server.async.reservations.Worker.objects')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
     def test_worker_returned_when_one_worker_is_not_reserved(self, mock_reserved_resource,
                                                              mock_worker_objects):
         get_online = mock_worker_objects.get_online
         get_online.return_value = [{'name': 'a'}, {'name': 'b'}]
-        mock_reserved_resource.objects.all.return_value = [{'worker_name': 'a'}]
+        mock_reserved_resource.objects.only.return_value = [
+            {'task_id': '1', 'worker_name': 'a', 'resource_id': 'r1'},
+        ]
         result = tasks._get_unreserved_worker()
         self.assertEqual(result, {'name': 'b'})
 
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_no_workers_raised_when_all_workers_reserved(self, mock_reserved_resource, mock_worker):
-        mock_worker.objects.return_value = [{'name': 'a'}, {'name': 'b'}]
-        find = mock_reserved_resource.objects
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
+    @mock.patch('pulp.server.async.reservations.Worker.objects')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
+    def test_no_workers_raised_when_all_workers_reserved(self, mock_reserved_resource,
+                                                         mock_worker_objects):
+        mock_worker_objects.get_online.return_value = [{'name': 'a'}, {'name': 'b'}]
+        mock_reserved_resource.objects.only.return_value = [
+            {'task_id': '1', 'worker_name': 'a', 'resource_id': 'r1'},
+            {'task_id': '2', 'worker_name': 'b', 'resource_id': 'r2'},
+        ]
         try:
             tasks._get_unreserved_worker()
         except NoWorkers:
@@ -1056,12 +1233,12 @@ class TestGetUnreservedWorker(ResourceReservationTests):
         else:
             self.fail("NoWorkers() Exception should have been raised.")
 
-    @mock.patch('pulp.server.async.tasks.Worker.objects')
-    @mock.patch('pulp.server.async.tasks.ReservedResource')
-    def test_no_workers_raised_when_there_are_no_workers(self, mock_reserved_resource, mock_worker):
-        mock_worker.objects.return_value = []
-        find = mock_reserved_resource.objects
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
+    @mock.patch('pulp.server.async.reservations.Worker.objects')
+    @mock.patch('pulp.server.async.reservations.ReservedResource')
+    def test_no_workers_raised_when_there_are_no_workers(self, mock_reserved_resource,
+                                                         mock_worker_objects):
+        mock_worker_objects.get_online.return_value = []
+        mock_reserved_resource.objects.only.return_value = []
         try:
             tasks._get_unreserved_worker()
         except NoWorkers:
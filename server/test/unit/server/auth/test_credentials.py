@@ -0,0 +1,149 @@
+import unittest
+
+import mock
+
+from pulp.server.auth import credentials
+from pulp.server.db import model
+from pulp.server.managers.auth.authentication import AuthenticationManager
+
+
+def make_user(login='admin', password='secret', roles=None):
+    user = model.User(login=login, roles=roles or ['super-users'])
+    user.password = 'stored-hash-of-%s' % password
+    return user
+
+
+class TestVerifiedCredentialCache(unittest.TestCase):
+
+    def test_disabled(self):
+        """
+        Ensure nothing is cached when the TTL is 0.
+        """
+        cache = credentials.VerifiedCredentialCache(0, 10)
+        user = make_user()
+        cache.add(user, 'secret')
+        self.assertFalse(cache.enabled)
+        self.assertFalse(cache.verified(user, 'secret'))
+
+    def test_verified(self):
+        """
+        Ensure cached credentials are verified and others are not.
+        """
+        cache = credentials.VerifiedCredentialCache(60, 10)
+        user = make_user()
+        self.assertFalse(cache.verified(user, 'secret'))
+        cache.add(user, 'secret')
+        self.assertTrue(cache.verified(user, 'secret'))
+        self.assertTrue(cache.verified(user, u'secret'))
+        self.assertFalse(cache.verified(user, 'wrong'))
+        self.assertFalse(cache.verified(make_user(login='other'), 'secret'))
+
+    def test_password_changed(self):
+        """
+        Ensure changing the stored password invalidates the credentials.
+        """
+        cache = credentials.VerifiedCredentialCache(60, 10)
+        user = make_user()
+        cache.add(user, 'secret')
+        user.password = 'new-stored-hash'
+        self.assertFalse(cache.verified(user, 'secret'))
+
+    def test_roles_changed(self):
+        """
+        Ensure changing the roles invalidates the credentials.
+        """
+        cache = credentials.VerifiedCredentialCache(60, 10)
+        user = make_user()
+        cache.add(user, 'secret')
+        user.roles = []
+        self.assertFalse(cache.verified(user, 'secret'))
+
+    @mock.patch('pulp.server.auth.credentials.time')
+    def test_expired(self, mock_time):
+        """
+        Ensure credentials expire after the TTL.
+        """
+        mock_time.time.return_value = 1000
+        cache = credentials.VerifiedCredentialCache(60, 10)
+        user = make_user()
+        cache.add(user, 'secret')
+        mock_time.time.return_value = 1059
+        self.assertTrue(cache.verified(user, 'secret'))
+        mock_time.time.return_value = 1060
+        self.assertFalse(cache.verified(user, 'secret'))
+        self.assertEqual(len(cache._entries), 0)
+
+    def test_bounded(self):
+        """
+        Ensure the least recently added credentials are discarded when the cache is full.
+        """
+        cache = credentials.VerifiedCredentialCache(60, 2)
+        users = [make_user(login='user-%d' % n) for n in range(3)]
+        for user in users:
+            cache.add(user, 'secret')
+        self.assertFalse(cache.verified(users[0], 'secret'))
+        self.assertTrue(cache.verified(users[1], 'secret'))
+        self.assertTrue(cache.verified(users[2], 'secret'))
+
+    def test_invalidate(self):
+        """
+        Ensure credentials can be discarded by login or all together.
+        """
+        cache = credentials.VerifiedCredentialCache(60, 10)
+        users = [make_user(login='user-%d' % n) for n in range(3)]
+        for user in users:
+            cache.add(user, 'secret')
+        cache.invalidate('user-0')
+        self.assertFalse(cache.verified(users[0], 'secret'))
+        self.assertTrue(cache.verified(users[1], 'secret'))
+        cache.invalidate()
+        self.assertFalse(cache.verified(users[1], 'secret'))
+
+    @mock.patch('pulp.server.auth.credentials._cache', None)
+    @mock.patch('pulp.server.auth.credentials.config')
+    def test_verified_credentials(self, mock_config):
+        """
+        Ensure the process cache is created once, as configured.
+        """
+        mock_config.getint.side_effect = lambda section, name: {
+            'credential_cache_ttl': 30, 'credential_cache_size': 5}[name]
+        cache = credentials.verified_credentials()
+        self.assertTrue(cache is credentials.verified_credentials())
+        self.assertEqual(cache.ttl, 30)
+        self.assertEqual(cache.max_size, 5)
+
+
+@mock.patch('pulp.server.managers.auth.authentication.model.User.objects')
+class TestCheckUsernamePassword(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = credentials.VerifiedCredentialCache(60, 10)
+        patcher = mock.patch('pulp.server.auth.credentials.verified_credentials',
+                             return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_password_checked_once(self, mock_objects):
+        """
+        Ensure the password is hashed only until it has been verified.
+        """
+        user = make_user()
+        user.check_password = mock.Mock(return_value=True)
+        mock_objects.return_value.first.return_value = user
+        manager = AuthenticationManager()
+        for n in range(3):
+            self.assertEqual(manager._check_username_password_local('admin', 'secret'), user)
+        self.assertEqual(user.check_password.call_count, 1)
+
+    def test_wrong_password_not_cached(self, mock_objects):
+        """
+        Ensure credentials that fail verification are not cached.
+        """
+        user = make_user()
+        user.check_password = mock.Mock(return_value=False)
+        mock_objects.return_value.first.return_value = user
+        manager = AuthenticationManager()
+        for n in range(2):
+            self.assertTrue(manager._check_username_password_local('admin', 'wrong') is None)
+        self.assertEqual(user.check_password.call_count, 2)
+        self.assertFalse(self.cache.verified(user, 'wrong'))
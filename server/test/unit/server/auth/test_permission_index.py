@@ -0,0 +1,81 @@
+import unittest
+
+import mock
+
+from pulp.server.auth import permission_index
+from pulp.server.auth.authorization import CREATE, READ, UPDATE
+
+
+PERMISSIONS = [
+    {'resource': '/', 'users': [{'username': 'root', 'permissions': [READ]}]},
+    {'resource': '/v2/repositories/', 'users': [
+        {'username': 'fred', 'permissions': [READ, CREATE]},
+        {'username': 'wilma', 'permissions': [READ]}]},
+    {'resource': '/v2/repositories/zoo/', 'users': [
+        {'username': 'wilma', 'permissions': [UPDATE]}]},
+]
+
+
+@mock.patch('pulp.server.auth.permission_index.PermissionVersion')
+@mock.patch('pulp.server.auth.permission_index.Permission')
+class TestPermissionIndex(unittest.TestCase):
+
+    def test_is_authorized(self, mock_permission, mock_version):
+        """
+        Ensure operations granted on a resource or a base resource are authorized.
+        """
+        mock_permission.get_collection.return_value.find.return_value = PERMISSIONS
+        mock_version.current.return_value = 1
+        index = permission_index.PermissionIndex()
+
+        self.assertTrue(index.is_authorized('/v2/repositories/', 'fred', CREATE))
+        self.assertTrue(index.is_authorized('/v2/repositories/zoo/', 'fred', READ))
+        self.assertTrue(index.is_authorized('/v2/repositories/zoo/', 'wilma', UPDATE))
+        self.assertTrue(index.is_authorized('/v2/tasks/', 'root', READ))
+        self.assertFalse(index.is_authorized('/v2/repositories/', 'wilma', UPDATE))
+        self.assertFalse(index.is_authorized('/v2/repositories/zoo/', 'fred', UPDATE))
+        self.assertFalse(index.is_authorized('/v2/tasks/', 'fred', READ))
+        self.assertFalse(index.is_authorized('/v2/repositories/', 'barney', READ))
+        self.assertEqual(mock_permission.get_collection.return_value.find.call_count, 1)
+
+    def test_reload_on_version_change(self, mock_permission, mock_version):
+        """
+        Ensure the permissions are reloaded only when the version changes.
+        """
+        find = mock_permission.get_collection.return_value.find
+        find.return_value = PERMISSIONS
+        mock_version.current.return_value = 1
+        index = permission_index.PermissionIndex()
+
+        self.assertFalse(index.is_authorized('/v2/tasks/', 'barney', READ))
+        self.assertFalse(index.is_authorized('/v2/tasks/', 'barney', READ))
+        self.assertEqual(find.call_count, 1)
+
+        find.return_value = PERMISSIONS + [
+            {'resource': '/v2/tasks/', 'users': [{'username': 'barney', 'permissions': [READ]}]}]
+        mock_version.current.return_value = 2
+        self.assertTrue(index.is_authorized('/v2/tasks/', 'barney', READ))
+        self.assertEqual(find.call_count, 2)
+
+    def test_invalidate(self, mock_permission, mock_version):
+        """
+        Ensure the permissions are reloaded after the index is invalidated.
+        """
+        find = mock_permission.get_collection.return_value.find
+        find.return_value = PERMISSIONS
+        mock_version.current.return_value = 1
+        index = permission_index.PermissionIndex()
+
+        index.is_authorized('/', 'root', READ)
+        index.invalidate()
+        index.is_authorized('/', 'root', READ)
+        self.assertEqual(find.call_count, 2)
+
+    @mock.patch('pulp.server.auth.permission_index.index')
+    def test_changed(self, mock_index, mock_permission, mock_version):
+        """
+        Ensure the version is incremented and the index of this process is invalidated.
+        """
+        permission_index.changed()
+        mock_version.increment.assert_called_once_with()
+        mock_index.invalidate.assert_called_once_with()
@@ -19,6 +19,7 @@ from mock import Mock, patch, call
 from pulp.server.content.sources.container import (
     ContentContainer, NectarListener, Item, RequestQueue, Batch, Threaded, Serial,
     DownloadReport, NectarFeed, Tracker, DownloadFailed, DOWNLOAD_SUCCEEDED)
+from pulp.server.content.sources import constants
 from pulp.server.content.sources.model import ContentSource
 
 
@@ -113,8 +114,8 @@ class TestContainer(TestCase):
     def test_refresh(self, fake_manager, fake_load):
         sources = {}
         for n in range(3):
-            s = ContentSource('s-%d' % n, {})
-            s.refresh = Mock(return_value=[n])
+            s = ContentSource('s-%d' % n, {constants.BASE_URL: 'http://s-%d/' % n})
+            s.refresh_url = Mock(return_value=n)
             s.get_downloader = Mock()
             sources[s.id] = s
 
@@ -123,12 +124,35 @@ class TestContainer(TestCase):
 
         # test
         container = ContentContainer('')
-        report = container.refresh()
+        report = container.refresh(concurrency=2)
 
         # validation
         for s in sources.values():
-            s.refresh.assert_called_with()
+            s.refresh_url.assert_called_with(s.base_url)
+
+        self.assertEqual(sorted(report), [0, 1, 2])
+        fake_manager().purge_expired.assert_called_once_with()
+
+    @patch(MODULE + '.pulp_conf')
+    @patch(MODULE + '.ContentSource.load_all')
+    @patch(MODULE + '.managers.content_catalog_manager')
+    def test_refresh_configured_concurrency(self, fake_manager, fake_load, fake_conf):
+        sources = {}
+        for n in range(3):
+            s = ContentSource('s-%d' % n, {constants.BASE_URL: 'http://s-%d/' % n})
+            s.refresh_url = Mock(return_value=n)
+            sources[s.id] = s
+
+        fake_conf.getint.return_value = 1
+        fake_manager().has_entries.return_value = False
+        fake_load.return_value = sources
 
+        # test
+        container = ContentContainer('')
+        report = container.refresh()
+
+        # validation
+        fake_conf.getint.assert_called_once_with('content_sources', 'refresh_concurrency')
         self.assertEqual(sorted(report), [0, 1, 2])
 
     @patch(MODULE + '.ContentSource.load_all')
@@ -136,8 +160,8 @@ class TestContainer(TestCase):
     def test_refresh_raised(self, fake_manager, fake_load):
         sources = {}
         for n in range(3):
-            s = ContentSource('s-%d' % n, {})
-            s.refresh = Mock(side_effect=ValueError('must be int'))
+            s = ContentSource('s-%d' % n, {constants.BASE_URL: 'http://s-%d/' % n})
+            s.refresh_url = Mock(side_effect=ValueError('must be int'))
             s.get_downloader = Mock()
             sources[s.id] = s
 
@@ -146,22 +170,25 @@ class TestContainer(TestCase):
 
         # test
         container = ContentContainer('')
-        report = container.refresh()
+        report = container.refresh(concurrency=3)
 
         # validation
         for s in sources.values():
-            s.refresh.assert_called_with()
+            s.refresh_url.assert_called_with(s.base_url)
 
+        self.assertEqual(len(report), 3)
         for r in report:
-            r.errors = ['must be int']
+            self.assertFalse(r.succeeded)
+            self.assertEqual(r.errors, ['must be int'])
+        self.assertEqual(sorted(r.source_id for r in report), sorted(sources))
 
     @patch(MODULE + '.ContentSource.load_all')
     @patch(MODULE + '.managers.content_catalog_manager')
     def test_forced_refresh(self, fake_manager, fake_load):
         sources = {}
         for n in range(3):
-            s = ContentSource('s-%d' % n, {})
-            s.refresh = Mock()
+            s = ContentSource('s-%d' % n, {constants.BASE_URL: 'http://s-%d/' % n})
+            s.refresh_url = Mock()
             sources[s.id] = s
 
         fake_manager().has_entries.return_value = True
@@ -169,11 +196,27 @@ class TestContainer(TestCase):
 
         # test
         container = ContentContainer('')
-        container.refresh(force=True)
+        container.refresh(force=True, concurrency=1)
 
         # validation
         for s in sources.values():
-            s.refresh.assert_called_with()
+            s.refresh_url.assert_called_with(s.base_url)
+
+    @patch(MODULE + '.ContentSource.load_all')
+    @patch(MODULE + '.managers.content_catalog_manager')
+    def test_refresh_not_needed(self, fake_manager, fake_load):
+        s = ContentSource('s-1', {constants.BASE_URL: 'http://s-1/'})
+        s.refresh_url = Mock()
+        fake_manager().has_entries.return_value = True
+        fake_load.return_value = {s.id: s}
+
+        # test
+        container = ContentContainer('')
+        report = container.refresh(concurrency=2)
+
+        # validation
+        self.assertEqual(report, [])
+        self.assertFalse(s.refresh_url.called)
 
     @patch(MODULE + '.ContentSource.load_all')
     @patch(MODULE + '.managers.content_catalog_manager')
@@ -295,6 +338,43 @@ class TestBatch(TestCase):
         self.assertEqual(batch.listener, listener)
         self.assertRaises(NotImplementedError, batch)
 
+    @patch(MODULE + '.RESOLVE_BATCH_SIZE', 2)
+    @patch(MODULE + '.managers.content_catalog_manager')
+    def test_resolved(self, fake_manager):
+        primary = Mock()
+        container = Mock(sources={'s-1': Mock()})
+        requests = [Mock(locator='l-1'), Mock(locator='l-2'), Mock(locator='l-1')]
+        find_by_locators = fake_manager.return_value.find_by_locators
+        find_by_locators.side_effect = [{'l-1': ['e-1']}, {}]
+
+        # test
+        batch = Batch(primary, container, iter(requests), None)
+        resolved = list(batch.resolved())
+
+        # validation
+        self.assertEqual(resolved, requests)
+        self.assertEqual(
+            find_by_locators.call_args_list, [call(set(['l-1', 'l-2'])), call(set(['l-1']))])
+        requests[0].find_sources.assert_called_once_with(primary, container.sources, ['e-1'])
+        requests[1].find_sources.assert_called_once_with(primary, container.sources, [])
+        requests[2].find_sources.assert_called_once_with(primary, container.sources, [])
+
+    @patch(MODULE + '.managers.content_catalog_manager')
+    def test_resolved_no_sources(self, fake_manager):
+        primary = Mock()
+        container = Mock(sources={})
+        requests = [Mock(), Mock()]
+
+        # test
+        batch = Batch(primary, container, requests, None)
+        resolved = list(batch.resolved())
+
+        # validation
+        self.assertEqual(resolved, requests)
+        self.assertFalse(fake_manager.return_value.find_by_locators.called)
+        for request in requests:
+            request.find_sources.assert_called_once_with(primary, {}, [])
+
 
 class TestSerial(TestCase):
 
@@ -313,10 +393,12 @@ class TestSerial(TestCase):
         self.assertEqual(batch.requests, requests)
         self.assertEqual(batch.listener, listener)
 
+    @patch(MODULE + '.managers.content_catalog_manager')
     @patch(MODULE + '.Started')
     @patch(MODULE + '.Succeeded')
     @patch(MODULE + '.Serial._download')
-    def test_download_succeeded(self, download, succeeded, started):
+    def test_download_succeeded(self, download, succeeded, started, fake_manager):
+        fake_manager.return_value.find_by_locators.return_value = {}
         primary = Mock()
         sources = [
             Mock(id=1, url='u1'),
@@ -341,7 +423,7 @@ class TestSerial(TestCase):
         self.assertEqual(started.call_args_list, [call(r) for r in requests])
         self.assertEqual(started.return_value.call_count, len(requests))
         for r in requests:
-            r.find_sources.assert_called_once_with(primary, sources)
+            r.find_sources.assert_called_once_with(primary, sources, [])
         self.assertEqual(
             download.call_args_list,
             [call(r.sources[0][1], r.destination, r.sources[0][0]) for r in requests])
@@ -356,10 +438,12 @@ class TestSerial(TestCase):
         self.assertEqual(details.total_succeeded, 1)
         self.assertEqual(details.total_failed, 0)
 
+    @patch(MODULE + '.managers.content_catalog_manager')
     @patch(MODULE + '.Started')
     @patch(MODULE + '.Failed')
     @patch(MODULE + '.Serial._download')
-    def test_download_failed(self, download, failed, started):
+    def test_download_failed(self, download, failed, started, fake_manager):
+        fake_manager.return_value.find_by_locators.return_value = {}
         download.side_effect = DownloadFailed()
         primary = Mock()
         sources = [
@@ -385,7 +469,7 @@ class TestSerial(TestCase):
         self.assertEqual(started.call_args_list, [call(r) for r in requests])
         self.assertEqual(started.return_value.call_count, len(requests))
         for r in requests:
-            r.find_sources.assert_called_once_with(primary, sources)
+            r.find_sources.assert_called_once_with(primary, sources, [])
         download_calls = []
         for r in requests:
             for s, u in r.sources:
@@ -559,9 +643,11 @@ class TestThreaded(TestCase):
         self.assertEqual(batch.queues[fake_source.id], fake_queue())
         self.assertEqual(queue, fake_queue())
 
+    @patch(MODULE + '.managers.content_catalog_manager')
     @patch(MODULE + '.Tracker.wait')
     @patch(MODULE + '.Threaded.dispatch')
-    def test_download(self, fake_dispatch, fake_wait):
+    def test_download(self, fake_dispatch, fake_wait, fake_manager):
+        fake_manager.return_value.find_by_locators.return_value = {}
         primary = Mock()
         sources = [Mock(), Mock()]
         container = Mock(sources=sources)
@@ -586,7 +672,7 @@ class TestThreaded(TestCase):
         # validation
         # initial dispatch
         for request in requests:
-            request.find_sources.assert_called_with(primary, sources)
+            request.find_sources.assert_called_with(primary, sources, [])
         calls = fake_dispatch.call_args_list
         self.assertEqual(len(calls), len(requests))
         for i, request in enumerate(requests):
@@ -606,9 +692,10 @@ class TestThreaded(TestCase):
         self.assertEqual(report.downloads['source-2'].total_succeeded, 200)
         self.assertEqual(report.downloads['source-2'].total_failed, 10)
 
+    @patch(MODULE + '.managers.content_catalog_manager')
     @patch(MODULE + '.Tracker.wait')
     @patch(MODULE + '.Threaded.dispatch')
-    def test_download_nothing(self, fake_dispatch, fake_wait):
+    def test_download_nothing(self, fake_dispatch, fake_wait, fake_manager):
         primary = Mock()
         container = Mock(sources=[])
         requests = []
@@ -626,9 +713,10 @@ class TestThreaded(TestCase):
         self.assertEqual(len(report.downloads), 0)
         fake_wait.assert_called_once_with(0)
 
+    @patch(MODULE + '.managers.content_catalog_manager')
     @patch(MODULE + '.Tracker.wait')
     @patch(MODULE + '.Threaded.dispatch')
-    def test_download_with_exception(self, fake_dispatch, fake_wait):
+    def test_download_with_exception(self, fake_dispatch, fake_wait, fake_manager):
         primary = Mock()
         fake_dispatch.side_effect = ValueError()
         sources = [Mock(), Mock()]
@@ -2,7 +2,7 @@ import os
 import sys
 from unittest import TestCase
 
-from mock import patch, Mock
+from mock import call, patch, Mock
 
 from pulp.common.constants import PRIMARY_ID
 from pulp.plugins.conduits.cataloger import CatalogerConduit
@@ -10,6 +10,7 @@ from pulp.server.content.sources import constants
 from pulp.server.content.sources.model import Request, PrimarySource, ContentSource, RefreshReport
 from pulp.server.content.sources.model import DownloadDetails, DownloadReport
 from pulp.server.content.sources.descriptor import DEFAULT
+from pulp.server.db.model.content import ContentCatalog
 
 
 TYPE = '1234'
@@ -147,6 +148,29 @@ class TestRequest(TestCase):
         self.assertEqual(request.sources[4][0].id, primary.id)
         self.assertEqual(request.sources[4][1], url)
 
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
+    def test_find_sources_with_entries(self, fake_manager):
+        primary = PrimarySource(None)
+        alternatives = dict([(s, ContentSource(s, d)) for s, d in DESCRIPTOR])
+
+        # test
+
+        request = Request('test_1', 1, 'http://redhat.com/repository', '/tmp/123')
+        request.find_sources(primary, alternatives, CATALOG[0:1])
+
+        # validation
+
+        self.assertFalse(fake_manager.called)
+        request.sources = list(request.sources)
+        self.assertEqual(len(request.sources), 2)
+        self.assertEqual(request.sources[0][0].id, 's-1')
+        self.assertEqual(request.sources[0][1], CATALOG[0][constants.URL])
+        self.assertEqual(request.sources[1][0].id, primary.id)
+
+    def test_locator(self):
+        request = Request('test_1', {'name': 'a'}, 'http://redhat.com/repository', '/tmp/123')
+        self.assertEqual(request.locator, ContentCatalog.get_locator('test_1', {'name': 'a'}))
+
     def test_next_source(self):
         sources = [1, 2, 3]
         request = Request('', {}, '', '')
@@ -357,8 +381,16 @@ class TestContentSource(TestCase):
 
         self.assertEqual(conduit.source_id, source.id)
         self.assertEqual(conduit.expires, 3600)
+        self.assertEqual(conduit.url, None)
         self.assertTrue(isinstance(conduit, CatalogerConduit))
 
+    def test_get_conduit_url(self):
+        source = ContentSource('s-1', {constants.EXPIRES: '1h'})
+
+        conduit = source.get_conduit('http://xyz.com')
+
+        self.assertEqual(conduit.url, 'http://xyz.com')
+
     @patch('pulp.server.content.sources.model.plugins')
     def test_get_cataloger(self, fake_plugins):
         plugin = Mock()
@@ -415,7 +447,8 @@ class TestContentSource(TestCase):
 
         # validation
 
-        self.assertEqual(conduit.reset.call_count, len(urls))
+        self.assertEqual(source.get_conduit.call_args_list, [call(u) for u in urls])
+        self.assertEqual(conduit.finish.call_count, len(urls))
         self.assertEqual(cataloger.refresh.call_count, len(urls))
 
         n = 0
@@ -453,7 +486,8 @@ class TestContentSource(TestCase):
 
         # validation
 
-        self.assertEqual(conduit.reset.call_count, len(urls))
+        self.assertEqual(source.get_conduit.call_args_list, [call(u) for u in urls])
+        self.assertFalse(conduit.finish.called)
         self.assertEqual(cataloger.refresh.call_count, len(urls))
 
         n = 0
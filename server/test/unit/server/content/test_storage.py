@@ -1,6 +1,8 @@
 import os
+import shutil
+import tempfile
 
-from errno import EEXIST, EPERM
+from errno import EEXIST, EPERM, EXDEV
 from unittest import TestCase
 
 from mock import Mock, patch
@@ -8,6 +10,7 @@ from mock import Mock, patch
 from pulp.plugins.util import verification
 from pulp.plugins.util import misc
 
+from pulp.server.content import storage as content_storage
 from pulp.server.content.storage import ContentStorage, FileStorage, SharedStorage
 
 
@@ -183,11 +186,87 @@ class TestFileStorage(TestCase):
         shutil.copy.assert_called_once_with(path_in, temp_destination)
         rename.assert_called_once_with(temp_destination, destination)
 
+    @patch('os.rename')
+    @patch('os.close')
+    @patch('pulp.server.content.storage.tempfile')
+    @patch('pulp.server.content.storage.shutil')
+    @patch('pulp.plugins.util.misc.mkdir')
+    def test_put_file_copied(self, _mkdir, shutil, tempfile, close, rename):
+        unit = Mock(id='123', storage_path='/tmp/storage')
+        tempfile.mkstemp.return_value = ('fd', '/some/file/path')
+
+        # test
+        method = FileStorage().put(unit, '/tmp/test', disposable=True)
+
+        # validation
+        self.assertEqual(method, content_storage.TRANSFER_COPY)
+        shutil.copy.assert_called_once_with('/tmp/test', '/some/file/path')
+
     def test_get(self):
         storage = FileStorage()
         storage.get(None)  # just for coverage
 
 
+@patch('pulp.server.content.storage.config')
+class TestFileStorageTransfer(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'working')
+        with open(self.path, 'w') as fp:
+            fp.write('content')
+        self.destination = os.path.join(self.tmp_dir, 'temp-destination')
+        open(self.destination, 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def read(self, path):
+        with open(path) as fp:
+            return fp.read()
+
+    def test_disabled(self, config):
+        config.getboolean.return_value = False
+        method = FileStorage.transfer(self.path, self.destination, disposable=True)
+        config.getboolean.assert_called_once_with('server', 'zero_copy_import')
+        self.assertEqual(method, content_storage.TRANSFER_COPY)
+        self.assertEqual(self.read(self.destination), 'content')
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_rename(self, config):
+        config.getboolean.return_value = True
+        method = FileStorage.transfer(self.path, self.destination, disposable=True)
+        self.assertEqual(method, content_storage.TRANSFER_RENAME)
+        self.assertEqual(self.read(self.destination), 'content')
+        self.assertFalse(os.path.exists(self.path))
+
+    @patch('pulp.server.content.storage.fcntl.ioctl')
+    def test_reflink(self, ioctl, config):
+        config.getboolean.return_value = True
+        method = FileStorage.transfer(self.path, self.destination)
+        self.assertEqual(method, content_storage.TRANSFER_REFLINK)
+        self.assertEqual(ioctl.call_args[0][1], content_storage.FICLONE)
+        self.assertTrue(os.path.exists(self.path))
+
+    @patch('pulp.server.content.storage._reflink', Mock(return_value=False))
+    def test_link(self, config):
+        config.getboolean.return_value = True
+        method = FileStorage.transfer(self.path, self.destination)
+        self.assertEqual(method, content_storage.TRANSFER_LINK)
+        self.assertEqual(os.stat(self.path).st_ino, os.stat(self.destination).st_ino)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['temp-destination', 'working'])
+
+    @patch('pulp.server.content.storage.os.rename', side_effect=OSError(EXDEV, 'cross-device'))
+    @patch('pulp.server.content.storage.os.link', side_effect=OSError(EXDEV, 'cross-device'))
+    @patch('pulp.server.content.storage.fcntl.ioctl', side_effect=IOError(EXDEV, 'cross-device'))
+    def test_copy(self, ioctl, link, rename, config):
+        config.getboolean.return_value = True
+        method = FileStorage.transfer(self.path, self.destination, disposable=True)
+        self.assertEqual(method, content_storage.TRANSFER_COPY)
+        self.assertEqual(self.read(self.destination), 'content')
+        self.assertTrue(os.path.exists(self.path))
+
+
 class TestSharedStorage(TestCase):
 
     @patch('pulp.server.content.storage.sha256')
@@ -5,6 +5,7 @@ from bson.objectid import InvalidId
 from mock import call, Mock, MagicMock, patch
 import mock
 import mongoengine
+from pymongo.errors import DuplicateKeyError
 
 from pulp.common import dateutils, error_codes
 from pulp.common.compat import unittest
@@ -373,9 +374,10 @@ class UpdateRepoUnitCountsTests(unittest.TestCase):
 
 class AssociateSingleUnitTests(unittest.TestCase):
 
+    @patch('pulp.server.controllers.repository.record_content_delta')
     @patch('pulp.server.controllers.repository.model.RepositoryContentUnit.objects')
     @patch('pulp.server.controllers.repository.dateutils.format_iso8601_utc_timestamp')
-    def test_unit_association(self, mock_get_timestamp, mock_rcu_objects):
+    def test_unit_association(self, mock_get_timestamp, mock_rcu_objects, mock_record):
         mock_get_timestamp.return_value = 'foo_tstamp'
         test_unit = DemoModel(id='bar', key_field='baz')
         repo = MagicMock(repo_id='foo')
@@ -389,12 +391,15 @@ class AssociateSingleUnitTests(unittest.TestCase):
             set_on_insert__created='foo_tstamp',
             set__updated='foo_tstamp',
             upsert=True)
+        mock_record.assert_called_once_with(
+            'foo', DemoModel._content_type_id.default, ['bar'], True)
 
 
 class TestDisassociateUnits(unittest.TestCase):
+    @patch('pulp.server.controllers.repository.record_content_delta')
     @patch('pulp.server.controllers.repository.update_last_unit_removed')
     @patch('pulp.server.controllers.repository.model.RepositoryContentUnit.objects')
-    def test_disassociate_units(self, m_rcu_objects, m_update_last_unit_removed):
+    def test_disassociate_units(self, m_rcu_objects, m_update_last_unit_removed, m_record):
         """"
         Test that multiple objects are all deleted and timestamp for units removal updated
         """
@@ -405,6 +410,8 @@ class TestDisassociateUnits(unittest.TestCase):
         m_rcu_objects.assert_called_once_with(repo_id='foo', unit_id__in=['bar', 'baz'])
         m_rcu_objects.return_value.delete.assert_called_once()
         m_update_last_unit_removed.assert_called_once_with('foo')
+        m_record.assert_called_once_with(
+            'foo', DemoModel._content_type_id.default, ['bar', 'baz'], False)
 
     @patch('pulp.server.controllers.repository.update_last_unit_removed')
     def test_disassociate_units_empty_iterable(self, m_update_last_unit_removed):
@@ -537,6 +544,78 @@ class TestQueueDelete(unittest.TestCase):
         self.assertTrue(async_result is mock_delete.apply_async_with_reservation())
 
 
+@patch('pulp.server.controllers.repository.connection.bulk_upsert')
+@patch('pulp.server.controllers.repository.Bind')
+@patch('pulp.server.controllers.repository.RepoContentDeltaStatus')
+@patch('pulp.server.controllers.repository.RepoContentDelta')
+class TestRecordContentDelta(unittest.TestCase):
+
+    def test_record(self, m_delta, m_status, m_bind, m_bulk_upsert):
+        status_collection = m_status.get_collection.return_value
+        status_collection.find_one_and_update.return_value = {'_id': 1, 'units': 2}
+        repo_controller.record_content_delta('foo', 'rpm', ['bar', 'baz'], False)
+        self.assertEqual(status_collection.find_one_and_update.call_args[0], (
+            {'repo_id': 'foo'},
+            {'$inc': {'units': 2, 'version': 1}, '$setOnInsert': {'full': True}}))
+        m_bind.get_collection.return_value.find_one.assert_called_once_with(
+            {'repo_id': 'foo'}, projection=['_id'])
+        collection, operations = m_bulk_upsert.call_args[0]
+        self.assertTrue(collection is m_delta.get_collection.return_value)
+        self.assertEqual(
+            [o._filter for o in operations],
+            [{'repo_id': 'foo', 'unit_type_id': 'rpm', 'unit_id': 'bar'},
+             {'repo_id': 'foo', 'unit_type_id': 'rpm', 'unit_id': 'baz'}])
+        for operation in operations:
+            self.assertEqual(operation._doc, {'$set': {'added': False}, '$inc': {'version': 1}})
+            self.assertTrue(operation._upsert)
+
+    @patch('pulp.server.controllers.repository.MAX_DELTA_UNITS', 2)
+    def test_record_too_many(self, m_delta, m_status, m_bind, m_bulk_upsert):
+        """
+        Assert that changes are no longer recorded once there are too many of them.
+        """
+        status_collection = m_status.get_collection.return_value
+        status_collection.find_one_and_update.return_value = {'_id': 1, 'units': 3}
+        repo_controller.record_content_delta('foo', 'rpm', ['bar'], True)
+        status_collection.update.assert_called_once_with({'_id': 1}, {'$set': {'full': True}})
+        m_delta.get_collection.return_value.remove.assert_called_once_with({'repo_id': 'foo'})
+        self.assertFalse(status_collection.remove.called)
+        self.assertFalse(m_bulk_upsert.called)
+
+    def test_record_not_bound(self, m_delta, m_status, m_bind, m_bulk_upsert):
+        """
+        Assert that changes are not recorded for a repository no consumer is bound to.
+        """
+        status_collection = m_status.get_collection.return_value
+        status_collection.find_one_and_update.return_value = {'_id': 1, 'units': 1}
+        m_bind.get_collection.return_value.find_one.return_value = None
+        repo_controller.record_content_delta('foo', 'rpm', ['bar'], True)
+        status_collection.update.assert_called_once_with({'_id': 1}, {'$set': {'full': True}})
+        m_delta.get_collection.return_value.remove.assert_called_once_with({'repo_id': 'foo'})
+        self.assertFalse(m_bulk_upsert.called)
+
+    def test_record_full(self, m_delta, m_status, m_bind, m_bulk_upsert):
+        """
+        Assert that only the status is updated once changes are no longer recorded.
+        """
+        status_collection = m_status.get_collection.return_value
+        status_collection.find_one_and_update.return_value = {'_id': 1, 'units': 9, 'full': True}
+        repo_controller.record_content_delta('foo', 'rpm', ['bar'], True)
+        self.assertFalse(m_bind.get_collection.called)
+        self.assertFalse(m_delta.get_collection.called)
+        self.assertFalse(m_bulk_upsert.called)
+
+    def test_record_status_inserted_concurrently(self, m_delta, m_status, m_bind, m_bulk_upsert):
+        status_collection = m_status.get_collection.return_value
+        status_collection.find_one_and_update.side_effect = [
+            DuplicateKeyError('duplicate'), {'_id': 1, 'units': 1}]
+        repo_controller.record_content_delta('foo', 'rpm', ['bar'], True)
+        self.assertFalse(status_collection.find_one_and_update.call_args[1].get('upsert'))
+        self.assertEqual(len(m_bulk_upsert.call_args[0][1]), 1)
+
+
+@mock.patch('pulp.server.controllers.repository.RepoContentDeltaStatus')
+@mock.patch('pulp.server.controllers.repository.RepoContentDelta')
 @mock.patch('pulp.server.controllers.repository.dist_controller')
 @mock.patch('pulp.server.controllers.repository.importer_controller')
 @mock.patch('pulp.server.controllers.repository.TaskResult')
@@ -551,7 +630,8 @@ class TestDelete(unittest.TestCase):
     """
 
     def test_delete_no_importers_or_distributors(self, m_factory, m_model, m_content, m_publish,
-                                                 m_sync, m_task_result, m_imp_ctrl, m_dist_ctrl):
+                                                 m_sync, m_task_result, m_imp_ctrl, m_dist_ctrl,
+                                                 m_delta, m_delta_status):
         """
         Test a simple repository delete when there are no importers or distributors.
         """
@@ -572,6 +652,9 @@ class TestDelete(unittest.TestCase):
         m_sync.get_collection().remove.assert_called_once_with(pymongo_args, **pymongo_kwargs)
         m_publish.get_collection().remove.assert_called_once_with(pymongo_args, **pymongo_kwargs)
         m_content.get_collection().remove.assert_called_once_with(pymongo_args, **pymongo_kwargs)
+        m_delta.get_collection().remove.assert_called_once_with(pymongo_args, **pymongo_kwargs)
+        m_delta_status.get_collection().remove.assert_called_once_with(pymongo_args,
+                                                                       **pymongo_kwargs)
         mock_group_manager.remove_repo_from_groups.assert_called_once_with('foo-repo')
         m_task_result.assert_called_once_with(error=None, spawned_tasks=[])
         self.assertTrue(result is m_task_result.return_value)
@@ -579,7 +662,8 @@ class TestDelete(unittest.TestCase):
     @mock.patch('pulp.server.controllers.repository.consumer_controller')
     def test_delete_imforms_other_collections(self, mock_consumer_ctrl, m_factory, m_model,
                                               m_content, m_publish, m_sync, m_task_result,
-                                              m_imp_ctrl, m_dist_ctrl):
+                                              m_imp_ctrl, m_dist_ctrl,
+                                              m_delta, m_delta_status):
         """
         Test that other collections are correctly informed when a repository is deleted.
         """
@@ -611,7 +695,8 @@ class TestDelete(unittest.TestCase):
         self.assertTrue(result is m_task_result.return_value)
 
     def test_delete_with_dist_and_imp_errors(self, m_factory, m_model, m_content, m_publish,
-                                             m_sync, m_task_result, m_imp_ctrl, m_dist_ctrl):
+                                             m_sync, m_task_result, m_imp_ctrl, m_dist_ctrl,
+                                             m_delta, m_delta_status):
         """
         Test repository delete when the other collections raise errors.
         """
@@ -659,7 +744,8 @@ class TestDelete(unittest.TestCase):
         self.assertTrue(isinstance(e.child_exceptions[2], MockException))
 
     def test_delete_content_errors(self, m_factory, m_model, m_content, m_publish,
-                                   m_sync, m_task_result, m_imp_ctrl, m_dist_ctrl):
+                                   m_sync, m_task_result, m_imp_ctrl, m_dist_ctrl,
+                                   m_delta, m_delta_status):
         """
         Test delete repository when the content collection raises errors.
         """
@@ -703,7 +789,8 @@ class TestDelete(unittest.TestCase):
     @mock.patch('pulp.server.controllers.repository.pulp_exceptions.PulpCodedException')
     def test_delete_consumer_bind_error(self, mock_coded_exception, mock_pulp_error,
                                         mock_consumer_ctrl, m_factory, m_model, m_content,
-                                        m_publish, m_sync, m_task_result, m_imp_ctrl, m_dist_ctrl):
+                                        m_publish, m_sync, m_task_result, m_imp_ctrl, m_dist_ctrl,
+                                        m_delta, m_delta_status):
         """
         Test repository delete when consumer bind collection raises an error.
         """
@@ -1756,18 +1843,27 @@ class TestQueueDownloadRepo(unittest.TestCase):
 
 class TestDownloadDeferred(unittest.TestCase):
 
+    @patch(MODULE + '_direct_download', Mock(return_value=False))
+    @patch(MODULE + 'model.DeferredDownload')
     @patch(MODULE + 'LazyUnitDownloadStep')
     @patch(MODULE + '_create_download_requests')
     @patch(MODULE + '_get_deferred_content_units')
-    def test_download_deferred(self, mock_get_deferred, mock_create_requests, mock_step):
+    def test_download_deferred(self, mock_get_deferred, mock_create_requests, mock_step,
+                               mock_deferred_download):
         """Assert the download step is initialized and called."""
+        mock_deferred_download.objects.count.return_value = 7
         repo_controller.download_deferred()
-        mock_create_requests.assert_called_once_with(mock_get_deferred.return_value)
+        mock_create_requests.assert_called_once_with(mock_get_deferred.return_value,
+                                                     direct=False)
+        self.assertFalse(mock_step.call_args[1]['direct'])
+        self.assertEqual(mock_step.call_args[1]['total_units'], 7)
         mock_step.return_value.start.assert_called_once_with()
 
 
+@patch(MODULE + 'missing_unit_count', Mock(return_value=3))
 class TestDownloadRepo(unittest.TestCase):
 
+    @patch(MODULE + '_direct_download', Mock(return_value=False))
     @patch(MODULE + 'LazyUnitDownloadStep')
     @patch(MODULE + '_create_download_requests')
     @patch(MODULE + 'find_units_not_downloaded')
@@ -1775,7 +1871,21 @@ class TestDownloadRepo(unittest.TestCase):
         """Assert the download step is initialized and called with missing units."""
         repo_controller.download_repo('fake-id')
         mock_missing_units.assert_called_once_with('fake-id')
-        mock_create_requests.assert_called_once_with(mock_missing_units.return_value)
+        mock_create_requests.assert_called_once_with(mock_missing_units.return_value,
+                                                     direct=False)
+        self.assertEqual(mock_step.call_args[1]['total_units'], 3)
+        mock_step.return_value.start.assert_called_once_with()
+
+    @patch(MODULE + '_direct_download', Mock(return_value=True))
+    @patch(MODULE + 'LazyUnitDownloadStep')
+    @patch(MODULE + '_create_download_requests')
+    @patch(MODULE + 'find_units_not_downloaded')
+    def test_download_repo_direct(self, mock_missing_units, mock_create_requests, mock_step):
+        """Assert the download step downloads directly when configured."""
+        repo_controller.download_repo('fake-id')
+        mock_create_requests.assert_called_once_with(mock_missing_units.return_value,
+                                                     direct=True)
+        self.assertTrue(mock_step.call_args[1]['direct'])
         mock_step.return_value.start.assert_called_once_with()
 
     @patch(MODULE + 'LazyUnitDownloadStep')
@@ -1783,10 +1893,16 @@ class TestDownloadRepo(unittest.TestCase):
     @patch(MODULE + 'get_mongoengine_unit_querysets')
     def test_download_repo_verify(self, mock_units_qs, mock_create_requests, mock_step):
         """Assert the download step is initialized and called with all units."""
-        mock_units_qs.return_value = [['some'], ['lists']]
+        query_sets = [MagicMock(), MagicMock()]
+        query_sets[0].__iter__.return_value = ['some']
+        query_sets[0].count.return_value = 1
+        query_sets[1].__iter__.return_value = ['lists']
+        query_sets[1].count.return_value = 1
+        mock_units_qs.return_value = iter(query_sets)
         repo_controller.download_repo('fake-id', verify_all_units=True)
         mock_units_qs.assert_called_once_with('fake-id')
         self.assertEqual(list(mock_create_requests.call_args[0][0]), ['some', 'lists'])
+        self.assertEqual(mock_step.call_args[1]['total_units'], 2)
         mock_step.return_value.start.assert_called_once_with()
 
 
@@ -1849,9 +1965,8 @@ class TestCreateDownloadRequests(unittest.TestCase):
     def test_create_download_requests(self, mock_catalog, mock_get_url, mock_mkdir):
         # Setup
         content_units = [Mock(id='123', type_id='abc', list_files=lambda: ['/file/path'])]
-        filtered_qs = mock_catalog.objects.filter.return_value
-        catalog_entry = filtered_qs.order_by.return_value.first.return_value
-        catalog_entry.path = '/storage/123/path'
+        catalog_entry = Mock(unit_id='123', unit_type_id='abc', path='/file/path', revision=0)
+        mock_catalog.objects.filter.return_value = [catalog_entry]
         expected_data_dict = {
             repo_controller.TYPE_ID: 'abc',
             repo_controller.UNIT_ID: '123',
@@ -1864,21 +1979,97 @@ class TestCreateDownloadRequests(unittest.TestCase):
         }
 
         # Test
-        requests = repo_controller._create_download_requests(content_units)
+        requests = list(repo_controller._create_download_requests(content_units))
         expected_data_dict[repo_controller.REQUEST] = requests[0]
-        mock_catalog.objects.filter.assert_called_once_with(
-            unit_id='123',
-            unit_type_id='abc',
-            path='/file/path'
-        )
-        filtered_qs.order_by.assert_called_once_with('revision')
-        filtered_qs.order_by.return_value.first.assert_called_once_with()
+        mock_catalog.objects.filter.assert_called_once_with(unit_id__in=['123'])
         mock_mkdir.assert_called_once_with('/working/123')
         self.assertEqual(1, len(requests))
         self.assertEqual(mock_get_url.return_value, requests[0].url)
-        self.assertEqual('/working/123/path', requests[0].destination)
+        self.assertEqual('/working/123/path', requests[0].destination.path)
+        self.assertEqual(catalog_entry.checksum_algorithm,
+                         requests[0].destination.checksum_type)
         self.assertEqual(expected_data_dict, requests[0].data)
 
+    @patch(MODULE + 'Key.load')
+    @patch(MODULE + 'common_utils.get_working_directory', Mock(return_value='/working/'))
+    @patch(MODULE + 'mkdir', Mock())
+    @patch(MODULE + '_get_streamer_url')
+    @patch(MODULE + 'model.LazyCatalogEntry')
+    def test_create_download_requests_direct(self, mock_catalog, mock_get_url, mock_key_load):
+        """Assert direct requests use the upstream URL and are not signed."""
+        content_units = [Mock(id='123', type_id='abc', list_files=lambda: ['/file/path'])]
+        mock_catalog.objects.filter.return_value = [
+            Mock(unit_id='123', unit_type_id='abc', path='/file/path', revision=0,
+                 url='http://upstream.example.com/path')]
+
+        requests = list(repo_controller._create_download_requests(content_units, direct=True))
+        self.assertEqual(1, len(requests))
+        self.assertEqual('http://upstream.example.com/path', requests[0].url)
+        self.assertFalse(mock_get_url.called)
+        self.assertFalse(mock_key_load.called)
+
+    @patch(MODULE + 'DOWNLOAD_PAGE_SIZE', 2)
+    @patch(MODULE + 'Key.load', Mock())
+    @patch(MODULE + 'common_utils.get_working_directory', Mock(return_value='/working/'))
+    @patch(MODULE + 'mkdir', Mock())
+    @patch(MODULE + '_get_streamer_url', Mock())
+    @patch(MODULE + 'model.LazyCatalogEntry')
+    def test_create_download_requests_paged(self, mock_catalog):
+        """Assert catalog entries are fetched with one query for each page of units."""
+        content_units = [
+            Mock(id=str(n), type_id='abc', list_files=lambda: ['/file/path']) for n in range(5)]
+        mock_catalog.objects.filter.return_value = []
+
+        requests = repo_controller._create_download_requests(iter(content_units))
+        self.assertEqual(0, mock_catalog.objects.filter.call_count)
+        self.assertEqual(list(requests), [])
+        self.assertEqual(
+            [c[1]['unit_id__in'] for c in mock_catalog.objects.filter.call_args_list],
+            [['0', '1'], ['2', '3'], ['4']])
+
+
+class TestGetCatalogEntries(unittest.TestCase):
+
+    @patch(MODULE + 'model.LazyCatalogEntry')
+    def test_lowest_revision(self, mock_catalog):
+        """Assert the entry with the lowest revision is used for each file."""
+        entries = [
+            Mock(unit_id='1', unit_type_id='abc', path='/a', revision=2),
+            Mock(unit_id='1', unit_type_id='abc', path='/a', revision=0),
+            Mock(unit_id='1', unit_type_id='abc', path='/a', revision=1),
+            Mock(unit_id='1', unit_type_id='abc', path='/b', revision=3),
+            Mock(unit_id='2', unit_type_id='abc', path='/c', revision=0),
+        ]
+        mock_catalog.objects.filter.return_value = entries
+        content_units = [Mock(id='1'), Mock(id='2')]
+
+        catalog = repo_controller._get_catalog_entries(content_units)
+        mock_catalog.objects.filter.assert_called_once_with(unit_id__in=['1', '2'])
+        self.assertEqual(catalog, {
+            ('1', 'abc', '/a'): entries[1],
+            ('1', 'abc', '/b'): entries[3],
+            ('2', 'abc', '/c'): entries[4],
+        })
+
+
+class TestDirectDownload(unittest.TestCase):
+
+    @patch(MODULE + 'pulp_conf')
+    def test_direct_download(self, mock_conf):
+        """Assert the setting is parsed as a boolean."""
+        mock_conf.get.return_value = 'true'
+        self.assertTrue(repo_controller._direct_download())
+        mock_conf.get.assert_called_once_with('lazy', 'direct_download')
+        mock_conf.get.return_value = 'false'
+        self.assertFalse(repo_controller._direct_download())
+
+    @patch(MODULE + 'pulp_conf')
+    def test_direct_download_unparsable(self, mock_conf):
+        """Assert an exception is raised if the configuration is unparsable."""
+        mock_conf.get.return_value = 'unsure'
+        self.assertRaises(pulp_exceptions.PulpCodedTaskException,
+                          repo_controller._direct_download)
+
 
 class TestGetStreamerUrl(unittest.TestCase):
 
@@ -1959,7 +2150,7 @@ class TestLazyUnitDownloadStep(unittest.TestCase):
             repo_controller.REQUEST: Mock(canceled=False),
             repo_controller.UNIT_FILES: {
                 '/no/where': {
-                    repo_controller.CATALOG_ENTRY: Mock(),
+                    repo_controller.CATALOG_ENTRY: Mock(checksum=None),
                     repo_controller.PATH_DOWNLOADED: None
                 }
             }
@@ -1972,6 +2163,127 @@ class TestLazyUnitDownloadStep(unittest.TestCase):
         self.step.start()
         self.step.downloader.download.assert_called_once_with(self.step.download_requests)
 
+    def test_total_units(self):
+        """Assert the progress total may be given for requests that are generated."""
+        requests = (Mock() for n in range(3))
+        step = repo_controller.LazyUnitDownloadStep('test_step', 'Test Step', requests,
+                                                    total_units=3)
+        self.assertEqual(step.total_units, 3)
+
+    @patch(MODULE + 'progress')
+    def test_report_complete(self, mock_progress):
+        """Assert the step is complete only after the downloader finishes."""
+        self.step.task_id = 'task'
+        self.step.downloader = Mock()
+        self.step.progress_successes = 1
+        self.step.report()
+        self.assertEqual(self.step.state, repo_controller.reporting_constants.STATE_NOT_STARTED)
+        self.step.start()
+        self.assertEqual(self.step.state, repo_controller.reporting_constants.STATE_COMPLETE)
+
+    @patch(MODULE + 'progress')
+    def test_report_forced_on_state_change(self, mock_progress):
+        """Assert the report is saved immediately only when the state changes."""
+        self.step.task_id = 'task'
+        self.step.report()
+        self.step.state = repo_controller.reporting_constants.STATE_RUNNING
+        self.step.report()
+        update = mock_progress.aggregator.return_value.update
+        self.assertEqual([c[1]['force'] for c in update.call_args_list], [False, True])
+        report = update.call_args[0][1]
+        self.assertEqual(report['test_step'][0]['state'],
+                         repo_controller.reporting_constants.STATE_RUNNING)
+
+    @patch(MODULE + 'time.time', Mock(return_value=100.5))
+    @patch(MODULE + 'progress')
+    def test_report_throttled(self, mock_progress):
+        """Assert the report is updated at most once a second unless the state changes."""
+        self.step.task_id = 'task'
+        self.step.report()
+        self.step.progress_successes = 1
+        self.step.report()
+        update = mock_progress.aggregator.return_value.update
+        self.assertEqual(update.call_count, 1)
+        self.step.state = repo_controller.reporting_constants.STATE_RUNNING
+        self.step.report()
+        self.assertEqual(update.call_count, 2)
+
+    def _direct_request(self, importer_id, url, destination):
+        request = Mock(url=url, destination=destination)
+        request.data = {
+            repo_controller.UNIT_FILES: {
+                destination: {
+                    repo_controller.CATALOG_ENTRY: Mock(importer_id=importer_id),
+                    repo_controller.PATH_DOWNLOADED: None
+                }
+            }
+        }
+        return request
+
+    @patch(MODULE + 'common_utils.get_working_directory', Mock(return_value='/working/'))
+    @patch(MODULE + 'get_importer_by_id')
+    def test_start_direct(self, mock_get_importer):
+        """Assert direct requests are downloaded by the downloader of each importer."""
+        importer, config, importer_model = Mock(), Mock(), Mock()
+        mock_get_importer.return_value = (importer, config, importer_model)
+        requests = [
+            self._direct_request('imp-1', 'http://a.example.com/1', '/working/1'),
+            self._direct_request('imp-1', 'http://a.example.com/2', '/working/2'),
+            self._direct_request('imp-2', 'http://b.example.com/3', '/working/3'),
+        ]
+        step = repo_controller.LazyUnitDownloadStep('test_step', 'Test Step', requests,
+                                                    direct=True)
+        self.assertTrue(step.downloader is None)
+        step.report = Mock()
+        step.start()
+
+        self.assertEqual(
+            sorted(c[0][0] for c in mock_get_importer.call_args_list), ['imp-1', 'imp-2'])
+        self.assertEqual(importer_model.config, config.flatten.return_value)
+        importer.get_downloader_for_db_importer.assert_any_call(
+            importer_model, 'http://a.example.com/1', working_dir='/working/', stream=True)
+        downloader = importer.get_downloader_for_db_importer.return_value
+        self.assertEqual(downloader.event_listener, step)
+        downloaded = sorted(
+            (r.url for c in downloader.download.call_args_list for r in c[0][0]))
+        self.assertEqual(downloaded, [r.url for r in requests])
+        self.assertEqual(downloader.config.finalize.call_count, 2)
+
+    @patch(MODULE + 'get_importer_by_id')
+    def test_start_direct_importer_not_found(self, mock_get_importer):
+        """Assert the requests of an importer that cannot be loaded are failed."""
+        mock_get_importer.side_effect = plugin_exceptions.PluginNotFound()
+        requests = [self._direct_request('imp-1', 'http://a.example.com/1', '/working/1')]
+        step = repo_controller.LazyUnitDownloadStep('test_step', 'Test Step', requests,
+                                                    direct=True)
+        step.report = Mock()
+        step.start()
+
+        self.assertEqual(step.progress_failures, 1)
+        path_entry = requests[0].data[repo_controller.UNIT_FILES]['/working/1']
+        self.assertFalse(path_entry[repo_controller.PATH_DOWNLOADED])
+
+    @patch(MODULE + 'get_importer_by_id')
+    def test_start_direct_importer_not_found_multifile(self, mock_get_importer):
+        """Assert the progress of failed requests is counted per unit."""
+        mock_get_importer.side_effect = plugin_exceptions.PluginNotFound()
+        requests = [
+            self._direct_request('imp-1', 'http://a.example.com/1', '/working/1'),
+            self._direct_request('imp-1', 'http://a.example.com/2', '/working/2'),
+        ]
+        unit_files = requests[0].data[repo_controller.UNIT_FILES]
+        unit_files.update(requests[1].data[repo_controller.UNIT_FILES])
+        requests[1].data[repo_controller.UNIT_FILES] = unit_files
+        step = repo_controller.LazyUnitDownloadStep('test_step', 'Test Step', requests,
+                                                    direct=True)
+        step.report = Mock()
+        step.start()
+
+        self.assertEqual(step.progress_failures, 1)
+        self.assertEqual(
+            [entry[repo_controller.PATH_DOWNLOADED] for entry in unit_files.values()],
+            [False, False])
+
     @patch(MODULE + 'plugin_api.get_unit_model_by_id')
     @patch(MODULE + 'model.DeferredDownload')
     def test_download_started(self, mock_deferred_download, mock_get_model):
@@ -2011,7 +2323,7 @@ class TestLazyUnitDownloadStep(unittest.TestCase):
 
         # Test
         self.step.download_succeeded(self.report)
-        unit.import_content.assert_called_once_with(self.report.destination)
+        unit.import_content.assert_called_once_with(self.report.destination, disposable=True)
         self.assertEqual(1, self.step.progress_successes)
         self.assertEqual(0, self.step.progress_failures)
         self.assertEqual(
@@ -2036,12 +2348,26 @@ class TestLazyUnitDownloadStep(unittest.TestCase):
         self.assertEqual(0, unit.set_storage_path.call_count)
         unit.import_content.assert_called_once_with(
             self.report.destination,
-            location='a/filename'
+            location='a/filename',
+            disposable=True
         )
-        self.assertEqual(1, self.step.progress_successes)
+        self.assertEqual(0, self.step.progress_successes)
         self.assertEqual(0, self.step.progress_failures)
         self.assertEqual(0, model_qs.objects.filter.return_value.update_one.call_count)
 
+    @patch(MODULE + 'os.path.relpath', Mock(return_value='a/filename'))
+    @patch(MODULE + 'plugin_api.get_unit_model_by_id')
+    def test_download_succeeded_multifile_failed_file(self, mock_get_model):
+        """Assert multi-file units with a failed file are counted once as failed."""
+        self.step.validate_file = Mock()
+        self.data[repo_controller.UNIT_FILES]['/second/file'] = {
+            repo_controller.PATH_DOWNLOADED: False
+        }
+
+        self.step.download_succeeded(self.report)
+        self.assertEqual(0, self.step.progress_successes)
+        self.assertEqual(1, self.step.progress_failures)
+
     @patch(MODULE + 'os.path.relpath', Mock(return_value='a/filename'))
     @patch(MODULE + 'plugin_api.get_unit_model_by_id')
     def test_download_succeeded_multifile_last_file(self, mock_get_model):
@@ -2059,7 +2385,8 @@ class TestLazyUnitDownloadStep(unittest.TestCase):
         self.assertEqual(0, unit.set_storage_path.call_count)
         unit.import_content.assert_called_once_with(
             self.report.destination,
-            location='a/filename'
+            location='a/filename',
+            disposable=True
         )
         self.assertEqual(1, self.step.progress_successes)
         self.assertEqual(0, self.step.progress_failures)
@@ -2082,6 +2409,27 @@ class TestLazyUnitDownloadStep(unittest.TestCase):
         self.assertEqual(0, self.step.progress_successes)
         self.assertEqual(1, self.step.progress_failures)
 
+    @patch(MODULE + 'plugin_api.get_unit_model_by_id')
+    def test_download_succeeded_digesting_file(self, mock_get_model):
+        """Assert the checksum calculated during the download is verified and cached."""
+        model_qs = mock_get_model.return_value
+        unit = model_qs.objects.filter.return_value.only.return_value.get.return_value
+        catalog_entry = Mock(path='/storage/where', checksum_algorithm='sha256', checksum='abc')
+        self.data[repo_controller.UNIT_FILES]['/no/where'][repo_controller.CATALOG_ENTRY] = \
+            catalog_entry
+        self.report.destination = Mock(spec=repo_controller.DigestingFile, path='/no/where',
+                                       checksum_type='sha256')
+        self.report.destination.hexdigest.return_value = 'abc'
+        self.step.validate_file = Mock()
+        self.step.cache_checksum = Mock()
+
+        self.step.download_succeeded(self.report)
+        self.report.destination.close.assert_called_once_with()
+        self.assertFalse(self.step.validate_file.called)
+        unit.import_content.assert_called_once_with('/no/where', disposable=True)
+        self.step.cache_checksum.assert_called_once_with('/storage/where', 'sha256', 'abc')
+        self.assertEqual(1, self.step.progress_successes)
+
     def test_download_failed(self):
         self.assertEqual(0, self.step.progress_failures)
         self.step.download_failed(self.report)
@@ -2105,3 +2453,77 @@ class TestLazyUnitDownloadStep(unittest.TestCase):
     def test_validate_file_no_checksum(self, mock_isfile):
         mock_isfile.return_value = False
         self.assertRaises(IOError, self.step.validate_file, '/no/where', None, None)
+
+    def test_validate_download_digest(self):
+        """Assert the checksum calculated during the download is compared."""
+        destination = Mock(spec=repo_controller.DigestingFile, path='/no/where',
+                           checksum_type='sha256')
+        destination.hexdigest.return_value = 'abc'
+        self.step.validate_file = Mock()
+
+        self.step.validate_download(destination, 'sha256', 'abc')
+        self.assertRaises(repo_controller.VerificationException,
+                          self.step.validate_download, destination, 'sha256', 'def')
+        self.assertFalse(self.step.validate_file.called)
+
+    @patch(MODULE + 'LazyUnitDownloadStep.validate_file')
+    def test_validate_download_no_digest(self, mock_validate_file):
+        """Assert the file is read when no checksum was calculated during the download."""
+        destination = Mock(spec=repo_controller.DigestingFile, path='/no/where',
+                           checksum_type=None)
+        destination.hexdigest.return_value = None
+
+        self.step.validate_download(destination, None, None)
+        mock_validate_file.assert_called_once_with('/no/where', None, None)
+        self.step.validate_download('/no/where', 'sha256', 'abc')
+        mock_validate_file.assert_called_with('/no/where', 'sha256', 'abc')
+
+    @patch(MODULE + 'model.FileChecksum')
+    @patch(MODULE + 'os.stat')
+    @patch(MODULE + 'LazyUnitDownloadStep.validate_file')
+    def test_validate_stored_file_cached(self, mock_validate_file, mock_stat, mock_checksum):
+        """Assert files with cached checksums are not read."""
+        mock_checksum.get_checksum.return_value = 'abc'
+
+        self.step.validate_stored_file('/storage/where', 'sha256', 'abc')
+        mock_checksum.get_checksum.assert_called_once_with(
+            '/storage/where', 'sha256', mock_stat.return_value)
+        self.assertRaises(repo_controller.VerificationException,
+                          self.step.validate_stored_file, '/storage/where', 'sha256', 'def')
+        self.assertFalse(mock_validate_file.called)
+        self.assertFalse(mock_checksum.set_checksum.called)
+
+    @patch(MODULE + 'model.FileChecksum')
+    @patch(MODULE + 'os.stat')
+    @patch(MODULE + 'LazyUnitDownloadStep.validate_file')
+    def test_validate_stored_file_not_cached(self, mock_validate_file, mock_stat,
+                                             mock_checksum):
+        """Assert files are read and their checksum cached when not already cached."""
+        mock_checksum.get_checksum.return_value = None
+
+        self.step.validate_stored_file('/storage/where', 'sha256', 'abc')
+        mock_validate_file.assert_called_once_with('/storage/where', 'sha256', 'abc')
+        mock_checksum.set_checksum.assert_called_once_with(
+            '/storage/where', 'sha256', mock_stat.return_value, 'abc')
+
+    @patch(MODULE + 'model.FileChecksum')
+    @patch(MODULE + 'LazyUnitDownloadStep.validate_file')
+    def test_validate_stored_file_invalid(self, mock_validate_file, mock_checksum):
+        """Assert checksums that fail verification are not cached."""
+        mock_checksum.get_checksum.return_value = None
+        mock_validate_file.side_effect = repo_controller.VerificationException('def')
+
+        with patch(MODULE + 'os.stat'):
+            self.assertRaises(repo_controller.VerificationException,
+                              self.step.validate_stored_file, '/storage/where', 'sha256', 'abc')
+        self.assertFalse(mock_checksum.set_checksum.called)
+        self.assertRaises(IOError, self.step.validate_stored_file, '/no/where', 'sha256', 'abc')
+
+    @patch(MODULE + 'model.FileChecksum')
+    @patch(MODULE + 'os.stat')
+    def test_cache_checksum(self, mock_stat, mock_checksum):
+        self.step.cache_checksum('/storage/where', 'sha256', 'abc')
+        mock_checksum.set_checksum.assert_called_once_with(
+            '/storage/where', 'sha256', mock_stat.return_value, 'abc')
+        self.step.cache_checksum('/storage/where', None, None)
+        self.assertEqual(mock_checksum.set_checksum.call_count, 1)
@@ -169,85 +169,44 @@ class TestIsLastSuperUser(unittest.TestCase):
         self.assertTrue(user_controller.is_last_super_user('test'))
 
 
-@mock.patch('pulp.server.controllers.user.manager_factory')
+@mock.patch('pulp.server.controllers.user.permission_index.index')
 @mock.patch('pulp.server.controllers.user.model.User')
 class TestIsAuthorized(unittest.TestCase):
     """
     Tests for determining whether a user is authorized to view a resource.
     """
 
-    def test_super_user(self, mock_model, mock_f):
+    def test_super_user(self, mock_model, mock_index):
         """
         Ensure that super users have access to everything.
         """
         m_user = mock_model.objects.get_or_404.return_value
         m_user.is_superuser.return_value = True
-        self.assertTrue(m_user.is_superuser('some_resource', 'superuser', 'op'))
+        self.assertTrue(user_controller.is_authorized('/some/resource/', 'superuser', 'op'))
+        self.assertFalse(mock_index.is_authorized.called)
 
-    def test_explicit_access(self, mock_model, mock_f):
+    def test_permission_index(self, mock_model, mock_index):
         """
-        Ensure that a user with access to a resource url is authorized for it.
+        Ensure that other users are authorized using the permission index.
         """
         m_user = mock_model.objects.get_or_404.return_value
         m_user.is_superuser.return_value = False
-        mock_pqm = mock_f.permission_query_manager.return_value
-        mock_pqm.find_by_resource.return_value = '/mock/resource/'
-        mock_pqm.find_user_permission.return_value = ['op']
+        mock_index.is_authorized.return_value = False
 
-        self.assertTrue(user_controller.is_authorized('/mock/resource/', 'testuser', 'op'))
-        mock_pqm.find_by_resource.assert_called_once_with('/mock/resource/')
-        mock_pqm.find_user_permission.assert_called_once_with('/mock/resource/', 'testuser')
+        self.assertFalse(user_controller.is_authorized('/mock/resource/', 'testuser', 'op'))
+        mock_model.objects.get_or_404.assert_called_once_with(login='testuser')
+        mock_index.is_authorized.assert_called_once_with('/mock/resource/', 'testuser', 'op')
 
-    def test_subdomain_access(self, mock_model, mock_f):
+    def test_user_fetched(self, mock_model, mock_index):
         """
-        Ensure that a user with access to the subdomain of a url has access to the url.
+        Ensure that a user that has already been fetched is not fetched again.
         """
-
-        def base_only(permission, login):
-            """
-            Simulate permission over a subdomain, but nothing else.
-            """
-            if permission == '/mock/':
-                return ['op']
-            else:
-                return []
-
-        m_user = mock_model.objects.get_or_404.return_value
+        m_user = mock.Mock()
         m_user.is_superuser.return_value = False
-        mock_pqm = mock_f.permission_query_manager.return_value
-        mock_pqm.find_by_resource.side_effect = lambda x: x
-        mock_pqm.find_user_permission.side_effect = base_only
-
-        self.assertTrue(user_controller.is_authorized('/mock/resource/', 'test-user', 'op'))
-        self.assertTrue(user_controller.is_authorized('/mock/other_resource/', 'test-user', 'op'))
-        self.assertFalse(user_controller.is_authorized('/other/', 'test-user', 'op'))
-        self.assertFalse(user_controller.is_authorized('/', 'test-user', 'op'))
+        mock_index.is_authorized.return_value = True
 
-    @mock.patch('pulp.server.controllers.user.Permission.get_collection')
-    def test_root_access(self, mock_perm_collection, mock_model, mock_f):
-        """
-        Ensure that a user that has access to the root domain '/' has access to everything.
-        """
-
-        def root_only(permission, login):
-            """
-            Simulate permission over root domain, but nothing else.
-            """
-            if permission == '/':
-                return ['op']
-            else:
-                return []
-
-        m_user = mock_model.objects.get_or_404.return_value
-        m_user.is_superuser.return_value = False
-        mock_pqm = mock_f.permission_query_manager.return_value
-        mock_pqm.find_by_resource.side_effect = lambda x: x
-        mock_pqm.find_user_permission.side_effect = root_only
-        mock_perm_collection.return_value.find_one.return_value = '/'
-
-        self.assertTrue(user_controller.is_authorized('/mock/resource/', 'test-user', 'op'))
-        self.assertTrue(user_controller.is_authorized('/mock/other_resource/', 'test-user', 'op'))
-        self.assertTrue(user_controller.is_authorized('/', 'test-user', 'op'))
+        self.assertTrue(user_controller.is_authorized('/mock/', 'testuser', 'op', user=m_user))
+        self.assertFalse(mock_model.objects.get_or_404.called)
 
 
 @mock.patch('pulp.server.controllers.user.Role.get_collection')
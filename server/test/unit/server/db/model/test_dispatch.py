@@ -18,9 +18,9 @@ import mock
 from .... import base
 from pulp.common import constants, dateutils
 from pulp.server.db import model
-from pulp.server.db.model import TaskStatus
+from pulp.server.db.model import TaskStatus, dispatch
 from pulp.server.db.model.criteria import Criteria
-from pulp.server.db.model.dispatch import ScheduledCall, ScheduleEntry
+from pulp.server.db.model.dispatch import ScheduledCall, ScheduleEntry, ScheduleVersion
 from pulp.server.managers.factory import initialize
 
 
@@ -49,6 +49,24 @@ SCHEDULE = {
 initialize()
 
 
+@mock.patch.object(ScheduleVersion, 'get_collection')
+class TestScheduleVersion(unittest.TestCase):
+
+    def test_current(self, mock_get_collection):
+        mock_get_collection.return_value.find_one.return_value = {'_id': 'schedules', 'version': 3}
+        self.assertEqual(ScheduleVersion.current(), 3)
+        mock_get_collection.return_value.find_one.assert_called_once_with({'_id': 'schedules'})
+
+    def test_current_not_incremented(self, mock_get_collection):
+        mock_get_collection.return_value.find_one.return_value = None
+        self.assertEqual(ScheduleVersion.current(), 0)
+
+    def test_increment(self, mock_get_collection):
+        ScheduleVersion.increment()
+        mock_get_collection.return_value.update_one.assert_called_once_with(
+            {'_id': 'schedules'}, {'$inc': {'version': 1}}, upsert=True)
+
+
 class TestTaskStatus(unittest.TestCase):
     """
     Test the TaskStatus class.
@@ -443,6 +461,79 @@ class TestTaskStatus(unittest.TestCase):
         self.assertEqual(ts['exception'], None)
 
 
+@mock.patch('pulp.server.db.model.config')
+@mock.patch('pulp.server.db.model.TaskStatus._get_collection')
+class TestTaskStatusUpdateFields(unittest.TestCase):
+    """
+    Test the TaskStatus.update_fields() method.
+    """
+
+    def test_update(self, mock_get_collection, mock_config):
+        """
+        Ensure the fields are set by a single update that returns only the ID.
+        """
+        mock_config.getboolean.return_value = False
+        collection = mock_get_collection.return_value
+
+        updated = TaskStatus.update_fields('task-1', {'state': constants.CALL_ERROR_STATE,
+                                                      'result': {'a': 1}})
+
+        self.assertTrue(updated)
+        collection.find_one_and_update.assert_called_once_with(
+            {'task_id': 'task-1'},
+            {'$set': {'state': constants.CALL_ERROR_STATE, 'result': {'a': 1}}},
+            projection={'_id': True}, upsert=False, return_document=mock.ANY)
+
+    def test_unless_complete(self, mock_get_collection, mock_config):
+        """
+        Ensure tasks in a complete state are not matched.
+        """
+        mock_config.getboolean.return_value = False
+        collection = mock_get_collection.return_value
+        collection.find_one_and_update.return_value = None
+
+        updated = TaskStatus.update_fields('task-1', {'state': constants.CALL_RUNNING_STATE},
+                                           unless_complete=True, upsert=True)
+
+        self.assertFalse(updated)
+        query = collection.find_one_and_update.call_args[0][0]
+        self.assertEqual(query, {'task_id': 'task-1',
+                                 'state': {'$nin': constants.CALL_COMPLETE_STATES}})
+        self.assertTrue(collection.find_one_and_update.call_args[1]['upsert'])
+
+    def test_duplicate_key(self, mock_get_collection, mock_config):
+        """
+        Ensure the update is retried without upsert when the upsert inserts a duplicate.
+        """
+        mock_config.getboolean.return_value = False
+        collection = mock_get_collection.return_value
+        collection.find_one_and_update.side_effect = [model.DuplicateKeyError('dup'), None]
+
+        updated = TaskStatus.update_fields('task-1', {'state': constants.CALL_RUNNING_STATE},
+                                           unless_complete=True, upsert=True)
+
+        self.assertFalse(updated)
+        self.assertEqual(collection.find_one_and_update.call_count, 2)
+        self.assertFalse('upsert' in collection.find_one_and_update.call_args[1])
+
+    @mock.patch('pulp.server.db.model.send_taskstatus_message')
+    def test_message(self, mock_send, mock_get_collection, mock_config):
+        """
+        Ensure the updated document is sent when event notifications are enabled.
+        """
+        mock_config.getboolean.return_value = True
+        collection = mock_get_collection.return_value
+        collection.find_one_and_update.return_value = {
+            'task_id': 'task-1', 'state': constants.CALL_RUNNING_STATE}
+
+        TaskStatus.update_fields('task-1', {'state': constants.CALL_RUNNING_STATE})
+
+        self.assertTrue(collection.find_one_and_update.call_args[1]['projection'] is None)
+        document = mock_send.call_args[0][0]
+        self.assertEqual(document.state, constants.CALL_RUNNING_STATE)
+        self.assertEqual(mock_send.call_args[1], {'routing_key': 'tasks.task-1'})
+
+
 class TestScheduledCallInit(unittest.TestCase):
     def test_new(self):
         call = ScheduledCall('PT1M', 'pulp.tasks.dosomething')
@@ -678,6 +769,7 @@ class TestScheduledCallSave(unittest.TestCase):
         expected = call.as_dict()
         del expected['_id']
         mock_update.assert_called_once_with({'_id': fake_id}, expected)
+        self.assertFalse(mock_get_collection.return_value.update_one.called)
 
     def test_new(self, mock_get_collection):
         mock_insert = mock_get_collection.return_value.insert
@@ -689,6 +781,9 @@ class TestScheduledCallSave(unittest.TestCase):
         expected['_id'] = bson.ObjectId(expected['_id'])
         mock_insert.assert_called_once_with(expected)
         self.assertFalse(call._new)
+        # the schedule version is incremented
+        mock_get_collection.return_value.update_one.assert_called_once_with(
+            {'_id': 'schedules'}, {'$inc': {'version': 1}}, upsert=True)
 
 
 class TestScheduledCallCalculateTimes(unittest.TestCase):
@@ -795,6 +890,54 @@ class TestScheduledCallCalculateTimes(unittest.TestCase):
         self.assertEqual(expected_runs, 0)
 
 
+class TestScheduledCallRunTimes(unittest.TestCase):
+    @mock.patch('time.time')
+    def test_duration_resumed(self, mock_time):
+        """
+        Ensure the runs of a calendar interval are found from the most recent run already found.
+        """
+        mock_time.return_value = 1422784799.0  # Just before 2015-02-01T10:00Z UTC
+        call = ScheduledCall('2014-01-01T10:00Z/P1M', 'pulp.tasks.dosomething')
+        self.assertEqual(call._calculate_times()[5], 12)
+
+        mock_time.return_value = 1430474399.0  # Just before 2015-05-01T10:00Z UTC
+        with mock.patch.object(dispatch._RunTimes, '_start_walk') as mock_start_walk:
+            times = call._calculate_times()
+        self.assertFalse(mock_start_walk.called)
+        self.assertEqual(times[5], 15)
+        self.assertEqual(times, ScheduledCall('2014-01-01T10:00Z/P1M',
+                                              'pulp.tasks.dosomething')._calculate_times())
+
+    @mock.patch('time.time')
+    def test_duration_clock_back(self, mock_time):
+        """
+        Ensure the runs of a calendar interval are found again when the clock goes back.
+        """
+        mock_time.return_value = 1430474399.0  # Just before 2015-05-01T10:00Z UTC
+        call = ScheduledCall('2014-01-01T10:00Z/P1M', 'pulp.tasks.dosomething')
+        self.assertEqual(call._calculate_times()[5], 15)
+
+        mock_time.return_value = 1422784799.0  # Just before 2015-02-01T10:00Z UTC
+        self.assertEqual(call._calculate_times()[5], 12)
+
+    @mock.patch('time.time')
+    def test_first_run_changed(self, mock_time):
+        """
+        Ensure the cached run times are replaced when the first run changes.
+        """
+        mock_time.return_value = 1389307330.966561
+        call = ScheduledCall('2014-01-09T17:15Z/PT1H', 'pulp.tasks.dosomething')
+        self.assertEqual(call._calculate_times()[5], 5)
+
+        call.first_run = '2014-01-09T19:15Z'
+        self.assertEqual(call._calculate_times()[5], 3)
+
+    def test_not_saved(self):
+        call = ScheduledCall('PT1H', 'pulp.tasks.dosomething')
+        self.assertTrue(call._run_times is not None)
+        self.assertFalse('_run_times' in call.as_dict())
+
+
 class TestScheduledCallCalculateNextRun(unittest.TestCase):
     @mock.patch('time.time')
     def test_future(self, mock_time):
@@ -891,7 +1034,7 @@ class TestScheduleEntryInit(unittest.TestCase):
         self.assertTrue(entry._scheduled_call is call)
 
 
-@mock.patch.object(ScheduledCall, 'save')
+@mock.patch.object(ScheduledCall, 'get_collection')
 class TestScheduleEntryNextInstance(unittest.TestCase):
     def setUp(self):
         super(TestScheduleEntryNextInstance, self).setUp()
@@ -917,7 +1060,8 @@ class TestScheduleEntryNextInstance(unittest.TestCase):
 
         self.assertEqual(remaining - 1, self.call.remaining_runs)
 
-    def test_disables_for_remaining_runs(self, mock_save):
+    @mock.patch.object(dispatch.ScheduleVersion, 'increment')
+    def test_disables_for_remaining_runs(self, mock_increment, mock_save):
         self.call.remaining_runs = 1
         # just verify that we have the correct starting state
         self.assertTrue(self.call.enabled)
@@ -926,11 +1070,17 @@ class TestScheduleEntryNextInstance(unittest.TestCase):
 
         # call should have been disabled because the remaining_runs hit 0
         self.assertFalse(self.call.enabled)
+        # and the scheduler told to remove it
+        self.assertTrue(time.time() - self.call.last_updated < 1)
+        mock_increment.assert_called_once_with()
 
-    def test_calls_save(self, mock_save):
+    def test_sets_run_fields(self, mock_get_collection):
         next(self.entry)
 
-        mock_save.assert_called_once_with()
+        mock_get_collection.return_value.update.assert_called_once_with(
+            {'_id': bson.ObjectId(self.call.id)},
+            {'$set': {'last_run_at': self.call.last_run_at, 'total_run_count': 1,
+                      'remaining_runs': 4, 'enabled': True}})
 
     def test_returns_entry(self, mock_save):
         next_entry = next(self.entry)
@@ -1,7 +1,7 @@
 import unittest
 
 from mock import call, patch, MagicMock, Mock
-from pymongo.errors import AutoReconnect
+from pymongo.errors import AutoReconnect, BulkWriteError
 import unittest2
 
 from pulp.common import error_codes
@@ -788,6 +788,35 @@ class TestDatabaseRetryOnInitialConnectionSupport(unittest.TestCase):
                                                      mock_itertools.repeat.return_value)
 
 
+class TestBulkUpsert(unittest.TestCase):
+
+    def test_bulk_upsert(self):
+        collection = Mock()
+        operations = [Mock(), Mock()]
+        connection.bulk_upsert(collection, operations)
+        collection.bulk_write.assert_called_once_with(operations, ordered=False)
+
+    def test_bulk_upsert_nothing(self):
+        collection = Mock()
+        connection.bulk_upsert(collection, [])
+        self.assertFalse(collection.bulk_write.called)
+
+    def test_bulk_upsert_retries_duplicates(self):
+        collection = Mock()
+        collection.bulk_write.side_effect = [
+            BulkWriteError({'writeErrors': [{'index': 1, 'code': 11000}]}), None]
+        operations = [Mock(), Mock()]
+        connection.bulk_upsert(collection, operations)
+        collection.bulk_write.assert_called_with([operations[1]], ordered=False)
+
+    def test_bulk_upsert_raises(self):
+        collection = Mock()
+        collection.bulk_write.side_effect = BulkWriteError(
+            {'writeErrors': [{'index': 1, 'code': 2}]})
+        self.assertRaises(BulkWriteError, connection.bulk_upsert, collection, [Mock(), Mock()])
+        self.assertEqual(collection.bulk_write.call_count, 1)
+
+
 class TestGetDatabaseFunction(unittest.TestCase):
 
     @patch('pulp.server.db.connection._DATABASE')
@@ -12,7 +12,8 @@ import stat
 import tempfile
 
 from mongoengine import (ValidationError, BooleanField, DateTimeField, DictField,
-                         Document, IntField, ListField, StringField, QuerySetNoCache)
+                         Document, IntField, ListField, NotUniqueError, StringField,
+                         QuerySetNoCache)
 
 from pulp.common import dateutils
 from pulp.common.compat import unittest
@@ -480,7 +481,7 @@ class TestFileContentUnit(unittest.TestCase):
         file_storage.assert_called_once_with()
         storage.__enter__.assert_called_once_with()
         storage.__exit__.assert_called_once_with(None, None, None)
-        storage.put.assert_called_once_with(unit, path, None)
+        storage.put.assert_called_once_with(unit, path, None, disposable=False)
 
     @patch('os.path.isfile')
     @patch('pulp.server.db.model.FileStorage')
@@ -502,7 +503,7 @@ class TestFileContentUnit(unittest.TestCase):
         file_storage.assert_called_once_with()
         storage.__enter__.assert_called_once_with()
         storage.__exit__.assert_called_once_with(None, None, None)
-        storage.put.assert_called_once_with(unit, path, location)
+        storage.put.assert_called_once_with(unit, path, location, disposable=False)
 
     def test_import_content_unit_not_saved(self):
         try:
@@ -1390,6 +1391,86 @@ class TestDeferredDownload(unittest.TestCase):
         self.assertEquals(model.DeferredDownload._meta['collection'], 'deferred_download')
 
 
+class TestFileChecksum(unittest.TestCase):
+    """
+    Test the FileChecksum class.
+    """
+
+    def setUp(self):
+        self.file_stat = Mock(st_size=10, st_mtime=1234.5, st_ino=99)
+
+    def test_model_superclass(self):
+        sample_model = model.FileChecksum()
+        self.assertTrue(isinstance(sample_model, model.AutoRetryDocument))
+
+    def test_indexes(self):
+        result = model.FileChecksum.list_indexes()
+        self.assertEqual([[('path', 1), ('algorithm', 1)], [(u'_id', 1)]], result)
+
+    def test_meta_collection(self):
+        """
+        Assert that the collection name is correct.
+        """
+        self.assertEquals(model.FileChecksum._meta['collection'], 'file_checksums')
+
+    @patch('pulp.server.db.model.FileChecksum.objects')
+    def test_get_checksum(self, mock_objects):
+        """
+        Assert the cached checksum is returned when the file is unchanged.
+        """
+        mock_objects.return_value.first.return_value = Mock(
+            size=10, mtime=1234.5, inode=99, checksum='abc')
+        checksum = model.FileChecksum.get_checksum('/a/b', 'sha256', self.file_stat)
+        mock_objects.assert_called_once_with(path='/a/b', algorithm='sha256')
+        self.assertEqual(checksum, 'abc')
+
+    @patch('pulp.server.db.model.FileChecksum.objects')
+    def test_get_checksum_changed(self, mock_objects):
+        """
+        Assert None is returned when the file has changed.
+        """
+        for changed in ({'size': 11}, {'mtime': 1234.6}, {'inode': 100}):
+            attributes = dict(size=10, mtime=1234.5, inode=99, checksum='abc')
+            attributes.update(changed)
+            mock_objects.return_value.first.return_value = Mock(**attributes)
+            self.assertTrue(
+                model.FileChecksum.get_checksum('/a/b', 'sha256', self.file_stat) is None)
+
+    @patch('pulp.server.db.model.FileChecksum.objects')
+    def test_get_checksum_not_cached(self, mock_objects):
+        mock_objects.return_value.first.return_value = None
+        self.assertTrue(model.FileChecksum.get_checksum('/a/b', 'sha256', self.file_stat) is None)
+
+    @patch('pulp.server.db.model.FileChecksum.objects')
+    def test_set_checksum(self, mock_objects):
+        model.FileChecksum.set_checksum('/a/b', 'sha256', self.file_stat, 'abc')
+        mock_objects.assert_called_once_with(path='/a/b', algorithm='sha256')
+        mock_objects.return_value.update_one.assert_called_once_with(
+            upsert=True, set__checksum='abc', set__size=10, set__mtime=1234.5, set__inode=99)
+
+    @patch('pulp.server.db.model.FileChecksum.objects')
+    def test_set_checksum_concurrent(self, mock_objects):
+        mock_objects.return_value.update_one.side_effect = NotUniqueError()
+        model.FileChecksum.set_checksum('/a/b', 'sha256', self.file_stat, 'abc')
+
+    @patch('pulp.server.db.model.os.path.isdir')
+    @patch('pulp.server.db.model.FileChecksum.objects')
+    def test_delete_checksums(self, mock_objects, mock_isdir):
+        """
+        Assert the checksums of files, and of the files in directories, are deleted.
+        """
+        mock_isdir.side_effect = lambda path: path == '/a/dir'
+        model.FileChecksum.delete_checksums(['/a/b', '/a/dir', '/a/c'])
+        self.assertEqual(mock_objects.call_args_list,
+                         [call(path__startswith='/a/dir/'), call(path__in=['/a/b', '/a/c'])])
+        self.assertEqual(mock_objects.return_value.delete.call_count, 2)
+
+    @patch('pulp.server.db.model.FileChecksum.objects')
+    def test_delete_checksums_empty(self, mock_objects):
+        model.FileChecksum.delete_checksums([])
+        self.assertFalse(mock_objects.called)
+
+
 class TestUser(unittest.TestCase):
     """
     Tests for the User model.
@@ -2,6 +2,7 @@
 This module contains tests for the pulp.server.db.reaper module.
 """
 from datetime import timedelta
+import threading
 import unittest
 
 import mock
@@ -12,6 +13,7 @@ from pulp.server.db import model
 from pulp.server.db import reaper
 from pulp.server.db.model import celery_result, consumer, repo_group, repository
 from pulp.server.db.model.consumer import ConsumerHistoryEvent
+from pulp.server.db.model import reaper_base
 from pulp.server.db.model.reaper_base import _create_expired_object_id, ReaperMixin
 
 
@@ -70,6 +72,199 @@ class TestCreateExpiredObjectId(unittest.TestCase):
         self.assertTrue(isinstance(expired_oid, ObjectId))
 
 
+class FakeCollection(object):
+    """
+    In-memory collection of documents with sortable _ids.
+    """
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+        self.removes = []
+
+    def find(self, query, projection=None, sort=None, limit=0):
+        matched = [i for i in self.ids if i <= query['_id']['$lte']]
+        return [{'_id': i} for i in matched[:limit]]
+
+    def remove(self, query):
+        self.removes.append(query)
+        if '$in' in query['_id']:
+            self.ids = [i for i in self.ids if i not in query['_id']['$in']]
+        else:
+            self.ids = [i for i in self.ids
+                        if not query['_id']['$gte'] <= i <= query['_id']['$lte']]
+
+
+class TestRemoveInBatches(unittest.TestCase):
+    """
+    Test the remove_in_batches() function.
+    """
+
+    def test_id_ranges(self):
+        """
+        Ensure the documents are removed by bounded ranges of _ids and progress is reported.
+        """
+        collection = FakeCollection(range(10))
+        progress = mock.Mock()
+
+        removed = reaper_base.remove_in_batches(collection, {'_id': {'$lte': 6}}, 3,
+                                                progress=progress)
+
+        self.assertEqual(removed, 7)
+        self.assertEqual(collection.ids, [7, 8, 9])
+        self.assertEqual(collection.removes, [{'_id': {'$gte': 0, '$lte': 2}},
+                                              {'_id': {'$gte': 3, '$lte': 5}},
+                                              {'_id': {'$gte': 6, '$lte': 6}}])
+        self.assertEqual(progress.call_args_list, [mock.call(3), mock.call(6), mock.call(7)])
+
+    def test_id_list(self):
+        """
+        Ensure the documents are removed by lists of _ids when ranges cannot be used.
+        """
+        collection = FakeCollection(range(5))
+
+        removed = reaper_base.remove_in_batches(collection, {'_id': {'$lte': 4}}, 3,
+                                                id_ranges=False)
+
+        self.assertEqual(removed, 5)
+        self.assertEqual(collection.removes, [{'_id': {'$in': [0, 1, 2]}},
+                                              {'_id': {'$in': [3, 4]}}])
+
+    @mock.patch('pulp.server.db.model.reaper_base.time')
+    def test_pause(self, mock_time):
+        """
+        Ensure there is a pause between batches, but not after the last batch.
+        """
+        collection = FakeCollection(range(5))
+
+        reaper_base.remove_in_batches(collection, {'_id': {'$lte': 4}}, 2, batch_pause=0.5)
+
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(0.5), mock.call(0.5)])
+
+    def test_stop(self):
+        """
+        Ensure no more batches are removed once stop is set.
+        """
+        collection = FakeCollection(range(10))
+        stop = threading.Event()
+
+        removed = reaper_base.remove_in_batches(collection, {'_id': {'$lte': 9}}, 3, stop=stop,
+                                                progress=lambda removed: stop.set())
+
+        self.assertEqual(removed, 3)
+        self.assertEqual(len(collection.removes), 1)
+
+
+class TestReapOldDocuments(unittest.TestCase):
+    """
+    Test the batch size of ReaperMixin.reap_old_documents().
+    """
+
+    @mock.patch('pulp.server.db.model.reaper_base.remove_in_batches')
+    def test_unbatched(self, mock_remove_in_batches):
+        collection = mock.Mock()
+        model_class = type('Reaped', (ReaperMixin,),
+                           {'get_collection': classmethod(lambda cls: collection)})
+
+        model_class.reap_old_documents(1)
+
+        self.assertEqual(collection.remove.call_count, 1)
+        self.assertFalse(mock_remove_in_batches.called)
+
+    @mock.patch('pulp.server.db.model.reaper_base.remove_in_batches')
+    def test_batched(self, mock_remove_in_batches):
+        collection = mock.Mock()
+        model_class = type('Reaped', (ReaperMixin,),
+                           {'get_collection': classmethod(lambda cls: collection)})
+        stop, progress = mock.Mock(), mock.Mock()
+
+        model_class.reap_old_documents(1, batch_size=100, batch_pause=2, stop=stop,
+                                       progress=progress)
+
+        self.assertFalse(collection.remove.called)
+        mock_remove_in_batches.assert_called_once_with(
+            collection, {'_id': {'$lte': mock.ANY}}, 100, 2, stop, progress)
+
+    @mock.patch('pulp.server.db.model.celery_result.remove_in_batches')
+    @mock.patch('pulp.server.db.model.celery_result.CeleryResult.get_collection')
+    def test_celery_result_batched(self, mock_get_collection, mock_remove_in_batches):
+        celery_result.CeleryResult.reap_old_documents(1, batch_size=100)
+
+        mock_remove_in_batches.assert_called_once_with(
+            mock_get_collection.return_value, {'date_done': {'$lt': mock.ANY}}, 100, 0, None,
+            None, id_ranges=False)
+
+
+class TestReapExpiredDocumentsBatches(unittest.TestCase):
+    """
+    Test the batches and progress of the reap_expired_documents() Task.
+    """
+
+    def setUp(self):
+        self.model_classes = [mock.Mock(), mock.Mock()]
+        collections = {self.model_classes[0]: 'task_status_history',
+                       self.model_classes[1]: 'consumer_history'}
+        patches = [
+            mock.patch.object(reaper, '_COLLECTION_TIMEDELTAS', collections),
+            mock.patch('pulp.server.db.reaper.pulp_config.config'),
+            mock.patch('pulp.server.db.reaper.get_current_task_id', return_value='task-1'),
+            mock.patch('pulp.server.db.reaper.progress'),
+        ]
+        self.config, self.task_id, self.progress = [p.start() for p in patches][1:]
+        for patch in patches:
+            self.addCleanup(patch.stop)
+        self.config.getint.return_value = 100
+        self.config.getfloat.return_value = 0.5
+
+    def test_progress(self):
+        """
+        Ensure the number of documents removed from each collection is reported.
+        """
+        def reap(config_days, progress, **kwargs):
+            progress(100)
+            progress(150)
+        for model_class in self.model_classes:
+            model_class.reap_old_documents.side_effect = reap
+
+        reaper._reap_expired_documents(threading.Event())
+
+        self.assertEqual(self.model_classes[0].reap_old_documents.call_args[1]['batch_size'], 100)
+        self.assertEqual(self.model_classes[0].reap_old_documents.call_args[1]['batch_pause'],
+                         0.5)
+        update = self.progress.aggregator.return_value.update
+        self.assertEqual(update.call_count, 4)
+        self.assertEqual(update.call_args[0], (
+            'task-1', {'reaper': {'task_status_history': 150, 'consumer_history': 150}}))
+
+    def test_stop(self):
+        """
+        Ensure the remaining collections are skipped once stop is set.
+        """
+        stop = threading.Event()
+
+        def reap(config_days, stop, **kwargs):
+            stop.set()
+        for model_class in self.model_classes:
+            model_class.reap_old_documents.side_effect = reap
+
+        reaper._reap_expired_documents(stop)
+
+        self.assertEqual(sum(m.reap_old_documents.call_count for m in self.model_classes), 1)
+
+    @mock.patch('pulp.server.db.reaper.register_sigterm_handler')
+    def test_sigterm_stops(self, mock_register):
+        """
+        Ensure the task stops reaping when the worker is shut down.
+        """
+        reaper.reap_expired_documents()
+
+        f, handler = mock_register.call_args[0]
+        self.assertTrue(f is reaper._reap_expired_documents)
+        stop = mock_register.return_value.call_args[0][0]
+        self.assertFalse(stop.is_set())
+        handler()
+        self.assertTrue(stop.is_set())
+
+
 class TestReapInheritance(unittest.TestCase):
     """
     Check class inheritance related to ReaperMixin
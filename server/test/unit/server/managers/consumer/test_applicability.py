@@ -1,15 +1,19 @@
 import mock
+from pymongo.errors import BulkWriteError
 
 from .... import base
 from pulp.devel import mock_plugins
 from pulp.devel.skip import skip_broken
 from pulp.plugins.loader import api as plugins
+from pulp.plugins.profiler import Profiler
 from pulp.server.controllers import distributor as dist_controller
+from pulp.server.controllers import repository as repo_controller
 from pulp.server.db import model
 from pulp.server.db.model.consumer import (Bind, Consumer, RepoProfileApplicability,
                                            UnitProfile)
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.db.model import Repository
+from pulp.server.db.model.repository import RepoContentDelta, RepoContentDeltaStatus
 from pulp.server.managers import factory as factory
 from pulp.server.managers.consumer.applicability import (
     _add_consumers_to_applicability_map, _add_profiles_to_consumer_map_and_get_hashes,
@@ -21,6 +25,26 @@ from pulp.server.managers.consumer.cud import ConsumerManager
 from pulp.server.managers.consumer.profile import ProfileManager
 
 
+class DeltaProfiler(Profiler):
+    """
+    A profiler that supports incremental applicability calculation.
+    """
+
+    def __init__(self):
+        self.full = mock.Mock(return_value={'rpm': ['rpm-1']})
+        self.delta = mock.Mock(return_value={'rpm': ['rpm-1', 'rpm-3']})
+
+    @classmethod
+    def metadata(cls):
+        return {'types': ['rpm']}
+
+    def calculate_applicable_units(self, *args):
+        return self.full(*args)
+
+    def calculate_applicable_units_delta(self, *args):
+        return self.delta(*args)
+
+
 class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
 
     CONSUMER_IDS = ['consumer-1', 'consumer-2']
@@ -286,22 +310,475 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
         self.assertEqual(applicability_list[0]['profile'], self.PROFILE1)
         self.assertEqual(applicability_list[0]['applicability'], expected_applicability)
 
-    @skip_broken
     @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
     @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
     @mock.patch('pulp.server.db.model.consumer.UnitProfile.get_collection')
     def test_batch_regenerate_applicability(self, mock_unit_profile_get_collection,
                                             mock_repo_profile_app_get_collection, mock_repo_qs):
-        factory.initialize()
-        applicability_manager = ApplicabilityRegenerationManager()
-        mock_repo = mock.MagicMock()
-        mock_repo.repo_id = 'fake-repo'
-        mock_repo_qs.find_by_criteria.return_value = [mock_repo]
-        profile_hashes = ({'profile_hash': 'mock-hash-1'}, {'profile_hash': 'mock-hash-2'})
-        applicability_manager.batch_regenerate_applicability('mock_repo', profile_hashes)
-        expected_params = {'profile_hash': {'$in': ['mock-hash-1', 'mock-hash-2']},
-                           'repo_id': 'mock_repo'}
-        mock_repo_profile_app_get_collection.return_value.find.assert_called_with(expected_params)
+        mock_repo_qs.return_value.only.return_value = [
+            Repository(repo_id='repo-1', content_unit_counts={'rpm': 1, 'erratum': 0}),
+            Repository(repo_id='repo-2', content_unit_counts={'rpm': 0})]
+        mock_unit_profile_get_collection.return_value.find.return_value = [
+            {'id': 'id-1', 'profile_hash': 'hash-1', 'content_type': 'rpm', 'profile': 'p1'},
+            {'id': 'id-2', 'profile_hash': 'hash-2', 'content_type': 'rpm', 'profile': 'p2'}]
+        profiles_to_process = [
+            ('repo-1', 'hash-1', [('hash-1', 'rpm', 'id-1')]),
+            ('repo-1', 'hash-2', [('hash-2', 'rpm', 'id-2')]),
+            ('repo-1', 'hash-3', [('hash-3', 'rpm', 'id-3')]),
+            ('repo-2', 'hash-1', [('hash-1', 'rpm', 'id-1')])]
+
+        ApplicabilityRegenerationManager.batch_regenerate_applicability(profiles_to_process)
+
+        # repositories and profiles are each loaded with one query
+        mock_repo_qs.assert_called_once_with(repo_id__in=mock.ANY)
+        self.assertEqual(set(mock_repo_qs.call_args[1]['repo_id__in']), set(['repo-1', 'repo-2']))
+        self.assertEqual(mock_unit_profile_get_collection.return_value.find.call_count, 1)
+        # the removed profile and the repository without applicable content are skipped
+        bulk_write = mock_repo_profile_app_get_collection.return_value.bulk_write
+        self.assertEqual(bulk_write.call_count, 1)
+        operations = bulk_write.call_args[0][0]
+        self.assertEqual([o._filter for o in operations], [
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1', 'profile_hash': 'hash-1'},
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-2', 'profile_hash': 'hash-2'}])
+        expected_applicability = {'rpm': ['rpm-1', 'rpm-2'], 'erratum': ['errata-1', 'errata-2']}
+        for operation in operations:
+            self.assertEqual(operation._doc, {'$set': {'applicability': expected_applicability,
+                                                       'revision': mock.ANY},
+                                              '$setOnInsert': {'profile': []}})
+            self.assertTrue(operation._upsert)
+        self.assertEqual(bulk_write.call_args[1], {'ordered': False})
+
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_profiler')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
+    @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
+    @mock.patch('pulp.server.db.model.consumer.UnitProfile.get_collection')
+    def test_batch_regenerate_applicability_delta(self, mock_unit_profile_get_collection,
+                                                  mock_repo_profile_app_get_collection,
+                                                  mock_repo_qs, mock_profiler):
+        profiler = DeltaProfiler()
+        mock_profiler.return_value = (profiler, {})
+        mock_repo_qs.return_value.only.return_value = [
+            Repository(repo_id='repo-1', content_unit_counts={'rpm': 3}),
+            Repository(repo_id='repo-2', content_unit_counts={'rpm': 1})]
+        mock_unit_profile_get_collection.return_value.find.return_value = [
+            {'id': 'id-1', 'profile_hash': 'hash-1', 'content_type': 'rpm', 'profile': 'p1'}]
+        collection = mock_repo_profile_app_get_collection.return_value
+        collection.find.return_value = [
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1',
+             'applicability': {'rpm': ['rpm-1']}, 'revision': 'r4'}]
+        collection.bulk_write.return_value.matched_count = 1
+        added = {'rpm': ['rpm-3']}
+        repo_deltas = {'repo-1': {'added': added, 'removed': {}}}
+        profiles_to_process = [
+            ('repo-1', 'hash-1', [('hash-1', 'rpm', 'id-1')]),
+            ('repo-2', 'hash-1', [('hash-1', 'rpm', 'id-1')])]
+
+        ApplicabilityRegenerationManager.batch_regenerate_applicability(profiles_to_process,
+                                                                        repo_deltas)
+
+        # the existing applicability of repo-1 is updated, repo-2 has no known delta
+        profiler.delta.assert_called_once_with(
+            [('hash-1', 'rpm', 'p1')], 'repo-1', {'rpm': ['rpm-1']}, added, {}, mock.ANY,
+            mock.ANY)
+        profiler.full.assert_called_once_with(
+            [('hash-1', 'rpm', 'p1')], 'repo-2', mock.ANY, mock.ANY)
+        # the update of repo-1 is conditional on the revision that was read
+        self.assertEqual(collection.bulk_write.call_count, 2)
+        operation, = collection.bulk_write.call_args_list[0][0][0]
+        self.assertEqual(operation._filter, {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1',
+                                             'profile_hash': 'hash-1', 'revision': 'r4'})
+        revision = operation._doc['$set']['revision']
+        self.assertNotEqual(revision, 'r4')
+        self.assertEqual(operation._doc, {'$set': {'applicability': {'rpm': ['rpm-1', 'rpm-3']},
+                                                   'revision': revision}})
+        self.assertFalse(operation._upsert)
+        operation, = collection.bulk_write.call_args_list[1][0][0]
+        self.assertEqual(operation._filter['repo_id'], 'repo-2')
+        self.assertEqual(operation._doc['$set'], {'applicability': {'rpm': ['rpm-1']},
+                                                  'revision': revision})
+        self.assertTrue(operation._upsert)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_profiler')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
+    @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
+    @mock.patch('pulp.server.db.model.consumer.UnitProfile.get_collection')
+    def test_batch_regenerate_applicability_delta_conflict(self, mock_unit_profile_get_collection,
+                                                           mock_repo_profile_app_get_collection,
+                                                           mock_repo_qs, mock_profiler):
+        """
+        Assert that applicability written by another regeneration since it was read is
+        calculated from scratch.
+        """
+        profiler = DeltaProfiler()
+        mock_profiler.return_value = (profiler, {})
+        mock_repo_qs.return_value.only.return_value = [
+            Repository(repo_id='repo-1', content_unit_counts={'rpm': 3})]
+        mock_unit_profile_get_collection.return_value.find.return_value = [
+            {'id': 'id-1', 'profile_hash': 'hash-1', 'content_type': 'rpm', 'profile': 'p1'}]
+        collection = mock_repo_profile_app_get_collection.return_value
+        collection.find.side_effect = [
+            [{'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1',
+              'applicability': {'rpm': ['rpm-1']}, 'revision': 'r4'}],
+            [{'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1', 'revision': 'r5'}]]
+        collection.bulk_write.return_value.matched_count = 0
+        repo_deltas = {'repo-1': {'added': {'rpm': ['rpm-3']}, 'removed': {}}}
+
+        ApplicabilityRegenerationManager.batch_regenerate_applicability(
+            [('repo-1', 'hash-1', [('hash-1', 'rpm', 'id-1')])], repo_deltas)
+
+        self.assertEqual(profiler.delta.call_count, 1)
+        profiler.full.assert_called_once_with(
+            [('hash-1', 'rpm', 'p1')], 'repo-1', mock.ANY, mock.ANY)
+        self.assertEqual(collection.bulk_write.call_count, 2)
+        operation, = collection.bulk_write.call_args_list[1][0][0]
+        self.assertEqual(operation._filter, {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1',
+                                             'profile_hash': 'hash-1'})
+        self.assertEqual(operation._doc['$set']['applicability'], {'rpm': ['rpm-1']})
+        self.assertTrue(operation._upsert)
+
+    @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
+    def test_get_conflicting_applicability(self, mock_get_collection):
+        mock_get_collection.return_value.find.return_value = [
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1', 'revision': 'r'},
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-2', 'revision': 'other'},
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-2', 'revision': 'r'},
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-3', 'revision': 'other'},
+            {'repo_id': 'repo-2', 'all_profiles_hash': 'hash-1', 'revision': 'other'}]
+        patched = dict.fromkeys([('repo-1', 'hash-1'), ('repo-1', 'hash-2'),
+                                 ('repo-1', 'hash-3'), ('repo-1', 'hash-4')])
+
+        conflicts = ApplicabilityRegenerationManager._get_conflicting_applicability(patched, 'r')
+
+        # a profile of hash-2 and hash-3 were written by another regeneration, and hash-4
+        # was removed
+        self.assertEqual(conflicts, set([('repo-1', 'hash-2'), ('repo-1', 'hash-3'),
+                                         ('repo-1', 'hash-4')]))
+
+    @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
+    def test_get_existing_applicability_map(self, mock_get_collection):
+        mock_get_collection.return_value.find.return_value = [
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1', 'applicability': {}},
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-2', 'applicability': {},
+             'revision': 'r1'},
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-2', 'applicability': {},
+             'revision': 'r2'},
+            {'repo_id': 'repo-2', 'all_profiles_hash': 'hash-1', 'applicability': {}}]
+
+        existing = ApplicabilityRegenerationManager._get_existing_applicability_map(
+            [('repo-1', 'hash-1'), ('repo-1', 'hash-2')])
+
+        self.assertEqual(existing, {
+            ('hash-1', 'repo-1'): {'applicability': {}, 'revision': None},
+            ('hash-2', 'repo-1'): None})
+
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_profiler')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
+    @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
+    @mock.patch('pulp.server.db.model.consumer.UnitProfile.get_collection')
+    def test_batch_regenerate_applicability_unchanged(self, mock_unit_profile_get_collection,
+                                                      mock_repo_profile_app_get_collection,
+                                                      mock_repo_qs, mock_profiler):
+        profiler = DeltaProfiler()
+        mock_profiler.return_value = (profiler, {})
+        collection = mock_repo_profile_app_get_collection.return_value
+        collection.find.return_value = [
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1',
+             'applicability': {'rpm': ['rpm-1']}}]
+        repo_deltas = {'repo-1': {'added': {}, 'removed': {}}}
+
+        ApplicabilityRegenerationManager.batch_regenerate_applicability(
+            [('repo-1', 'hash-1', [('hash-1', 'rpm', 'id-1')])], repo_deltas)
+
+        # nothing is loaded, calculated or written
+        mock_unit_profile_get_collection.return_value.find.assert_called_once_with(
+            {'id': {'$in': []}}, projection=mock.ANY)
+        self.assertFalse(profiler.full.called)
+        self.assertFalse(profiler.delta.called)
+        self.assertFalse(collection.bulk_write.called)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_profiler')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
+    @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
+    @mock.patch('pulp.server.db.model.consumer.UnitProfile.get_collection')
+    def test_batch_regenerate_applicability_delta_no_change(self, mock_unit_profile_get_collection,
+                                                            mock_repo_profile_app_get_collection,
+                                                            mock_repo_qs, mock_profiler):
+        profiler = DeltaProfiler()
+        profiler.delta.return_value = {'rpm': ['rpm-1']}
+        mock_profiler.return_value = (profiler, {})
+        mock_repo_qs.return_value.only.return_value = [
+            Repository(repo_id='repo-1', content_unit_counts={'rpm': 3})]
+        mock_unit_profile_get_collection.return_value.find.return_value = [
+            {'id': 'id-1', 'profile_hash': 'hash-1', 'content_type': 'rpm', 'profile': 'p1'}]
+        collection = mock_repo_profile_app_get_collection.return_value
+        collection.find.return_value = [
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1',
+             'applicability': {'rpm': ['rpm-1']}, 'revision': 'r4'}]
+        collection.bulk_write.return_value.matched_count = 1
+        repo_deltas = {'repo-1': {'added': {}, 'removed': {'rpm': ['rpm-4']}}}
+
+        ApplicabilityRegenerationManager.batch_regenerate_applicability(
+            [('repo-1', 'hash-1', [('hash-1', 'rpm', 'id-1')])], repo_deltas)
+
+        # only the revision is incremented
+        self.assertEqual(profiler.delta.call_count, 1)
+        self.assertFalse(profiler.full.called)
+        operation, = collection.bulk_write.call_args_list[0][0][0]
+        self.assertEqual(operation._filter['revision'], 'r4')
+        self.assertEqual(operation._doc.keys(), ['$set'])
+        self.assertEqual(operation._doc['$set'].keys(), ['revision'])
+
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDeltaStatus.'
+                'get_collection')
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDelta.get_collection')
+    def test_get_repo_content_deltas(self, mock_get_collection, mock_get_status_collection):
+        mock_get_status_collection.return_value.find.return_value = [
+            {'_id': 10, 'version': 2, 'repo_id': 'repo-1'},
+            {'_id': 11, 'version': 7, 'repo_id': 'repo-2', 'full': True}]
+        mock_get_collection.return_value.find.return_value = [
+            {'_id': 1, 'version': 1, 'repo_id': 'repo-1', 'unit_type_id': 'rpm',
+             'unit_id': 'a', 'added': True},
+            {'_id': 2, 'version': 3, 'repo_id': 'repo-1', 'unit_type_id': 'erratum',
+             'unit_id': 'b', 'added': False}]
+
+        deltas, recorded = ApplicabilityRegenerationManager._get_repo_content_deltas(
+            ['repo-1', 'repo-2', 'repo-3'])
+
+        # changes are no longer recorded for repo-2 and were never recorded for repo-3
+        self.assertEqual(deltas, {
+            'repo-1': {'added': {'rpm': ['a']}, 'removed': {'erratum': ['b']}}})
+        mock_get_collection.return_value.find.assert_called_once_with(
+            {'repo_id': {'$in': ['repo-1']}}, projection=mock.ANY)
+        self.assertEqual([(m, o._filter) for m, o in recorded], [
+            (RepoContentDeltaStatus, {'_id': 10, 'version': 2}),
+            (RepoContentDeltaStatus, {'_id': 11, 'version': 7}),
+            (RepoContentDeltaStatus, {'repo_id': 'repo-3'}),
+            (RepoContentDelta, {'_id': 1, 'version': 1}),
+            (RepoContentDelta, {'_id': 2, 'version': 3})])
+        for model_class, operation in recorded[:2]:
+            self.assertEqual(operation._doc, {'$set': {'units': 0, 'full': False}})
+        self.assertEqual(recorded[2][1]._doc,
+                         {'$setOnInsert': {'units': 0, 'full': False, 'version': 0}})
+        self.assertTrue(recorded[2][1]._upsert)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDeltaStatus.'
+                'get_collection')
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDelta.get_collection')
+    def test_get_repo_content_deltas_unchanged(self, mock_get_collection,
+                                               mock_get_status_collection):
+        mock_get_status_collection.return_value.find.return_value = [
+            {'_id': 10, 'version': 2, 'repo_id': 'repo-1', 'units': 0}]
+        mock_get_collection.return_value.find.return_value = []
+
+        deltas, recorded = ApplicabilityRegenerationManager._get_repo_content_deltas(['repo-1'])
+
+        self.assertEqual(deltas, {'repo-1': {'added': {}, 'removed': {}}})
+        self.assertEqual(len(recorded), 1)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDeltaStatus.'
+                'get_collection')
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDelta.get_collection')
+    def test_get_repo_content_deltas_not_recorded(self, mock_get_collection,
+                                                  mock_get_status_collection):
+        """
+        Assert that a repository without a status is regenerated from scratch.
+        """
+        mock_get_status_collection.return_value.find.return_value = []
+
+        deltas, recorded = ApplicabilityRegenerationManager._get_repo_content_deltas(['repo-1'])
+
+        self.assertEqual(deltas, {})
+        self.assertEqual([o._filter for m, o in recorded], [{'repo_id': 'repo-1'}])
+        self.assertFalse(mock_get_collection.called)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDeltaStatus.'
+                'get_collection')
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDelta.get_collection')
+    def test_clear_repo_content_deltas(self, mock_get_collection, mock_get_status_collection):
+        status_operation = mock.Mock()
+        delta_operations = [mock.Mock(), mock.Mock()]
+        ApplicabilityRegenerationManager._clear_repo_content_deltas(
+            [(RepoContentDeltaStatus, status_operation),
+             (RepoContentDelta, delta_operations[0]), (RepoContentDelta, delta_operations[1])])
+        bulk_write = mock_get_collection.return_value.bulk_write
+        bulk_write.assert_called_once_with(delta_operations, ordered=False)
+        mock_get_status_collection.return_value.bulk_write.assert_called_once_with(
+            [status_operation], ordered=False)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDeltaStatus.'
+                'get_collection')
+    def test_clear_repo_content_deltas_status_inserted(self, mock_get_status_collection):
+        """
+        Assert that a status inserted concurrently by record_content_delta() is kept.
+        """
+        bulk_write = mock_get_status_collection.return_value.bulk_write
+        bulk_write.side_effect = BulkWriteError({'writeErrors': [{'code': 11000}]})
+        ApplicabilityRegenerationManager._clear_repo_content_deltas(
+            [(RepoContentDeltaStatus, mock.Mock())])
+        bulk_write.side_effect = BulkWriteError({'writeErrors': [{'code': 2}]})
+        self.assertRaises(BulkWriteError, ApplicabilityRegenerationManager.
+                          _clear_repo_content_deltas, [(RepoContentDeltaStatus, mock.Mock())])
+
+    @mock.patch('pulp.server.controllers.repository.connection.bulk_upsert')
+    @mock.patch('pulp.server.controllers.repository.Bind')
+    @mock.patch('pulp.server.controllers.repository.RepoContentDeltaStatus')
+    @mock.patch('pulp.server.controllers.repository.RepoContentDelta')
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_get_profiles_to_process')
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityRegenerationManager.'
+                '_profiler')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDelta.get_collection')
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDeltaStatus.'
+                'get_collection')
+    @mock.patch('pulp.server.db.model.consumer.RepoProfileApplicability.get_collection')
+    @mock.patch('pulp.server.db.model.consumer.UnitProfile.get_collection')
+    def test_regenerate_applicability_for_repos_too_many_changes(
+            self, mock_unit_profile_get_collection, mock_repo_profile_app_get_collection,
+            mock_get_status_collection, mock_get_delta_collection, mock_repo_qs, mock_profiler,
+            mock_get_profiles, m_delta, m_status, m_bind, m_bulk_upsert):
+        """
+        Assert that applicability is regenerated from scratch once more changes than are
+        recorded have been made to a repository.
+        """
+        # the status of the repository as stored by record_content_delta()
+        status = {'_id': 10, 'repo_id': 'repo-1', 'units': 0, 'version': 1}
+
+        def find_one_and_update(spec, update, **kwargs):
+            status['units'] += update['$inc']['units']
+            status['version'] += update['$inc']['version']
+            return dict(status)
+
+        status_collection = m_status.get_collection.return_value
+        status_collection.find_one_and_update.side_effect = find_one_and_update
+        status_collection.update.side_effect = lambda spec, update: status.update(update['$set'])
+        status_collection.remove.side_effect = lambda spec: status.clear()
+
+        repo_controller.record_content_delta(
+            'repo-1', 'rpm', ['unit-%d' % i for i in range(repo_controller.MAX_DELTA_UNITS + 1)],
+            True)
+
+        self.assertTrue(status['full'])
+        self.assertFalse(m_bulk_upsert.called)
+
+        profiler = DeltaProfiler()
+        mock_profiler.return_value = (profiler, {})
+        mock_repo_qs.find_by_criteria.return_value = [Repository(repo_id='repo-1')]
+        mock_repo_qs.return_value.only.return_value = [
+            Repository(repo_id='repo-1', content_unit_counts={'rpm': 3})]
+        mock_get_status_collection.return_value.find.return_value = [status]
+        mock_get_profiles.return_value = [('repo-1', 'hash-1', [('hash-1', 'rpm', 'id-1')])]
+        mock_unit_profile_get_collection.return_value.find.return_value = [
+            {'id': 'id-1', 'profile_hash': 'hash-1', 'content_type': 'rpm', 'profile': 'p1'}]
+        collection = mock_repo_profile_app_get_collection.return_value
+        collection.find.return_value = [
+            {'repo_id': 'repo-1', 'all_profiles_hash': 'hash-1',
+             'applicability': {'rpm': ['rpm-1']}, 'revision': 'r4'}]
+
+        ApplicabilityRegenerationManager.regenerate_applicability_for_repos(
+            self.REPO_CRITERIA.as_dict())
+
+        profiler.full.assert_called_once_with(
+            [('hash-1', 'rpm', 'p1')], 'repo-1', mock.ANY, mock.ANY)
+        self.assertFalse(profiler.delta.called)
+        self.assertFalse(mock_get_delta_collection.called)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.RepoContentDelta.get_collection')
+    def test_clear_repo_content_deltas_nothing(self, mock_get_collection):
+        ApplicabilityRegenerationManager._clear_repo_content_deltas([])
+        self.assertFalse(mock_get_collection.called)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.batch_regenerate_applicability_task')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_batch_size', return_value=1)
+    @mock.patch.object(ApplicabilityRegenerationManager, '_clear_repo_content_deltas')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_get_profiles_to_process')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_get_repo_content_deltas')
+    def test_queue_regenerate_applicability_for_repos_deltas(self, mock_get_deltas,
+                                                             mock_get_profiles, mock_clear,
+                                                             mock_batch_size, mock_repo_qs,
+                                                             mock_task):
+        mock_repo_qs.find_by_criteria.return_value = [Repository(repo_id='repo-1'),
+                                                      Repository(repo_id='repo-2')]
+        delta_1 = {'added': {'rpm': ['a']}, 'removed': {}}
+        mock_get_deltas.return_value = ({'repo-1': delta_1}, [(1, 1)])
+        mock_get_profiles.return_value = [('repo-1', 'hash-1', []), ('repo-2', 'hash-1', [])]
+
+        ApplicabilityRegenerationManager.queue_regenerate_applicability_for_repos(
+            self.REPO_CRITERIA.as_dict())
+
+        mock_get_deltas.assert_called_once_with(['repo-1', 'repo-2'])
+        self.assertEqual([c[0][0] for c in mock_task.apply_async.call_args_list], [
+            ([('repo-1', 'hash-1', [])], {'repo-1': delta_1}),
+            ([('repo-2', 'hash-1', [])], {})])
+        mock_clear.assert_called_once_with([(1, 1)])
+
+    @mock.patch('pulp.server.managers.consumer.applicability.batch_regenerate_applicability_task')
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_batch_size', return_value=10)
+    @mock.patch.object(ApplicabilityRegenerationManager, '_clear_repo_content_deltas')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_get_profiles_to_process')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_get_repo_content_deltas')
+    def test_queue_regenerate_applicability_for_repos_full(self, mock_get_deltas,
+                                                           mock_get_profiles, mock_clear,
+                                                           mock_batch_size, mock_repo_qs,
+                                                           mock_task):
+        """
+        Assert that the recorded changes are not passed to the tasks but are still cleared.
+        """
+        mock_repo_qs.find_by_criteria.return_value = [Repository(repo_id='repo-1')]
+        mock_get_deltas.return_value = (
+            {'repo-1': {'added': {'rpm': ['a']}, 'removed': {}}}, [(1, 1)])
+        mock_get_profiles.return_value = [('repo-1', 'hash-1', [])]
+
+        ApplicabilityRegenerationManager.queue_regenerate_applicability_for_repos(
+            self.REPO_CRITERIA.as_dict(), full=True)
+
+        self.assertEqual(mock_task.apply_async.call_args[0][0], ([('repo-1', 'hash-1', [])], {}))
+        mock_clear.assert_called_once_with([(1, 1)])
+
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
+    @mock.patch.object(ApplicabilityRegenerationManager, 'batch_regenerate_applicability')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_clear_repo_content_deltas')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_get_profiles_to_process')
+    @mock.patch.object(ApplicabilityRegenerationManager, '_get_repo_content_deltas')
+    def test_regenerate_applicability_for_repos_full(self, mock_get_deltas, mock_get_profiles,
+                                                     mock_clear, mock_batch, mock_repo_qs):
+        mock_repo_qs.find_by_criteria.return_value = [Repository(repo_id='repo-1')]
+        mock_get_deltas.return_value = (
+            {'repo-1': {'added': {'rpm': ['a']}, 'removed': {}}}, [(1, 1)])
+        mock_get_profiles.return_value = [('repo-1', 'hash-1', [])]
+
+        ApplicabilityRegenerationManager.regenerate_applicability_for_repos(
+            self.REPO_CRITERIA.as_dict(), full=True)
+
+        mock_batch.assert_called_once_with([('repo-1', 'hash-1', [])], {})
+        mock_clear.assert_called_once_with([(1, 1)])
+
+    def test_supports_delta(self):
+        self.assertTrue(ApplicabilityRegenerationManager._supports_delta(DeltaProfiler()))
+        self.assertFalse(ApplicabilityRegenerationManager._supports_delta(Profiler()))
+
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Worker.objects')
+    def test_batch_size(self, mock_worker_objects):
+        workers = [mock.Mock() for i in range(3)]
+        for i, worker in enumerate(workers):
+            worker.name = 'reserved_resource_worker-%d@host' % i
+        resource_manager = mock.Mock()
+        resource_manager.name = 'resource_manager@host'
+        mock_worker_objects.get_online.return_value = workers + [resource_manager]
+        self.assertEqual(ApplicabilityRegenerationManager._batch_size(1), 10)
+        self.assertEqual(ApplicabilityRegenerationManager._batch_size(1200), 100)
+        self.assertEqual(ApplicabilityRegenerationManager._batch_size(100000), 500)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.model.Worker.objects')
+    def test_batch_size_no_workers(self, mock_worker_objects):
+        mock_worker_objects.get_online.return_value = []
+        self.assertEqual(ApplicabilityRegenerationManager._batch_size(200), 50)
 
     @mock.patch('pulp.server.managers.consumer.applicability.model.Repository.objects')
     def test_get_existing_repo_content_types_no_repo(self, mock_repo_qs):
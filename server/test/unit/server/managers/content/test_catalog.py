@@ -171,6 +171,58 @@ class TestCatalogManager(PulpServerTests):
             self.assertEqual(entry['unit_key'], unit_key)
             self.assertEqual(entry['url'], url)
 
+    def test_find_by_locators(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        for unit_key, url in units:
+            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url)
+        # newer entry for the first unit
+        manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, units[0][0], 'file://redhat.com/new')
+        locators = [ContentCatalog.get_locator(TYPE_ID, k) for k, u in units[0:5]]
+        locators.append(ContentCatalog.get_locator(TYPE_ID, {'name': 'missing'}))
+        found = manager.find_by_locators(locators)
+        self.assertEqual(sorted(found.keys()), sorted(locators[0:5]))
+        for locator, entries in found.items():
+            self.assertEqual(len(entries), 1)
+            self.assertEqual(entries[0]['locator'], locator)
+        self.assertEqual(found[locators[0]][0]['url'], 'file://redhat.com/new')
+        self.assertEqual(found[locators[1]][0]['url'], units[1][1])
+
+    def test_update_entries(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        source_url = 'file://redhat.com/'
+        entries = [(TYPE_ID, k, u) for k, u in units]
+        added = manager.update_entries(SOURCE_ID, EXPIRATION, source_url, 'r1', entries)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(added, len(units))
+        self.assertEqual(collection.find({'refresh_id': 'r1'}).count(), len(units))
+        # refreshed with one changed url
+        entries[0] = (TYPE_ID, units[0][0], 'file://redhat.com/changed')
+        added = manager.update_entries(SOURCE_ID, EXPIRATION, source_url, 'r2', entries)
+        self.assertEqual(added, 1)
+        self.assertEqual(collection.find({'refresh_id': 'r2'}).count(), len(units))
+        self.assertEqual(collection.find().count(), len(units) + 1)
+        entries = manager.find(TYPE_ID, units[0][0])
+        self.assertEqual(entries[0]['url'], 'file://redhat.com/changed')
+
+    def test_expire_stale(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        source_url = 'file://redhat.com/'
+        entries = [(TYPE_ID, k, u) for k, u in units]
+        manager.update_entries(SOURCE_ID, EXPIRATION, source_url, 'r1', entries)
+        manager.update_entries(SOURCE_ID, EXPIRATION, source_url, 'r2', entries[0:4])
+        manager.update_entries(SOURCE_ID, EXPIRATION, 'file://other/', 'r3', entries[4:])
+        expired = manager.expire_stale(SOURCE_ID, source_url, 'r2')
+        self.assertEqual(expired, 0)
+        expired = manager.expire_stale(SOURCE_ID, 'file://other/', 'r4')
+        self.assertEqual(expired, 6)
+        for unit_key, url in units[0:4]:
+            self.assertEqual(len(manager.find(TYPE_ID, unit_key)), 1)
+        for unit_key, url in units[4:]:
+            self.assertEqual(len(manager.find(TYPE_ID, unit_key)), 0)
+
     def test_expired(self):
         units = self.units(0, 10)
         manager = ContentCatalogManager()
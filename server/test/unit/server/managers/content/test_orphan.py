@@ -15,7 +15,7 @@ from pulp.plugins.types.model import TypeDefinition
 from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.managers import factory as manager_factory
-from pulp.server.managers.content.orphan import OrphanManager
+from pulp.server.managers.content.orphan import OrphanManager, OrphanDeleteProgress
 
 
 MODULE_PATH = 'pulp.server.managers.content.orphan.'
@@ -273,31 +273,37 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertEqual(len(orphans), 0)
         self.assertEqual(self.number_of_files_in_content_root(), 0)
         mock_lazy_catalog_objects.assert_called_once_with(
-            unit_id=unit['_id'],
+            unit_id__in=[unit['_id']],
             unit_type_id=unit['_content_type_id']
         )
         mock_lazy_catalog_objects.return_value.delete.assert_called_once_with()
 
+    @patch(MODULE_PATH + 'model.FileChecksum.delete_checksums')
     @patch(MODULE_PATH + 'model.LazyCatalogEntry.objects')
     @patch(MODULE_PATH + 'OrphanManager.delete_orphaned_file')
     @patch(MODULE_PATH + 'model.RepositoryContentUnit.objects')
     @patch(MODULE_PATH + 'plugin_api.get_unit_model_by_id')
     def test_delete_content_unit_by_type(
-            self, m_get_model, m_rcu_objects, m_del_orphan, mock_lazy_catalog_objects):
+            self, m_get_model, m_rcu_objects, m_del_orphan, mock_lazy_catalog_objects,
+            m_delete_checksums):
         orphan = Mock(_storage_path='test_foo_path', id='orphan')
         non_orphan = Mock(_storage_path='test_foo_path', id='non_orphan')
-        m_get_model.return_value.objects.only.return_value = [
+        m_get_model.return_value.objects.only.return_value.batch_size.return_value = [
             orphan,
             non_orphan
         ]
         m_rcu_objects.return_value.distinct.return_value = ['non_orphan']
 
-        self.orphan_manager.delete_orphan_content_units_by_type('foo_type')
+        count = self.orphan_manager.delete_orphan_content_units_by_type('foo_type')
+        self.assertEqual(count, 1)
         mock_lazy_catalog_objects.assert_called_once_with(
-            unit_id='orphan',
+            unit_id__in=['orphan'],
             unit_type_id='foo_type'
         )
         mock_lazy_catalog_objects.return_value.delete.assert_called_once_with()
+        m_get_model.return_value.objects.assert_called_once_with(id__in=['orphan'])
+        m_get_model.return_value.objects.return_value.delete.assert_called_once_with()
+        m_delete_checksums.assert_called_once_with(['test_foo_path'])
         m_del_orphan.assert_called_once_with('test_foo_path')
 
     @patch(MODULE_PATH + 'plugin_api.get_unit_model_by_id')
@@ -309,6 +315,165 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         mock_get_model.return_value.objects.assert_called_once_with(id__in=('orphan2',))
 
 
+class TestFindOrphans(TestCase):
+
+    @patch(MODULE_PATH + 'RepoContentUnit.get_collection')
+    @patch(MODULE_PATH + 'content_types_db.type_units_collection')
+    def test_find_orphans(self, m_units_collection, m_rcu_collection):
+        """
+        Assert that the sorted unit streams are merged with the referenced unit ids.
+        """
+        units = {
+            'type_1': [{'_id': 'a'}, {'_id': 'c'}, {'_id': 'e'}],
+            'type_2': [{'_id': 'b'}, {'_id': 'd'}],
+        }
+        collections = dict((type_id, Mock(**{
+            'find.return_value.sort.return_value.batch_size.return_value': type_units}))
+            for type_id, type_units in units.items())
+        m_units_collection.side_effect = collections.get
+        m_rcu_collection.return_value.find.return_value.sort.return_value.batch_size.\
+            return_value = [{'unit_id': 'a'}, {'unit_id': 'a'}, {'unit_id': 'd'}, {'unit_id': 'f'}]
+
+        orphans = list(OrphanManager.find_orphans(['type_1', 'type_2'], ['name']))
+
+        self.assertEqual(orphans, [('type_2', {'_id': 'b'}), ('type_1', {'_id': 'c'}),
+                                   ('type_1', {'_id': 'e'})])
+        collections['type_1'].find.assert_called_once_with({}, projection=['name', '_id'])
+        collections['type_1'].find.return_value.sort.assert_called_once_with('_id', 1)
+        m_rcu_collection.return_value.find.assert_called_once_with(
+            {}, projection={'unit_id': 1, '_id': 0})
+        m_rcu_collection.return_value.find.return_value.sort.assert_called_once_with(
+            'unit_id', 1)
+
+    @patch(MODULE_PATH + 'RepoContentUnit.get_collection')
+    @patch(MODULE_PATH + 'content_types_db.type_units_collection')
+    def test_find_orphans_single_type(self, m_units_collection, m_rcu_collection):
+        """
+        Assert that only the associations of the type are read for a single type.
+        """
+        m_units_collection.return_value.find.return_value.sort.return_value.batch_size.\
+            return_value = [{'_id': 'a'}, {'_id': 'b'}]
+        m_rcu_collection.return_value.find.return_value.sort.return_value.batch_size.\
+            return_value = [{'unit_id': 'b'}]
+
+        orphans = list(OrphanManager.find_orphans(iter(['type_1'])))
+
+        self.assertEqual(orphans, [('type_1', {'_id': 'a'})])
+        m_rcu_collection.return_value.find.assert_called_once_with(
+            {'unit_type_id': 'type_1'}, projection={'unit_id': 1, '_id': 0})
+
+    @patch(MODULE_PATH + 'OrphanManager.find_orphans')
+    def test_count_orphans(self, m_find_orphans):
+        """
+        Assert that the counts of all types come from a single pass.
+        """
+        m_find_orphans.return_value = [('type_1', {}), ('type_1', {}), ('type_2', {})]
+
+        counts = OrphanManager.count_orphans(['type_1', 'type_2', 'type_3'])
+
+        self.assertEqual(counts, {'type_1': 2, 'type_2': 1, 'type_3': 0})
+        self.assertEqual(m_find_orphans.call_count, 1)
+
+    @patch(MODULE_PATH + 'plugin_api.list_unit_models')
+    @patch(MODULE_PATH + 'content_types_db.all_type_ids')
+    @patch(MODULE_PATH + 'OrphanManager.count_orphans')
+    def test_orphans_summary(self, m_count_orphans, m_all_type_ids, m_list_unit_models):
+        m_all_type_ids.return_value = ['type_1']
+        m_list_unit_models.return_value = {'type_2': Mock()}
+
+        summary = OrphanManager().orphans_summary()
+
+        self.assertEqual(summary, m_count_orphans.return_value)
+        m_count_orphans.assert_called_once_with(set(['type_1', 'type_2']))
+
+    @patch(MODULE_PATH + '_associated_unit_ids')
+    @patch(MODULE_PATH + 'content_types_db.type_units_collection')
+    def test_get_orphan_associated(self, m_units_collection, m_associated):
+        m_associated.return_value = ['a']
+
+        self.assertRaises(pulp_exceptions.MissingResource,
+                          OrphanManager().get_orphan, 'type_1', 'a')
+        m_associated.assert_called_once_with(['a'])
+
+
+@patch(MODULE_PATH + 'model.FileChecksum.delete_checksums')
+@patch(MODULE_PATH + 'OrphanManager.delete_orphaned_file')
+@patch(MODULE_PATH + 'units_controller.get_unit_key_fields_for_type')
+@patch(MODULE_PATH + 'plugin_api.get_unit_model_by_id')
+@patch(MODULE_PATH + 'model.LazyCatalogEntry.objects')
+@patch(MODULE_PATH + '_associated_unit_ids')
+@patch(MODULE_PATH + 'content_types_db.type_units_collection')
+class TestDeleteOrphansByType(TestCase):
+
+    @patch(MODULE_PATH + 'ORPHAN_CHUNK_SIZE', 2)
+    @patch(MODULE_PATH + 'OrphanManager.generate_orphans_by_type')
+    def test_chunked(self, m_generate, m_units_collection, m_associated, m_lazy_objects,
+                     m_get_model, m_key_fields, m_delete_file, m_delete_checksums):
+        """
+        Assert that orphans are deleted in chunks and that units associated since
+        they were found are not deleted.
+        """
+        m_key_fields.return_value = ('name',)
+        m_generate.return_value = [{'_id': 'a', '_storage_path': '/a'}, {'_id': 'b'},
+                                   {'_id': 'c', '_storage_path': '/c'}]
+        m_associated.side_effect = [['b'], []]
+        progress = Mock()
+
+        count = OrphanManager.delete_orphans_by_type('type_1', progress=progress)
+
+        self.assertEqual(count, 2)
+        m_generate.assert_called_once_with('type_1', fields=('_id', '_storage_path', 'name'))
+        self.assertEqual(m_units_collection.return_value.remove.call_args_list,
+                         [call({'_id': {'$in': ['a']}}), call({'_id': {'$in': ['c']}})])
+        self.assertEqual(m_lazy_objects.call_count, 2)
+        self.assertEqual(progress.update.call_args_list,
+                         [call('type_1', 1), call('type_1', 1)])
+        self.assertEqual(m_delete_file.call_args_list, [call('/a'), call('/c')])
+        self.assertEqual(m_delete_checksums.call_args_list, [call(['/a']), call(['/c'])])
+
+    def test_by_id(self, m_units_collection, m_associated, m_lazy_objects, m_get_model,
+                   m_key_fields, m_delete_file, m_delete_checksums):
+        """
+        Assert that only the given units are read when ids are specified.
+        """
+        m_key_fields.return_value = ()
+        m_units_collection.return_value.find.return_value = [{'_id': 'a'}]
+        m_associated.return_value = []
+
+        count = OrphanManager.delete_orphans_by_type('type_1', ['a'], progress=Mock())
+
+        self.assertEqual(count, 1)
+        m_units_collection.return_value.find.assert_called_once_with(
+            {'_id': {'$in': ['a']}}, projection=('_id', '_storage_path'))
+        m_lazy_objects.assert_called_once_with(unit_id__in=['a'], unit_type_id='type_1')
+
+
+@patch(MODULE_PATH + 'model.TaskStatus.objects')
+@patch(MODULE_PATH + 'get_current_task_id')
+class TestOrphanDeleteProgress(TestCase):
+
+    def test_update(self, m_task_id, m_task_status):
+        m_task_id.return_value = 'task_1'
+        progress = OrphanDeleteProgress(interval=60)
+
+        progress.update('type_1', 2)
+        progress.update('type_1', 3)
+        progress.update('type_2', 0)
+
+        self.assertEqual(progress.deleted, {'type_1': 5})
+        m_task_status.assert_called_once_with(task_id='task_1')
+        m_task_status.return_value.update_one.assert_called_once_with(
+            set__progress_report={'orphans': {'deleted': {'type_1': 2}}})
+
+    def test_report_no_task(self, m_task_id, m_task_status):
+        m_task_id.return_value = None
+        progress = OrphanDeleteProgress()
+
+        progress.update('type_1', 1)
+
+        self.assertFalse(m_task_status.called)
+
+
 class TestDelete(TestCase):
 
     @patch('shutil.rmtree')
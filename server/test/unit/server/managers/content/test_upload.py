@@ -1,6 +1,9 @@
+from StringIO import StringIO
 import errno
+import hashlib
 import os
 import shutil
+import tempfile
 
 import unittest
 import mock
@@ -10,9 +13,11 @@ from pulp.common import dateutils
 from pulp.devel import mock_plugins
 from pulp.plugins.conduits.upload import UploadConduit
 from pulp.server.controllers import importer as importer_controller
+from pulp.server import util
 from pulp.server.db import model
 from pulp.server.exceptions import (MissingResource, PulpDataException, PulpExecutionException,
                                     InvalidValue, PulpCodedException)
+from pulp.server.managers.content import upload
 from pulp.server.managers.content.upload import ContentUploadManager
 import pulp.server.managers.factory as manager_factory
 
@@ -175,6 +180,7 @@ class ContentUploadManagerTests(base.PulpServerTests):
         mock_plugins.MOCK_IMPORTER.upload_unit.return_value = importer_return_report
 
         upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'fus ro dah')
         file_path = self.upload_manager._upload_file_path(upload_id)
 
         fake_user = model.User('import-user', '')
@@ -196,6 +202,8 @@ class ContentUploadManagerTests(base.PulpServerTests):
         conduit = call_args[5]
         self.assertTrue(isinstance(conduit, UploadConduit))
         self.assertEqual(call_args[5].repo_id, 'repo-u')
+        self.assertEqual(conduit.get_checksums(),
+                         {util.TYPE_SHA256: hashlib.sha256('fus ro dah').hexdigest()})
 
         # It is now platform's responsibility to update plugin content unit counts
         self.assertTrue(mock_rebuild.called, "rebuild_content_unit_counts must be called")
@@ -262,9 +270,12 @@ class TestContentUploadManager(unittest.TestCase):
     @mock.patch('pulp.server.managers.content.upload.os')
     def test_delete_upload_removes_file(self, mock_os, mock__upload_file_path):
         my_upload_id = 'asdf'
+        mock__upload_file_path.return_value = '/uploads/asdf'
         ContentUploadManager().delete_upload(my_upload_id)
-        mock__upload_file_path.assert_called_once_with(my_upload_id)
-        mock_os.remove.assert_called_once_with(mock__upload_file_path.return_value)
+        mock__upload_file_path.assert_called_with(my_upload_id)
+        self.assertEqual(mock_os.remove.call_args_list,
+                         [mock.call('/uploads/asdf'), mock.call('/uploads/asdf.digest'),
+                          mock.call('/uploads/asdf.tmp.digest')])
 
     @mock.patch.object(ContentUploadManager, '_upload_file_path')
     @mock.patch('pulp.server.managers.content.upload.os')
@@ -290,3 +301,120 @@ class TestContentUploadManager(unittest.TestCase):
         my_upload_id = 'asdf'
         mock_os.remove.side_effect = ValueError()
         self.assertRaises(ValueError, ContentUploadManager().delete_upload, my_upload_id)
+
+
+class TestContentUploadManagerChecksums(unittest.TestCase):
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_dir)
+        patcher = mock.patch.object(ContentUploadManager, '_upload_storage_dir',
+                                    return_value=self.storage_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(upload._digests.clear)
+        self.manager = ContentUploadManager()
+        self.upload_id = self.manager.initialize_upload()
+
+    def checksums(self):
+        return ContentUploadManager._upload_checksums(self.upload_id)
+
+    @mock.patch.object(upload, 'UPLOAD_CHUNK_SIZE', 4)
+    def test_save_data_stream(self):
+        """
+        Ensure data read from a file is written in chunks and checksummed across segments.
+        """
+        self.manager.save_data(self.upload_id, 0, StringIO('0123456789'))
+        self.manager.save_data(self.upload_id, 10, StringIO('abcdef'))
+        self.manager.save_data(self.upload_id, 16, 'ghi')
+
+        self.assertEqual(self.manager.read_upload(self.upload_id), '0123456789abcdefghi')
+        self.assertEqual(self.checksums(),
+                         {util.TYPE_SHA256: hashlib.sha256('0123456789abcdefghi').hexdigest()})
+
+    def test_save_data_resumed(self):
+        """
+        Ensure another manager resumes the checksums kept in memory.
+        """
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        ContentUploadManager().save_data(self.upload_id, 3, 'def')
+        self.assertEqual(self.checksums(),
+                         {util.TYPE_SHA256: hashlib.sha256('abcdef').hexdigest()})
+
+    @mock.patch.object(upload, 'UPLOAD_CHUNK_SIZE', 2)
+    def test_save_data_rebuilt(self):
+        """
+        Ensure another process calculates the checksums again from the data already written.
+        """
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        upload._digests.clear()
+        self.manager.save_data(self.upload_id, 3, 'def')
+        self.assertEqual(self.checksums(),
+                         {util.TYPE_SHA256: hashlib.sha256('abcdef').hexdigest()})
+
+    def test_save_data_stale(self):
+        """
+        Ensure the checksums in memory are not resumed once another process wrote the upload.
+        """
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        cached = upload._digests.pop(self.upload_id)
+        self.manager.save_data(self.upload_id, 0, 'xyz')
+        upload._digests[self.upload_id] = cached
+        self.manager.save_data(self.upload_id, 3, 'def')
+        self.assertEqual(self.checksums(),
+                         {util.TYPE_SHA256: hashlib.sha256('xyzdef').hexdigest()})
+
+    def test_save_data_state_replaced(self):
+        """
+        Ensure the saved checksums are replaced without leaving a temporary file.
+        """
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        self.manager.save_data(self.upload_id, 3, 'def')
+        digest_path = ContentUploadManager._upload_digest_path(self.upload_id)
+        self.assertEqual(sorted(os.listdir(self.storage_dir)),
+                         [self.upload_id, os.path.basename(digest_path)])
+
+    def test_save_data_out_of_order(self):
+        """
+        Ensure no checksums are given when the data is not written in order.
+        """
+        self.manager.save_data(self.upload_id, 3, 'def')
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        self.assertEqual(self.manager.read_upload(self.upload_id), 'abcdef')
+        self.assertEqual(self.checksums(), {})
+
+    def test_save_data_rewritten(self):
+        """
+        Ensure no checksums are given when data already checksummed is written again.
+        """
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        self.manager.save_data(self.upload_id, 3, 'def')
+        self.manager.save_data(self.upload_id, 3, 'xyz')
+        self.assertEqual(self.checksums(), {})
+        self.assertFalse(os.path.exists(ContentUploadManager._upload_digest_path(self.upload_id)))
+
+    def test_incomplete(self):
+        """
+        Ensure no checksums are given when they do not cover the whole file.
+        """
+        self.manager.save_data(self.upload_id, 0, 'abcdef')
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        self.assertEqual(self.checksums(), {})
+
+    @mock.patch.object(upload, 'UPLOAD_CHECKSUM_TYPES', ())
+    def test_unsupported(self):
+        """
+        Ensure data is saved without checksums when they cannot be calculated.
+        """
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        self.assertEqual(self.manager.read_upload(self.upload_id), 'abc')
+        self.assertEqual(self.checksums(), {})
+
+    def test_list_and_delete(self):
+        """
+        Ensure the saved checksums are not listed as an upload and are deleted with it.
+        """
+        self.manager.save_data(self.upload_id, 0, 'abc')
+        self.assertEqual(self.manager.list_upload_ids(), [self.upload_id])
+        self.manager.delete_upload(self.upload_id)
+        self.assertEqual(os.listdir(self.storage_dir), [])
@@ -284,6 +284,12 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
         self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'unit-1')
         mock_ctrl.update_last_unit_added.assert_called_once_with(self.repo_id)
 
+    @mock.patch('pulp.server.managers.repo.unit_association.repo_controller')
+    def test_associate_by_id_records_delta(self, mock_ctrl, mock_repo):
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'unit-1')
+        mock_ctrl.record_content_delta.assert_called_once_with(
+            self.repo_id, 'type-1', ['unit-1'], True)
+
     @mock.patch('pulp.server.controllers.repository.update_unit_count')
     def test_associate_by_id_does_not_call_update_unit_count(self, mock_call, mock_repo):
         """
@@ -376,6 +382,13 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
         self.assertEqual(mock_ctrl.update_unit_count.call_args_list[0][0][1], self.unit_type_id)
         self.assertEqual(mock_ctrl.update_unit_count.call_args_list[0][0][2], 1)
 
+    @mock.patch('pulp.server.managers.repo.unit_association.repo_controller')
+    def test_unassociate_by_id_records_delta(self, mock_ctrl, mock_repo):
+        self.manager.associate_unit_by_id(self.repo_id, self.unit_type_id, self.unit_id)
+        self.manager.unassociate_unit_by_id(self.repo_id, self.unit_type_id, self.unit_id)
+        mock_ctrl.record_content_delta.assert_called_with(
+            self.repo_id, self.unit_type_id, [self.unit_id], False)
+
     @mock.patch('pulp.server.managers.repo.unit_association.repo_controller')
     def test_unassociate_by_id_non_unique(self, mock_ctrl, mock_repo):
         self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'unit-1')
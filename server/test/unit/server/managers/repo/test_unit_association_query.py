@@ -32,6 +32,8 @@ TYPE_DEF_EPSILON = model.TypeDefinition('epsilon', 'Epsilon', 'Test Type Epsilon
 
 _QUERY_TYPES = [TYPE_DEF_ALPHA, TYPE_DEF_BETA, TYPE_DEF_GAMMA, TYPE_DEF_DELTA, TYPE_DEF_EPSILON]
 
+MODULE_PATH = 'pulp.server.managers.repo.unit_association_query.'
+
 
 class RepoUnitAssociationQueryManagerTests(unittest.TestCase):
     """
@@ -74,6 +76,117 @@ class RepoUnitAssociationQueryManagerTests(unittest.TestCase):
         self.assertEqual(return_value, expected_return_value)
 
 
+def _associations(unit_type_id, *unit_ids):
+    return [{'unit_type_id': unit_type_id, 'unit_id': unit_id} for unit_id in unit_ids]
+
+
+def _units_cursor(unit_type_id, criteria, unit_ids):
+    return [{'_content_type_id': unit_type_id, '_id': unit_id} for unit_id in sorted(unit_ids)]
+
+
+@mock.patch(MODULE_PATH + 'UNITS_BATCH_SIZE', 2)
+@mock.patch(MODULE_PATH + 'RepoUnitAssociationQueryManager._associated_units_by_type_cursor',
+            side_effect=_units_cursor)
+@mock.patch(MODULE_PATH + 'RepoUnitAssociationQueryManager._unit_associations_cursor')
+class GetUnitsStreamingTests(unittest.TestCase):
+    """
+    Tests for the streaming execution paths of get_units().
+    """
+
+    def _cursor(self, associations, count=None):
+        cursor = mock.MagicMock()
+        cursor.__iter__.return_value = iter(associations)
+        cursor.count.return_value = len(associations) if count is None else count
+        return cursor
+
+    def test_id_order_windows(self, m_associations_cursor, m_units_cursor):
+        """
+        Assert that the associations are read in windows and that the units of
+        each window are fetched separately.
+        """
+        cursor = self._cursor(_associations('alpha', 'a', 'b', 'c'))
+        m_associations_cursor.return_value = cursor
+        criteria = UnitAssociationCriteria(type_ids=['alpha'])
+
+        units = association_query_manager.RepoUnitAssociationQueryManager().get_units(
+            'repo-1', criteria, as_generator=True)
+
+        self.assertFalse(m_associations_cursor.called)
+        self.assertEqual([u['metadata']['_id'] for u in units], ['a', 'b', 'c'])
+        m_associations_cursor.assert_called_once_with('repo-1', criteria, 'alpha')
+        cursor.sort.assert_called_once_with([('unit_id', association_query_manager.SORT_ASCENDING)])
+        self.assertEqual(m_units_cursor.call_count, 2)
+        self.assertEqual(set(m_units_cursor.call_args_list[0][0][2]), set(['a', 'b']))
+        self.assertEqual(m_units_cursor.call_args_list[1][0][2], ['c'])
+
+    def test_id_order_skip_and_limit_pushed_down(self, m_associations_cursor, m_units_cursor):
+        """
+        Assert that whole types are skipped and skip and limit are performed by the
+        associations query when there are no unit filters.
+        """
+        alpha = self._cursor([], count=2)
+        beta = self._cursor(_associations('beta', 'd', 'e'), count=4)
+        m_associations_cursor.side_effect = [alpha, beta]
+        criteria = UnitAssociationCriteria(type_ids=['beta', 'alpha'], skip=3, limit=2)
+
+        units = association_query_manager.RepoUnitAssociationQueryManager().get_units(
+            'repo-1', criteria)
+
+        self.assertEqual([u['metadata']['_id'] for u in units], ['d', 'e'])
+        self.assertFalse(alpha.__iter__.called)
+        beta.skip.assert_called_once_with(1)
+        beta.limit.assert_called_once_with(2)
+
+    def test_id_order_limit_stops(self, m_associations_cursor, m_units_cursor):
+        """
+        Assert that no more types are queried once the limit has been reached.
+        """
+        m_associations_cursor.return_value = self._cursor(_associations('alpha', 'a', 'b'))
+        criteria = UnitAssociationCriteria(type_ids=['alpha', 'beta'], limit=2)
+
+        units = association_query_manager.RepoUnitAssociationQueryManager().get_units(
+            'repo-1', criteria)
+
+        self.assertEqual(len(units), 2)
+        m_associations_cursor.assert_called_once_with('repo-1', criteria, 'alpha')
+
+    def test_id_order_unit_filters(self, m_associations_cursor, m_units_cursor):
+        """
+        Assert that skip and limit are performed on the units when there are unit filters.
+        """
+        cursor = self._cursor(_associations('alpha', 'a', 'b', 'c'))
+        m_associations_cursor.return_value = cursor
+        criteria = UnitAssociationCriteria(type_ids=['alpha'], unit_filters={'key_1': 'x'},
+                                           skip=1, limit=1)
+
+        units = association_query_manager.RepoUnitAssociationQueryManager().get_units(
+            'repo-1', criteria)
+
+        self.assertEqual([u['metadata']['_id'] for u in units], ['b'])
+        self.assertFalse(cursor.skip.called)
+        self.assertFalse(cursor.limit.called)
+
+    def test_association_order_windows(self, m_associations_cursor, m_units_cursor):
+        """
+        Assert that units are returned in association order one window at a time.
+        """
+        associations = _associations('beta', 'z') + _associations('alpha', 'b', 'a')
+        cursor = self._cursor(associations)
+        m_associations_cursor.return_value = cursor
+        criteria = UnitAssociationCriteria(
+            association_sort=[('created', association_query_manager.SORT_DESCENDING)],
+            skip=5, limit=3)
+
+        units = association_query_manager.RepoUnitAssociationQueryManager().get_units(
+            'repo-1', criteria)
+
+        self.assertEqual([u['metadata']['_id'] for u in units], ['z', 'b', 'a'])
+        cursor.skip.assert_called_once_with(5)
+        cursor.limit.assert_called_once_with(3)
+        self.assertEqual(
+            [c[0][0] for c in m_units_cursor.call_args_list], ['alpha', 'beta', 'alpha'])
+
+
 class UnitAssociationQueryTests(base.PulpServerTests):
 
     def clean(self):
@@ -604,7 +717,7 @@ class UnitAssociationQueryTests(base.PulpServerTests):
 
     def test_get_units_by_type_batches(self):
         # Check if units are found as expectation by different batch size
-        association_query_manager.UNITS_BATCH_SIZE = 100000
+        association_query_manager.UNITS_BATCH_SIZE = 1000
         units_1 = self.manager.get_units_by_type('repo-1', 'alpha')
 
         association_query_manager.UNITS_BATCH_SIZE = 2
@@ -621,7 +734,7 @@ class UnitAssociationQueryTests(base.PulpServerTests):
         self.assertEqual(len(self.units['alpha']), len(units_1))
 
         # Revert
-        association_query_manager.UNITS_BATCH_SIZE = 100000
+        association_query_manager.UNITS_BATCH_SIZE = 1000
 
     @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.\
 _associated_units_by_type_cursor')
@@ -648,7 +761,7 @@ _associated_units_by_type_cursor')
             _associated_units_by_type_cursor_mock.call_count, batch_num + 1)
 
         # Revert
-        association_query_manager.UNITS_BATCH_SIZE = 100000
+        association_query_manager.UNITS_BATCH_SIZE = 1000
 
     @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.\
 _associated_units_by_type_cursor')
@@ -670,7 +783,7 @@ _associated_units_by_type_cursor')
             _associated_units_by_type_cursor_mock.call_count, batch_num + 1)
 
         # Revert
-        association_query_manager.UNITS_BATCH_SIZE = 100000
+        association_query_manager.UNITS_BATCH_SIZE = 1000
 
     def test_criteria_str(self):
         # Setup
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import copy
 import time
 import unittest
 
@@ -8,7 +9,7 @@ import mock
 
 from pulp.server import exceptions
 from pulp.server.db.model.criteria import Criteria
-from pulp.server.db.model.dispatch import ScheduledCall
+from pulp.server.db.model.dispatch import ScheduledCall, ScheduleVersion
 from pulp.server.managers.schedule import utils
 
 
@@ -139,6 +140,30 @@ class TestGetUpdatedSince(unittest.TestCase):
         mock_get_collection.assert_called_once_with()
 
 
+class TestGetChangedSince(unittest.TestCase):
+    @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
+    def test_query(self, mock_get_collection):
+        mock_query = mock_get_collection.return_value.query
+
+        ret = utils.get_changed_since(1387218569.811224)
+
+        criteria = mock_query.call_args[0][0]
+        self.assertEqual(criteria.filters, {'last_updated': {'$gt': 1387218569.811224}})
+        self.assertTrue(ret is mock_query.return_value)
+
+
+class TestGetEnabledIds(unittest.TestCase):
+    @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
+    def test_query(self, mock_get_collection):
+        mock_find = mock_get_collection.return_value.find
+        mock_find.return_value = [{'_id': ObjectId('529f4bd93de3a31d0ec77338')}]
+
+        ret = utils.get_enabled_ids()
+
+        mock_find.assert_called_once_with({'enabled': True}, projection=['_id'])
+        self.assertEqual(ret, set(['529f4bd93de3a31d0ec77338']))
+
+
 class TestGetEnabled(unittest.TestCase):
     @mock.patch('pulp.server.db.connection.PulpCollection.query')
     def test_query(self, mock_query):
@@ -181,13 +206,16 @@ class TestGetEnabled(unittest.TestCase):
 class TestDelete(unittest.TestCase):
     schedule_id = str(ObjectId())
 
+    @mock.patch.object(ScheduleVersion, 'increment')
     @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
-    def test_delete(self, mock_get_collection):
+    def test_delete(self, mock_get_collection, mock_increment):
         mock_remove = mock_get_collection.return_value.find_and_modify
         mock_remove.return_value = 'not none'
 
         utils.delete(self.schedule_id)
 
+        mock_increment.assert_called_once_with()
+
         self.assertEqual(mock_remove.call_count, 1)
         # there should only be 1 argument, a criteria
         self.assertEqual(len(mock_remove.call_args[0]), 0)
@@ -203,6 +231,7 @@ class TestDelete(unittest.TestCase):
         self.assertRaises(exceptions.MissingResource, utils.delete, self.schedule_id)
         self.assertEqual(mock_find.call_count, 1)
 
+    @mock.patch.object(ScheduleVersion, 'increment', new=mock.MagicMock())
     @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
     def test_gets_correct_collection(self, mock_get_collection):
         """
@@ -221,22 +250,25 @@ class TestDelete(unittest.TestCase):
 
 
 class TestDeleteByResource(unittest.TestCase):
+    @mock.patch.object(ScheduleVersion, 'increment')
     @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
-    def test_calls_remove(self, mock_get_collection):
+    def test_calls_remove(self, mock_get_collection, mock_increment):
         mock_remove = mock_get_collection.return_value.remove
         mock_remove.return_value = None
 
         utils.delete_by_resource('resource1')
 
         mock_remove.assert_called_once_with({'resource': 'resource1'})
+        mock_increment.assert_called_once_with()
 
 
 class TestUpdate(unittest.TestCase):
     schedule_id = str(ObjectId())
 
+    @mock.patch.object(ScheduleVersion, 'increment')
     @mock.patch('pickle.dumps')
     @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
-    def test_update(self, mock_get, mock_pickle):
+    def test_update(self, mock_get, mock_pickle, mock_increment):
         mock_find = mock_get.return_value.find_and_modify
         mock_find.return_value = SCHEDULES[0]
 
@@ -254,7 +286,9 @@ class TestUpdate(unittest.TestCase):
 
         self.assertTrue(isinstance(ret, ScheduledCall))
         self.assertEqual(mock_pickle.call_args_list, [])
+        mock_increment.assert_called_once_with()
 
+    @mock.patch.object(ScheduleVersion, 'increment', new=mock.MagicMock())
     @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
     def test_update_iso_schedule(self, mock_get):
         mock_find = mock_get.return_value.find_and_modify
@@ -280,6 +314,7 @@ class TestUpdate(unittest.TestCase):
 
         self.assertTrue(isinstance(ret, ScheduledCall))
 
+    @mock.patch.object(ScheduleVersion, 'increment', new=mock.MagicMock())
     @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
     def test_gets_correct_collection(self, mock_get_collection):
         """
@@ -404,8 +439,9 @@ class TestIncrementFailureCount(unittest.TestCase):
         # make sure we didn't disable the schedule, since it's already disabled
         self.assertEqual(mock_update.call_count, 0)
 
+    @mock.patch.object(ScheduleVersion, 'increment')
     @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
-    def test_disable_schedule(self, mock_get_collection):
+    def test_disable_schedule(self, mock_get_collection, mock_increment):
         mock_find = mock_get_collection.return_value.find_and_modify
         mock_update = mock_get_collection.return_value.update
         schedule = SCHEDULES[0].copy()
@@ -423,11 +459,65 @@ class TestIncrementFailureCount(unittest.TestCase):
         last_updated = mock_update.call_args[0][1]['$set']['last_updated']
         # make sure the last_updated value is within the last tenth of a second
         self.assertTrue(time.time() - last_updated < .1)
+        mock_increment.assert_called_once_with()
 
     def test_invalid_schedule_id(self):
         self.assertRaises(exceptions.InvalidValue, utils.increment_failure_count, 'notavalidid')
 
 
+class FakeScheduleCollection(object):
+    """
+    Holds a single schedule document and applies updates to it.
+    """
+
+    def __init__(self, document):
+        self.document = document
+
+    def _apply(self, update):
+        if not any(key.startswith('$') for key in update):
+            # A replacement document
+            self.document = dict(update, _id=self.document['_id'])
+            return
+        for name, value in update.get('$inc', {}).items():
+            self.document[name] += value
+        self.document.update(update.get('$set', {}))
+
+    def find_and_modify(self, query, update, new):
+        self._apply(update)
+        return copy.deepcopy(self.document)
+
+    def update(self, spec, document):
+        self._apply(document)
+
+
+@mock.patch.object(ScheduleVersion, 'increment')
+class TestFailureThreshold(unittest.TestCase):
+
+    def test_disabled_after_run_between_failures(self, mock_increment):
+        """
+        Ensure a run of the schedule, by the copy of it loaded by celerybeat, does
+        not reset the failures counted while it was loaded.
+        """
+        call = ScheduledCall('2014-01-19T17:15Z/PT1H', 'pulp.tasks.dosomething',
+                             principal={'login': 'admin'}, failure_threshold=2)
+        document = call.as_dict()
+        document['_id'] = ObjectId(document['_id'])
+        collection = FakeScheduleCollection(document)
+        # celerybeat's copy of the schedule
+        entry = ScheduledCall.from_db(copy.deepcopy(document)).as_schedule_entry()
+
+        with mock.patch.object(ScheduledCall, 'get_collection', return_value=collection):
+            utils.increment_failure_count(call.id)
+            next(entry)
+            self.assertEqual(collection.document['consecutive_failures'], 1)
+            self.assertEqual(collection.document['total_run_count'], 1)
+
+            utils.increment_failure_count(call.id)
+
+        self.assertEqual(collection.document['consecutive_failures'], 2)
+        self.assertFalse(collection.document['enabled'])
+
+
 SCHEDULES = [
     {
         u'_id': u'529f4bd93de3a31d0ec77338',
@@ -1,6 +1,8 @@
 from cStringIO import StringIO
 import hashlib
+import os
 import shutil
+import tempfile
 
 from mock import Mock, patch, call
 
@@ -296,3 +298,40 @@ class TestCalculateChecksums(unittest.TestCase):
 
         self.assertEqual(ret['sha256'], self.sha256_sum)
         self.assertTrue(len(ret), 1)
+
+
+class TestDigestingFile(unittest.TestCase):
+    def setUp(self):
+        super(TestDigestingFile, self).setUp()
+        self.working_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.working_dir, 'file')
+
+    def tearDown(self):
+        super(TestDigestingFile, self).tearDown()
+        shutil.rmtree(self.working_dir)
+
+    def test_write(self):
+        destination = util.DigestingFile(self.path, util.TYPE_SHA256)
+        destination.write('some')
+        destination.write('text')
+        destination.close()
+
+        with open(self.path) as fp:
+            self.assertEqual(fp.read(), 'sometext')
+        self.assertEqual(destination.hexdigest(), hashlib.sha256('sometext').hexdigest())
+        self.assertEqual(str(destination), self.path)
+
+    def test_empty(self):
+        destination = util.DigestingFile(self.path, util.TYPE_SHA1)
+        self.assertFalse(os.path.exists(self.path))
+        destination.close()
+
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertEqual(destination.hexdigest(), hashlib.sha1().hexdigest())
+
+    def test_no_checksum(self):
+        for checksum_type in (None, 'sha224'):
+            destination = util.DigestingFile(self.path, checksum_type)
+            destination.write('sometext')
+            destination.close()
+            self.assertTrue(destination.hexdigest() is None)
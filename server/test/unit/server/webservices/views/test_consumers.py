@@ -1076,6 +1076,7 @@ class TestConsumerProfileSearchView(unittest.TestCase):
         self.assertEqual(ConsumerProfileSearchView.response_builder,
                          util.generate_json_response_with_pulp_encoder)
         self.assertTrue(isinstance(ConsumerProfileSearchView.manager, profile.ProfileManager))
+        self.assertTrue(ConsumerProfileSearchView.stream_results)
 
 
 class TestConsumerProfileResourceView(unittest.TestCase):
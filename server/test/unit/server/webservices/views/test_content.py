@@ -318,6 +318,30 @@ class TestContentUnitSearch(unittest.TestCase):
         self.assertEqual(len(ret), 1)
         self.assertEqual(ret[0].get('repository_memberships'), ['repo1'])
 
+    @mock.patch('pulp.server.webservices.views.content.MEMBERSHIP_PAGE_SIZE', 2)
+    @mock.patch('pulp.server.webservices.views.content.units_controller')
+    @mock.patch('pulp.server.webservices.views.content.ContentUnitSearch._add_repo_memberships')
+    @mock.patch('pulp.server.webservices.views.content._process_content_unit')
+    def test_iter_results_with_repos(self, mock_process, mock_add_repo, mock_ctrl):
+        """
+        Ensure repository memberships are added one page of units at a time.
+        """
+        mock_process.side_effect = lambda unit, type_id: unit
+        mock_search = mock.MagicMock(return_value=iter(['u1', 'u2', 'u3']))
+        results = ContentUnitSearch.iter_results(
+            {}, mock_search, {'include_repos': True}, type_id='mock_type')
+        self.assertEqual(next(results), 'u1')
+        mock_add_repo.assert_called_once_with(['u1', 'u2'], 'mock_type')
+        self.assertEqual(list(results), ['u2', 'u3'])
+        self.assertEqual(mock_add_repo.call_args_list,
+                         [mock.call(['u1', 'u2'], 'mock_type'), mock.call(['u3'], 'mock_type')])
+
+    def test_stream_results(self):
+        """
+        Ensure content unit search results are streamed.
+        """
+        self.assertTrue(ContentUnitSearch.stream_results)
+
     @mock.patch('pulp.server.webservices.views.content.ContentUnitSearch._add_repo_memberships')
     @mock.patch('pulp.server.webservices.views.content._process_content_unit')
     def test_get_results_without_repos(self, mock_process, mock_add_repo):
@@ -642,12 +666,12 @@ class TestUploadSegmentResourceView(unittest.TestCase):
         mock_upload_manager = mock.MagicMock()
         mock_factory.content_upload_manager.return_value = mock_upload_manager
         request = mock.MagicMock()
-        request.body = 'upload these bits'
 
         upload_segment_resource = UploadSegmentResourceView()
         response = upload_segment_resource.put(request, 'mock_id', 4)
 
-        mock_upload_manager.save_data.assert_called_once_with('mock_id', 4, 'upload these bits')
+        # The request body is streamed rather than read into memory
+        mock_upload_manager.save_data.assert_called_once_with('mock_id', 4, request)
         mock_resp.assert_called_once_with(None)
         self.assertTrue(response is mock_resp.return_value)
 
@@ -144,3 +144,24 @@ class TestAuthenticationMethods(base.PulpServerTests):
         decorated_func = decorators.auth_required(0, False)(self.func)
         self.assertRaises(PulpCodedAuthenticationException, decorated_func, None)
         self.assertEqual(1, mock_is_authorized.call_count)
+
+    @mock.patch('pulp.server.webservices.http.resource_path', autospec=True, return_value='/')
+    @mock.patch('pulp.server.webservices.views.decorators.check_preauthenticated',
+                return_value='admin')
+    @mock.patch('pulp.server.webservices.views.decorators.factory.principal_manager')
+    @mock.patch('pulp.server.webservices.views.decorators.model.User.objects')
+    @mock.patch('pulp.server.webservices.views.decorators.user_controller.is_authorized',
+                return_value=True)
+    def test_auth_decorator_user_authorized(self, mock_is_authorized, mock_user_objects,
+                                            mock_principal_manager, *unused_mocks):
+        """
+        Test that the user is fetched once to authorize the user and set the principal.
+        """
+        principal_manager = mock_principal_manager.return_value
+        user = mock_user_objects.get.return_value
+        decorated_func = decorators.auth_required(0, False)(lambda *x: None)
+        decorated_func(None)
+
+        mock_user_objects.get.assert_called_once_with(login='admin')
+        mock_is_authorized.assert_called_once_with('/', 'admin', 0, user=user)
+        principal_manager.set_principal.assert_called_once_with(user)
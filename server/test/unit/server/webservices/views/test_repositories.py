@@ -668,8 +668,8 @@ class TestRepoUnitSearch(unittest.TestCase):
     Tests for RepoUnitSearch.
     """
 
-    @mock.patch(
-        'pulp.server.webservices.views.repositories.generate_json_response_with_pulp_encoder')
+    @mock.patch('pulp.server.webservices.views.repositories.'
+                'generate_streaming_json_response_with_pulp_encoder')
     @mock.patch('pulp.server.webservices.views.repositories.manager_factory.'
                 'repo_unit_association_query_manager')
     @mock.patch('pulp.server.webservices.views.repositories.UnitAssociationCriteria')
@@ -685,11 +685,12 @@ class TestRepoUnitSearch(unittest.TestCase):
         repo_unit_search._generate_response('mock_q', {}, repo_id='mock_repo')
         mock_crit.from_client_input.assert_called_once_with('mock_q')
         mock_uqm().get_units_by_type.assert_called_once_with('mock_repo', 'one_type',
-                                                             criteria=criteria)
-        mock_resp.assert_called_once_with(mock_uqm().get_units_by_type.return_value)
+                                                             criteria=criteria,
+                                                             as_generator=True)
+        self.assertEqual(mock_resp.call_count, 1)
 
-    @mock.patch(
-        'pulp.server.webservices.views.repositories.generate_json_response_with_pulp_encoder')
+    @mock.patch('pulp.server.webservices.views.repositories.'
+                'generate_streaming_json_response_with_pulp_encoder')
     @mock.patch('pulp.server.webservices.views.repositories.manager_factory.'
                 'repo_unit_association_query_manager')
     @mock.patch('pulp.server.webservices.views.repositories.UnitAssociationCriteria')
@@ -704,8 +705,28 @@ class TestRepoUnitSearch(unittest.TestCase):
         repo_unit_search = RepoUnitSearch()
         repo_unit_search._generate_response('mock_q', {}, repo_id='mock_repo')
         mock_crit.from_client_input.assert_called_once_with('mock_q')
-        mock_uqm().get_units.assert_called_once_with('mock_repo', criteria=criteria)
-        mock_resp.assert_called_once_with(mock_uqm().get_units.return_value)
+        mock_uqm().get_units.assert_called_once_with('mock_repo', criteria=criteria,
+                                                     as_generator=True)
+        self.assertEqual(mock_resp.call_count, 1)
+
+    @mock.patch('pulp.server.webservices.views.repositories.content.'
+                'serialize_unit_with_serializer')
+    @mock.patch('pulp.server.webservices.views.repositories.manager_factory.'
+                'repo_unit_association_query_manager')
+    @mock.patch('pulp.server.webservices.views.repositories.UnitAssociationCriteria')
+    @mock.patch('pulp.server.webservices.views.repositories.model.Repository.objects')
+    def test__generate_response_streamed(self, mock_repo_qs, mock_crit, mock_uqm, mock_serialize):
+        """
+        Test that units are serialized as the response is streamed.
+        """
+        criteria = mock_crit.from_client_input.return_value
+        criteria.type_ids = None
+        units = [{'metadata': {'n': 1}}, {'metadata': {'n': 2}}]
+        mock_uqm().get_units.return_value = iter(units)
+        response = RepoUnitSearch._generate_response('mock_q', {}, repo_id='mock_repo')
+        self.assertEqual(mock_serialize.call_count, 1)
+        self.assertEqual(''.join(response.streaming_content), json.dumps(units))
+        self.assertEqual(mock_serialize.call_count, 2)
 
 
 class TestRepoImportersView(unittest.TestCase):
@@ -1425,7 +1446,44 @@ class TestContentApplicabilityRegenerationView(unittest.TestCase):
             raise AssertionError('OperationPostponed should be raised for a regenerate task')
 
         self.assertEqual(response.http_status_code, 202)
-        mock_regen.assert_called_once_with(mock_crit.return_value.as_dict())
+        mock_regen.assert_called_once_with(mock_crit.return_value.as_dict(), full=False)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth', new=assert_auth_CREATE())
+    @mock.patch('pulp.server.webservices.views.repositories.regenerate_applicability_for_repos')
+    @mock.patch('pulp.server.webservices.views.repositories.tags')
+    @mock.patch('pulp.server.webservices.views.repositories.Criteria.from_client_input')
+    def test_post_full(self, mock_crit, mock_tags, mock_regen):
+        """
+        Test that a full regeneration is passed to the task.
+        """
+
+        mock_request = mock.MagicMock()
+        mock_request.body = json.dumps({'repo_criteria': {}, 'full': True})
+        content_app_regen = ContentApplicabilityRegenerationView()
+        try:
+            content_app_regen.post(mock_request)
+        except exceptions.OperationPostponed, response:
+            pass
+        else:
+            raise AssertionError('OperationPostponed should be raised for a regenerate task')
+
+        self.assertEqual(response.http_status_code, 202)
+        mock_regen.apply_async_with_reservation.assert_called_once_with(
+            mock_tags.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE, mock_tags.RESOURCE_ANY_ID,
+            (mock_crit.return_value.as_dict(),), {'full': True},
+            tags=[mock_tags.action_tag.return_value])
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth', new=assert_auth_CREATE())
+    @mock.patch('pulp.server.webservices.views.repositories.Criteria.from_client_input')
+    def test_post_with_invalid_full(self, mock_crit):
+        """
+        Test regenerate content applicability with a full parameter that is not a boolean.
+        """
+
+        mock_request = mock.MagicMock()
+        mock_request.body = json.dumps({'repo_criteria': {}, 'full': 'yes'})
+        content_app_regen = ContentApplicabilityRegenerationView()
+        self.assertRaises(exceptions.InvalidValue, content_app_regen.post, mock_request)
 
     @mock.patch('pulp.server.webservices.views.decorators._verify_auth', new=assert_auth_CREATE())
     @mock.patch('pulp.server.webservices.views.repositories.Criteria.from_client_input')
@@ -372,6 +372,86 @@ class TestSearchView(unittest.TestCase):
         m_serial.assert_called_once_with(['list', 'of', 'things'], multiple=True)
         m_trim.assert_called_once_with(m_model, m_serial().data, ['f1', 'f2'])
 
+    def test__generate_response_streamed(self):
+        """
+        Test that _generate_response() streams the results when stream_results is set.
+        """
+        class FakeSearchView(search.SearchView):
+            model = mock.MagicMock()
+            serializer = mock.MagicMock(side_effect=['biggest money', 'unreal money'])
+            stream_results = True
+
+        query = {'filters': {'money': {'$gt': 1000000}}}
+        FakeSearchView.model.objects.find_by_criteria.return_value = ['big money', 'bigger money']
+
+        results = FakeSearchView._generate_response(query, {})
+
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["biggest money", "unreal money"]')
+        self.assertEqual(results.status_code, 200)
+
+    def test__generate_response_streamed_invalid_criteria(self):
+        """
+        Test that a pymongo exception is handled correctly when the results are streamed.
+        """
+        class FakeSearchView(search.SearchView):
+            model = mock.MagicMock()
+            stream_results = True
+
+        def find_by_criteria(query):
+            raise OperationFailure('dang')
+            yield
+
+        query = {'filters': {'money': {'$gt': 1000000}}}
+        FakeSearchView.model.objects.find_by_criteria.side_effect = find_by_criteria
+        self.assertRaises(exceptions.InvalidValue, FakeSearchView._generate_response, query, {})
+
+    def test_iter_results_serializer(self):
+        """
+        Ensure that if a class has an old style serializer, it is used for each result.
+        """
+        m_serial = mock.MagicMock(side_effect=lambda r: r.upper())
+
+        class FakeSearchView(search.SearchView):
+            model = mock.MagicMock()
+            serializer = m_serial
+
+        m_method = mock.MagicMock(return_value=iter(['list', 'of', 'things']))
+
+        results = FakeSearchView.iter_results({'search': 'q'}, m_method, {})
+        self.assertFalse(m_method.called)
+        self.assertEqual(list(results), ['LIST', 'OF', 'THINGS'])
+
+    def test_iter_results_model_restricted_fields(self):
+        """
+        Ensure each result is serialized by the model SERIALIZER and trimmed to the fields.
+        """
+        m_model = mock.MagicMock()
+        m_model._fields = {'r': mock.MagicMock(required=True),
+                           'o': mock.MagicMock(required=False)}
+        m_model.SERIALIZER.side_effect = lambda r: mock.MagicMock(data=dict(r))
+
+        class FakeSearchView(search.SearchView):
+            model = m_model
+
+        m_method = mock.MagicMock(return_value=[{'id': 1, 'r': 2, 'o': 3, 'f1': 4, 'x': 5}])
+
+        results = list(FakeSearchView.iter_results({'fields': ['f1']}, m_method, {}))
+        self.assertEqual(results, [{'id': 1, 'r': 2, 'f1': 4}])
+        m_model.SERIALIZER.assert_called_once_with({'id': 1, 'r': 2, 'o': 3, 'f1': 4, 'x': 5})
+
+    def test_iter_results_no_serializer(self):
+        """
+        Ensure results are returned unchanged without a serializer.
+        """
+        class FakeSearchView(search.SearchView):
+            manager = mock.MagicMock()
+
+        m_method = mock.MagicMock(return_value=['list', 'of', 'things'])
+
+        results = FakeSearchView.iter_results({}, m_method, {})
+        self.assertEqual(list(results), ['list', 'of', 'things'])
+
 
 class TestParseArgs(unittest.TestCase):
     class FakeSearchView(search.SearchView):
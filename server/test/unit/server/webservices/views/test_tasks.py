@@ -48,6 +48,7 @@ class TestTaskSearchView(unittest.TestCase):
                          util.generate_json_response_with_pulp_encoder)
         self.assertEqual(TaskSearchView.model, model.TaskStatus)
         self.assertEqual(TaskSearchView.serializer, task_serializer)
+        self.assertTrue(TaskSearchView.stream_results)
 
 
 class TestTaskCollection(unittest.TestCase):
@@ -2,7 +2,7 @@ import httplib
 import json
 import mock
 
-from django.http import HttpResponse, HttpResponseNotFound
+from django.http import HttpResponse, HttpResponseNotFound, StreamingHttpResponse
 
 from pulp.common.compat import unittest
 from pulp.server.exceptions import InputEncodingError, PulpCodedValidationException
@@ -58,6 +58,58 @@ class TestResponseGenerators(unittest.TestCase):
         util.generate_json_response_with_pulp_encoder(test_content)
         mock_json.dumps.assert_called_once_with(test_content, default=pulp_json_encoder)
 
+    def test_generate_streaming_json_response(self):
+        """
+        Ensure the streamed body is the same as the one built by generate_json_response.
+        """
+        for count in (0, 1, 2, 5):
+            test_content = [{'n': n} for n in range(count)]
+            response = util.generate_streaming_json_response(iter(test_content), chunk_size=2)
+            self.assertTrue(isinstance(response, StreamingHttpResponse))
+            self.assertEqual(response.status_code, httplib.OK)
+            self.assertEqual(response._headers.get('content-type'),
+                             ('Content-Type', 'application/json; charset=utf-8'))
+            self.assertEqual(''.join(response.streaming_content),
+                             util.generate_json_response(test_content).content)
+
+    def test_generate_streaming_json_response_chunks(self):
+        """
+        Ensure items are consumed one chunk at a time, and the first before returning.
+        """
+        consumed = []
+
+        def items():
+            for n in range(5):
+                consumed.append(n)
+                yield n
+
+        response = util.generate_streaming_json_response(items(), chunk_size=2)
+        self.assertEqual(consumed, [0])
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), '[0, 1')
+        self.assertEqual(consumed, [0, 1])
+        self.assertEqual(list(chunks), [', 2, 3', ', 4', ']'])
+
+    def test_generate_streaming_json_response_raised(self):
+        """
+        Ensure errors raised while fetching the first item are raised by the function.
+        """
+        def items():
+            raise ValueError('bad query')
+            yield
+
+        self.assertRaises(ValueError, util.generate_streaming_json_response, items())
+
+    @mock.patch('pulp.server.webservices.views.util.json')
+    def test_generate_streaming_json_response_with_pulp_encoder(self, mock_json):
+        """
+        Ensure that the shortcut function uses the specified encoder.
+        """
+        mock_json.dumps.return_value = '{}'
+        response = util.generate_streaming_json_response_with_pulp_encoder([{'foo': 'bar'}])
+        list(response.streaming_content)
+        mock_json.dumps.assert_called_once_with({'foo': 'bar'}, default=pulp_json_encoder)
+
     @mock.patch('pulp.server.webservices.views.util.iri_to_uri')
     def test_generate_redirect_response(self, mock_iri_to_uri):
         """
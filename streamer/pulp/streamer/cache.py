@@ -3,6 +3,7 @@ import sys
 from gettext import gettext as _
 from logging import getLogger
 from threading import RLock
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
 log = getLogger(__name__)
@@ -19,22 +20,35 @@ class Cache(object):
     """
     Generic object cache.
 
+    The inventory is ordered by when each item was last requested so that
+    eviction only needs to inspect the least recently requested items.
+    Eviction is amortized by running it at most once per eviction interval
+    or when the number of cached items exceeds the configured maximum.
+
     Attributes:
         eviction_threshold (timedelta): How long an unrequested item will be cached.
+        eviction_interval (timedelta): The minimum time between evictions.
+        max_entries (int): The maximum number of cached items.  None is unbounded.
         _lock (RLock): The object mutex.
-        _inventory (dict): The inventory of cached objects.
-            Each value is an Item.
+        _inventory (OrderedDict): The inventory of cached objects ordered
+            by last requested (oldest first).  Each value is an Item.
+        _last_eviction (datetime): When the last eviction was performed.
     """
 
-    def __init__(self, eviction_threshold=None):
+    def __init__(self, eviction_threshold=None, max_entries=None, eviction_interval=None):
         """
         Args:
             eviction_threshold (timedelta): How long an unrequested item will be cached.
-
+            max_entries (int): The maximum number of cached items.  None is unbounded.
+            eviction_interval (timedelta): The minimum time between evictions.
+                Defaults to 1/10 of the eviction threshold.
         """
         self.eviction_threshold = eviction_threshold or timedelta(hours=4)
+        self.eviction_interval = eviction_interval or self.eviction_threshold / 10
+        self.max_entries = max_entries
         self._lock = RLock()
-        self._inventory = {}
+        self._inventory = OrderedDict()
+        self._last_eviction = None
 
     def add(self, key, object_):
         """
@@ -45,7 +59,10 @@ class Cache(object):
             object_ (object): An object to be cached.
         """
         with self._lock:
+            self._inventory.pop(key, None)
             self._inventory[key] = Item(object_)
+            if self.max_entries and len(self._inventory) > self.max_entries:
+                self.evict()
 
     def purge(self, key):
         """
@@ -72,16 +89,21 @@ class Cache(object):
         """
         with self._lock:
             try:
-                item = self._inventory[key]
+                item = self._inventory.pop(key)
             except KeyError:
                 raise NotCached()
             item.touch()
-            self.evict()
+            self._inventory[key] = item
+            if self._last_eviction is None or \
+                    (item.last_requested - self._last_eviction) >= self.eviction_interval:
+                self.evict()
             return item.object
 
     def evict(self):
         """
-        Evict all unused cached objects.
+        Evict unused cached objects that have not been requested within the
+        eviction threshold or exceed the maximum number of entries.
+        Only the least recently requested items (and busy items) are inspected.
 
         Returns:
             list: The evicted objects.
@@ -90,15 +112,17 @@ class Cache(object):
         evicted = []
         now = Item.now()
         with self._lock:
-            for key, item in self._inventory.items():
-                duration = (now - item.last_requested)
+            excess = len(self._inventory) - (self.max_entries or len(self._inventory))
+            for key, item in self._inventory.iteritems():
                 if item.busy:
                     busy.append(item.object)
                     continue
-                if duration < self.eviction_threshold:
-                    continue
-                self.purge(key)
-                evicted.append(item.object)
+                expired = (now - item.last_requested) >= self.eviction_threshold
+                if not expired and len(evicted) >= excess:
+                    break
+                evicted.append(key)
+            evicted = [self._inventory.pop(key).object for key in evicted]
+            self._last_eviction = now
         log.debug(
             _('Cache.evict(): %(t)d total, %(e)d evicted, %(b)d busy'),
             {
@@ -111,6 +135,9 @@ class Cache(object):
     def __contains__(self, key):
         return key in self._inventory
 
+    def __len__(self):
+        return len(self._inventory)
+
 
 class Item(object):
     """
@@ -9,6 +9,11 @@ DEFAULT_VALUES = {
         'port': '8751',
         'interfaces': 'localhost',
         'cache_timeout': '86400',
+        'coalesce': 'false',
+        'spool_dir': '/tmp',
+        'disk_cache_dir': '',
+        'disk_cache_size': '10737418240',
+        'session_cache_size': '1000',
     },
 }
 
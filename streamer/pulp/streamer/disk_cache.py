@@ -0,0 +1,397 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from collections import OrderedDict
+from gettext import gettext as _
+from logging import getLogger
+from threading import RLock
+
+from pulp.server import util
+
+log = getLogger(__name__)
+
+
+# The algorithm used to digest content when the catalog entry has no checksum.
+DEFAULT_ALGORITHM = 'sha256'
+
+# Suffix of the metadata file stored alongside each cached file.
+METADATA_SUFFIX = '.json'
+
+# Prefix of files being written.
+TMP_PREFIX = '.tmp-'
+
+# The size of the chunks read from cached files.
+READ_SIZE = 65536
+
+
+def supported(algorithm):
+    """
+    Get whether a Pulp checksum type is supported.
+
+    Args:
+        algorithm (str): The checksum type.
+
+    Returns:
+        bool: True if supported.
+    """
+    return algorithm.lower() in util.CHECKSUM_FUNCTIONS
+
+
+class Entry(object):
+    """
+    A file stored in the disk cache.
+
+    Attributes:
+        name (str): The file name within the cache directory.
+        path (str): The catalog path.
+        size (int): The file size in bytes.
+        algorithm (str): The algorithm used to calculate the digest.
+        digest (str): The hex digest of the file content.
+        headers (list): The (name, values) response headers.
+    """
+
+    def __init__(self, name, path, size, algorithm, digest, headers):
+        """
+        Args:
+            name (str): The file name within the cache directory.
+            path (str): The catalog path.
+            size (int): The file size in bytes.
+            algorithm (str): The algorithm used to calculate the digest.
+            digest (str): The hex digest of the file content.
+            headers (list): The (name, values) response headers.
+        """
+        self.name = name
+        self.path = path
+        self.size = size
+        self.algorithm = algorithm
+        self.digest = digest
+        self.headers = headers
+
+    def valid(self, algorithm, checksum):
+        """
+        Validate the cached content using the catalog entry checksum.
+        The content is valid when the catalog entry has no checksum.
+
+        Args:
+            algorithm (str): The catalog entry checksum algorithm.
+            checksum (str): The catalog entry checksum.
+
+        Returns:
+            bool: True if valid.
+        """
+        if not (algorithm and checksum):
+            return True
+        return algorithm == self.algorithm and checksum == self.digest
+
+    def dict(self):
+        """
+        Returns:
+            dict: The metadata to be stored.
+        """
+        return dict(
+            path=self.path,
+            size=self.size,
+            algorithm=self.algorithm,
+            digest=self.digest,
+            headers=self.headers)
+
+
+class DiskCache(object):
+    """
+    Bounded on-disk cache of content streamed by the streamer.
+    Files are evicted in least recently requested order when the total
+    size of the cached files exceeds the maximum.
+
+    Attributes:
+        directory (str): The cache directory.
+        max_bytes (int): The maximum total size of cached files.
+        size (int): The total size of cached files.
+        _lock (RLock): The object mutex.
+        _inventory (OrderedDict): Entry keyed by catalog path ordered
+            by last requested (oldest first).
+    """
+
+    @staticmethod
+    def file_name(path):
+        """
+        Get the file name used to store the specified catalog path.
+
+        Args:
+            path (str): The catalog path.
+
+        Returns:
+            str: The file name.
+        """
+        return hashlib.sha256(path).hexdigest()
+
+    def __init__(self, directory, max_bytes):
+        """
+        Args:
+            directory (str): The cache directory.
+            max_bytes (int): The maximum total size of cached files.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = RLock()
+        self._inventory = OrderedDict()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._load()
+
+    def get(self, path, algorithm, checksum):
+        """
+        Get a cached file.
+        Files that fail validation using the catalog entry checksum are purged.
+
+        Args:
+            path (str): The catalog path.
+            algorithm (str): The catalog entry checksum algorithm.
+            checksum (str): The catalog entry checksum.
+
+        Returns:
+            tuple: (entry, fp) where fp is the open file.  (None, None) when not cached.
+        """
+        with self._lock:
+            entry = self._inventory.pop(path, None)
+            if entry is None:
+                return None, None
+            if not entry.valid(algorithm, checksum):
+                log.info(_('Cached file failed validation: {p}').format(p=path))
+                self._remove(entry)
+                return None, None
+            try:
+                fp = open(self._data_path(entry.name), 'rb')
+            except IOError:
+                self._remove(entry)
+                return None, None
+            self._inventory[path] = entry
+            return entry, fp
+
+    def writer(self, path, responder, algorithm, checksum):
+        """
+        Get a writer used to add a file to the cache.
+
+        Args:
+            path (str): The catalog path.
+            responder (object): A file-like object used to write the response.
+            algorithm (str): The catalog entry checksum algorithm.
+            checksum (str): The catalog entry checksum.
+
+        Returns:
+            Writer: A writer, or None when the checksum algorithm is not supported,
+                in which case the content cannot be validated and is not cached.
+        """
+        if checksum and algorithm and not supported(algorithm):
+            log.warn(_('Unsupported checksum algorithm {a}, not cached: {p}').format(
+                a=algorithm, p=path))
+            return None
+        return Writer(self, path, responder, algorithm, checksum)
+
+    def add(self, entry, tmp_path):
+        """
+        Add a completely written file to the cache and evict files as needed.
+
+        Args:
+            entry (Entry): The entry to be added.
+            tmp_path (str): The absolute path to the written file.
+        """
+        with self._lock:
+            previous = self._inventory.pop(entry.path, None)
+            if previous is not None:
+                self._remove(previous)
+            with open(self._metadata_path(entry.name), 'w') as fp:
+                json.dump(entry.dict(), fp)
+            os.rename(tmp_path, self._data_path(entry.name))
+            self._inventory[entry.path] = entry
+            self.size += entry.size
+            self.evict()
+
+    def evict(self):
+        """
+        Evict the least recently requested files until the total size
+        is within the maximum.
+
+        Returns:
+            list: The catalog paths of evicted files.
+        """
+        evicted = []
+        with self._lock:
+            while self.size > self.max_bytes and self._inventory:
+                path, entry = self._inventory.popitem(last=False)
+                self._remove(entry)
+                evicted.append(path)
+        if evicted:
+            log.debug(
+                _('DiskCache.evict(): %(t)d total, %(e)d evicted, %(s)d bytes'),
+                {
+                    't': len(self._inventory),
+                    'e': len(evicted),
+                    's': self.size
+                })
+        return evicted
+
+    def _remove(self, entry):
+        """
+        Remove the files for an entry which has already been removed
+        from the inventory.  Open files are not affected.
+
+        Args:
+            entry (Entry): The entry to remove.
+        """
+        self.size -= entry.size
+        for path in (self._data_path(entry.name), self._metadata_path(entry.name)):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _load(self):
+        """
+        Load the inventory of files already in the cache directory.
+        Incomplete files left behind by a previous process are deleted.
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(TMP_PREFIX):
+                os.unlink(path)
+                continue
+            if not name.endswith(METADATA_SUFFIX):
+                continue
+            try:
+                with open(path) as fp:
+                    metadata = json.load(fp)
+                name = name[:-len(METADATA_SUFFIX)]
+                entry = Entry(name=name, **metadata)
+                mtime = os.stat(self._data_path(name)).st_mtime
+            except (OSError, IOError, ValueError, TypeError):
+                log.debug(_('Ignoring invalid cache metadata: {p}').format(p=path))
+                continue
+            found.append((mtime, entry))
+        for mtime, entry in sorted(found, key=lambda f: f[0]):
+            self._inventory[entry.path] = entry
+            self.size += entry.size
+        self.evict()
+
+    def _data_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _metadata_path(self, name):
+        return os.path.join(self.directory, name + METADATA_SUFFIX)
+
+    def __contains__(self, path):
+        return path in self._inventory
+
+    def __len__(self):
+        return len(self._inventory)
+
+
+class Writer(object):
+    """
+    A file-like object that tees streamed content to both the client
+    response and a temporary file in the disk cache.  The content is
+    digested as it is written so it can be validated on commit.
+
+    Attributes:
+        cache (DiskCache): The disk cache.
+        path (str): The catalog path.
+        algorithm (str): The algorithm used to calculate the digest.
+        checksum (str): The expected checksum.  May be None.
+        responder (object): A file-like object used to write the response.
+        size (int): The number of bytes written.
+        _fp (file): The temporary file.
+        _tmp_path (str): The absolute path to the temporary file.
+        _hasher (object): The hashlib hash object.
+    """
+
+    def __init__(self, cache, path, responder, algorithm, checksum):
+        """
+        Args:
+            cache (DiskCache): The disk cache.
+            path (str): The catalog path.
+            responder (object): A file-like object used to write the response.
+            algorithm (str): The catalog entry checksum algorithm.
+            checksum (str): The catalog entry checksum.
+        """
+        self.cache = cache
+        self.path = path
+        self.algorithm = algorithm if checksum and algorithm else DEFAULT_ALGORITHM
+        self.checksum = checksum
+        self.responder = responder
+        self.size = 0
+        self._hasher = util.CHECKSUM_FUNCTIONS[self.algorithm.lower()]()
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache.directory, prefix=TMP_PREFIX)
+        self._fp = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        """
+        Forward data to the responder and append it to the temporary file.
+
+        Args:
+            data (str): A string to write to the response.
+        """
+        self.responder.write(data)
+        if self._fp is None:
+            return
+        try:
+            self._fp.write(data)
+        except (OSError, IOError):
+            log.exception(_('Write to disk cache failed: {p}').format(p=self.path))
+            self.discard()
+            return
+        self._hasher.update(data)
+        self.size += len(data)
+
+    def commit(self, headers):
+        """
+        Add the written file to the cache when the digest matches
+        the expected checksum.
+
+        Args:
+            headers (list): The (name, values) response headers.
+
+        Returns:
+            bool: True if added to the cache.
+        """
+        if self._fp is None:
+            return False
+        self._fp.close()
+        self._fp = None
+        digest = self._hasher.hexdigest()
+        if self.checksum and digest != self.checksum:
+            log.info(_('Checksum mismatch, not cached: {p}').format(p=self.path))
+            self._unlink()
+            return False
+        entry = Entry(
+            name=DiskCache.file_name(self.path),
+            path=self.path,
+            size=self.size,
+            algorithm=self.algorithm,
+            digest=digest,
+            headers=list(headers))
+        try:
+            self.cache.add(entry, self._tmp_path)
+        except (OSError, IOError):
+            log.exception(_('Add to disk cache failed: {p}').format(p=self.path))
+            self._unlink()
+            return False
+        return True
+
+    def discard(self):
+        """
+        Discard the written file.
+        """
+        if self._fp is None:
+            return
+        self._fp.close()
+        self._fp = None
+        self._unlink()
+
+    def _unlink(self):
+        try:
+            os.unlink(self._tmp_path)
+        except OSError:
+            pass
@@ -19,6 +19,8 @@ from pulp.server.db.model import DeferredDownload, LazyCatalogEntry
 from pulp.server.controllers import repository as repo_controller
 from pulp.plugins.loader.exceptions import PluginNotFound
 from pulp.streamer.cache import Cache, NotCached
+from pulp.streamer.disk_cache import DiskCache, READ_SIZE
+from pulp.streamer.spool import Coalescer, SpoolWriter
 
 logger = logging.getLogger(__name__)
 
@@ -112,7 +114,16 @@ class Streamer(Resource):
         """
         Resource.__init__(self)
         self.config = config
-        self.session_cache = SessionCache()
+        self.session_cache = SessionCache(
+            max_entries=config.getint('streamer', 'session_cache_size'))
+        self.coalescer = None
+        if config.getboolean('streamer', 'coalesce'):
+            self.coalescer = Coalescer(config.get('streamer', 'spool_dir'))
+        self.disk_cache = None
+        if config.get('streamer', 'disk_cache_dir'):
+            self.disk_cache = DiskCache(
+                config.get('streamer', 'disk_cache_dir'),
+                config.getint('streamer', 'disk_cache_size'))
 
     def render_GET(self, request):
         """
@@ -139,34 +150,166 @@ class Streamer(Resource):
         Download the requested content using the content unit catalog and dispatch
         a celery task that causes Pulp to download the newly cached unit.
 
+        When coalescing is enabled, concurrent requests for the same path share
+        a single upstream download.  The first request downloads and spools the
+        content while the others are streamed the spooled content.
+
         :param request: The original twisted client HTTP request being handled by the streamer.
         :type  request: twisted.web.server.Request
         """
         with Responder(request) as responder:
             try:
                 path = urlparse(request.uri).path
-                q_set = LazyCatalogEntry.objects.filter(path=path)
-                q_set = q_set.order_by('-_id', '-revision')
-                count = q_set.count()
-                if not count:
-                    logger.error(_('No catalog entry found. path={p}'.format(p=path)))
-                    request.setResponseCode(NOT_FOUND)
+                if self.coalescer is None:
+                    self._fetch(request, path, responder)
                     return
-                for entry in q_set.all():
-                    logger.info('Trying URL: {url}'.format(url=entry.url))
-                    try:
-                        last_report = self._download(request, entry, responder)
-                        self._on_succeeded(entry, request, last_report)
-                        return
-                    except (DownloadFailed, DoesNotExist, PluginNotFound):
-                        # try another
-                        continue
-                # Failed
-                self._on_all_failed(request)
+                spool, leader = self.coalescer.join(path)
             except Exception:
-                logger.exception(_('An unexpected error occurred: {url}').format(url=request.uri))
-                request.setResponseCode(INTERNAL_SERVER_ERROR)
+                self._on_error(request)
+                return
+            if leader:
+                self._lead(request, path, spool, responder)
+            else:
+                self._follow(request, spool, responder)
+
+    def _lead(self, request, path, spool, responder):
+        """
+        Download the requested content while writing it to the spool
+        for coalesced requests.
+
+        :param request: The original twisted client HTTP request being handled by the streamer.
+        :type  request: twisted.web.server.Request
+        :param path: The requested catalog path.
+        :type  path: str
+        :param spool: The spool to be written.
+        :type  spool: pulp.streamer.spool.Spool
+        :param responder: The file-like object used to write the response.
+        :type  responder: Responder
+        """
+        entry = None
+        try:
+            entry = self._fetch(request, path, SpoolWriter(spool, request, responder))
+        except Exception:
+            self._on_error(request)
+        finally:
+            self.coalescer.done(spool, request.code, entry)
+
+    def _follow(self, request, spool, responder):
+        """
+        Stream the content being downloaded by another request from the spool.
+
+        :param request: The original twisted client HTTP request being handled by the streamer.
+        :type  request: twisted.web.server.Request
+        :param spool: The spool being written by the leader.
+        :type  spool: pulp.streamer.spool.Spool
+        :param responder: The file-like object used to write the response.
+        :type  responder: Responder
+        """
+        try:
+            spool.wait()
+            if spool.finished and not spool.succeeded:
+                request.setResponseCode(spool.code)
                 request.setHeader('Content-Length', '0')
+                return
+            for name, values in spool.headers or []:
+                request.responseHeaders.setRawHeaders(name, values)
+            for data in spool.read():
+                responder.write(data)
+            if spool.succeeded:
+                self._on_succeeded(spool.entry, request, None)
+        except Exception:
+            self._on_error(request)
+        finally:
+            spool.detach()
+
+    def _fetch(self, request, path, responder):
+        """
+        Download the requested content using the content unit catalog.
+
+        :param request: The original twisted client HTTP request being handled by the streamer.
+        :type  request: twisted.web.server.Request
+        :param path: The requested catalog path.
+        :type  path: str
+        :param responder: The file-like object that nectar should write to.
+        :type  responder: Responder
+        :return: The catalog entry successfully downloaded or None.
+        :rtype: pulp.server.db.model.LazyCatalogEntry
+        """
+        q_set = LazyCatalogEntry.objects.filter(path=path)
+        q_set = q_set.order_by('-_id', '-revision')
+        count = q_set.count()
+        if not count:
+            logger.error(_('No catalog entry found. path={p}'.format(p=path)))
+            request.setResponseCode(NOT_FOUND)
+            return
+        if self.disk_cache is not None:
+            entry = q_set.first()
+            if self._serve_cached(request, path, entry, responder):
+                self._on_succeeded(entry, request, None)
+                return entry
+        for entry in q_set.all():
+            logger.info('Trying URL: {url}'.format(url=entry.url))
+            writer = None
+            if self.disk_cache is not None:
+                writer = self.disk_cache.writer(
+                    path, responder, entry.checksum_algorithm, entry.checksum)
+            try:
+                last_report = self._download(request, entry, writer or responder)
+                if writer is not None:
+                    writer.commit(request.responseHeaders.getAllRawHeaders())
+                self._on_succeeded(entry, request, last_report)
+                return entry
+            except (DownloadFailed, DoesNotExist, PluginNotFound):
+                # try another
+                continue
+            finally:
+                if writer is not None:
+                    writer.discard()
+        # Failed
+        self._on_all_failed(request)
+
+    def _serve_cached(self, request, path, entry, responder):
+        """
+        Serve the requested content from the disk cache.
+        The cached content is validated using the catalog entry checksum.
+
+        :param request: The original twisted client HTTP request being handled by the streamer.
+        :type  request: twisted.web.server.Request
+        :param path: The requested catalog path.
+        :type  path: str
+        :param entry: A catalog entry for the path.
+        :type  entry: pulp.server.db.model.LazyCatalogEntry
+        :param responder: The file-like object used to write the response.
+        :type  responder: Responder
+        :return: True if served from the disk cache.
+        :rtype: bool
+        """
+        cached, fp = self.disk_cache.get(path, entry.checksum_algorithm, entry.checksum)
+        if cached is None:
+            return False
+        with fp:
+            for name, values in cached.headers:
+                request.responseHeaders.setRawHeaders(name, values)
+            request.setHeader('Content-Length', str(cached.size))
+            while True:
+                data = fp.read(READ_SIZE)
+                if not data:
+                    break
+                responder.write(data)
+        logger.debug(_('Served from disk cache: {p}').format(p=path))
+        return True
+
+    @staticmethod
+    def _on_error(request):
+        """
+        An unexpected error occurred.
+
+        :param request: The original twisted client HTTP request being handled by the streamer.
+        :type  request: twisted.web.server.Request
+        """
+        logger.exception(_('An unexpected error occurred: {url}').format(url=request.uri))
+        request.setResponseCode(INTERNAL_SERVER_ERROR)
+        request.setHeader('Content-Length', '0')
 
     def _on_succeeded(self, entry, request, report):
         """
@@ -176,7 +319,7 @@ class Streamer(Resource):
         :type  entry: LazyCatalogEntry
         :param request: An HTTP request.
         :type  request: twisted.web.server.Request
-        :param report: A download report.
+        :param report: A download report or None when not downloaded.
         :type  report: nectar.report.DownloadReport
         """
         pulp_requested = request.getHeader(PULP_STREAM_REQUEST_HEADER)
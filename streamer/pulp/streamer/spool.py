@@ -0,0 +1,270 @@
+import os
+import tempfile
+
+from gettext import gettext as _
+from logging import getLogger
+from threading import Condition, RLock
+
+log = getLogger(__name__)
+
+
+# The size of the chunks read from a spool file and forwarded to clients.
+READ_SIZE = 65536
+
+
+class Spool(object):
+    """
+    A local spool file for a single in-flight download.
+
+    The downloading (leader) request writes the bytes it receives into the
+    spool while coalesced (follower) requests read them back as the file grows.
+
+    Attributes:
+        path (str): The catalog path being downloaded.
+        file_path (str): The absolute path to the spool file.
+        headers (list): The (name, value) response headers captured from the leader.
+        code (int): The HTTP response code of the leader once finished.
+        entry (pulp.server.db.model.LazyCatalogEntry): The catalog entry
+            that was successfully downloaded.  None if the download failed.
+        size (int): The number of bytes written.
+        finished (bool): The leader has finished writing.
+        _condition (Condition): Used to wake readers when data is written.
+        _fp (file): The open spool file used for writing.
+        _readers (int): The number of readers attached to the spool.
+    """
+
+    def __init__(self, path, directory):
+        """
+        Args:
+            path (str): The catalog path being downloaded.
+            directory (str): The directory in which the spool file is created.
+        """
+        self.path = path
+        fd, self.file_path = tempfile.mkstemp(dir=directory, prefix='spool-')
+        self.headers = None
+        self.code = None
+        self.entry = None
+        self.size = 0
+        self.finished = False
+        self._condition = Condition(RLock())
+        self._fp = os.fdopen(fd, 'wb')
+        self._readers = 0
+
+    @property
+    def succeeded(self):
+        """
+        The leader finished and the download succeeded.
+
+        Returns:
+            bool: True if succeeded.
+        """
+        return self.finished and self.entry is not None
+
+    def set_headers(self, headers):
+        """
+        Capture the response headers to be replayed to followers.
+
+        Args:
+            headers (list): List of (name, value) tuples.
+        """
+        with self._condition:
+            if self.headers is None:
+                self.headers = list(headers)
+            self._condition.notify_all()
+
+    def write(self, data):
+        """
+        Append data to the spool and wake any waiting readers.
+
+        Args:
+            data (str): The data to be written.
+        """
+        with self._condition:
+            self._fp.write(data)
+            self._fp.flush()
+            self.size += len(data)
+            self._condition.notify_all()
+
+    def finish(self, code, entry=None):
+        """
+        The leader has finished writing.
+
+        Args:
+            code (int): The HTTP response code sent to the leader's client.
+            entry (pulp.server.db.model.LazyCatalogEntry): The catalog entry
+                that was successfully downloaded or None on failure.
+        """
+        with self._condition:
+            self.code = code
+            self.entry = entry
+            self.finished = True
+            self._fp.close()
+            self._condition.notify_all()
+        self._unlink()
+
+    def attach(self):
+        """
+        Attach a reader.
+        Must be called while the spool is registered with the coalescer.
+        """
+        with self._condition:
+            self._readers += 1
+
+    def detach(self):
+        """
+        Detach a reader.
+        The spool file is deleted after the last reader detaches and the
+        leader has finished writing.
+        """
+        with self._condition:
+            self._readers -= 1
+        self._unlink()
+
+    def wait(self):
+        """
+        Block until the leader has produced headers, data or has finished.
+        """
+        with self._condition:
+            while not (self.finished or self.headers is not None or self.size):
+                self._condition.wait()
+
+    def read(self):
+        """
+        Read the spool from the beginning, following the file as it grows
+        until the leader has finished.
+
+        Returns:
+            generator: Yields chunks of data.
+        """
+        with open(self.file_path, 'rb') as fp:
+            position = 0
+            while True:
+                with self._condition:
+                    while position >= self.size and not self.finished:
+                        self._condition.wait()
+                    available = self.size
+                if position >= available:
+                    break
+                while position < available:
+                    data = fp.read(min(READ_SIZE, available - position))
+                    if not data:
+                        break
+                    position += len(data)
+                    yield data
+
+    def _unlink(self):
+        """
+        Delete the spool file when no longer needed.
+        """
+        with self._condition:
+            if not self.finished or self._readers:
+                return
+            try:
+                os.unlink(self.file_path)
+            except OSError:
+                pass
+
+
+class SpoolWriter(object):
+    """
+    A file-like object provided to nectar that tees the downloaded
+    bytes to both the client response and the spool.
+
+    Attributes:
+        spool (Spool): The spool being written.
+        request (twisted.web.server.Request): The leader's client request.
+        responder (pulp.streamer.server.Responder): Writes to the client.
+    """
+
+    def __init__(self, spool, request, responder):
+        """
+        Args:
+            spool (Spool): The spool being written.
+            request (twisted.web.server.Request): The leader's client request.
+            responder (pulp.streamer.server.Responder): Writes to the client.
+        """
+        self.spool = spool
+        self.request = request
+        self.responder = responder
+
+    def write(self, data):
+        """
+        Forward data to the client and append it to the spool.
+        The response headers are captured on the first write since nectar
+        reports headers before any data is written.
+
+        Args:
+            data (str): A string to write to the response.
+        """
+        if self.spool.headers is None:
+            self.spool.set_headers(self.request.responseHeaders.getAllRawHeaders())
+        self.responder.write(data)
+        self.spool.write(data)
+
+
+class Coalescer(object):
+    """
+    Single-flight coalescing of concurrent downloads of the same path.
+
+    The first request for a path becomes the leader and downloads the content
+    into a spool.  Requests for the same path received while the leader is
+    still downloading are served from the spool.
+
+    Attributes:
+        directory (str): The directory in which spool files are created.
+        _lock (RLock): The object mutex.
+        _inflight (dict): In-flight spools keyed by catalog path.
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): The directory in which spool files are created.
+        """
+        self.directory = directory
+        self._lock = RLock()
+        self._inflight = {}
+
+    def join(self, path):
+        """
+        Join the in-flight download of the specified path.
+        When no download is in-flight, a new spool is created and the caller
+        is the leader.  Otherwise, the caller is attached as a reader.
+
+        Args:
+            path (str): The catalog path.
+
+        Returns:
+            tuple: (spool, leader) where leader is True when the caller
+                is responsible for downloading.
+        """
+        with self._lock:
+            spool = self._inflight.get(path)
+            if spool is not None:
+                spool.attach()
+                log.debug(_('Coalesced request: %(p)s'), {'p': path})
+                return spool, False
+            spool = Spool(path, self.directory)
+            self._inflight[path] = spool
+            return spool, True
+
+    def done(self, spool, code, entry=None):
+        """
+        The leader has finished.
+        The spool is removed from the in-flight inventory so that subsequent
+        requests for the path start a new download.
+
+        Args:
+            spool (Spool): The leader's spool.
+            code (int): The HTTP response code sent to the leader's client.
+            entry (pulp.server.db.model.LazyCatalogEntry): The catalog entry
+                that was successfully downloaded or None on failure.
+        """
+        with self._lock:
+            if self._inflight.get(spool.path) is spool:
+                del self._inflight[spool.path]
+        spool.finish(code, entry)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._inflight)
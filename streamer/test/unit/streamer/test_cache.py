@@ -76,6 +76,57 @@ class TestCache(TestCase):
         cache.evict()
         self.assertTrue('t1' in cache)
 
+    @patch(MODULE + '.Cache.evict')
+    @patch(MODULE + '.Item.now')
+    def test_get_amortized_eviction(self, now, evict):
+        now.side_effect = [1, 2, 3, 4]
+        cache = Cache(10, eviction_interval=2)
+        cache.add('t1', Mock())
+        cache._last_eviction = 1
+        cache.get('t1')
+        self.assertFalse(evict.called)
+        cache.get('t1')
+        evict.assert_called_once_with()
+
+    @patch(MODULE + '.Item.now')
+    def test_get_reorders(self, now):
+        now.side_effect = [1, 2, 3, 4]
+        cache = Cache(10)
+        cache.add('t1', Mock())
+        cache.add('t2', Mock())
+        cache.get('t1')
+        self.assertEqual(list(cache._inventory), ['t2', 't1'])
+
+    @patch(MODULE + '.Item.now')
+    def test_evict_oldest_only(self, now):
+        now.side_effect = [1, 5, 6]
+        cache = Cache(3)
+        cache.add('t1', Mock(key='t1'))
+        cache.add('t2', Mock(key='t2'))
+        evicted = cache.evict()
+        self.assertEqual([obj.key for obj in evicted], ['t1'])
+        self.assertFalse('t1' in cache)
+        self.assertTrue('t2' in cache)
+
+    def test_max_entries(self):
+        cache = Cache(max_entries=2)
+        cache.add('t1', Mock(key='t1'))
+        cache.add('t2', Mock(key='t2'))
+        cache.add('t3', Mock(key='t3'))
+        self.assertEqual(len(cache), 2)
+        self.assertFalse('t1' in cache)
+        self.assertTrue('t2' in cache)
+        self.assertTrue('t3' in cache)
+
+    def test_max_entries_busy(self):
+        t1 = Mock()  # hold ref to make it busy.
+        cache = Cache(max_entries=1)
+        cache.add('t1', t1)
+        cache.add('t2', Mock())
+        cache.add('t3', Mock())
+        self.assertTrue('t1' in cache)
+        self.assertFalse('t2' in cache)
+
 
 class TestItem(TestCase):
 
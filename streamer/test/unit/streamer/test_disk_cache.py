@@ -0,0 +1,132 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from mock import Mock
+
+from pulp.streamer.disk_cache import (DiskCache, Entry, DEFAULT_ALGORITHM, TMP_PREFIX,
+                                      supported)
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestSupported(TestCase):
+
+    def test_supported(self):
+        self.assertTrue(supported('sha256'))
+        self.assertTrue(supported('sha'))
+        self.assertTrue(supported('MD5'))
+        self.assertFalse(supported('sha224'))
+
+
+class TestEntry(TestCase):
+
+    def test_valid(self):
+        entry = Entry('n', '/a', 3, 'sha256', sha256('abc'), [])
+        self.assertTrue(entry.valid(None, None))
+        self.assertTrue(entry.valid('sha256', sha256('abc')))
+        self.assertFalse(entry.valid('sha256', sha256('xyz')))
+        self.assertFalse(entry.valid('sha1', hashlib.sha1('abc').hexdigest()))
+
+
+class TestDiskCache(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def store(self, cache, path, data, algorithm=None, checksum=None, headers=None):
+        responder = Mock()
+        writer = cache.writer(path, responder, algorithm, checksum)
+        writer.write(data)
+        responder.write.assert_called_once_with(data)
+        return writer.commit(headers or [])
+
+    def test_init_creates_directory(self):
+        DiskCache(self.cache_dir, 10)
+        self.assertTrue(os.path.isdir(self.cache_dir))
+
+    def test_write_get(self):
+        cache = DiskCache(self.cache_dir, 100)
+        headers = [('Content-Type', ['application/x-rpm'])]
+        self.assertTrue(self.store(cache, '/a', 'abc', headers=headers))
+        entry, fp = cache.get('/a', None, None)
+        with fp:
+            self.assertEqual(fp.read(), 'abc')
+        self.assertEqual(entry.size, 3)
+        self.assertEqual(entry.algorithm, DEFAULT_ALGORITHM)
+        self.assertEqual(entry.digest, sha256('abc'))
+        self.assertEqual(entry.headers, headers)
+        self.assertEqual(cache.size, 3)
+
+    def test_get_not_cached(self):
+        cache = DiskCache(self.cache_dir, 100)
+        self.assertEqual(cache.get('/a', None, None), (None, None))
+
+    def test_get_invalid(self):
+        cache = DiskCache(self.cache_dir, 100)
+        self.store(cache, '/a', 'abc', 'sha256', sha256('abc'))
+        self.assertEqual(cache.get('/a', 'sha256', sha256('xyz')), (None, None))
+        self.assertFalse('/a' in cache)
+        self.assertEqual(cache.size, 0)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_commit_checksum_mismatch(self):
+        cache = DiskCache(self.cache_dir, 100)
+        self.assertFalse(self.store(cache, '/a', 'abc', 'sha256', sha256('xyz')))
+        self.assertFalse('/a' in cache)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_discard(self):
+        cache = DiskCache(self.cache_dir, 100)
+        writer = cache.writer('/a', Mock(), None, None)
+        writer.write('abc')
+        writer.discard()
+        self.assertFalse(writer.commit([]))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_writer_unsupported_algorithm(self):
+        cache = DiskCache(self.cache_dir, 100)
+        self.assertTrue(cache.writer('/a', Mock(), 'sha224', 'abc') is None)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_writer_unsupported_algorithm_no_checksum(self):
+        cache = DiskCache(self.cache_dir, 100)
+        self.assertTrue(self.store(cache, '/a', 'abc', 'sha224', None))
+        self.assertEqual(cache.get('/a', None, None)[0].algorithm, DEFAULT_ALGORITHM)
+
+    def test_write_get_pulp_checksum_type(self):
+        cache = DiskCache(self.cache_dir, 100)
+        checksum = hashlib.sha1('abc').hexdigest()
+        self.assertTrue(self.store(cache, '/a', 'abc', 'sha', checksum))
+        entry, fp = cache.get('/a', 'sha', checksum)
+        fp.close()
+        self.assertEqual(entry.digest, checksum)
+
+    def test_evict_lru(self):
+        cache = DiskCache(self.cache_dir, 6)
+        self.store(cache, '/a', 'abc')
+        self.store(cache, '/b', 'def')
+        cache.get('/a', None, None)[1].close()
+        self.store(cache, '/c', 'ghi')
+        self.assertTrue('/a' in cache)
+        self.assertFalse('/b' in cache)
+        self.assertTrue('/c' in cache)
+        self.assertEqual(cache.size, 6)
+
+    def test_load(self):
+        cache = DiskCache(self.cache_dir, 100)
+        self.store(cache, '/a', 'abc')
+        open(os.path.join(self.cache_dir, TMP_PREFIX + 'partial'), 'w').close()
+        cache = DiskCache(self.cache_dir, 100)
+        self.assertTrue('/a' in cache)
+        self.assertEqual(cache.size, 3)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
@@ -8,6 +8,7 @@ from pulp.common.compat import unittest
 from pulp.devel.unit.util import SideEffect
 from pulp.plugins.loader.exceptions import PluginNotFound
 from pulp.server import constants
+from pulp.streamer.config import load_configuration
 from pulp.streamer.server import (
     Responder, SessionCache, Streamer, DownloadListener, DownloadFailed, HOP_BY_HOP_HEADERS
 )
@@ -80,12 +81,18 @@ class TestStreamer(unittest.TestCase):
         request = Mock()
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         streamer.render_GET(request)
 
         # validation
         reactor.callInThread.assert_called_once_with(streamer._handle_get, request)
 
+    def test_session_cache_size(self):
+        config = load_configuration([])
+        config.set('streamer', 'session_cache_size', '10')
+        streamer = Streamer(config)
+        self.assertEqual(streamer.session_cache.max_entries, 10)
+
     @patch(MODULE_PREFIX + 'Responder')
     @patch(MODULE_PREFIX + 'Streamer._on_succeeded')
     @patch(MODULE_PREFIX + 'Streamer._download')
@@ -113,7 +120,8 @@ class TestStreamer(unittest.TestCase):
         model.objects.filter.return_value.order_by.return_value.count.return_value = len(catalog)
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
+        streamer.coalescer = None
         streamer._handle_get(request)
 
         # validation
@@ -155,7 +163,8 @@ class TestStreamer(unittest.TestCase):
         model.objects.filter.return_value.order_by.return_value.count.return_value = len(catalog)
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
+        streamer.coalescer = None
         streamer._handle_get(request)
 
         # validation
@@ -187,7 +196,8 @@ class TestStreamer(unittest.TestCase):
         model.objects.filter.return_value.order_by.return_value.count.return_value = len(catalog)
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
+        streamer.coalescer = None
         streamer._handle_get(request)
 
         # validation
@@ -204,11 +214,222 @@ class TestStreamer(unittest.TestCase):
         model.objects.filter.side_effect = ValueError()
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
+        streamer.coalescer = None
+        streamer._handle_get(request)
+
+        # validation
+        request.setResponseCode.assert_called_once_with(INTERNAL_SERVER_ERROR)
+
+    @patch(MODULE_PREFIX + 'Streamer._on_succeeded')
+    @patch(MODULE_PREFIX + 'Streamer._download')
+    @patch(MODULE_PREFIX + 'Streamer._serve_cached')
+    @patch(MODULE_PREFIX + 'LazyCatalogEntry')
+    def test_fetch_disk_cache_hit(self, model, _serve_cached, _download, _on_succeeded):
+        request = Mock()
+        responder = Mock()
+        q_set = model.objects.filter.return_value.order_by.return_value
+        q_set.count.return_value = 1
+        _serve_cached.return_value = True
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer.disk_cache = Mock()
+        entry = streamer._fetch(request, '/a', responder)
+
+        # validation
+        _serve_cached.assert_called_once_with(request, '/a', q_set.first.return_value, responder)
+        _on_succeeded.assert_called_once_with(q_set.first.return_value, request, None)
+        self.assertEqual(entry, q_set.first.return_value)
+        self.assertFalse(_download.called)
+
+    @patch(MODULE_PREFIX + 'Streamer._on_succeeded')
+    @patch(MODULE_PREFIX + 'Streamer._download')
+    @patch(MODULE_PREFIX + 'Streamer._serve_cached')
+    @patch(MODULE_PREFIX + 'LazyCatalogEntry')
+    def test_fetch_disk_cache_miss(self, model, _serve_cached, _download, _on_succeeded):
+        request = Mock()
+        responder = Mock()
+        report = DownloadReport('', '')
+        _download.side_effect = SideEffect(DownloadFailed(report), report)
+        catalog = [
+            Mock(url='url-a'),
+            Mock(url='url-b'),
+        ]
+        q_set = model.objects.filter.return_value.order_by.return_value
+        q_set.count.return_value = len(catalog)
+        q_set.all.return_value = catalog
+        _serve_cached.return_value = False
+        writers = [Mock(), Mock()]
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer.disk_cache = Mock()
+        streamer.disk_cache.writer.side_effect = writers
+        entry = streamer._fetch(request, '/a', responder)
+
+        # validation
+        self.assertEqual(entry, catalog[1])
+        self.assertEqual(
+            streamer.disk_cache.writer.call_args_list,
+            [
+                call('/a', responder, catalog[0].checksum_algorithm, catalog[0].checksum),
+                call('/a', responder, catalog[1].checksum_algorithm, catalog[1].checksum),
+            ])
+        self.assertEqual(
+            _download.call_args_list,
+            [
+                call(request, catalog[0], writers[0]),
+                call(request, catalog[1], writers[1]),
+            ])
+        self.assertFalse(writers[0].commit.called)
+        writers[0].discard.assert_called_once_with()
+        writers[1].commit.assert_called_once_with(
+            request.responseHeaders.getAllRawHeaders.return_value)
+        _on_succeeded.assert_called_once_with(catalog[1], request, report)
+
+    def test_serve_cached(self):
+        request = Mock()
+        responder = Mock()
+        entry = Mock()
+        cached = Mock(size=6, headers=[('Content-Type', ['application/x-rpm'])])
+        fp = Mock()
+        fp.__enter__ = Mock(return_value=fp)
+        fp.__exit__ = Mock(return_value=False)
+        fp.read.side_effect = ['abc', 'def', '']
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer.disk_cache = Mock()
+        streamer.disk_cache.get.return_value = (cached, fp)
+        served = streamer._serve_cached(request, '/a', entry, responder)
+
+        # validation
+        self.assertTrue(served)
+        streamer.disk_cache.get.assert_called_once_with(
+            '/a', entry.checksum_algorithm, entry.checksum)
+        request.responseHeaders.setRawHeaders.assert_called_once_with(
+            'Content-Type', ['application/x-rpm'])
+        request.setHeader.assert_called_once_with('Content-Length', '6')
+        self.assertEqual(responder.write.call_args_list, [call('abc'), call('def')])
+
+    def test_serve_cached_not_cached(self):
+        responder = Mock()
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer.disk_cache = Mock()
+        streamer.disk_cache.get.return_value = (None, None)
+        served = streamer._serve_cached(Mock(), '/a', Mock(), responder)
+
+        # validation
+        self.assertFalse(served)
+        self.assertFalse(responder.write.called)
+
+    @patch(MODULE_PREFIX + 'Responder')
+    @patch(MODULE_PREFIX + 'Streamer._lead')
+    @patch(MODULE_PREFIX + 'reactor', Mock())
+    def test_handle_get_leader(self, _lead, responder):
+        responder.return_value.__enter__.return_value = responder.return_value
+        request = Mock(uri='http://content-world.com/content/bear.rpm')
+        spool = Mock()
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer.coalescer = Mock()
+        streamer.coalescer.join.return_value = (spool, True)
+        streamer._handle_get(request)
+
+        # validation
+        streamer.coalescer.join.assert_called_once_with('/content/bear.rpm')
+        _lead.assert_called_once_with(
+            request, '/content/bear.rpm', spool, responder.return_value)
+
+    @patch(MODULE_PREFIX + 'Responder')
+    @patch(MODULE_PREFIX + 'Streamer._follow')
+    @patch(MODULE_PREFIX + 'reactor', Mock())
+    def test_handle_get_follower(self, _follow, responder):
+        responder.return_value.__enter__.return_value = responder.return_value
+        request = Mock(uri='http://content-world.com/content/bear.rpm')
+        spool = Mock()
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer.coalescer = Mock()
+        streamer.coalescer.join.return_value = (spool, False)
         streamer._handle_get(request)
 
+        # validation
+        _follow.assert_called_once_with(request, spool, responder.return_value)
+
+    @patch(MODULE_PREFIX + 'SpoolWriter')
+    @patch(MODULE_PREFIX + 'Streamer._fetch')
+    def test_lead(self, _fetch, writer):
+        request = Mock(code=200)
+        spool = Mock()
+        responder = Mock()
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer.coalescer = Mock()
+        streamer._lead(request, '/a', spool, responder)
+
+        # validation
+        writer.assert_called_once_with(spool, request, responder)
+        _fetch.assert_called_once_with(request, '/a', writer.return_value)
+        streamer.coalescer.done.assert_called_once_with(spool, 200, _fetch.return_value)
+
+    @patch(MODULE_PREFIX + 'SpoolWriter', Mock())
+    @patch(MODULE_PREFIX + 'Streamer._fetch')
+    def test_lead_failed_badly(self, _fetch):
+        request = Mock(code=INTERNAL_SERVER_ERROR)
+        spool = Mock()
+        _fetch.side_effect = ValueError()
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer.coalescer = Mock()
+        streamer._lead(request, '/a', spool, Mock())
+
         # validation
         request.setResponseCode.assert_called_once_with(INTERNAL_SERVER_ERROR)
+        streamer.coalescer.done.assert_called_once_with(spool, INTERNAL_SERVER_ERROR, None)
+
+    @patch(MODULE_PREFIX + 'Streamer._on_succeeded')
+    def test_follow(self, _on_succeeded):
+        request = Mock()
+        responder = Mock()
+        spool = Mock(
+            finished=True,
+            succeeded=True,
+            headers=[('Content-Length', ['6'])])
+        spool.read.return_value = ['abc', 'def']
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer._follow(request, spool, responder)
+
+        # validation
+        spool.wait.assert_called_once_with()
+        request.responseHeaders.setRawHeaders.assert_called_once_with('Content-Length', ['6'])
+        self.assertEqual(responder.write.call_args_list, [call('abc'), call('def')])
+        _on_succeeded.assert_called_once_with(spool.entry, request, None)
+        spool.detach.assert_called_once_with()
+
+    def test_follow_leader_failed(self):
+        request = Mock()
+        responder = Mock()
+        spool = Mock(finished=True, succeeded=False, code=NOT_FOUND)
+
+        # test
+        streamer = Streamer(load_configuration([]))
+        streamer._follow(request, spool, responder)
+
+        # validation
+        request.setResponseCode.assert_called_once_with(NOT_FOUND)
+        request.setHeader.assert_called_once_with('Content-Length', '0')
+        self.assertFalse(responder.write.called)
+        spool.detach.assert_called_once_with()
 
     @patch(MODULE_PREFIX + 'Streamer._insert_deferred')
     def test_on_succeeded_client_requested(self, _insert_deferred):
@@ -224,7 +445,7 @@ class TestStreamer(unittest.TestCase):
         }
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         streamer._on_succeeded(entry, request, report)
 
         # validation
@@ -244,7 +465,7 @@ class TestStreamer(unittest.TestCase):
         }
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         streamer._on_succeeded(entry, request, report)
 
         # validation
@@ -257,7 +478,7 @@ class TestStreamer(unittest.TestCase):
         }.__getitem__
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         streamer._on_all_failed(request)
 
         # validation
@@ -283,7 +504,7 @@ class TestStreamer(unittest.TestCase):
         _get_downloader.return_value = downloader
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         report = streamer._download(twisted_request, entry, responder)
 
         # validation
@@ -319,7 +540,7 @@ class TestStreamer(unittest.TestCase):
         _get_downloader.return_value = downloader
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         self.assertRaises(DownloadFailed, streamer._download, twisted_request, entry, responder)
 
         # validation
@@ -347,7 +568,7 @@ class TestStreamer(unittest.TestCase):
         controller.get_importer_by_id.return_value = plugin
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         downloader = streamer._get_downloader(request, entry)
 
         # validation
@@ -367,7 +588,7 @@ class TestStreamer(unittest.TestCase):
         controller.get_importer_by_id.side_effect = PluginNotFound()
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         self.assertRaises(PluginNotFound, streamer._get_downloader, Mock(), entry)
 
     @patch(MODULE_PREFIX + 'plugin_api')
@@ -382,7 +603,7 @@ class TestStreamer(unittest.TestCase):
         plugin_api.get_unit_model_by_id.return_value = model
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         unit = streamer._get_unit(entry)
 
         # validation
@@ -404,7 +625,7 @@ class TestStreamer(unittest.TestCase):
         q_set.get.side_effect = DoesNotExist
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         self.assertRaises(DoesNotExist, streamer._get_unit, entry)
 
     @patch(MODULE_PREFIX + 'DeferredDownload')
@@ -413,7 +634,7 @@ class TestStreamer(unittest.TestCase):
         model.return_value.save.side_effect = NotUniqueError()
 
         # test
-        streamer = Streamer(Mock())
+        streamer = Streamer(load_configuration([]))
         streamer._insert_deferred(entry)
 
         # validation
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+
+from threading import Thread
+from unittest import TestCase
+
+from mock import Mock
+
+from pulp.streamer.spool import Coalescer, Spool, SpoolWriter
+
+
+class TestSpool(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_read(self):
+        spool = Spool('/a', self.tmp_dir)
+        spool.attach()
+        spool.write('abc')
+        spool.write('def')
+        spool.finish(200, Mock())
+        self.assertTrue(spool.succeeded)
+        self.assertEqual(''.join(spool.read()), 'abcdef')
+        self.assertTrue(os.path.exists(spool.file_path))
+        spool.detach()
+        self.assertFalse(os.path.exists(spool.file_path))
+
+    def test_read_while_growing(self):
+        spool = Spool('/a', self.tmp_dir)
+        spool.attach()
+        spool.write('abc')
+        received = []
+
+        def reader():
+            received.extend(spool.read())
+
+        thread = Thread(target=reader)
+        thread.start()
+        spool.write('def')
+        spool.finish(200, Mock())
+        thread.join()
+        self.assertEqual(''.join(received), 'abcdef')
+
+    def test_finish_no_readers(self):
+        spool = Spool('/a', self.tmp_dir)
+        spool.finish(404)
+        self.assertFalse(spool.succeeded)
+        self.assertEqual(spool.code, 404)
+        self.assertFalse(os.path.exists(spool.file_path))
+
+    def test_set_headers(self):
+        spool = Spool('/a', self.tmp_dir)
+        spool.set_headers(iter([('A', ['1'])]))
+        spool.set_headers([('B', ['2'])])
+        spool.wait()
+        self.assertEqual(spool.headers, [('A', ['1'])])
+        spool.finish(200)
+
+
+class TestSpoolWriter(TestCase):
+
+    def test_write(self):
+        spool = Mock(headers=None)
+        request = Mock()
+        responder = Mock()
+        writer = SpoolWriter(spool, request, responder)
+        writer.write('abc')
+        spool.set_headers.assert_called_once_with(
+            request.responseHeaders.getAllRawHeaders.return_value)
+        responder.write.assert_called_once_with('abc')
+        spool.write.assert_called_once_with('abc')
+
+
+class TestCoalescer(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_join(self):
+        coalescer = Coalescer(self.tmp_dir)
+        spool, leader = coalescer.join('/a')
+        self.assertTrue(leader)
+        spool_2, leader = coalescer.join('/a')
+        self.assertFalse(leader)
+        self.assertTrue(spool is spool_2)
+        _, leader = coalescer.join('/b')
+        self.assertTrue(leader)
+        self.assertEqual(len(coalescer), 2)
+
+    def test_done(self):
+        coalescer = Coalescer(self.tmp_dir)
+        spool, _ = coalescer.join('/a')
+        entry = Mock()
+        coalescer.done(spool, 200, entry)
+        self.assertEqual(len(coalescer), 0)
+        self.assertTrue(spool.succeeded)
+        self.assertEqual(spool.entry, entry)
+        _, leader = coalescer.join('/a')
+        self.assertTrue(leader)